@@ -5,13 +5,16 @@ from datetime import datetime
 import time
 import os
 
-from . data import saveddata, calceddata, cleandata, cfgdata, logdata
+from . data import saveddata, calceddata, cleandata, cfgdata, logdata, mapcache, routecache
 from . data.scheduledata import schedule_tasks
 from . comm.connections import mqttcomm, httpcomm, uartcomm, mqttapi
 from . comm.api import cassandra_api
 from . comm.messageservice import messageservice
 from . data.roverdata import robot
 from . data.mapdata import current_map
+from . data.telemetrystore import telemetry_store
+from . data.telemetryrollup import telemetry_rollup
+from . map.planningjobs import planning_jobs
 
 restart = threading.Event()
 
@@ -97,21 +100,17 @@ def schedule_loop(restart: threading.Event) -> None:
         time.sleep(60)
 
 def store_data(restart: threading.Event, file_paths: tuple) -> None:
+    #New rows are appended to the telemetry store every few seconds (no full dump of the data)
     start_time_save = datetime.now()
-    time_to_wait = 1
     while True:
         if restart.is_set():
             logger.info('Data storage thread is stopped')
-            logger.info('Writing State-Data to the file')
-            saveddata.save('state', file_paths)
-            logger.info('Writing Statistics-Data to the file')
-            saveddata.save('stats', file_paths)
+            logger.info('Writing measured data to the telemetry store')
+            saveddata.save()
             return
-        if (datetime.now() - start_time_save).seconds >= 1800*time_to_wait:
-            logger.info('Writing State-Data to the file')
-            saveddata.save('state', file_paths)
-            logger.info('Writing Statistics-Data to the file')
-            saveddata.save('stats', file_paths)
+        if (datetime.now() - start_time_save).total_seconds() >= telemetry_store.flush_interval:
+            saveddata.save()
+            telemetry_rollup.update()
             start_time_save = datetime.now()
         time.sleep(1)
 
@@ -219,6 +218,8 @@ def start(file_paths) -> None:
    
     # todo: saveddata should probably be a class instead
     saveddata.file_paths = file_paths
+    mapcache.map_cache.path = file_paths.map.cache
+    routecache.route_cache.path = file_paths.map.route_cache
     logger.info('Backend: Read saved data')
     saveddata.read(file_paths.measure)
     logger.info('Backend: Read map data file')
@@ -354,6 +355,7 @@ def reboot() -> None:
 def stop() -> None:
     logger.info('Backendserver is being shut down')
     restart.set()
+    planning_jobs.shutdown()
     time.sleep(1)
     data_storage_running = True
     while data_storage_running:
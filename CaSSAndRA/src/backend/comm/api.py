@@ -8,7 +8,9 @@ import pandas as pd
 from .. data.mapdata import current_map, current_task, mapping_maps, tasks
 from .. data.scheduledata import schedule_tasks
 from .. data.cfgdata import schedulecfg, pathplannercfgapi, commcfg
-from .. map import path, map
+from .. map import map
+from .. map.planningjobs import planning_jobs, apply_route_preview
+from .. map.obstaclereplan import obstacle_replanner
 from .. comm import cmdlist
 from .. comm.connections import mqttapi
 from .. data.roverdata import robot
@@ -86,6 +88,7 @@ class API:
         self.mowparametersstate['mowborder'] = pathplannercfgapi.mowborder
         self.mowparametersstate['mowexclusion'] = pathplannercfgapi.mowexclusion
         self.mowparametersstate['mowborderccw'] = pathplannercfgapi.mowborderccw
+        self.mowparametersstate['angleauto'] = pathplannercfgapi.angleauto
         self.mowparametersstate_json = json.dumps(self.mowparametersstate)
     
     def create_map_payload(self) -> None:
@@ -99,7 +102,10 @@ class API:
         self.mapstate['distanceTotal'] = current_map.distance
         self.mapstate['finishedIdx'] = int(current_map.finished_idx)
         self.mapstate['idxTotal'] = int(current_map.idx)
+        self.mapstate['remainingTime'] = current_map.remaining_time
         self.mapstate['areaTotal'] = int(current_map.areatomow) 
+        latest_job = planning_jobs.latest()
+        self.mapstate['planning'] = latest_job.to_dict() if latest_job is not None else dict()
         self.mapstate_json = json.dumps(self.mapstate)
     
     def create_current_map_coords_payload(self) -> None:
@@ -235,7 +241,7 @@ class API:
     def perform_mow_parameters_cmd(self, buffer: dict) -> None:
         buffer = buffer['value']
         if 'mowPattern' in buffer:
-            allowed_values = ['lines', 'squares', 'rings']
+            allowed_values = ['lines', 'squares', 'rings', 'cells']
             pattern = buffer['mowPattern']
             value = list(set([pattern]).intersection(allowed_values))
             if value != []:
@@ -254,11 +260,15 @@ class API:
             except Exception as e:
                 logger.info(f'Width value is invalid')
                 logger.debug(str(e))
-        if 'angle' in buffer:
+        if 'angle' in buffer and buffer['angle'] == 'auto':
+            pathplannercfgapi.angleauto = True
+            logger.info(f'Mow parameter angle changed to: auto')
+        elif 'angle' in buffer:
             try:
                 value = int(buffer['angle'])
                 if 0 <= value <= 359:
                     pathplannercfgapi.angle = value
+                    pathplannercfgapi.angleauto = False
                     logger.info(f'Mow parameter angle changed to: {value}')
                 else:
                     logger.info(f'Wrong range of angle value')
@@ -313,7 +323,7 @@ class API:
                 logger.debug(str(e))
     
     def check_map_cmd(self, buffer) -> None:
-        allowed_values = ['setSelection', 'setMowParameters', 'resetObstacles']
+        allowed_values = ['setSelection', 'setMowParameters', 'resetObstacles', 'replanObstacles', 'cancelPlanning']
         command = list(set([buffer['command']]).intersection(allowed_values))
         if command != []:
             if command[0] == 'setSelection':
@@ -322,6 +332,10 @@ class API:
                 self.perform_mow_parameters_cmd(buffer)
             elif command[0] == 'resetObstacles':
                 self.perform_reset_obstacles_cmd()
+            elif command[0] == 'replanObstacles':
+                self.perform_replan_obstacles_cmd()
+            elif command[0] == 'cancelPlanning':
+                self.perform_cancel_planning_cmd()
         else:
             logger.info(f'No valid command in api message found. Allowed commands: {allowed_values}. Aborting')
     
@@ -389,12 +403,7 @@ class API:
                     elif self.command == 'load':
                         self.loaded_tasks = self.value
                         current_task.load_task_order(self.value)
-                        current_map.task_progress = 0
-                        current_map.calculating = True
-                        path.calc_task(current_task.subtasks, current_task.subtasks_parameters)
-                        current_map.calculating = False
-                        current_map.calc_route_mowpath()
-                        cmdlist.cmd_take_map = True
+                        planning_jobs.submit_task(current_task.subtasks, current_task.subtasks_parameters, on_done=self.take_planned_map, source='api')
             except Exception as e:
                 logger.info(f'No valid value in api message found. Allowed values: {allowed_values}. Aborting')
                 logger.debug(f'{e}')
@@ -461,44 +470,41 @@ class API:
             cmdlist.cmd_resume = True
         elif self.value == 'task':
             if self.tasksstate['selected'] != []:
-                current_map.task_progress = 0
-                current_map.calculating = True
-                path.calc_task(current_task.subtasks, current_task.subtasks_parameters)
-                current_map.calculating = False
-                current_map.calc_route_mowpath()
-                cmdlist.cmd_mow = True
+                planning_jobs.submit_task(current_task.subtasks, current_task.subtasks_parameters, on_done=self.mow_planned_route, source='api')
             else:
                 logger.info(f'No selected tasks found')
         elif self.value == 'all':
             current_map.selected_perimeter = current_map.perimeter_polygon
-            current_map.calculating = True
-            current_map.task_progress = 0
-            current_map.total_tasks = 1
-            route = path.calc_simple(current_map.selected_perimeter, pathplannercfgapi)
-            if route:
-                current_map.areatomow = round(current_map.selected_perimeter.area)
-                current_map.calc_route_preview(route) 
-            current_map.calculating = False
-            current_map.calc_route_mowpath()
-            cmdlist.cmd_mow = True
+            planning_jobs.submit_simple(current_map.selected_perimeter, pathplannercfgapi, on_done=self.mow_planned_route, source='api')
         elif self.value == 'selection':
             if 'selection' in self.mapstate:
                 current_map.selected_perimeter = map.selection(current_map.perimeter_polygon, self.mapstate['selection'])
-                current_map.calculating = True
-                current_map.task_progress = 0
-                current_map.total_tasks = 1
-                route = path.calc_simple(current_map.selected_perimeter, pathplannercfgapi)
-                if route:
-                    current_map.calc_route_preview(route)
-                    current_map.areatomow = round(current_map.selected_perimeter.area)
-                current_map.calculating = False
-                current_map.calc_route_mowpath()
-                cmdlist.cmd_mow = True
+                planning_jobs.submit_simple(current_map.selected_perimeter, pathplannercfgapi, on_done=self.mow_planned_route, source='api')
             else:
                 logger.info(f'No selection found')
         else:
             logger.info(f'No valid value in api message found. Allowed values: {allowed_values}. Aborting')
     
+    def mow_planned_route(self, job) -> None:
+        if apply_route_preview(job):
+            current_map.calc_route_mowpath()
+            cmdlist.cmd_mow = True
+        else:
+            logger.info(f'Route calculation {job.state}. Mow command not sent')
+
+    def take_planned_map(self, job) -> None:
+        if apply_route_preview(job):
+            current_map.calc_route_mowpath()
+            cmdlist.cmd_take_map = True
+        else:
+            logger.info(f'Route calculation {job.state}. Map not sent')
+
+    def perform_cancel_planning_cmd(self) -> None:
+        if planning_jobs.running_source('api'):
+            planning_jobs.cancel_source('api')
+        else:
+            logger.info('No running route calculation found')
+    
     def perform_goto_cmd(self) -> None:
         if 'x' in self.value and 'y' in self.value:
             try:
@@ -521,6 +527,12 @@ class API:
     def perform_reset_obstacles_cmd(self) -> None:
         current_map.add_obstacles(pd.DataFrame())
     
+    def perform_replan_obstacles_cmd(self) -> None:
+        obstacle_replanner.replan_mowpath(on_replanned=self.mow_replanned_route, source='api')
+
+    def mow_replanned_route(self) -> None:
+        cmdlist.cmd_mow = True
+    
     def perform_coords_cmd(self, buffer) -> None:
         allowed_values = ['currentMap', 'preview', 'mowPath', 'obstacles']
         if 'value' in buffer:
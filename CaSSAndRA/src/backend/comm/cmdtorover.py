@@ -7,11 +7,12 @@ from datetime import datetime
 
 from .. data.mapdata import current_map
 from .. data.roverdata import robot
+from .. data.route import Route
 from .. data.cfgdata import rovercfg, commcfg
 from . import cmdlist
 #from . api import cassandra_api
 
-def takemap(perimeter: pd.DataFrame, way: pd.DataFrame, dock: bool) -> pd.DataFrame:
+def takemap(perimeter: pd.DataFrame, way: Route, dock: bool) -> pd.DataFrame:
     robot.status_timestamp = datetime.now()
     robot.set_robot_status('map upload', 'map upload')
 
@@ -22,21 +23,17 @@ def takemap(perimeter: pd.DataFrame, way: pd.DataFrame, dock: bool) -> pd.DataFr
     if not dock:
         perimeter = perimeter[perimeter['type'] != 'dockpoints']
 
-    data = pd.concat([perimeter, way], ignore_index=True)
-    
-    data = data.round(2)
+    perimeter_rounded = perimeter[['X', 'Y']].round(2)
+    coords = (','+perimeter_rounded['X'].astype(str)+','+perimeter_rounded['Y'].astype(str)).to_list()
+    #Coordinate strings of the way are prepared once by the route
+    coords.extend(way.upload_coords)
     #Create AT+W messages
-    amount_of_packages = data.index//30
-    data['package_nr'] = amount_of_packages
-    data['coords'] = ','+data['X'].astype(str)+','+data['Y'].astype(str) 
-    data = data.groupby('package_nr').agg({'coords': lambda x: list(x)})
-    buffer = pd.DataFrame()
-    for i, row in data.iterrows():
-        buffer_str = ''.join(row['coords'])
-        msg = {'msg': 'AT+W,'+str(i*30)+buffer_str}
-        msg_df = pd.DataFrame([msg])
-        buffer = pd.concat([buffer, msg_df], ignore_index=True)
+    msgs = []
+    for i in range(0, len(coords), 30):
+        msg = {'msg': 'AT+W,'+str(i)+''.join(coords[i:i+30])}
+        msgs.append(msg)
         logger.debug('Add to takemap buffer: '+str(msg))
+    buffer = pd.DataFrame(msgs)
 
     #Create AT+N message
     perimeter_cnt = len(perimeter[perimeter['type'] == 'perimeter'])
@@ -45,10 +42,7 @@ def takemap(perimeter: pd.DataFrame, way: pd.DataFrame, dock: bool) -> pd.DataFr
     exclusion_names = np.delete(exclusion_names, np.where(exclusion_names == 'dockpoints'))
     exclusions_cnt = len(perimeter[perimeter['type'].isin(exclusion_names)])
     docking_cnt = len(perimeter[perimeter['type'] == 'dockpoints'])
-    if way.empty:
-        way_cnt = 0
-    else:
-        way_cnt = len(way[way['type'] == 'way'])
+    way_cnt = len(way)
     msg = {'msg': 'AT+N,'+str(perimeter_cnt)+','+str(exclusions_cnt)+','+str(docking_cnt)+','+str(way_cnt)+',0'}
     msg_df = pd.DataFrame([msg])
     buffer = pd.concat([buffer, msg_df], ignore_index=True)
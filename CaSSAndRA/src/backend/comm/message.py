@@ -6,6 +6,7 @@ from datetime import datetime
 
 from src.backend.data.mapdata import current_map
 from src.backend.data.roverdata import robot
+from src.backend.data.route import Route
 from src.backend.data.mapdata import current_map
 from . import cmdtorover, cmdlist
 
@@ -39,10 +40,10 @@ def check() -> pd.DataFrame:
             robot.uptoday = False
             robot.map_upload_failed = False
             perimeter_no_dockpath = current_map.perimeter[(current_map.perimeter['type'] != 'dockpoints') & (current_map.perimeter['type'] != 'search wire')]
-            data = pd.concat([perimeter_no_dockpath, current_map.gotopoint], ignore_index=True)
-            mapCRCx = data['X']*100 
-            mapCRCy = data['Y']*100
-            current_map.map_crc = int(mapCRCx.sum() + mapCRCy.sum())
+            gotopoint = Route.from_dataframe(current_map.gotopoint)
+            mapCRCx = perimeter_no_dockpath['X']*100 
+            mapCRCy = perimeter_no_dockpath['Y']*100
+            current_map.map_crc = int(mapCRCx.sum() + mapCRCy.sum() + gotopoint.crc)
             if cmdlist.cmd_take_map_attempt >= 5:
                 logger.warning('Backend: Could not upload map to the rover')
                 cmdlist.cmd_take_map_attempt = 0
@@ -54,7 +55,7 @@ def check() -> pd.DataFrame:
             logger.debug('Map crc deivation: '+str(abs(current_map.map_crc - robot.map_crc)))    
             logger.debug('Initiate map upload.')
             cmdlist.cmd_take_map_attempt = cmdlist.cmd_take_map_attempt + 1
-            map_msg = cmdtorover.takemap(current_map.perimeter, current_map.gotopoint, dock=False)
+            map_msg = cmdtorover.takemap(current_map.perimeter, gotopoint, dock=False)
             msg_pckg = map_msg
             return msg_pckg
         
@@ -68,7 +69,7 @@ def check() -> pd.DataFrame:
                 cmdlist.cmd_take_map_attempt = 0
                 goto_msg = cmdtorover.goto()
                 msg_pckg = goto_msg
-                robot.current_task = current_map.gotopoint
+                robot.current_task = Route.from_dataframe(current_map.gotopoint)
                 robot.last_cmd = goto_msg
                 robot.last_task_name = 'go to'
                 robot.last_mow_status = checkmowmotor(goto_msg, robot.last_mow_status)
@@ -163,10 +164,9 @@ def check() -> pd.DataFrame:
             robot.uptoday = False
             robot.map_upload_failed = False
             data = current_map.perimeter[current_map.perimeter['type'] != 'search wire']
-            data = pd.concat([data, current_map.mowpath], ignore_index=True)
             mapCRCx = data['X']*100 
             mapCRCy = data['Y']*100
-            current_map.map_crc = int(mapCRCx.sum() + mapCRCy.sum())
+            current_map.map_crc = int(mapCRCx.sum() + mapCRCy.sum() + current_map.mowpath.crc)
             if cmdlist.cmd_take_map_attempt >= 5:
                 logger.warning('Backend: Could not upload map to the rover')
                 cmdlist.cmd_take_map_attempt = 0
@@ -256,10 +256,9 @@ def check() -> pd.DataFrame:
             robot.uptoday = False
             robot.map_upload_failed = False
             data = current_map.perimeter[current_map.perimeter['type'] != 'search wire']
-            data = pd.concat([data, current_map.mowpath], ignore_index=True)
             mapCRCx = data['X']*100 
             mapCRCy = data['Y']*100
-            current_map.map_crc = int(mapCRCx.sum() + mapCRCy.sum())
+            current_map.map_crc = int(mapCRCx.sum() + mapCRCy.sum() + current_map.mowpath.crc)
             if cmdlist.cmd_take_map_attempt >= 5:
                 logger.warning('Backend: Could not upload map to the rover')
                 cmdlist.cmd_take_map_attempt = 0
@@ -15,7 +15,7 @@ from . mapdata import current_map, mapping_maps
 def calcdata_from_state():
     logger.debug('Backend: Calc data from state data frame')
     #create longnames
-    current_df = roverdata.state.iloc[-1]
+    current_df = roverdata.state.last()
     if current_df['position_solution'] == 2:
         solution = 'fix'
     elif current_df['position_solution'] == 1:
@@ -84,8 +84,7 @@ def calcdata_from_state():
         soc = 100
 
     calced_from_state = {'solution':solution, 'job':job, 'sensor': sensor, 'soc': soc, 'timestamp': current_df['timestamp']}
-    calced_from_state = pd.DataFrame(calced_from_state, index=[0])
-    roverdata.calced_from_state = pd.concat([roverdata.calced_from_state, calced_from_state], ignore_index=True)
+    roverdata.calced_from_state.append(calced_from_state)
 
 def calcdata_from_stats():
     pass
@@ -100,9 +99,9 @@ def calcdata_from_stats():
         if (diff_df.iloc[-1]['duration_idle'] < 0 or diff_df.iloc[-1]['duration_charge'] < 0 or diff_df.iloc[-1]['duration_mow'] < 0 
             or diff_df.iloc[-1]['duration_mow_fix'] < 0 or diff_df.iloc[-1]['duration_mow_float'] < 0 or diff_df.iloc[-1]['duration_mow_invalid'] < 0):
             diff_df = roverdata.stats.tail(1)
-        diff_df.loc[:,'timestamp'] = roverdata.stats.iloc[-1]['timestamp']
+        diff_df.loc[:,'timestamp'] = roverdata.stats.last()['timestamp']
         calced_from_stats = diff_df
-        roverdata.calced_from_stats = pd.concat([roverdata.calced_from_stats, calced_from_stats], ignore_index=True)
+        roverdata.calced_from_stats.extend(calced_from_stats)
     else:
         logger.warning('Backend: Could not write calc from stats data to data frame. Skipping')
 
@@ -117,9 +116,8 @@ def calc_rover_state():
         if difference > appcfg.time_to_offline:
             logger.warning('Backend: Could not connect to the rover. State set to offline')
             robot.set_robot_status('offline')
-            calced_from_state = {'solution':'invalid', 'job':'offline', 'sensor': 'no error', 'timestamp': str(now)}
-            calced_from_state = pd.DataFrame(calced_from_state, index=[0])
-            roverdata.calced_from_state = pd.concat([roverdata.calced_from_state, calced_from_state], ignore_index=True)
+            calced_from_state = {'solution':'invalid', 'job':'offline', 'sensor': 'no error', 'timestamp': now}
+            roverdata.calced_from_state.append(calced_from_state)
 
     
 
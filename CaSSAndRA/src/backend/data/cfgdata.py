@@ -250,6 +250,12 @@ class PathPlannerCfg:
     mowborder: int = 1
     mowexclusion: bool = True
     mowborderccw: bool = True
+    #angle is taken by the angle optimizer, the angle value is kept for manual planning
+    angleauto: bool = False
+    #planner options of the settings file (not part of task parameters), off: faster planning
+    segmentorder: bool = False
+    simplify: bool = True
+    simplifytolerance: float = 0.02
 
     def read_pathplannercfg(self) -> None:
         try:
@@ -271,6 +277,10 @@ class PathPlannerCfg:
             self.mowborder = pathplannercfg_from_file['mowborder']
             self.mowexclusion = pathplannercfg_from_file['mowexclusion']
             self.mowborderccw = pathplannercfg_from_file['mowborderccw']
+            self.angleauto = pathplannercfg_from_file.get('angleauto', False)
+            self.segmentorder = pathplannercfg_from_file.get('segmentorder', False)
+            self.simplify = pathplannercfg_from_file.get('simplify', True)
+            self.simplifytolerance = pathplannercfg_from_file.get('simplifytolerance', 0.02)
         except Exception as e:
             logger.error('Could not read pathplannercfg.json. Data are invalid. Go with standard values')
             res = self.save_pathplannercfg()
@@ -286,6 +296,10 @@ class PathPlannerCfg:
             new_data['mowborder'] = self.mowborder
             new_data['mowexclusion'] = self.mowexclusion
             new_data['mowborderccw'] = self.mowborderccw
+            new_data['angleauto'] = self.angleauto
+            new_data['segmentorder'] = self.segmentorder
+            new_data['simplify'] = self.simplify
+            new_data['simplifytolerance'] = self.simplifytolerance
             with open(file_paths.user.pathplannercfg, 'w') as f:
                 logger.debug('New pathplannercfg data: '+str(new_data))
                 json.dump(new_data, f, indent=4)
@@ -305,6 +319,8 @@ class PathPlannerCfg:
         self.mowborder = parameters.iloc[0]['mowborder']
         self.mowexclusion = parameters.iloc[0]['mowexclusion']
         self.mowborderccw = parameters.iloc[0]['mowborderccw']
+        #tasks saved before the angle optimizer have no angleauto column (or NaN after concat)
+        self.angleauto = parameters.iloc[0].get('angleauto', False) == True
 
 @dataclass
 class ScheduleCfg:
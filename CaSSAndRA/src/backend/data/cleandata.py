@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 #local imports
 from . import roverdata, appdata
 from . cfgdata import appcfg
+from . telemetrystore import telemetry_store
 
 def check(data_clean_finished: bool) -> bool:
     now = datetime.now()
@@ -15,24 +16,11 @@ def check(data_clean_finished: bool) -> bool:
         logger.info('Backend: Cleaning meausered and calced data. Max age: '+str(appcfg.datamaxage)+' days')
         delta_time = str(datetime.now() - timedelta(appcfg.datamaxage))
 
-        #Clean state data 
+        #Clean state, stats and calced data (whole days of the telemetry store)
         try:
-            state = roverdata.state[(roverdata.state['timestamp'] > delta_time)]
-            logger.debug('state data: '+str(len(roverdata.state[(roverdata.state['timestamp'] <= delta_time)]))+' rows will be droped')
-            state = state.reset_index(drop=True)
-            roverdata.state = state
+            telemetry_store.drop_before(datetime.now() - timedelta(appcfg.datamaxage))
         except Exception as e:
-            logger.error('Clean state data call failed!')
-            logger.error(f'{e}')
-
-        #Clean stats data 
-        try:
-            stats = roverdata.stats[(roverdata.stats['timestamp'] > delta_time)]
-            logger.debug('stats data: '+str(len(roverdata.stats[(roverdata.stats['timestamp'] <= delta_time)]))+' rows will be droped')
-            stats = stats.reset_index(drop=True)
-            roverdata.stats = stats
-        except Exception as e:
-            logger.error('Clean stats data call failed!')
+            logger.error('Clean telemetry data call failed!')
             logger.error(f'{e}')
 
         #Clean props data 
@@ -53,18 +41,6 @@ def check(data_clean_finished: bool) -> bool:
         except:
             logger.debug('online data: nothing to clean')
 
-        #Clean calced_from_state data 
-        calced_from_state = roverdata.calced_from_state[(roverdata.calced_from_state['timestamp'] > delta_time)]
-        logger.debug('calced_from_state data: '+str(len(roverdata.calced_from_state[(roverdata.calced_from_state['timestamp'] <= delta_time)]))+' rows will be droped')
-        calced_from_state = calced_from_state.reset_index(drop=True)
-        roverdata.calced_from_state = calced_from_state
-
-        #Clean calced_from_stats data 
-        calced_from_stats = roverdata.calced_from_stats[(roverdata.calced_from_stats['timestamp'] > delta_time)]
-        logger.debug('calced_from_stats data: '+str(len(roverdata.calced_from_stats[(roverdata.calced_from_stats['timestamp'] <= delta_time)]))+' rows will be droped')
-        calced_from_stats = calced_from_stats.reset_index(drop=True)
-        roverdata.calced_from_stats = calced_from_stats
-
         data_clean_finished = True
 
     elif now.hour != 0:
@@ -55,10 +55,9 @@ def add_state_to_df_from_mqtt(data: dict) -> None:
                     'lateral_error': 0,
                     'timetable_autostartstop_dayofweek': 0,
                     'timetabel_autostartstop_hour' : 0,
-                    'timestamp': str(datetime.now())}
-        state_to_df = pd.DataFrame(data=state_to_df, index=[0])
+                    'timestamp': datetime.now()}
         robot.set_state(state_to_df)
-        roverdata.state = pd.concat([roverdata.state, state_to_df], ignore_index=True)
+        roverdata.state.append(state_to_df)
         calceddata.calcdata_from_state()
     except Exception as e:
         logger.error('Backend: Failed to write state data to data frame')
@@ -109,9 +108,8 @@ def add_stats_to_df_from_mqtt(data: dict) -> None:
                     'counter_diff_imu_wheel_yaw_speed_triggered': 0,
                     'counter_imu_no_rotation_triggered': 0,
                     'counter_rotation_timeout_triggered': 0,
-                    'timestamp': str(datetime.now())}
-        stats_to_df = pd.DataFrame(data=stats_to_df, index=[0])
-        roverdata.stats = pd.concat([roverdata.stats, stats_to_df], ignore_index=True)
+                    'timestamp': datetime.now()}
+        roverdata.stats.append(stats_to_df)
         calceddata.calcdata_from_stats()
     except Exception as e:
         logger.error('Backend: Failed to write stats data to data frame')
@@ -148,9 +146,8 @@ def add_state_to_df(data: str) -> None:
             data_list.append('0')
             data_list.append('0')
         data_list = [float(x) if '.' in x else int(x) for x in data_list]
-        data_list.append(str(datetime.now()))
-        state_to_df = pd.DataFrame([data_list])
-        state_to_df.columns = ['battery_voltage',
+        data_list.append(datetime.now())
+        state_to_df = dict(zip(['battery_voltage',
                             'position_x',
                             'position_y',
                             'position_delta',
@@ -169,9 +166,9 @@ def add_state_to_df(data: str) -> None:
                             'lateral_error',
                             'timetable_autostartstop_dayofweek',
                             'timetabel_autostartstop_hour',
-                            'timestamp']
+                            'timestamp'], data_list))
         robot.set_state(state_to_df)
-        roverdata.state = pd.concat([roverdata.state, state_to_df], ignore_index=True)
+        roverdata.state.append(state_to_df)
         calceddata.calcdata_from_state()
     except Exception as e:
         logger.error('Backend: Failed to write state data to data frame')
@@ -189,9 +186,8 @@ def add_stats_to_df(data: str) -> None:
         if len(data_list) < 31:
             data_list.extend(['0', '0', '0', '0', '0', '0'])
         data_list = [float(x) if '.' in x else int(x) for x in data_list]
-        data_list.append(str(datetime.now()))
-        stats_to_df = pd.DataFrame([data_list])
-        stats_to_df.columns = [
+        data_list.append(datetime.now())
+        stats_to_df = dict(zip([
                                 'duration_idle',
                                 'duration_charge',
                                 'duration_mow',
@@ -224,8 +220,8 @@ def add_stats_to_df(data: str) -> None:
                                 'counter_imu_no_rotation_triggered',
                                 'counter_rotation_timeout_triggered',
                                 'timestamp'
-                            ]
-        roverdata.stats = pd.concat([roverdata.stats, stats_to_df], ignore_index=True)
+                            ], data_list))
+        roverdata.stats.append(stats_to_df)
         calceddata.calcdata_from_stats()
     except Exception as e:
         logger.error('Backend: Failed to write stats data to data frame')
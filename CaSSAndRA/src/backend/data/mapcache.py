@@ -0,0 +1,116 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import *
+from dataclasses import dataclass
+
+from .. map.distancetable import DistanceTable
+
+#Disk cache for map artifacts (perimeter polygon, search wire, go to points, A* graph edges and distance table).
+#Entries are keyed by a hash of the map coordinates, so an edited map gets a new entry.
+#Least recently used entries are removed, if there are more than max_entries files.
+@dataclass
+class MapCache:
+    path: str = None
+    max_entries: int = 16
+    version: str = '2'
+    hits: int = 0
+    misses: int = 0
+
+    def key(self, perimeter: pd.DataFrame) -> str:
+        if perimeter.empty:
+            return None
+        coords = perimeter[['X', 'Y']].to_numpy(dtype=float)
+        types = '\n'.join(perimeter['type'].astype(str).tolist())
+        content = hashlib.sha1(self.version.encode())
+        content.update(np.ascontiguousarray(coords).tobytes())
+        content.update(types.encode())
+        return content.hexdigest()
+
+    def file(self, key: str) -> str:
+        return os.path.join(self.path, key+'.npz')
+
+    def load(self, key: str) -> dict:
+        if self.path is None or key is None:
+            return None
+        file = self.file(key)
+        if not os.path.exists(file):
+            self.misses += 1
+            logger.debug('Map cache: miss '+key)
+            return None
+        try:
+            with np.load(file, allow_pickle=False) as data:
+                artifacts = dict(perimeter_polygon=shapely.from_wkb(data['perimeter_polygon'].tobytes()),
+                                 search_wire=shapely.from_wkb(data['search_wire'].tobytes()),
+                                 gotopoints=data['gotopoints'].copy(),
+                                 edges=data['edges'].copy(),
+                                 astar_table=DistanceTable(sources=data['table_sources'].copy(),
+                                                           predecessors=data['table_predecessors'].copy(),
+                                                           lengths=data['table_lengths'].copy()))
+            os.utime(file)
+            self.hits += 1
+            logger.info('Map cache: artifacts loaded from cache')
+            return artifacts
+        except Exception as e:
+            logger.warning('Map cache: Could not read cache file, artifacts will be recalculated')
+            logger.debug(str(e))
+            self.invalidate(key)
+            self.misses += 1
+            return None
+
+    def save(self, key: str, perimeter_polygon: Polygon, search_wire: LineString, gotopoints: np.ndarray, edges: np.ndarray, astar_table: DistanceTable) -> None:
+        if self.path is None or key is None:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            file_tmp = self.file(key)+'.'+str(os.getpid())+'.tmp'
+            with open(file_tmp, 'wb') as f:
+                np.savez(f, perimeter_polygon=np.frombuffer(perimeter_polygon.wkb, dtype=np.uint8),
+                         search_wire=np.frombuffer(search_wire.wkb, dtype=np.uint8),
+                         gotopoints=np.asarray(gotopoints, dtype=float).reshape(-1, 2),
+                         edges=np.asarray(edges, dtype=float).reshape(-1, 5),
+                         table_sources=astar_table.sources,
+                         table_predecessors=astar_table.predecessors,
+                         table_lengths=astar_table.lengths)
+            os.replace(file_tmp, self.file(key))
+            logger.info('Map cache: artifacts saved to cache')
+            self.evict()
+        except Exception as e:
+            logger.warning('Map cache: Could not save artifacts to cache')
+            logger.debug(str(e))
+
+    def invalidate(self, key: str) -> None:
+        if self.path is None or key is None:
+            return
+        try:
+            if os.path.exists(self.file(key)):
+                os.remove(self.file(key))
+                logger.debug('Map cache: removed entry '+key)
+        except Exception as e:
+            logger.warning('Map cache: Could not remove cache entry')
+            logger.debug(str(e))
+
+    def evict(self) -> None:
+        try:
+            files = [os.path.join(self.path, file) for file in os.listdir(self.path) if file.endswith('.npz')]
+            files.sort(key=os.path.getmtime)
+            for file in files[:max(0, len(files)-self.max_entries)]:
+                os.remove(file)
+                logger.debug('Map cache: evicted '+os.path.basename(file))
+        except Exception as e:
+            logger.warning('Map cache: Could not evict cache entries')
+            logger.debug(str(e))
+
+    def clear(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        for file in os.listdir(self.path):
+            if file.endswith('.npz'):
+                os.remove(os.path.join(self.path, file))
+
+map_cache = MapCache()
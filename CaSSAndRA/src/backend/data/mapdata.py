@@ -7,16 +7,27 @@ import io
 import os
 import json
 import pandas as pd
+import numpy as np
 import math
 import networkx as nx
 from dataclasses import dataclass, field, asdict
 from shapely.geometry import *
 from PIL import Image
 import uuid
+import threading
 
 from .roverdata import robot
 from .cfgdata import PathPlannerCfg, pathplannercfg, rovercfg
+from .mapcache import map_cache
+from .route import Route
 from .. map import map
+from .. map.directway import directway
+from .. map import visibilitygraph
+from .. map.astar import CSRGraph
+from .. map.distancetable import DistanceTable
+
+class PlanningCancelled(Exception):
+    pass
 
 @dataclass
 class Perimeter:
@@ -32,15 +43,16 @@ class Perimeter:
     search_wire_points: MultiPoint = MultiPoint()
     gotopoints: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
     gotopoint: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
-    mowpath: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
+    mowpath: Route = field(default_factory=Route)
     mowpathId: str = None
-    preview: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
+    preview: Route = field(default_factory=lambda: Route(type='preview route'))
     previewId: str = None
     obstacles: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
     obstaclesId: str = None
     obstacle_img: Image = field(default_factory = lambda: 
                                 Image.open(os.path.dirname(__file__).replace('/backend/data', '/assets/icons/obstacle.png')))
-    astar_graph: nx.Graph = nx.Graph()
+    astar_graph: CSRGraph = field(default_factory=CSRGraph)
+    astar_table: DistanceTable = field(default_factory=DistanceTable)
     areatomow: int = 0
     distancetogo: int = 0
     map_crc: int = None
@@ -53,12 +65,19 @@ class Perimeter:
     finished_idx: int = 0
     idx: int = 0
     idx_perc: int = 0 
+    remaining_time: int = None
     # Progress bar
     calculating: bool = False
     calculated_progress: int = 0
     total_progress: int = 0
     task_progress: int = 0
     total_tasks: int = 0
+    calc_cancel: threading.Event = field(default_factory=threading.Event)
+
+    def check_calc_cancelled(self) -> None:
+        #Called by the planners in their main loops, set by the planning job service
+        if self.calc_cancel.is_set():
+            raise PlanningCancelled('Route calculation cancelled')
 
     def set_gotopoint(self, clickdata: dict) -> None:
         goto = {'X':[clickdata['points'][0]['x']], 'Y':[clickdata['points'][0]['y']], 'type': ['way']}
@@ -86,6 +105,7 @@ class Perimeter:
                 perimeter = perimeter.difference(exclusions.convex_hull)
         self.perimeter_polygon = perimeter
         #create search wire
+        self.search_wire = LineString()
         if not search_wire.empty and len(search_wire) >= 2:
             search_wire_coords = search_wire[['X', 'Y']]
             self.search_wire = LineString(search_wire_coords.values.tolist())
@@ -114,6 +134,7 @@ class Perimeter:
         perimeter_points = MultiPoint((perimeter_coords))
         self.perimeter_points = perimeter_points
         #Create MultiPoint from search wire
+        self.search_wire_points = MultiPoint()
         if not self.search_wire.is_empty:
             search_wire_coords = list(self.search_wire.coords)
             search_wire_points = MultiPoint(search_wire_coords)
@@ -147,92 +168,61 @@ class Perimeter:
             gotopoints = pd.concat([gotopoints, coords_df], ignore_index=True)
             self.gotopoints = gotopoints
 
-    def create_networkx_graph(self):
-        G = nx.Graph()
-        #Create networkx edges for perimeter
-        logger.info('Create networkx edges for perimeter (A* pathfinder)')
-        perimeter_coords = list(self.perimeter_polygon.exterior.coords)
-        for i in range(len(perimeter_coords)-1):
-            line = LineString(([perimeter_coords[i], perimeter_coords[i+1]]))
-            G.add_edge(list(line.coords)[0], list(line.coords)[1], weight=line.length)
-            for k in range(len(perimeter_coords)-1):
-                possible_way = self.check_direct_way(perimeter_coords[i], perimeter_coords[k])
-                if possible_way:
-                    direct_way = LineString((perimeter_coords[i], perimeter_coords[k]))
-                    G.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-        logger.debug('NetworkX perimeter edges: '+str(len(G.edges)))
-        
-        #Create networkx edges for exclusions
-        logger.info('Create networkx edges for exclusions (A* pathfinder)')
-        for excl in self.perimeter_polygon.interiors:
-            excl_coords = list(excl.coords)
-            for i in range(len(excl_coords)-1):
-                line = LineString(([excl_coords[i], excl_coords[i+1]]))
-                G.add_edge(list(line.coords)[0], list(line.coords)[1], weight=line.length)
-        logger.debug('NetworkX perimeter + exlusion edges: '+str(len(G.edges)))
+    def create_networkx_graph(self, edges: list = None) -> list:
+        if edges is None:
+            edges = visibilitygraph.create_edges(self.perimeter_polygon, self.search_wire)
+        self.astar_graph = CSRGraph.from_edges(edges)
+        logger.debug('A* graph created. Nodes: '+str(self.astar_graph.number_of_nodes())+' Edges: '+str(self.astar_graph.number_of_edges()))
+        return edges
 
-        #Create networkx edges betweed exclusions and perimeter
-        logger.info('Create networkx edges between exclusions and perimeter (A* pathfinder)')
-        for excl in self.perimeter_polygon.interiors:
-            connected_to_perimeter = False
-            excl_coords = list(excl.coords)
-            for i in range(len(excl_coords)-1):
-                for k in range(len(perimeter_coords)-1):
-                    possible_way = self.check_direct_way(excl_coords[i], perimeter_coords[k])
-                    if possible_way:
-                        connected_to_perimeter = True
-                        direct_way = LineString((excl_coords[i], perimeter_coords[k]))
-                        G.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-            if connected_to_perimeter == False:
-                logger.info('One exclusion could not be connected to perimeter')
-                logger.info('Trying to connect to other exclusions')
-                for l in range(len(excl_coords)-1):
-                    for other_exclusion in self.perimeter_polygon.interiors:
-                        other_exclusion_coords = list(other_exclusion.coords)
-                        for m in range(len(other_exclusion.coords)):
-                            possible_way = self.check_direct_way(excl_coords[l], other_exclusion_coords[m])
-                            if possible_way:
-                                connected_to_perimeter = True
-                                direct_way = LineString((excl_coords[l], other_exclusion_coords[m]))
-                                G.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-        logger.debug('NetworkX perimeter + exclusion + perimeter/exclusion edges: '+str(len(G.edges)))
-        #Create networkx edges from search wire
-        logger.info('Create networkx edges for search wire (A* pathfinder)')
-        if not self.search_wire.is_empty:
-            search_wire_coords = list(self.search_wire.coords)
-            for i in range(len(search_wire_coords)-1):
-                line = LineString(([search_wire_coords[i], search_wire_coords[i+1]]))
-                G.add_edge(list(line.coords)[0], list(line.coords)[1], weight=line.length/2)
-                for other_search_wire_point in self.search_wire_points.geoms:
-                    possible_way = self.check_direct_way(search_wire_coords[i], list(other_search_wire_point.coords)[0])
-                    if possible_way:
-                        direct_way = LineString((search_wire_coords[i], list(other_search_wire_point.coords)[0]))
-                        G.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length/2)
-                for perimeter_point in self.perimeter_points.geoms:
-                    possible_way = self.check_direct_way(search_wire_coords[i], list(perimeter_point.coords)[0])
-                    if possible_way:
-                        direct_way = LineString((search_wire_coords[i], list(perimeter_point.coords)[0]))
-                        G.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-            logger.debug('NetworkX perimeter + exclusion + perimeter/exclusion edges + search wire edges: '+str(len(G.edges)))
+    def create_distance_table(self) -> None:
+        logger.info('Create distance table for perimeter and exclusion points (A* pathfinder)')
+        self.astar_table = DistanceTable.create(self.astar_graph, [(point.x, point.y) for point in self.perimeter_points.geoms])
+
+    def save_artifacts_to_cache(self, cache_key: str, edges: list) -> None:
+        if self.gotopoints.empty:
+            gotopoints = np.empty((0, 2))
         else:
-            logger.info('No search wire found.')
-        self.astar_graph = G
+            gotopoints = self.gotopoints[['X', 'Y']].to_numpy(dtype=float)
+        edges = np.array([(start[0], start[1], end[0], end[1], weight) for start, end, weight in edges], dtype=float)
+        map_cache.save(cache_key, self.perimeter_polygon, self.search_wire, gotopoints, edges, self.astar_table)
+
+    def load_artifacts_from_cache(self, artifacts: dict) -> None:
+        self.perimeter_polygon = artifacts['perimeter_polygon']
+        self.search_wire = artifacts['search_wire']
+        self.create_perimeter_for_plot()
+        self.create_points_from_polygon()
+        self.gotopoints = pd.DataFrame(artifacts['gotopoints'], columns=['X', 'Y'])
+        self.gotopoints['type'] = 'possible gotos'
+        edges = [((row[0], row[1]), (row[2], row[3]), row[4]) for row in artifacts['edges'].tolist()]
+        self.create_networkx_graph(edges)
+        self.astar_table = artifacts['astar_table']
     
+    def create_artifacts(self) -> None:
+        #Everything needed by the planners, loaded from map cache if possible
+        cache_key = map_cache.key(self.perimeter)
+        artifacts = map_cache.load(cache_key)
+        if artifacts is not None:
+            self.load_artifacts_from_cache(artifacts)
+        else:
+            self.create_perimeter_polygon()
+            self.create_perimeter_for_plot()
+            self.create_points_from_polygon()
+            self.create_go_to_points()
+            edges = self.create_networkx_graph()
+            self.create_distance_table()
+            self.save_artifacts_to_cache(cache_key, edges)
+
     def check_direct_way(self, start, end) -> bool:
-        way = LineString([start, end])
-        direct_way_possible = way.within(self.perimeter_polygon)
+        direct_way_possible = directway.check(self.perimeter_polygon, start, end)
         return direct_way_possible
     
     def create(self, name: str) -> None:
         self.name = name
-        self.preview = pd.DataFrame()
-        self.mowpath = pd.DataFrame()
+        self.preview = Route(type='preview route')
+        self.mowpath = Route()
         self.obstacles = pd.DataFrame()
-        self.create_perimeter_polygon()
-        self.create_perimeter_for_plot()
-        self.create_points_from_polygon()
-        self.create_go_to_points()
-        self.create_networkx_graph()
+        self.create_artifacts()
         self.save_map_name()
         self.map_id = str(uuid.uuid4())
         self.previewId = str(uuid.uuid4())
@@ -240,14 +230,13 @@ class Perimeter:
         self.obstaclesId = str(uuid.uuid4())
     
     def calc_route_preview(self, route: list) -> None:
-        self.preview = pd.DataFrame(route)
-        self.preview.columns = ['X', 'Y']
-        self.preview['type'] = 'preview route'
+        self.preview = Route.from_list(route, 'preview route')
         self.previewId = str(uuid.uuid4())
 
     def calc_route_mowpath(self) -> None:
-        self.mowpath = self.preview
-        self.mowpath['type'] = 'way'
+        #Cumulative length of the mow path is calculated once here, progress is then a lookup by mow point index
+        self.mowpath = self.preview.with_type('way')
+        self.mowpath.cumulative_length
         self.mowpathId = str(uuid.uuid4())
     
     def add_obstacles(self, data: pd.DataFrame) -> None:
@@ -278,8 +267,8 @@ class Perimeter:
     def clear_map(self) -> None:
         self.name = ''
         self.perimeter = pd.DataFrame()
-        self.preview = pd.DataFrame()
-        self.mowpath = pd.DataFrame()
+        self.preview = Route(type='preview route')
+        self.mowpath = Route()
         self.perimeter_polygon = Polygon()
         self.perimeter_for_plot = pd.DataFrame()
         self.gotopoints = pd.DataFrame()
@@ -296,22 +285,18 @@ class Perimeter:
         if not self.mowpath.empty:
             self.finished_idx = robot.position_mow_point_index - 1
             try: 
-                filtered = self.mowpath[self.mowpath['type'] == 'way']
                 if self.finished_idx < 0:
                     self.finished_idx = 0
-                path_finished = filtered[filtered.index < self.finished_idx]
-                path_finished = path_finished[['X', 'Y']]
-                try:
-                    path_finished = LineString(path_finished.to_numpy())
-                    self.finished_distance = round(path_finished.length)
-                except:
-                    self.finished_distance = 0
-                path = filtered[['X', 'Y']]
-                path = LineString(path.to_numpy())
-                self.distance = round(path.length)
-                self.idx = len(filtered)
+                finished_points = min(self.finished_idx, len(self.mowpath))
+                self.finished_distance = round(self.mowpath.cumulative_length[finished_points-1]) if finished_points > 1 else 0
+                self.distance = round(self.mowpath.length)
+                self.idx = len(self.mowpath)
                 self.distance_perc = round((self.finished_distance/self.distance)*100)
                 self.idx_perc = round((self.finished_idx/self.idx)*100)
+                if robot.seconds_per_idx != None:
+                    self.remaining_time = round(max(self.idx-self.finished_idx, 0)*robot.seconds_per_idx)
+                else:
+                    self.remaining_time = None
             except Exception as e:
                 logger.warning('Backend: Calculation of mow progress failed')
                 logger.debug(str(e))
@@ -321,6 +306,7 @@ class Perimeter:
                 self.finished_idx = 0
                 self.idx = 0
                 self.idx_perc = 0
+                self.remaining_time = None
     
     def perimeter_to_geojson(self) -> dict:
         try:
@@ -359,14 +345,9 @@ class Perimeter:
     def preview_to_geojson(self) -> dict:
         try:
             logger.info('Exporting route preview to gejson')
-            preview_for_export = self.preview
             geojson = dict(type="FeatureCollection", features=[])
             geojson['features'].append(dict(type='Feature', properties=dict(name='current preview', id=self.previewId)))
-            if not preview_for_export.empty:
-                value = dict(type="Feature", properties=dict(name="preview"), geometry=dict(dict(type="LineString", coordinates=[preview_for_export[['X', 'Y']].values.tolist()])))
-            else:
-                value = dict(type="Feature", properties=dict(name="preview"), geometry=dict(dict(type="LineString", coordinates=[])))
-            geojson['features'].append(value)
+            geojson['features'].append(self.preview.to_geojson('preview'))
             return geojson
         except Exception as e:
             logger.error('Could not export preview route to gejson')
@@ -375,14 +356,9 @@ class Perimeter:
     
     def mowpath_to_gejson(self) -> dict:
         try:
-            mowpath_for_export = self.mowpath
             geojson = dict(type="FeatureCollection", features=[])
             geojson['features'].append(dict(type='Feature', properties=dict(name='current mow path', id=self.mowpathId)))
-            if not mowpath_for_export.empty:
-                value = dict(type="Feature", properties=dict(name="mow path"), geometry=dict(dict(type="LineString", coordinates=[mowpath_for_export[['X', 'Y']].values.tolist()])))
-            else:
-                value = dict(type="Feature", properties=dict(name="mow path"), geometry=dict(dict(type="LineString", coordinates=[])))
-            geojson['features'].append(value)
+            geojson['features'].append(self.mowpath.to_geojson('mow path'))
             return geojson
         except Exception as e:
             logger.error('Could not export mow path to geojson')
@@ -897,17 +873,21 @@ class Task:
     selected_perimeter: Polygon = Polygon()
     selection_type: str = ''
     selection: dict = field(default_factory=dict)
-    preview: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
+    preview: Route = field(default_factory=lambda: Route(type='preview route'))
     parameters: PathPlannerCfg = field(default_factory = lambda: pathplannercfg)
     subtasks: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
     subtasks_parameters: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
     tasks_order: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
     tasks_order_parameters: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
+    planning_job_id: str = None
 
     def calc_route_preview(self, route: list) -> None:
-        self.preview = pd.DataFrame(route)
-        self.preview.columns = ['X', 'Y']
-        self.preview['type'] = 'preview route'
+        self.preview = Route.from_list(route, 'preview route')
+
+    def apply_planned_route(self, job) -> None:
+        #on_done of the planning job submitted by the task planner
+        if job.state == 'done' and job.route:
+            self.calc_route_preview(job.route)
 
     def create_subtask(self) -> None:
         if not self.subtasks.empty:
@@ -919,7 +899,7 @@ class Task:
             task_nr = 0
             start_position = {'X': [robot.position_x], 'Y': [robot.position_y], 'type': ['start position']}
             position_df = pd.DataFrame(start_position)
-        subtask = self.preview
+        subtask = self.preview.to_dataframe()
         selection = pd.DataFrame(self.selection)
         selection.columns = ['X', 'Y']
         selection['type'] = self.selection_type
@@ -930,12 +910,13 @@ class Task:
         self.subtasks = pd.concat([self.subtasks, subtask], ignore_index=True) 
         parameters = self.pathplanenrcfg_to_dict(task_nr)
         self.subtasks_parameters = pd.concat([self.subtasks_parameters, pd.DataFrame(parameters)], ignore_index= True)
-        self.preview = pd.DataFrame()
+        self.preview = Route(type='preview route')
     
     def pathplanenrcfg_to_dict(self, task_nr: int) -> dict:
         parameters = {'map name': self.map_name, 'task nr': task_nr, 'pattern': [self.parameters.pattern], 'width': [self.parameters.width], 'angle': [self.parameters.angle], 
                       'distancetoborder': [self.parameters.distancetoborder], 'mowarea': [self.parameters.mowarea], 'mowborder': [self.parameters.mowborder], 
-                      'mowexclusion': [self.parameters.mowexclusion], 'mowborderccw': [self.parameters.mowborderccw]}
+                      'mowexclusion': [self.parameters.mowexclusion], 'mowborderccw': [self.parameters.mowborderccw], 
+                      'angleauto': [self.parameters.angleauto]}
         return parameters
     
     def load_task_order(self, tasks_order: list) -> None:
@@ -966,7 +947,7 @@ class Task:
         self.selected_perimeter = Polygon()
         self.selection_type = ''
         self.selection = dict()
-        self.preview = pd.DataFrame()
+        self.preview = Route(type='preview route')
         self.parameters = dict() 
         self.subtasks = pd.DataFrame()
         self.subtasks_parameters = pd.DataFrame()
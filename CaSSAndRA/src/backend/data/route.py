@@ -0,0 +1,92 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from functools import cached_property
+
+#Route (preview, mow path, go to point) as N x 2 float64 array. Derived values (bounds, cumulative length,
+#crc and coordinate strings for the map upload) are calculated once on first use. Coords are read only,
+#a changed route is always a new Route object.
+@dataclass
+class Route:
+    coords: np.ndarray = field(default_factory=lambda: np.empty((0, 2)))
+    type: str = 'way'
+
+    def __post_init__(self) -> None:
+        self.coords = np.array(self.coords, dtype=np.float64).reshape(-1, 2)
+        self.coords.flags.writeable = False
+
+    @classmethod
+    def from_list(cls, route: list, type: str = 'way') -> 'Route':
+        return cls(coords=route, type=type)
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame, type: str = None) -> 'Route':
+        #Takes X, Y columns, filtered by type if given (type of the route is then the given one)
+        if data.empty:
+            return cls(type=type or 'way')
+        if type is not None:
+            data = data[data['type'] == type]
+        elif 'type' in data.columns and not data.empty:
+            type = data['type'].iloc[0]
+        return cls(coords=data[['X', 'Y']].to_numpy(dtype=np.float64), type=type or 'way')
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.coords) == 0
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.coords[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.coords[:, 1]
+
+    def with_type(self, type: str) -> 'Route':
+        return Route(coords=self.coords, type=type)
+
+    @cached_property
+    def bounds(self) -> tuple:
+        if self.empty:
+            return ()
+        return tuple(self.coords.min(axis=0).tolist() + self.coords.max(axis=0).tolist())
+
+    @cached_property
+    def cumulative_length(self) -> np.ndarray:
+        #Distance from the first point to every point of the route
+        if self.empty:
+            return np.empty(0)
+        return np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(self.coords, axis=0).T))))
+
+    @property
+    def length(self) -> float:
+        return float(self.cumulative_length[-1]) if not self.empty else 0.0
+
+    @cached_property
+    def crc(self) -> float:
+        #Sum of coords*100 like the map crc of the rover, not rounded so it can be added to the perimeter sum
+        return float((self.coords[:, 0]*100).sum() + (self.coords[:, 1]*100).sum())
+
+    @cached_property
+    def upload_coords(self) -> list:
+        #',X,Y' strings rounded to 2 decimals for the AT+W messages
+        return [','+str(x)+','+str(y) for x, y in np.round(self.coords, 2).tolist()]
+
+    def to_list(self) -> list:
+        return [tuple(coords) for coords in self.coords.tolist()]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        data = pd.DataFrame(self.coords.copy(), columns=['X', 'Y'])
+        data['type'] = self.type
+        return data
+
+    def to_geojson(self, name: str) -> dict:
+        #GeoJSON feature of the route
+        coordinates = [self.coords.tolist()] if not self.empty else []
+        return dict(type="Feature", properties=dict(name=name), geometry=dict(dict(type="LineString", coordinates=coordinates)))
@@ -0,0 +1,122 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import math
+import hashlib
+import numpy as np
+import pandas as pd
+from shapely.geometry import *
+from dataclasses import dataclass
+
+from .mapcache import map_cache
+
+#Disk cache for planned routes. Entries are keyed by map geometry, selection, planner parameters
+#and start position (rounded to start_bucket), file names start with the map key, so all routes of
+#a map can be removed at once. Plans with random angle are not cached.
+@dataclass
+class RouteCache:
+    path: str = None
+    max_entries: int = 200
+    start_bucket: float = 0.5
+    version: str = '1'
+    hits: int = 0
+    misses: int = 0
+
+    def key(self, perimeter: pd.DataFrame, selected_perimeter: Polygon, parameters, start_pos: list, options: tuple = ()) -> str:
+        if parameters.angle is None or math.isnan(float(parameters.angle)):
+            return None
+        map_key = map_cache.key(perimeter)
+        if map_key is None:
+            return None
+        start_pos = np.asarray(start_pos, dtype=float).reshape(-1)[:2]
+        content = hashlib.sha1(self.version.encode())
+        content.update(selected_perimeter.wkb)
+        content.update(str((str(parameters.pattern), float(parameters.width), float(parameters.angle), float(parameters.distancetoborder),
+                            bool(parameters.mowarea), float(parameters.mowborder), bool(parameters.mowexclusion), bool(parameters.mowborderccw))).encode())
+        content.update(str(tuple(np.round(start_pos/self.start_bucket).astype(int).tolist())).encode())
+        #planner options, which are not part of the parameters (e.g. post optimization)
+        content.update(str(options).encode())
+        return map_key[:16]+'_'+content.hexdigest()
+
+    def file(self, key: str) -> str:
+        return os.path.join(self.path, key+'.npz')
+
+    def load(self, key: str) -> list:
+        if self.path is None or key is None:
+            return None
+        file = self.file(key)
+        if not os.path.exists(file):
+            self.misses += 1
+            return None
+        try:
+            with np.load(file, allow_pickle=False) as data:
+                route = [tuple(coords) for coords in data['route'].tolist()]
+            os.utime(file)
+            self.hits += 1
+            logger.info('Route cache: route loaded from cache (hits: '+str(self.hits)+', misses: '+str(self.misses)+')')
+            return route
+        except Exception as e:
+            logger.warning('Route cache: Could not read cache file, route will be recalculated')
+            logger.debug(str(e))
+            self.invalidate(key)
+            self.misses += 1
+            return None
+
+    def save(self, key: str, route: list) -> None:
+        if self.path is None or key is None or not route:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            file_tmp = self.file(key)+'.'+str(os.getpid())+'.tmp'
+            with open(file_tmp, 'wb') as f:
+                np.savez(f, route=np.asarray(route, dtype=float).reshape(-1, 2))
+            os.replace(file_tmp, self.file(key))
+            logger.debug('Route cache: route saved to cache')
+            self.evict()
+        except Exception as e:
+            logger.warning('Route cache: Could not save route to cache')
+            logger.debug(str(e))
+
+    def invalidate(self, key: str) -> None:
+        if self.path is None or key is None:
+            return
+        try:
+            if os.path.exists(self.file(key)):
+                os.remove(self.file(key))
+        except Exception as e:
+            logger.warning('Route cache: Could not remove cache entry')
+            logger.debug(str(e))
+
+    def invalidate_map(self, perimeter: pd.DataFrame) -> None:
+        map_key = map_cache.key(perimeter)
+        if self.path is None or map_key is None or not os.path.exists(self.path):
+            return
+        try:
+            for file in os.listdir(self.path):
+                if file.startswith(map_key[:16]+'_'):
+                    os.remove(os.path.join(self.path, file))
+            logger.debug('Route cache: removed routes of map '+map_key[:8])
+        except Exception as e:
+            logger.warning('Route cache: Could not remove cache entries of map')
+            logger.debug(str(e))
+
+    def evict(self) -> None:
+        try:
+            files = [os.path.join(self.path, file) for file in os.listdir(self.path) if file.endswith('.npz')]
+            files.sort(key=os.path.getmtime)
+            for file in files[:max(0, len(files)-self.max_entries)]:
+                os.remove(file)
+                logger.debug('Route cache: evicted '+os.path.basename(file))
+        except Exception as e:
+            logger.warning('Route cache: Could not evict cache entries')
+            logger.debug(str(e))
+
+    def clear(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        for file in os.listdir(self.path):
+            if file.endswith('.npz'):
+                os.remove(os.path.join(self.path, file))
+
+route_cache = RouteCache()
@@ -11,6 +11,10 @@ from icecream import ic
 
 from . import appdata
 from . cfgdata import rovercfg, appcfg, commcfg
+from . route import Route
+from . telemetrybuffer import TelemetryBuffer
+from . telemetryschema import STATE_SCHEMA, STATS_SCHEMA, CALCED_FROM_STATE_SCHEMA, CALCED_FROM_STATS_SCHEMA
+from . telemetrystore import telemetry_store
 #from .. comm.api import cassandra_api
 
 #mower class
@@ -48,7 +52,7 @@ class Mower:
     cmd_move_ang: float = 0.0
     last_cmd: pd.DataFrame = field(default_factory=lambda: pd.DataFrame([{'msg': 'AT+C,-1,-1,-1,-1,-1,-1,-1,-1'}]))
     last_task_name: str = 'no task'
-    current_task: pd.DataFrame = field(default_factory=lambda: pd.DataFrame())
+    current_task: Route = field(default_factory=Route)
     map_upload_started: bool = False
     map_upload_failed: bool = False
     map_old_crc: int = None
@@ -70,8 +74,7 @@ class Mower:
     dock_reason: str = None
     dock_reason_time: datetime = datetime.now()
 
-    def set_state(self, state: pd.DataFrame) -> None:
-        state = state.iloc[-1]
+    def set_state(self, state: dict) -> None:
         self.speed = self.calc_speed(state['position_x'], state['position_y'], self.timestamp)
         self.direction = self.calc_direction()
         self.rover_image = self.set_rover_image()
@@ -313,12 +316,18 @@ class Mower:
 robot = Mower()
 
 #measured
-state = pd.DataFrame()
-stats = pd.DataFrame()
+state = TelemetryBuffer(schema=STATE_SCHEMA)
+stats = TelemetryBuffer(schema=STATS_SCHEMA)
 props = pd.DataFrame()
 online = pd.DataFrame()
 
 #calced
-calced_from_state = pd.DataFrame()
-calced_from_stats = pd.DataFrame()
+calced_from_state = TelemetryBuffer(schema=CALCED_FROM_STATE_SCHEMA)
+calced_from_stats = TelemetryBuffer(schema=CALCED_FROM_STATS_SCHEMA)
+
+#persisted in the telemetry store
+telemetry_store.register('state', state)
+telemetry_store.register('stats', stats)
+telemetry_store.register('calced_from_state', calced_from_state)
+telemetry_store.register('calced_from_stats', calced_from_stats)
 
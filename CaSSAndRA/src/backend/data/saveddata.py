@@ -1,27 +1,45 @@
 import logging
 logger = logging.getLogger(__name__)
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import pandas as pd
 import os
 
 from . import roverdata
 from .mapdata import current_map, mapping_maps, current_task, tasks
+from .mapcache import map_cache
+from .routecache import route_cache
+from .route import Route
+from .cfgdata import appcfg
+from .telemetryschema import migrate, STATE_SCHEMA, STATS_SCHEMA, CALCED_FROM_STATE_SCHEMA, CALCED_FROM_STATS_SCHEMA
+from .telemetrystore import telemetry_store
 
 file_paths = None
 
 def read(measure_file_paths) -> None:
+    #Telemetry store replaces the pickle files, pickles are only read if the store has no data (migration)
+    telemetry_store.path = measure_file_paths.telemetry
+    if telemetry_store.exists():
+        try:
+            telemetry_store.load(datetime.now() - timedelta(appcfg.datamaxage))
+            logger.info('Backend: Telemetry data are loaded successfully')
+        except Exception as e:
+            logger.error('Backend: Failed to load telemetry data')
+            logger.debug(str(e))
+        if not any(buffer.empty for buffer in telemetry_store.tables.values()):
+            return
+
     #Try to read State Date from file
     try:
-        roverdata.state = pd.read_pickle(measure_file_paths.state)
-        if not 'lateral_error' in roverdata.state.columns:
-            roverdata.state['lateral_error'] = 0
-        if not 'timetable_autostartstop_dayofweek' in roverdata.state.columns:
-            roverdata.state['timetable_autostartstop_dayofweek'] = 0
-            roverdata.state['timetabel_autostartstop_hour'] = 0
+        state = pd.read_pickle(measure_file_paths.state)
+        if not 'lateral_error' in state.columns:
+            state['lateral_error'] = 0
+        if not 'timetable_autostartstop_dayofweek' in state.columns:
+            state['timetable_autostartstop_dayofweek'] = 0
+            state['timetabel_autostartstop_hour'] = 0
         logger.info('Backend: State data are loaded successfully')
-        if roverdata.state.empty:
+        if state.empty:
             logger.warning('state.pickle is empty, create a default data frame')
             state = {"battery_voltage":{"0":0},
                  "position_x":{"0":0},
@@ -43,7 +61,7 @@ def read(measure_file_paths) -> None:
                  "timetable_autostartstop_dayofweek":{"0":0},
                  "timetabel_autostartstop_hour":{"0":0}, 
                  "timestamp":{"0":str(datetime.now())}}
-            roverdata.state = pd.DataFrame(data=state)
+            state = pd.DataFrame(data=state)
     except:
         logger.warning('Backend: Failed to load state data, create a default data frame')
         state = {"battery_voltage":{"0":0},
@@ -66,28 +84,28 @@ def read(measure_file_paths) -> None:
                  "timetable_autostartstop_dayofweek":{"0":0},
                  "timetabel_autostartstop_hour":{"0":0}, 
                  "timestamp":{"0":str(datetime.now())}}
-        roverdata.state = pd.DataFrame(data=state)
+        state = pd.DataFrame(data=state)
         #calceddata.calcdata_from_state()
 
     #Try to read Stats Data from file
     try:
-        roverdata.stats = pd.read_pickle(measure_file_paths.stats)
-        if not 'duration_mow_motor_recovery' in roverdata.stats:
-            roverdata.stats['duration_mow_motor_recovery'] = 0
-        if not 'counter_lift_triggered' in roverdata.stats.columns:
-            roverdata.stats['counter_lift_triggered'] = 0
-        if not 'counter_gps_no_speed_triggered' in roverdata.stats.columns:
-            roverdata.stats['counter_gps_no_speed_triggered'] = 0
-        if not 'counter_tof_triggered' in roverdata.stats.columns:
-            roverdata.stats['counter_tof_triggered'] = 0
-        if not 'counter_diff_imu_wheel_yaw_speed_triggered' in roverdata.stats.columns:
-            roverdata.stats['counter_diff_imu_wheel_yaw_speed_triggered'] = 0
-        if not 'counter_imu_no_rotation_triggered' in roverdata.stats.columns:
-            roverdata.stats['counter_imu_no_rotation_triggered'] = 0
-        if not 'counter_rotation_timeout_triggered' in roverdata.stats.columns:
-            roverdata.stats['counter_rotation_timeout_triggered'] = 0
+        stats = pd.read_pickle(measure_file_paths.stats)
+        if not 'duration_mow_motor_recovery' in stats:
+            stats['duration_mow_motor_recovery'] = 0
+        if not 'counter_lift_triggered' in stats.columns:
+            stats['counter_lift_triggered'] = 0
+        if not 'counter_gps_no_speed_triggered' in stats.columns:
+            stats['counter_gps_no_speed_triggered'] = 0
+        if not 'counter_tof_triggered' in stats.columns:
+            stats['counter_tof_triggered'] = 0
+        if not 'counter_diff_imu_wheel_yaw_speed_triggered' in stats.columns:
+            stats['counter_diff_imu_wheel_yaw_speed_triggered'] = 0
+        if not 'counter_imu_no_rotation_triggered' in stats.columns:
+            stats['counter_imu_no_rotation_triggered'] = 0
+        if not 'counter_rotation_timeout_triggered' in stats.columns:
+            stats['counter_rotation_timeout_triggered'] = 0
         logger.info('Backend: Statistics data are loaded successfully')
-        if roverdata.stats.empty:
+        if stats.empty:
             logger.warning('stats.pickle is empty, create a default data frame')
             stats = {"duration_idle":{"0":0},
                  "duration_charge":{"0":0},
@@ -121,7 +139,7 @@ def read(measure_file_paths) -> None:
                  "counter_imu_no_rotation_triggered":{"0":0},
                  "counter_rotation_timeout_triggered":{"0":0},
                  "timestamp":{"0":str(datetime.now())}}
-            roverdata.stats = pd.DataFrame(data=stats)
+            stats = pd.DataFrame(data=stats)
         logger.info('Backend: Statistics data are loaded successfully')
     except:
         logger.warning('Backend: Failed to load statistics data, create a default data frame')
@@ -157,20 +175,20 @@ def read(measure_file_paths) -> None:
                  "counter_imu_no_rotation_triggered":{"0":0},
                  "counter_rotation_timeout_triggered":{"0":0},
                  "timestamp":{"0":str(datetime.now())}}
-        roverdata.stats = pd.DataFrame(data=stats)
+        stats = pd.DataFrame(data=stats)
 
     #Try to read Calced from State Data from file
     try:
-        roverdata.calced_from_state = pd.read_pickle(measure_file_paths.calcedstate)
+        calced_from_state = pd.read_pickle(measure_file_paths.calcedstate)
         logger.info('Backend: Calced data from state are loaded successfully')
-        if roverdata.calced_from_state.empty:
+        if calced_from_state.empty:
             logger.warning('calcedstate.pickle is empty, create a default data frame')
             calced_from_state = {"solution":{"0":"invalid"},
                              "job":{"0":"unknown"},
                              "sensor":{"0":"unknown"},
                              "soc":{"0":0},
                              "timestamp":{"0":str(datetime.now())}}
-            roverdata.calced_from_state = pd.DataFrame(data=calced_from_state)
+            calced_from_state = pd.DataFrame(data=calced_from_state)
     except:
         logger.warning('Backend: Failed to load calced data from state, create a default data frame')
         calced_from_state = {"solution":{"0":"invalid"},
@@ -178,27 +196,27 @@ def read(measure_file_paths) -> None:
                              "sensor":{"0":"unknown"},
                              "soc":{"0":0},
                              "timestamp":{"0":str(datetime.now())}}
-        roverdata.calced_from_state = pd.DataFrame(data=calced_from_state)
+        calced_from_state = pd.DataFrame(data=calced_from_state)
     
     #Try to read Calced from Stats Data from file
     try:
-        roverdata.calced_from_stats = pd.read_pickle(measure_file_paths.calcedstats)
-        if not 'duration_mow_motor_recovery' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['duration_mow_motor_recovery'] = 0
-        if not 'counter_lift_triggered' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['counter_lift_triggered'] = 0
-        if not 'counter_gps_no_speed_triggered' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['counter_gps_no_speed_triggered'] = 0
-        if not 'counter_tof_triggered' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['counter_tof_triggered'] = 0
-        if not 'counter_diff_imu_wheel_yaw_speed_triggered' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['counter_diff_imu_wheel_yaw_speed_triggered'] = 0
-        if not 'counter_imu_no_rotation_triggered' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['counter_imu_no_rotation_triggered'] = 0
-        if not 'counter_rotation_timeout_triggered' in roverdata.calced_from_stats.columns:
-            roverdata.calced_from_stats['counter_rotation_timeout_triggered'] = 0
+        calced_from_stats = pd.read_pickle(measure_file_paths.calcedstats)
+        if not 'duration_mow_motor_recovery' in calced_from_stats.columns:
+            calced_from_stats['duration_mow_motor_recovery'] = 0
+        if not 'counter_lift_triggered' in calced_from_stats.columns:
+            calced_from_stats['counter_lift_triggered'] = 0
+        if not 'counter_gps_no_speed_triggered' in calced_from_stats.columns:
+            calced_from_stats['counter_gps_no_speed_triggered'] = 0
+        if not 'counter_tof_triggered' in calced_from_stats.columns:
+            calced_from_stats['counter_tof_triggered'] = 0
+        if not 'counter_diff_imu_wheel_yaw_speed_triggered' in calced_from_stats.columns:
+            calced_from_stats['counter_diff_imu_wheel_yaw_speed_triggered'] = 0
+        if not 'counter_imu_no_rotation_triggered' in calced_from_stats.columns:
+            calced_from_stats['counter_imu_no_rotation_triggered'] = 0
+        if not 'counter_rotation_timeout_triggered' in calced_from_stats.columns:
+            calced_from_stats['counter_rotation_timeout_triggered'] = 0
         logger.info('Backend: Calced data from stats are loaded successfully')
-        if roverdata.calced_from_stats.empty:
+        if calced_from_stats.empty:
             logger.warning('calcedstats.pickle is empty, create a default data frame')
             calced_from_stats = {"duration_idle":{"0":0},
                             "duration_charge":{"0":0},
@@ -232,7 +250,7 @@ def read(measure_file_paths) -> None:
                             "counter_imu_no_rotation_triggered":{"0":0},
                             "counter_rotation_timeout_triggered":{"0":0},
                             "timestamp":{"0":str(datetime.now())}}
-            roverdata.calced_from_stats = pd.DataFrame(data=calced_from_stats)
+            calced_from_stats = pd.DataFrame(data=calced_from_stats)
     except:
         logger.warning('Backend: Failed to load calced data from stats, create a default data frame')
         calced_from_stats = {"duration_idle":{"0":0},
@@ -267,7 +285,19 @@ def read(measure_file_paths) -> None:
                             "counter_imu_no_rotation_triggered":{"0":0},
                             "counter_rotation_timeout_triggered":{"0":0},
                             "timestamp":{"0":str(datetime.now())}}
-        roverdata.calced_from_stats = pd.DataFrame(data=calced_from_stats)
+        calced_from_stats = pd.DataFrame(data=calced_from_stats)
+
+    #Older files have string timestamps and generic int/float columns, only tables without data in the store are replaced
+    if roverdata.state.empty:
+        roverdata.state.replace(migrate('state', state, STATE_SCHEMA))
+    if roverdata.stats.empty:
+        roverdata.stats.replace(migrate('stats', stats, STATS_SCHEMA))
+    if roverdata.calced_from_state.empty:
+        roverdata.calced_from_state.replace(migrate('calced_from_state', calced_from_state, CALCED_FROM_STATE_SCHEMA))
+    if roverdata.calced_from_stats.empty:
+        roverdata.calced_from_stats.replace(migrate('calced_from_stats', calced_from_stats, CALCED_FROM_STATS_SCHEMA))
+    if telemetry_store.flush():
+        logger.info('Backend: Measured data are migrated to the telemetry store')
 
 def read_perimeter(map_file_paths) -> None:
     try:
@@ -304,27 +334,11 @@ def read_perimeter(map_file_paths) -> None:
         logger.error('Backend: Loading saved perimeter failed')
         logger.debug(str(e))
 
-def save(name: str, file_paths) -> None:
-    if name == 'state':
-        try:
-            roverdata.state.to_pickle(file_paths.measure.state)
-            logger.info('Backend: State data are saved successfully in state.pickle')
-
-            roverdata.calced_from_state.to_pickle(file_paths.measure.calcedstate)
-            logger.info('Backend: Calced state data are saved successfully in calcstate.pickle')
-        except Exception as e:
-            logger.error('Backend: Could not save state data to the file')
-            logger.debug(str(e))
-    elif name == 'stats':
-        try:
-            roverdata.stats.to_pickle(file_paths.measure.stats)
-            logger.info('Backend: Statistics data are saved successfully in stats.pickle')
-
-            roverdata.calced_from_stats.to_pickle(file_paths.measure.calcedstats)
-            logger.info('Backend: Calced statistics data are saved successfully in calcstats.pickle')
-        except Exception as e:
-            logger.error('Backend: Could not save statistics data to the file')
-            logger.debug(str(e))
+def save() -> None:
+    #Appends new measured and calced rows to the telemetry store
+    written = telemetry_store.flush()
+    if written:
+        logger.debug('Backend: '+str(written)+' rows of measured data are saved')
 
 def save_perimeter(perimeter_arr: pd.DataFrame, perimeter: pd.DataFrame, perimeter_name: str) -> None:
     if perimeter_name is None:
@@ -356,8 +370,11 @@ def save_perimeter(perimeter_arr: pd.DataFrame, perimeter: pd.DataFrame, perimet
 
 def remove_perimeter(perimeter_arr: pd.DataFrame, perimeter_name: str, tasks_arr: pd.DataFrame, tasks_parameters_arr) -> None:
     try:
+        removed_perimeter = perimeter_arr[perimeter_arr['name'] == perimeter_name]
         perimeter_arr = perimeter_arr[perimeter_arr['name'] != perimeter_name]
         perimeter_arr.to_json(file_paths.map.perimeter, indent=2, date_format='iso')
+        map_cache.invalidate(map_cache.key(removed_perimeter))
+        route_cache.invalidate_map(removed_perimeter)
         #remove also tasks belong to this map
         remove_task(tasks_arr, tasks_parameters_arr, [''], perimeter_name)
         logger.info('Backend: Perimeter is successfully removed from perimeter.json')
@@ -484,7 +501,8 @@ def remove_task(task_arr: pd.DataFrame, task_parameter_arr: pd.DataFrame, task_n
         logger.error('Backend: Could not remove task data from file')
         logger.debug(str(e))
 
-def update_task_preview(task_arr: pd.DataFrame, new_preview: pd.DataFrame) -> None:
+def update_task_preview(task_arr: pd.DataFrame, new_preview: Route) -> None:
+    new_preview = new_preview.to_dataframe()
     new_preview['map name'] = current_map.name
     new_preview['task nr'] = 0
     new_preview['name'] = current_task.subtasks['name'].unique()[0]
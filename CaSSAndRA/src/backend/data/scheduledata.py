@@ -8,7 +8,7 @@ from .. comm import cmdlist
 from . roverdata import robot
 from . mapdata import Task, current_map
 from . cfgdata import ScheduleCfg, schedulecfg
-from .. map import path
+from .. map.planningjobs import planning_jobs, apply_route_preview
 
 @dataclass
 class ScheduleTasks:
@@ -114,12 +114,7 @@ class ScheduleTasks:
                 self.job_started = True
             elif not tasks_order_table[self.dayweek].subtasks.empty:
                 logger.info('Create job from selected tasks')
-                current_map.task_progress = 0
-                current_map.calculating = True
-                path.calc_task(tasks_order_table[self.dayweek].subtasks, tasks_order_table[self.dayweek].subtasks_parameters)
-                current_map.calculating = False
-                current_map.calc_route_mowpath()
-                cmdlist.cmd_mow = True
+                planning_jobs.submit_task(tasks_order_table[self.dayweek].subtasks, tasks_order_table[self.dayweek].subtasks_parameters, on_done=self.start_planned_job, source='schedule')
                 self.job_started = True
             else:
                 logger.info(f'Schedule start not possible. Last command: {robot.last_task_name}')
@@ -131,6 +126,13 @@ class ScheduleTasks:
             if self.start_failed_cnt >= 5:
                 self.job_finished = True
     
+    def start_planned_job(self, job) -> None:
+        if apply_route_preview(job):
+            current_map.calc_route_mowpath()
+            cmdlist.cmd_mow = True
+        else:
+            logger.warning(f'Schedule route calculation {job.state}. Mow command not sent')
+    
     def create_dock_cmd(self) -> None:
         if robot.job == 1:
             cmdlist.cmd_dock_schedule = True
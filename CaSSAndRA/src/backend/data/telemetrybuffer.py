@@ -0,0 +1,240 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+
+from .telemetryschema import apply_schema
+
+#Append optimized column store for the rover time series (state, stats and calced data).
+#Every column is a preallocated numpy array, capacity grows by doubling (at least one chunk), so an append is
+#amortized O(1) and old rows are never copied on append. frame returns a data frame of read only views
+#on the filled part of the columns (no copy), it stays valid after further appends.
+#Columns of the schema have fixed types (categoricals are stored as int16 codes), other columns are typed
+#from the first values. generation changes if rows are replaced or removed (not on append).
+@dataclass
+class TelemetryBuffer:
+    schema: dict = field(default_factory=dict)
+    chunk_size: int = 4096
+    columns: list = field(default_factory=list)
+    data: dict = field(default_factory=dict)
+    categories: dict = field(default_factory=dict)
+    size: int = 0
+    generation: int = 0
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    snapshot: pd.DataFrame = None
+
+    def __post_init__(self) -> None:
+        for column, dtype in self.schema.items():
+            self.add_column(column, dtype)
+
+    @property
+    def capacity(self) -> int:
+        if not self.columns:
+            return 0
+        return len(self.data[self.columns[0]])
+
+    @property
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row: dict) -> None:
+        with self.lock:
+            for column, value in row.items():
+                if column not in self.data:
+                    self.add_column(column, column_dtype(value))
+                elif column not in self.schema and not fits(self.data[column].dtype, value):
+                    self.promote(column, column_dtype(value))
+            if self.size == self.capacity:
+                self.grow(self.size+1)
+            for column in self.columns:
+                if column not in row:
+                    self.data[column][self.size] = self.default(column)
+                elif column in self.categories:
+                    self.data[column][self.size] = self.code(column, row[column])
+                else:
+                    self.data[column][self.size] = row[column]
+            self.size += 1
+            self.snapshot = None
+
+    def extend(self, data: pd.DataFrame) -> None:
+        if data.empty:
+            return
+        data = apply_schema(data, self.schema)
+        with self.lock:
+            for column in data.columns:
+                values = data[column].to_numpy()
+                dtype = values.dtype if values.dtype.kind in 'biufM' else np.dtype(object)
+                if column not in self.data:
+                    self.add_column(column, dtype)
+                elif column not in self.schema and not np.can_cast(dtype, self.data[column].dtype, 'safe'):
+                    self.promote(column, dtype)
+            if self.size+len(data) > self.capacity:
+                self.grow(self.size+len(data))
+            for column in self.columns:
+                if column not in data.columns:
+                    values = self.default(column)
+                elif column in self.categories:
+                    values = [self.code(column, value) for value in data[column].astype(object)]
+                else:
+                    values = data[column].to_numpy()
+                self.data[column][self.size:self.size+len(data)] = values
+            self.size += len(data)
+            self.snapshot = None
+
+    def replace(self, data: pd.DataFrame) -> None:
+        #New content (loaded from file or cleaned), columns and categories are kept
+        with self.lock:
+            self.data = {column: np.empty(0, dtype=values.dtype) for column, values in self.data.items()}
+            self.size = 0
+            self.snapshot = None
+            self.generation += 1
+            self.extend(data)
+
+    def drop_head(self, rows: int) -> None:
+        #Removes the oldest rows (retention), snapshots taken before stay valid
+        with self.lock:
+            rows = min(rows, self.size)
+            if rows <= 0:
+                return
+            for column in self.columns:
+                values = np.empty(len(self.data[column]), dtype=self.data[column].dtype)
+                values[:self.size-rows] = self.data[column][rows:self.size]
+                values[self.size-rows:] = self.default(column)
+                self.data[column] = values
+            self.size -= rows
+            self.snapshot = None
+            self.generation += 1
+
+    def drop_rows(self, mask: np.ndarray) -> int:
+        #Removes rows of mask (retention of rows out of order), returns number of removed rows
+        with self.lock:
+            mask = np.asarray(mask, dtype=bool)[:self.size]
+            rows = int(mask.sum())
+            if rows == 0:
+                return 0
+            keep = ~mask
+            for column in self.columns:
+                values = np.empty(len(self.data[column]), dtype=self.data[column].dtype)
+                values[:self.size-rows] = self.data[column][:self.size][keep]
+                values[self.size-rows:] = self.default(column)
+                self.data[column] = values
+            self.size -= rows
+            self.snapshot = None
+            self.generation += 1
+            return rows
+
+    def add_column(self, column: str, dtype) -> None:
+        if dtype == 'category':
+            self.categories[column] = dict()
+            dtype = np.int16
+        self.data[column] = np.empty(self.capacity, dtype=dtype)
+        self.data[column][:] = self.default(column)
+        self.columns.append(column)
+
+    def promote(self, column: str, dtype: np.dtype) -> None:
+        #int -> float, everything else mixed -> object
+        current = self.data[column].dtype
+        if current.kind in 'biuf' and dtype.kind in 'biuf':
+            new_dtype = np.result_type(current, dtype)
+        else:
+            new_dtype = np.dtype(object)
+        logger.debug('Telemetry buffer: column '+column+' promoted from '+str(current)+' to '+str(new_dtype))
+        self.data[column] = self.data[column].astype(new_dtype)
+
+    def grow(self, required: int) -> None:
+        capacity = max(self.chunk_size, self.capacity)
+        while capacity < required:
+            capacity *= 2
+        for column in self.columns:
+            values = np.empty(capacity, dtype=self.data[column].dtype)
+            values[:self.size] = self.data[column][:self.size]
+            values[self.size:] = self.default(column)
+            self.data[column] = values
+
+    def default(self, column: str):
+        if column in self.categories:
+            return -1
+        return default_value(self.data[column].dtype)
+
+    def code(self, column: str, value) -> int:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return -1
+        codes = self.categories[column]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def values(self, column: str, start: int, end: int, copy: bool = False):
+        values = self.data[column][start:end]
+        if copy:
+            values = values.copy()
+        else:
+            values.flags.writeable = False
+        if column in self.categories:
+            return pd.Categorical.from_codes(values, categories=list(self.categories[column]))
+        return values
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        #Snapshot of the buffer (read only views, no copy). Cached until next change
+        with self.lock:
+            if self.snapshot is None:
+                views = {column: self.values(column, 0, self.size) for column in self.columns}
+                self.snapshot = pd.DataFrame(views, columns=self.columns, copy=False)
+            return self.snapshot
+
+    def last(self) -> dict:
+        #Last row without creating a data frame
+        with self.lock:
+            if self.size == 0:
+                return dict()
+            row = dict()
+            for column in self.columns:
+                value = self.data[column][self.size-1]
+                if column in self.categories:
+                    value = list(self.categories[column])[value] if value >= 0 else None
+                row[column] = value
+            return row
+
+    def tail(self, rows: int) -> pd.DataFrame:
+        with self.lock:
+            start = max(0, self.size-rows)
+            return pd.DataFrame({column: self.values(column, start, self.size, copy=True) for column in self.columns}, columns=self.columns)
+
+    def nbytes(self) -> int:
+        return sum(self.data[column][:self.size].nbytes for column in self.columns)
+
+def column_dtype(value) -> np.dtype:
+    if isinstance(value, (bool, np.bool_)):
+        return np.dtype(bool)
+    if isinstance(value, (int, np.integer)):
+        return np.dtype(np.int64)
+    if isinstance(value, (float, np.floating)):
+        return np.dtype(np.float64)
+    return np.dtype(object)
+
+def fits(dtype: np.dtype, value) -> bool:
+    if dtype.kind == 'O':
+        return True
+    if dtype.kind == 'f':
+        return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+    if dtype.kind in 'iu':
+        return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+    if dtype.kind == 'b':
+        return isinstance(value, (bool, np.bool_))
+    return False
+
+def default_value(dtype: np.dtype):
+    if dtype.kind == 'f':
+        return np.nan
+    if dtype.kind == 'M':
+        return np.datetime64('NaT')
+    if dtype.kind in 'iub':
+        return 0
+    return None
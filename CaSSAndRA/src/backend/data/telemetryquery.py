@@ -0,0 +1,110 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from .telemetrystore import telemetry_store
+
+#Time range queries on the rover time series (state, stats and calced data) for charts and stats.
+#Rows are found with searchsorted on the timestamp column (binary search instead of a mask over the full history),
+#the result is a data frame of read only views on the telemetry buffer (no copy, index starts at 0). If timestamps are
+#not in order (clock of the host jumped), a mask is used and the matching rows are copied.
+#Rows older than the buffer are read from the telemetry store. Results of finished days are cached until the rows
+#of the buffer are replaced or removed (generation of the buffer).
+@dataclass
+class TelemetryQuery:
+    cache_size: int = 32
+    cache: OrderedDict = field(default_factory=OrderedDict)
+    ordered: dict = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def range(self, name: str, start=None, end=None, columns: list = None, closed: str = 'right') -> pd.DataFrame:
+        #Rows with start < timestamp <= end (closed='right') or start <= timestamp <= end (closed='both')
+        buffer = telemetry_store.tables[name]
+        start = to_datetime64(start)
+        end = to_datetime64(end)
+        key = (name, start, end, None if columns is None else tuple(columns), closed, buffer.generation)
+        finished = end is not None and end < np.datetime64(datetime.now().date(), 'ns')
+        if finished:
+            with self.lock:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    return self.cache[key]
+        data = self.query(name, buffer, start, end, columns, closed)
+        if finished:
+            with self.lock:
+                self.cache[key] = data
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return data
+
+    def query(self, name: str, buffer, start, end, columns: list, closed: str) -> pd.DataFrame:
+        with buffer.lock:
+            columns = [column for column in buffer.columns if columns is None or column in columns]
+            first, last, selection = self.slice(name, buffer, start, end, closed)
+            if selection is None:
+                data = pd.DataFrame({column: buffer.values(column, first, last) for column in columns}, columns=columns, copy=False)
+            else:
+                data = pd.DataFrame({column: buffer.values(column, first, last)[selection] for column in columns}, columns=columns)
+            buffer_start = buffer.data['timestamp'][0] if not buffer.empty else None
+        #older rows than in the buffer are only on disk
+        if start is not None and buffer_start is not None and start < buffer_start and telemetry_store.exists():
+            older = telemetry_store.read(name, start, buffer_start, columns)
+            if not older.empty:
+                timestamps = older['timestamp'].to_numpy()
+                older = older[((timestamps >= start) if closed == 'both' else (timestamps > start)) & (timestamps < buffer_start)]
+                if not older.empty:
+                    data = pd.concat([older, data], ignore_index=True)
+        return data
+
+    def slice(self, name: str, buffer, start, end, closed: str) -> tuple:
+        #Row positions of the range in the buffer and the matching rows within (None if all rows match)
+        timestamps = buffer.data['timestamp'][:len(buffer)]
+        if not self.is_ordered(name, buffer, timestamps):
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= (timestamps >= start) if closed == 'both' else (timestamps > start)
+            if end is not None:
+                mask &= timestamps <= end
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return 0, 0, None
+            first, last = int(rows[0]), int(rows[-1])+1
+            return first, last, (None if len(rows) == last-first else rows-first)
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left' if closed == 'both' else 'right'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return first, max(first, last), None
+
+    def is_ordered(self, name: str, buffer, timestamps: np.ndarray) -> bool:
+        #Timestamps are checked once, afterwards only the appended rows
+        generation, checked, ordered = self.ordered.get(name, (None, 0, True))
+        if generation != buffer.generation or checked > len(timestamps):
+            generation, checked, ordered = buffer.generation, 0, True
+        if ordered and len(timestamps)-checked > 0:
+            new = timestamps[max(0, checked-1):]
+            ordered = bool(np.all(new[1:] >= new[:-1]))
+            if not ordered:
+                logger.warning('Telemetry query: '+name+' timestamps are not in order, slower range queries are used')
+        self.ordered[name] = (generation, len(timestamps), ordered)
+        return ordered
+
+    def bounds(self, name: str) -> tuple:
+        #First and last timestamp of the table in memory
+        buffer = telemetry_store.tables[name]
+        with buffer.lock:
+            if buffer.empty:
+                return None, None
+            timestamps = buffer.data['timestamp']
+            return pd.Timestamp(timestamps[0]), pd.Timestamp(timestamps[len(buffer)-1])
+
+def to_datetime64(value):
+    if value is None:
+        return None
+    return np.datetime64(pd.Timestamp(value), 'ns')
+
+telemetry = TelemetryQuery()
@@ -0,0 +1,233 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+
+from .telemetrystore import telemetry_store
+from .telemetryquery import telemetry, to_datetime64
+
+#Pre aggregated rover time series for charts of long time ranges (minute, hour and day buckets).
+#Rollups are derived from the telemetry buffers: new rows are added incrementally (update), if rows of a buffer
+#are replaced or removed (load, retention) the rollups of this buffer are rebuilt. Every bucket holds the number of
+#rows, min/max/sum of the metrics and sums of the summed columns. Rows of the mow rollup (job == 1) additionally
+#count lateral_error of fix solutions in the bins of the lateral error chart.
+RESOLUTIONS = {'minute': 'm', 'hour': 'h', 'day': 'D'}
+LATERAL_ERROR_BINS = np.linspace(-0.5, 0.5, 101)
+
+@dataclass
+class RollupTable:
+    unit: str
+    metrics: list = field(default_factory=list)
+    sums: list = field(default_factory=list)
+    histogram: str = None
+    bins: np.ndarray = None
+    buckets: np.ndarray = field(default_factory=lambda: np.empty(0, dtype='datetime64[ns]'))
+    data: dict = field(default_factory=dict)
+    size: int = 0
+
+    def __post_init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.buckets = np.empty(0, dtype='datetime64[ns]')
+        self.data = {'count': np.empty(0, dtype=np.int64)}
+        for metric in self.metrics:
+            self.data[metric+'_min'] = np.empty(0, dtype=np.float64)
+            self.data[metric+'_max'] = np.empty(0, dtype=np.float64)
+            self.data[metric+'_sum'] = np.empty(0, dtype=np.float64)
+            self.data[metric+'_count'] = np.empty(0, dtype=np.int64)
+        for column in self.sums:
+            self.data[column] = np.empty(0, dtype=np.float64)
+        if self.histogram is not None:
+            self.data['histogram'] = np.empty((0, len(self.bins)-1), dtype=np.int32)
+        self.size = 0
+
+    def grow(self, required: int) -> None:
+        capacity = max(256, len(self.buckets))
+        while capacity < required:
+            capacity *= 2
+        if capacity == len(self.buckets):
+            return
+        buckets = np.empty(capacity, dtype=self.buckets.dtype)
+        buckets[:self.size] = self.buckets[:self.size]
+        self.buckets = buckets
+        for column, values in self.data.items():
+            new_values = np.zeros((capacity,)+values.shape[1:], dtype=values.dtype)
+            new_values[:self.size] = values[:self.size]
+            if column.endswith('_min'):
+                new_values[self.size:] = np.inf
+            elif column.endswith('_max'):
+                new_values[self.size:] = -np.inf
+            self.data[column] = new_values
+
+    def add(self, timestamps: np.ndarray, values: dict, histogram_mask: np.ndarray = None) -> bool:
+        #Adds rows to the buckets, returns False if rows are older than the last bucket (rebuild needed)
+        valid = ~np.isnat(timestamps)
+        buckets = timestamps[valid].astype('datetime64['+self.unit+']').astype('datetime64[ns]')
+        if len(buckets) == 0:
+            return True
+        last = self.buckets[self.size-1] if self.size > 0 else None
+        if last is not None and buckets.min() < last:
+            return False
+        new_buckets, inverse = np.unique(buckets, return_inverse=True)
+        first = self.size-1 if last is not None and new_buckets[0] == last else self.size
+        self.grow(first+len(new_buckets))
+        self.buckets[first:first+len(new_buckets)] = new_buckets
+        self.size = first+len(new_buckets)
+        positions = first+inverse
+        length = self.size
+        self.data['count'][:length] += np.bincount(positions, minlength=length)
+        for metric in self.metrics:
+            metric_values = values[metric][valid].astype(np.float64)
+            metric_valid = ~np.isnan(metric_values)
+            metric_positions = positions[metric_valid]
+            metric_values = metric_values[metric_valid]
+            if len(metric_values) == 0:
+                continue
+            self.data[metric+'_count'][:length] += np.bincount(metric_positions, minlength=length)
+            self.data[metric+'_sum'][:length] += np.bincount(metric_positions, weights=metric_values, minlength=length)
+            order = np.argsort(metric_positions, kind='stable')
+            group_positions, group_starts = np.unique(metric_positions[order], return_index=True)
+            self.data[metric+'_min'][group_positions] = np.fmin(self.data[metric+'_min'][group_positions], np.minimum.reduceat(metric_values[order], group_starts))
+            self.data[metric+'_max'][group_positions] = np.fmax(self.data[metric+'_max'][group_positions], np.maximum.reduceat(metric_values[order], group_starts))
+        for column in self.sums:
+            column_values = np.nan_to_num(values[column][valid].astype(np.float64))
+            self.data[column][:length] += np.bincount(positions, weights=column_values, minlength=length)
+        if self.histogram is not None:
+            histogram_values = values[self.histogram][valid].astype(np.float64)
+            histogram_valid = (histogram_mask[valid] if histogram_mask is not None else True) & (histogram_values >= self.bins[0]) & (histogram_values < self.bins[-1])
+            bins = np.clip(np.searchsorted(self.bins, histogram_values[histogram_valid], side='right')-1, 0, len(self.bins)-2)
+            counts = np.bincount(positions[histogram_valid]*(len(self.bins)-1)+bins, minlength=length*(len(self.bins)-1))
+            self.data['histogram'][:length] += counts.reshape(length, len(self.bins)-1).astype(np.int32)
+        return True
+
+    def slice(self, start, end) -> tuple:
+        #Buckets overlapping start, end
+        buckets = self.buckets[:self.size]
+        first = 0 if start is None else int(np.searchsorted(buckets, start.astype('datetime64['+self.unit+']').astype('datetime64[ns]'), side='left'))
+        last = self.size if end is None else int(np.searchsorted(buckets, end, side='right'))
+        return first, max(first, last)
+
+    def frame(self, first: int, last: int) -> pd.DataFrame:
+        #Metrics as mean (column name of the metric), min and max
+        data = {'timestamp': self.buckets[first:last].copy(), 'count': self.data['count'][first:last].copy()}
+        for metric in self.metrics:
+            count = self.data[metric+'_count'][first:last]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                data[metric] = np.where(count > 0, self.data[metric+'_sum'][first:last]/count, np.nan)
+            data[metric+'_min'] = np.where(count > 0, self.data[metric+'_min'][first:last], np.nan)
+            data[metric+'_max'] = np.where(count > 0, self.data[metric+'_max'][first:last], np.nan)
+        for column in self.sums:
+            data[column] = self.data[column][first:last].copy()
+        return pd.DataFrame(data)
+
+@dataclass
+class TelemetryRollup:
+    max_points: int = 1000
+    tables: dict = field(default_factory=dict)
+    processed: dict = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def __post_init__(self) -> None:
+        for resolution, unit in RESOLUTIONS.items():
+            self.tables[('state', resolution)] = RollupTable(unit, metrics=['battery_voltage', 'amps', 'position_visible_satellites', 'position_visible_satellites_dgps'])
+            self.tables[('state_mow', resolution)] = RollupTable(unit, metrics=['position_visible_satellites', 'position_visible_satellites_dgps'],
+                                                                 histogram='lateral_error', bins=LATERAL_ERROR_BINS)
+            self.tables[('calced_from_stats', resolution)] = RollupTable(unit, sums=['duration_mow_fix', 'duration_mow_float', 'duration_mow_invalid',
+                                                                                     'duration_charge', 'duration_idle', 'duration_mow'])
+
+    def update(self) -> None:
+        #Adds new rows of the buffers, rebuilds rollups of replaced or removed rows
+        with self.lock:
+            for source in ('state', 'calced_from_stats'):
+                if source not in telemetry_store.tables:
+                    continue
+                try:
+                    self.update_source(source, telemetry_store.tables[source])
+                except Exception as e:
+                    logger.error('Telemetry rollup: Could not update '+source+' rollups')
+                    logger.debug(str(e))
+
+    def update_source(self, source: str, buffer) -> None:
+        with buffer.lock:
+            generation, rows = self.processed.get(source, (None, 0))
+            if generation != buffer.generation or rows > len(buffer):
+                self.clear(source)
+                generation, rows = buffer.generation, 0
+            if rows == len(buffer):
+                return
+            size = len(buffer)
+            timestamps = buffer.data['timestamp'][rows:size]
+            values = {column: buffer.data[column][rows:size] for column in buffer.columns if column in self.columns(source)}
+        if not self.add(source, timestamps, values):
+            logger.info('Telemetry rollup: '+source+' timestamps are not in order, rollups are rebuilt')
+            self.clear(source)
+            with buffer.lock:
+                size = len(buffer)
+                timestamps = buffer.data['timestamp'][:size]
+                values = {column: buffer.data[column][:size] for column in buffer.columns if column in self.columns(source)}
+            self.add(source, timestamps, values, ordered=False)
+        self.processed[source] = (generation, size)
+
+    def columns(self, source: str) -> set:
+        columns = set()
+        for (name, resolution), table in self.tables.items():
+            if name == source or (source == 'state' and name == 'state_mow'):
+                columns.update(table.metrics+table.sums+([table.histogram] if table.histogram else []))
+        return columns | {'job', 'position_solution'}
+
+    def add(self, source: str, timestamps: np.ndarray, values: dict, ordered: bool = True) -> bool:
+        if not ordered:
+            order = np.argsort(timestamps, kind='stable')
+            timestamps = timestamps[order]
+            values = {column: column_values[order] for column, column_values in values.items()}
+        for resolution in RESOLUTIONS:
+            if source == 'state':
+                mow = values['job'] == 1
+                if not self.tables[('state', resolution)].add(timestamps, values):
+                    return False
+                mow_values = {column: column_values[mow] for column, column_values in values.items()}
+                if not self.tables[('state_mow', resolution)].add(timestamps[mow], mow_values, mow_values['position_solution'] == 2):
+                    return False
+            elif not self.tables[(source, resolution)].add(timestamps, values):
+                return False
+        return True
+
+    def clear(self, source: str) -> None:
+        for (name, resolution), table in self.tables.items():
+            if name == source or (source == 'state' and name == 'state_mow'):
+                table.clear()
+        self.processed.pop(source, None)
+
+    def resolution(self, name: str, start=None, end=None) -> str:
+        #Raw data (None) or the finest resolution with not more than max_points buckets in the range
+        if len(telemetry.range(name, start, end, columns=['timestamp'])) <= self.max_points:
+            return None
+        self.update()
+        start, end = to_datetime64(start), to_datetime64(end)
+        with self.lock:
+            for resolution in RESOLUTIONS:
+                first, last = self.tables[(name, resolution)].slice(start, end)
+                if last-first <= self.max_points:
+                    return resolution
+        return 'day'
+
+    def range(self, name: str, resolution: str, start=None, end=None) -> pd.DataFrame:
+        self.update()
+        with self.lock:
+            table = self.tables[(name, resolution)]
+            first, last = table.slice(to_datetime64(start), to_datetime64(end))
+            return table.frame(first, last)
+
+    def histogram(self, name: str, resolution: str, start=None, end=None) -> tuple:
+        #Summed bin counts and bin edges of the range
+        self.update()
+        with self.lock:
+            table = self.tables[(name, resolution)]
+            first, last = table.slice(to_datetime64(start), to_datetime64(end))
+            return table.data['histogram'][first:last].sum(axis=0), table.bins
+
+telemetry_rollup = TelemetryRollup()
@@ -0,0 +1,113 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import pandas as pd
+
+#Column types of the rover time series. Timestamps are datetime64, integer codes small ints, measured values
+#float32 (precision of the rover values is much lower) and the calced labels categoricals.
+#Data frames of older versions (string timestamps, int64/float64 columns) are migrated with apply_schema.
+
+STATE_SCHEMA = {
+    'battery_voltage': 'float32',
+    'position_x': 'float32',
+    'position_y': 'float32',
+    'position_delta': 'float32',
+    'position_solution': 'int8',
+    'job': 'int8',
+    'position_mow_point_index': 'int32',
+    'position_age': 'float32',
+    'sensor': 'int8',
+    'target_x': 'float32',
+    'target_y': 'float32',
+    'position_accuracy': 'float32',
+    'position_visible_satellites': 'int8',
+    'amps': 'float32',
+    'position_visible_satellites_dgps': 'int8',
+    'map_crc': 'int64',
+    'lateral_error': 'float32',
+    'timetable_autostartstop_dayofweek': 'int8',
+    'timetabel_autostartstop_hour': 'int8',
+    'timestamp': 'datetime64[ns]',
+}
+
+STATS_SCHEMA = {
+    'duration_idle': 'int32',
+    'duration_charge': 'int32',
+    'duration_mow': 'int32',
+    'duration_mow_invalid': 'int32',
+    'duration_mow_float': 'int32',
+    'duration_mow_fix': 'int32',
+    'distance_mow_traveled': 'float32',
+    'counter_gps_chk_sum_errors': 'int32',
+    'counter_dgps_chk_sum_errors': 'int32',
+    'counter_invalid_recoveries': 'int32',
+    'counter_float_recoveries': 'int32',
+    'counter_gps_jumps': 'int32',
+    'counter_gps_motion_timeout': 'int32',
+    'counter_imu_triggered': 'int32',
+    'counter_sonar_triggered': 'int32',
+    'counter_bumper_triggered': 'int32',
+    'counter_obstacles': 'int32',
+    'time_max_cycle': 'float32',
+    'time_max_dpgs_age': 'float32',
+    'serial_buffer_size': 'int32',
+    'free_memory': 'int32',
+    'reset_cause': 'int32',
+    'temp_min': 'float32',
+    'temp_max': 'float32',
+    'duration_mow_motor_recovery': 'int32',
+    'counter_lift_triggered': 'int32',
+    'counter_gps_no_speed_triggered': 'int32',
+    'counter_tof_triggered': 'int32',
+    'counter_diff_imu_wheel_yaw_speed_triggered': 'int32',
+    'counter_imu_no_rotation_triggered': 'int32',
+    'counter_rotation_timeout_triggered': 'int32',
+    'timestamp': 'datetime64[ns]',
+}
+
+CALCED_FROM_STATE_SCHEMA = {
+    'solution': 'category',
+    'job': 'category',
+    'sensor': 'category',
+    'soc': 'float32',
+    'timestamp': 'datetime64[ns]',
+}
+
+CALCED_FROM_STATS_SCHEMA = STATS_SCHEMA
+
+def convert(values: pd.Series, dtype: str) -> pd.Series:
+    if dtype == 'category':
+        return values.astype('category') if values.dtype.name != 'category' else values
+    if dtype.startswith('datetime64'):
+        if values.dtype.kind == 'M':
+            return values.astype(dtype)
+        return pd.to_datetime(values, format='ISO8601', errors='coerce').astype(dtype)
+    if np.dtype(dtype).kind in 'iu':
+        return pd.to_numeric(values, errors='coerce').fillna(0).astype(dtype)
+    return pd.to_numeric(values, errors='coerce').astype(dtype)
+
+def apply_schema(data: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    #Returns data frame with schema types, columns not in schema are kept as they are
+    if not any(column in data.columns and data[column].dtype.name != dtype for column, dtype in schema.items()):
+        return data
+    data = data.copy()
+    for column, dtype in schema.items():
+        if column in data.columns and data[column].dtype.name != dtype:
+            data[column] = convert(data[column], dtype)
+    return data
+
+def migrate(name: str, data: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    #Migration of loaded data, memory usage before and after is logged
+    migrated = apply_schema(data, schema)
+    if migrated is not data:
+        before = memory_usage(data)
+        after = memory_usage(migrated)
+        logger.info('Telemetry schema: '+name+' migrated ('+str(len(data))+' rows), memory '+format_bytes(before)+' -> '+format_bytes(after))
+    return migrated
+
+def memory_usage(data: pd.DataFrame) -> int:
+    return int(data.memory_usage(index=False, deep=True).sum())
+
+def format_bytes(size: int) -> str:
+    return str(round(size/1024/1024, 2))+' MB'
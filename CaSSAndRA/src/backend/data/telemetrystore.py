@@ -0,0 +1,240 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import json
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from dataclasses import dataclass, field
+
+MIN_DAY = np.datetime64('2020-01-01', 'D')
+
+#Append only on disk store for the rover time series. Every table (state, stats, calced data) is split in daily
+#segments, a segment is a directory with one raw binary file per column and segment.json (rows and column types).
+#New rows of the telemetry buffers are appended every flush_interval seconds, segment.json is written after the
+#column data, so after a crash only the rows of segment.json are read. Categoricals are stored as codes of the
+#categories in manifest.json. Retention removes whole segments, reads load only segments of the requested range.
+#Without RTC the clock of the host can start in 1970 or jump back until it is synchronized: segment days never go
+#back (rows are written to the last segment) and never before MIN_DAY, timestamps of the rows are kept as they are.
+@dataclass
+class TelemetryStore:
+    path: str = None
+    flush_interval: float = 5.0
+    version: str = '1'
+    tables: dict = field(default_factory=dict)
+    flushed: dict = field(default_factory=dict)
+    last_days: dict = field(default_factory=dict)
+    categories: dict = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def register(self, name: str, buffer) -> None:
+        self.tables[name] = buffer
+        self.flushed[name] = 0
+        self.categories[name] = dict()
+
+    def exists(self) -> bool:
+        return self.path is not None and os.path.exists(self.manifest_file())
+
+    def manifest_file(self) -> str:
+        return os.path.join(self.path, 'manifest.json')
+
+    def segment_path(self, name: str, day: str) -> str:
+        return os.path.join(self.path, name, day)
+
+    def read_manifest(self) -> None:
+        with open(self.manifest_file()) as f:
+            manifest = json.load(f)
+        for name, table in manifest.get('tables', dict()).items():
+            if name in self.categories:
+                self.categories[name] = {column: list(values) for column, values in table.get('categories', dict()).items()}
+
+    def write_manifest(self) -> None:
+        manifest = dict(version=self.version, tables={name: dict(categories=self.categories[name]) for name in self.tables})
+        file_tmp = self.manifest_file()+'.tmp'
+        with open(file_tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(file_tmp, self.manifest_file())
+
+    def segments(self, name: str) -> list:
+        #Days (YYYY-MM-DD) of the table on disk, sorted
+        table_path = os.path.join(self.path, name)
+        if not os.path.exists(table_path):
+            return []
+        return sorted(day for day in os.listdir(table_path) if os.path.exists(os.path.join(table_path, day, 'segment.json')))
+
+    def read_segment_meta(self, name: str, day: str) -> dict:
+        with open(os.path.join(self.segment_path(name, day), 'segment.json')) as f:
+            return json.load(f)
+
+    def write_segment_meta(self, name: str, day: str, meta: dict) -> None:
+        file = os.path.join(self.segment_path(name, day), 'segment.json')
+        with open(file+'.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(file+'.tmp', file)
+
+    def load(self, start: datetime = None) -> None:
+        #Fills the registered buffers from disk (segments from start on), loaded rows count as flushed
+        with self.lock:
+            self.read_manifest()
+            for name, buffer in self.tables.items():
+                data = self.read(name, start)
+                buffer.replace(data)
+                self.flushed[name] = len(buffer)
+                logger.info('Telemetry store: '+name+' loaded ('+str(len(buffer))+' rows)')
+
+    def read(self, name: str, start: datetime = None, end: datetime = None, columns: list = None) -> pd.DataFrame:
+        #Rows of the segments overlapping start, end (segment granularity, data is not filtered within a segment)
+        first_day = None if start is None else str(pd.Timestamp(start).date())
+        last_day = None if end is None else str(pd.Timestamp(end).date())
+        frames = []
+        for day in self.segments(name):
+            if (first_day is not None and day < first_day) or (last_day is not None and day > last_day):
+                continue
+            try:
+                frames.append(self.read_segment(name, day, columns))
+            except Exception as e:
+                logger.warning('Telemetry store: Could not read segment '+name+'/'+day+', segment is skipped')
+                logger.debug(str(e))
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, ignore_index=True)
+        for column, categories in self.categories[name].items():
+            if column in data.columns:
+                data[column] = pd.Categorical(data[column], categories=categories)
+        return data
+
+    def read_segment(self, name: str, day: str, columns: list = None) -> pd.DataFrame:
+        meta = self.read_segment_meta(name, day)
+        data = dict()
+        for column, dtype in meta['columns'].items():
+            if columns is not None and column not in columns:
+                continue
+            values = np.fromfile(os.path.join(self.segment_path(name, day), column+'.bin'), dtype=np.dtype(dtype), count=meta['rows'])
+            if column in self.categories[name]:
+                values = pd.Categorical.from_codes(values, categories=self.categories[name][column]).astype(object)
+            data[column] = values
+        return pd.DataFrame(data)
+
+    def flush(self) -> int:
+        #Appends new rows of all buffers, returns number of written rows
+        if self.path is None:
+            return 0
+        written = 0
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            categories_changed = not self.exists()
+            for name, buffer in self.tables.items():
+                try:
+                    rows, changed = self.flush_table(name, buffer)
+                    written += rows
+                    categories_changed |= changed
+                except Exception as e:
+                    logger.error('Telemetry store: Could not write '+name+' data')
+                    logger.debug(str(e))
+            if categories_changed:
+                self.write_manifest()
+        if written:
+            logger.debug('Telemetry store: '+str(written)+' rows written')
+        return written
+
+    def flush_table(self, name: str, buffer) -> tuple:
+        categories_changed = False
+        with buffer.lock:
+            start, end = self.flushed[name], len(buffer)
+            if end <= start:
+                return 0, False
+            columns = dict()
+            for column in buffer.columns:
+                values = buffer.data[column][start:end]
+                if column in buffer.categories:
+                    values, changed = self.store_codes(name, column, buffer.categories[column], values)
+                    categories_changed |= changed
+                elif values.dtype.kind not in 'biufM':
+                    continue
+                columns[column] = np.ascontiguousarray(values)
+            timestamps = buffer.data['timestamp'][start:end] if 'timestamp' in buffer.data else np.full(end-start, np.datetime64('NaT'), dtype='datetime64[ns]')
+        days = timestamps.astype('datetime64[D]')
+        #rows without timestamp belong to the segment of today
+        days[np.isnat(days)] = np.datetime64(datetime.now().date())
+        days = self.segment_days(name, days)
+        for day in np.unique(days):
+            mask = days == day
+            self.append_segment(name, str(day), {column: values[mask] for column, values in columns.items()})
+        self.flushed[name] = end
+        return end-start, categories_changed
+
+    def segment_days(self, name: str, days: np.ndarray) -> np.ndarray:
+        #Segment of every row, not before the last written segment and MIN_DAY (clock jumps of the host)
+        if name not in self.last_days:
+            segments = self.segments(name)
+            self.last_days[name] = np.datetime64(segments[-1], 'D') if segments else MIN_DAY
+        segment_days = np.maximum.accumulate(np.maximum(days, self.last_days[name]))
+        self.last_days[name] = segment_days[-1]
+        moved = int((segment_days != days).sum())
+        if moved:
+            logger.debug('Telemetry store: '+str(moved)+' '+name+' rows with older time than the last segment written to '+str(segment_days[-1]))
+        return segment_days
+
+    def store_codes(self, name: str, column: str, buffer_categories: dict, codes: np.ndarray) -> tuple:
+        #Buffer codes -> codes of the manifest categories (stable on disk)
+        categories = self.categories[name].setdefault(column, [])
+        changed = False
+        for value in buffer_categories:
+            if value not in categories:
+                categories.append(value)
+                changed = True
+        translation = np.array([categories.index(value) for value in buffer_categories]+[-1], dtype=np.int16)
+        return translation[codes], changed
+
+    def append_segment(self, name: str, day: str, columns: dict) -> None:
+        segment_path = self.segment_path(name, day)
+        os.makedirs(segment_path, exist_ok=True)
+        meta = self.read_segment_meta(name, day) if os.path.exists(os.path.join(segment_path, 'segment.json')) else dict(rows=0, columns=dict())
+        rows = len(next(iter(columns.values())))
+        for column, values in columns.items():
+            file = os.path.join(segment_path, column+'.bin')
+            dtype = values.dtype
+            if column in meta['columns'] and np.dtype(meta['columns'][column]) != dtype:
+                values = values.astype(np.dtype(meta['columns'][column]))
+                dtype = values.dtype
+            if column not in meta['columns']:
+                #new column in an existing segment, older rows get default values
+                values = np.concatenate((np.zeros(meta['rows'], dtype=dtype) if dtype.kind != 'M' else np.full(meta['rows'], np.datetime64('NaT'), dtype=dtype), values))
+                meta['columns'][column] = dtype.str
+                mode = 'wb'
+            else:
+                mode = 'r+b' if os.path.exists(file) else 'wb'
+            with open(file, mode) as f:
+                #drop data of an incomplete flush (crash after writing column data)
+                if mode == 'r+b':
+                    f.truncate(meta['rows']*dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                values.tofile(f)
+        meta['rows'] += rows
+        self.write_segment_meta(name, day, meta)
+
+    def drop_before(self, cutoff: datetime) -> None:
+        #Retention: removes segments older than the day of cutoff and the same rows from the buffers
+        cutoff_day = str(pd.Timestamp(cutoff).date())
+        with self.lock:
+            for name, buffer in self.tables.items():
+                if self.path is not None:
+                    for day in self.segments(name):
+                        if day < cutoff_day:
+                            shutil.rmtree(self.segment_path(name, day), ignore_errors=True)
+                            logger.info('Telemetry store: Segment '+name+'/'+day+' removed')
+                with buffer.lock:
+                    if 'timestamp' not in buffer.data or buffer.empty:
+                        continue
+                    #timestamps are not always in order (clock of the host), rows without timestamp are kept
+                    old = buffer.data['timestamp'][:len(buffer)] < np.datetime64(cutoff_day, 'ns')
+                    flushed = self.flushed[name] - int(old[:self.flushed[name]].sum())
+                    rows = buffer.drop_rows(old)
+                    self.flushed[name] = flushed
+                logger.debug(name+' data: '+str(rows)+' rows dropped')
+
+telemetry_store = TelemetryStore()
@@ -7,8 +7,8 @@ logger = logging.getLogger(__name__)
 
 file_paths = namedtuple('FilePaths', ['src', 'user', 'measure', 'map'])
 file_paths.user = namedtuple('UserConfigPaths', ['comm', 'mapcfg', 'appcfg', 'rovercfg', 'pathplannercfg', 'schedulecfg'])
-file_paths.measure = namedtuple('MeasureConfigPaths', ['state', 'stats', 'props', 'calcedstate', 'calcedstats'])
-file_paths.map = namedtuple("MapFilePaths", ['perimeter', 'tasks', 'tasks_parameters'])
+file_paths.measure = namedtuple('MeasureConfigPaths', ['state', 'stats', 'props', 'calcedstate', 'calcedstats', 'telemetry'])
+file_paths.map = namedtuple("MapFilePaths", ['perimeter', 'tasks', 'tasks_parameters', 'cache', 'route_cache'])
 
 
 def create_missing_files(src_dir, dest_dir):
@@ -60,12 +60,15 @@ def init_data(data_path):
     file_paths.measure.props = os.path.join(data_path, 'measure', 'props.pickle')
     file_paths.measure.calcedstate = os.path.join(data_path, 'measure', 'calcstate.pickle')
     file_paths.measure.calcedstats = os.path.join(data_path, 'measure', 'calcstats.pickle')
+    file_paths.measure.telemetry = os.path.join(data_path, 'measure', 'telemetry')
 
     # map files
     file_paths.map.perimeter = os.path.join(data_path, 'map', 'perimeter.json')
     file_paths.map.tasks = os.path.join(data_path, 'map', 'tasks.json')
     file_paths.map.tasks_parameters = os.path.join(data_path, 'map', 'tasks_parameters.json')
     file_paths.map.tmp = os.path.join(data_path, 'map', 'tmp.json')
+    file_paths.map.cache = os.path.join(data_path, 'map', 'cache')
+    file_paths.map.route_cache = os.path.join(data_path, 'map', 'routecache')
 
     # log files
     file_paths.log = os.path.join(data_path, 'log', 'cassandra.log')
@@ -0,0 +1,80 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import time
+import numpy as np
+from dataclasses import dataclass, field, replace
+from shapely.geometry import *
+
+from ..data.mapdata import current_map
+from ..data.cfgdata import PathPlannerCfg
+
+#Mow angle optimizer for angleauto. Plans the selection with every candidate angle and takes the route with the lowest score.
+#With more than one worker the planning jobs submit every candidate as a child job and select the route in the parent job,
+#optimize runs the candidates one after another in the calling worker (one worker). Every candidate is stored in the route cache:
+#score = length + transit_weight*transit + turn_cost*turns
+#transit is the length of all segments not parallel to the mow lines (connections, step overs, border laps)
+@dataclass
+class AngleOptimizer:
+    angles: list = field(default_factory=lambda: list(range(0, 180, 15)))
+    transit_weight: float = 0.5
+    turn_cost: float = 1.0
+    turn_threshold: float = 30.0
+    parallel_tolerance: float = 5.0
+    #score tables of the last optimizations (one table per optimized selection)
+    results: list = field(default_factory=list)
+
+    def score(self, route: list, parameters: PathPlannerCfg, angle: int) -> dict:
+        coords = np.asarray(route, dtype=float).reshape(-1, 2)
+        segments = np.diff(coords, axis=0)
+        lengths = np.hypot(segments[:, 0], segments[:, 1])
+        segments, lengths = segments[lengths > 1e-6], lengths[lengths > 1e-6]
+        headings = np.degrees(np.arctan2(segments[:, 1], segments[:, 0]))
+        mow_directions = [angle, angle+90] if parameters.pattern == 'squares' and parameters.mowarea else [angle]
+        deviation = np.min([np.abs((headings-direction+90)%180-90) for direction in mow_directions], axis=0) if len(headings) else np.empty(0)
+        transit = lengths[deviation > self.parallel_tolerance].sum()
+        heading_changes = np.abs((np.diff(headings)+180)%360-180)
+        turns = int(np.count_nonzero(heading_changes > self.turn_threshold))
+        length = lengths.sum()
+        return dict(angle=int(angle), length=round(float(length), 2), transit=round(float(transit), 2), turns=turns,
+                    score=round(float(length + self.transit_weight*transit + self.turn_cost*turns), 2))
+
+    def candidates(self, parameters: PathPlannerCfg) -> list:
+        #Planner parameters of every candidate angle
+        if parameters.pattern == 'rings':
+            logger.info('Angle optimizer: Pattern rings does not depend on angle, use angle 0')
+            return [replace(parameters, angle=0, angleauto=False)]
+        angles = list(dict.fromkeys(int(angle)%360 for angle in self.angles))
+        return [replace(parameters, angle=angle, angleauto=False) for angle in angles]
+
+    def select(self, routes: list, candidates: list) -> tuple:
+        #Returns route with the lowest score and the score table
+        scores = [self.score(route, candidate, candidate.angle) for route, candidate in zip(routes, candidates) if len(route) > 1]
+        if scores == []:
+            logger.info('Angle optimizer: No candidate delivered a route')
+            return [], scores
+        best = min(scores, key=lambda row: row['score'])
+        for row in scores:
+            row['selected'] = row is best
+        logger.info('Angle optimizer: Best angle '+str(best['angle'])+'Deg, score: '+str(best['score']))
+        logger.debug('Angle optimizer: Scores '+str(scores))
+        return routes[[candidate.angle for candidate in candidates].index(best['angle'])], scores
+
+    def optimize(self, selected_perimeter: Polygon, parameters: PathPlannerCfg, start_pos: list) -> list:
+        from .path import calc
+        candidates = self.candidates(parameters)
+        if len(candidates) == 1:
+            return calc(selected_perimeter, candidates[0], start_pos)
+        logger.info('Angle optimizer: Planning route with '+str(len(candidates))+' candidate angles')
+        start_time = time.perf_counter()
+        routes = []
+        for candidate in candidates:
+            current_map.check_calc_cancelled()
+            routes.append(calc(selected_perimeter, candidate, start_pos))
+        route, scores = self.select(routes, candidates)
+        if scores:
+            self.results.append(scores)
+        logger.info('Angle optimizer: Optimization done in '+str(round(time.perf_counter()-start_time, 2))+'s')
+        return route
+
+angle_optimizer = AngleOptimizer()
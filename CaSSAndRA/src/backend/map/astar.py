@@ -0,0 +1,153 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import heapq
+from itertools import count
+import numpy as np
+import networkx as nx
+from dataclasses import dataclass, field
+
+#Compact graph for the A* pathfinder. Nodes have integer ids (coordinates in an array),
+#adjacency is stored as CSR arrays (indptr, indices, weights). The neighbor order is the
+#same as in a networkx graph built from the same edges, so searches deliver the same paths.
+@dataclass
+class CSRGraph:
+    coords: np.ndarray = field(default_factory=lambda: np.empty((0, 2)))
+    indptr: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int32))
+    indices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    weights: np.ndarray = field(default_factory=lambda: np.empty(0))
+    node_ids: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_edges(cls, edges: list) -> 'CSRGraph':
+        node_ids = dict()
+        adjacency = []
+        for start, end, weight in edges:
+            for node in (start, end):
+                if node not in node_ids:
+                    node_ids[node] = len(adjacency)
+                    adjacency.append(dict())
+            start_id, end_id = node_ids[start], node_ids[end]
+            adjacency[start_id][end_id] = weight
+            adjacency[end_id][start_id] = weight
+        return cls.from_adjacency(node_ids, adjacency)
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph) -> 'CSRGraph':
+        node_ids = {node: i for i, node in enumerate(G.nodes)}
+        adjacency = [{node_ids[neighbor]: data.get('weight', 1) for neighbor, data in G.adj[node].items()} for node in G.nodes]
+        return cls.from_adjacency(node_ids, adjacency)
+
+    @classmethod
+    def from_adjacency(cls, node_ids: dict, adjacency: list) -> 'CSRGraph':
+        indptr = np.zeros(len(adjacency)+1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(neighbors) for neighbors in adjacency])
+        indices = np.fromiter((neighbor for neighbors in adjacency for neighbor in neighbors), dtype=np.int32, count=indptr[-1])
+        weights = np.fromiter((weight for neighbors in adjacency for weight in neighbors.values()), dtype=float, count=indptr[-1])
+        coords = np.array(list(node_ids), dtype=float).reshape(-1, 2)
+        return cls(coords=coords, indptr=indptr, indices=indices, weights=weights, node_ids=node_ids)
+
+    def __contains__(self, node) -> bool:
+        return node in self.node_ids
+
+    def number_of_nodes(self) -> int:
+        return len(self.coords)
+
+    def number_of_edges(self) -> int:
+        self_loops = int(np.count_nonzero(self.indices == np.repeat(np.arange(len(self.coords)), np.diff(self.indptr))))
+        return (len(self.indices) - self_loops)//2 + self_loops
+
+    def nbytes(self) -> int:
+        return self.coords.nbytes + self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes
+
+def astar(graph: CSRGraph, source: int, target: int, heuristic_factor: float = 0.0, overlay: dict = None, overlay_coords: np.ndarray = None) -> list:
+    #Heap based A* over CSR arrays, overlay holds additional edges {node id: {node id: weight}}.
+    #Node ids >= graph.number_of_nodes() are overlay nodes with coordinates in overlay_coords
+    nodes_count = len(graph.coords)
+    if overlay_coords is not None and len(overlay_coords) > 0:
+        coords = np.concatenate((graph.coords, overlay_coords))
+    else:
+        coords = graph.coords
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    target_x, target_y = coords[target]
+    c = count()
+    queue = [(0, next(c), source, 0, None)]
+    enqueued = {}
+    explored = {}
+    while queue:
+        _, __, curnode, dist, parent = heapq.heappop(queue)
+        if curnode == target:
+            path = [curnode]
+            node = parent
+            while node is not None:
+                path.append(node)
+                node = explored[node]
+            path.reverse()
+            return path
+        if curnode in explored:
+            if explored[curnode] is None:
+                continue
+            qcost, h = enqueued[curnode]
+            if qcost < dist:
+                continue
+        explored[curnode] = parent
+        if curnode < nodes_count:
+            neighbors = indices[indptr[curnode]:indptr[curnode+1]]
+            neighbors_weights = weights[indptr[curnode]:indptr[curnode+1]].tolist()
+            if heuristic_factor:
+                neighbors_h = (heuristic_factor*np.hypot(coords[neighbors, 0]-target_x, coords[neighbors, 1]-target_y)).tolist()
+            else:
+                neighbors_h = [0]*len(neighbors)
+            candidates = zip(neighbors.tolist(), neighbors_weights, neighbors_h)
+        else:
+            candidates = iter(())
+        if overlay is not None and curnode in overlay:
+            overlay_neighbors = list(overlay[curnode])
+            if heuristic_factor:
+                overlay_h = (heuristic_factor*np.hypot(coords[overlay_neighbors, 0]-target_x, coords[overlay_neighbors, 1]-target_y)).tolist()
+            else:
+                overlay_h = [0]*len(overlay_neighbors)
+            candidates = list(candidates) + list(zip(overlay_neighbors, overlay[curnode].values(), overlay_h))
+        for neighbor, weight, neighbor_h in candidates:
+            ncost = dist + weight
+            if neighbor in enqueued:
+                qcost, h = enqueued[neighbor]
+                if qcost <= ncost:
+                    continue
+            else:
+                h = neighbor_h
+            enqueued[neighbor] = ncost, h
+            heapq.heappush(queue, (ncost + h, next(c), neighbor, ncost, curnode))
+    raise nx.NetworkXNoPath('Node '+str(target)+' not reachable from '+str(source))
+
+def astar_path(graph: CSRGraph, source: tuple, target: tuple, heuristic_factor: float = 0.0, overlay_edges: dict = None) -> list:
+    #Adapter with coordinate nodes (like nx.astar_path), overlay edges are given as {coords: {coords: weight}}
+    node_ids = graph.node_ids
+    overlay = None
+    overlay_nodes = []
+    if overlay_edges:
+        overlay_ids = dict()
+        def overlay_id(node):
+            if node in node_ids:
+                return node_ids[node]
+            if node not in overlay_ids:
+                overlay_ids[node] = len(node_ids) + len(overlay_nodes)
+                overlay_nodes.append(node)
+            return overlay_ids[node]
+        overlay = dict()
+        for node, neighbors in overlay_edges.items():
+            node_id = overlay_id(node)
+            overlay_neighbors = overlay.setdefault(node_id, dict())
+            for neighbor, weight in neighbors.items():
+                overlay_neighbors[overlay_id(neighbor)] = weight
+        all_nodes = lambda node: node in node_ids or node in overlay_ids
+        get_id = overlay_id
+    else:
+        all_nodes = lambda node: node in node_ids
+        get_id = lambda node: node_ids[node]
+    if not all_nodes(source) or not all_nodes(target):
+        raise nx.NodeNotFound('Either source '+str(source)+' or target '+str(target)+' is not in graph')
+    overlay_coords = np.array(overlay_nodes, dtype=float).reshape(-1, 2)
+    path = astar(graph, get_id(source), get_id(target), heuristic_factor, overlay, overlay_coords)
+    nodes_count = len(graph.coords)
+    return [tuple(graph.coords[node].tolist()) if node < nodes_count else overlay_nodes[node-nodes_count] for node in path]
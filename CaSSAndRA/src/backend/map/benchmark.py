@@ -0,0 +1,267 @@
+import logging
+logger = logging.getLogger(__name__)
+
+#Benchmarks for the path planner building blocks on synthetic maps.
+#Usage (from CaSSAndRA folder): python -m src.backend.map.benchmark graph|pathfinder|astar|cells
+
+import argparse
+import math
+import time
+import tracemalloc
+import pandas as pd
+import networkx as nx
+from shapely.geometry import *
+
+from . import visibilitygraph
+from . import astar
+
+def synthetic_map(perimeter_vertices: int, exclusions: int = 0, radius: float = 30.0) -> Polygon:
+    perimeter_coords = []
+    for i in range(perimeter_vertices):
+        angle = 2*math.pi*i/perimeter_vertices
+        r = radius*(1 + 0.2*math.sin(7*angle) + 0.05*math.sin(31*angle))
+        perimeter_coords.append((r*math.cos(angle), r*math.sin(angle)))
+    holes = []
+    columns = max(1, math.ceil(math.sqrt(exclusions)))
+    for e in range(exclusions):
+        cx = -0.5*radius + radius*(e % columns)/max(1, columns-1) if columns > 1 else 0
+        cy = -0.5*radius + radius*(e // columns)/max(1, columns-1) if columns > 1 else 0
+        holes.append([(cx+1.0*math.cos(2*math.pi*k/8), cy+1.0*math.sin(2*math.pi*k/8)) for k in range(8)])
+    return Polygon(perimeter_coords, holes)
+
+def synthetic_search_wire(polygon: Polygon) -> LineString:
+    minx, miny, maxx, maxy = polygon.bounds
+    search_wire = LineString([(minx/2, 0), (0, 0.4*miny), (maxx/2, 0)])
+    return search_wire
+
+def synthetic_perimeter_df(polygon: Polygon) -> pd.DataFrame:
+    rows = [(x, y, 'perimeter') for x, y in list(polygon.exterior.coords)[:-1]]
+    for i, excl in enumerate(polygon.interiors):
+        rows.extend([(x, y, 'exclusion_'+str(i)) for x, y in list(excl.coords)[:-1]])
+    minx, miny, maxx, maxy = polygon.bounds
+    rows.extend([(maxx+1, 0, 'dockpoints'), (maxx+2, 0, 'dockpoints')])
+    return pd.DataFrame(rows, columns=['X', 'Y', 'type'])
+
+def legacy_graph(polygon: Polygon, search_wire: LineString) -> nx.Graph:
+    #Pairwise reference implementation (one within call per pair)
+    def check(start, end):
+        return LineString([start, end]).within(polygon)
+    def add(G, start, end, factor=1):
+        line = LineString((start, end))
+        G.add_edge(start, end, weight=line.length*factor)
+    G = nx.Graph()
+    perimeter_coords = list(polygon.exterior.coords)
+    for i in range(len(perimeter_coords)-1):
+        add(G, perimeter_coords[i], perimeter_coords[i+1])
+        for k in range(len(perimeter_coords)-1):
+            if check(perimeter_coords[i], perimeter_coords[k]):
+                add(G, perimeter_coords[i], perimeter_coords[k])
+    for excl in polygon.interiors:
+        excl_coords = list(excl.coords)
+        for i in range(len(excl_coords)-1):
+            add(G, excl_coords[i], excl_coords[i+1])
+    for excl in polygon.interiors:
+        connected_to_perimeter = False
+        excl_coords = list(excl.coords)
+        for i in range(len(excl_coords)-1):
+            for k in range(len(perimeter_coords)-1):
+                if check(excl_coords[i], perimeter_coords[k]):
+                    connected_to_perimeter = True
+                    add(G, excl_coords[i], perimeter_coords[k])
+        if not connected_to_perimeter:
+            for l in range(len(excl_coords)-1):
+                for other_exclusion in polygon.interiors:
+                    for other_coord in list(other_exclusion.coords):
+                        if check(excl_coords[l], other_coord):
+                            add(G, excl_coords[l], other_coord)
+    if not search_wire.is_empty:
+        perimeter_points = list(perimeter_coords)
+        for excl in polygon.interiors:
+            perimeter_points.extend(list(excl.coords))
+        search_wire_coords = list(search_wire.coords)
+        for i in range(len(search_wire_coords)-1):
+            add(G, search_wire_coords[i], search_wire_coords[i+1], 0.5)
+            for other in search_wire_coords:
+                if check(search_wire_coords[i], other):
+                    add(G, search_wire_coords[i], other, 0.5)
+            for perimeter_point in perimeter_points:
+                if check(search_wire_coords[i], perimeter_point):
+                    add(G, search_wire_coords[i], perimeter_point)
+    return G
+
+def same_graph(G1: nx.Graph, G2: nx.Graph) -> bool:
+    if set(G1.nodes) != set(G2.nodes) or len(G1.edges) != len(G2.edges):
+        return False
+    for u, v, weight in G1.edges(data='weight'):
+        if not G2.has_edge(u, v) or abs(G2[u][v]['weight'] - weight) > 1e-9:
+            return False
+    return True
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def benchmark_graph(sizes: list, exclusions: int, legacy_limit: int) -> list:
+    results = []
+    print('{:>9} {:>6} {:>8} {:>10} {:>10} {:>8} {:>6}'.format('vertices', 'excl', 'edges', 'legacy[s]', 'vector[s]', 'speedup', 'equal'))
+    for size in sizes:
+        polygon = synthetic_map(size, exclusions)
+        search_wire = synthetic_search_wire(polygon)
+        G_new, time_new = timed(visibilitygraph.create, polygon, search_wire)
+        if size <= legacy_limit:
+            G_legacy, time_legacy = timed(legacy_graph, polygon, search_wire)
+            equal = same_graph(G_legacy, G_new)
+            speedup = time_legacy/time_new
+        else:
+            time_legacy, equal, speedup = float('nan'), None, float('nan')
+        results.append(dict(vertices=size, exclusions=exclusions, edges=len(G_new.edges), legacy=time_legacy, vectorized=time_new, speedup=speedup, equal=equal))
+        print('{:>9} {:>6} {:>8} {:>10.3f} {:>10.3f} {:>8.1f} {:>6}'.format(size, exclusions, len(G_new.edges), time_legacy, time_new, speedup, str(equal)))
+    return results
+
+def random_points(polygon: Polygon, amount: int, seed: int = 0) -> list:
+    import random
+    rnd = random.Random(seed)
+    minx, miny, maxx, maxy = polygon.bounds
+    points = []
+    while len(points) < amount:
+        point = (rnd.uniform(minx, maxx), rnd.uniform(miny, maxy))
+        if polygon.contains(Point(point)):
+            points.append(point)
+    return points
+
+def benchmark_pathfinder(size: int, exclusions: int, width: float, plans: int, queries: int) -> list:
+    #Consecutive lines.calcroute runs (each followed by pathfinder queries like task stitching/go to),
+    #start/goal edges live in a per query overlay, the map graph must not grow
+    from ..data.mapdata import current_map
+    from ..data.roverdata import robot
+    from ..data.cfgdata import PathPlannerCfg
+    from . import path
+    from .pathfinder import pathfinder
+    polygon = synthetic_map(size, exclusions)
+    points = random_points(polygon, 2*queries*plans)
+    find_way = pathfinder.find_way
+    results = []
+    print('{:>8} {:>10} {:>12} {:>14} {:>10} {:>10}'.format('queries', 'A*[s]', 'nodes', 'edges', 'total[s]', 'length'))
+    current_map.perimeter = synthetic_perimeter_df(polygon)
+    current_map.create('benchmark')
+    nodes_before, edges_before = current_map.astar_graph.number_of_nodes(), current_map.astar_graph.number_of_edges()
+    stats = dict(queries=0, time=0.0, length=0.0)
+    def timed_find_way(start, goal):
+        start_time = time.perf_counter()
+        result = find_way(start, goal)
+        stats['time'] += time.perf_counter() - start_time
+        stats['queries'] += 1
+        return result
+    pathfinder.find_way = timed_find_way
+    robot.position_x, robot.position_y, robot.job = 0.0, 0.0, 0
+    start_time = time.perf_counter()
+    try:
+        for plan in range(plans):
+            route = path.calc_simple(current_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=width, angle=(plan*37) % 180))
+            stats['length'] += LineString(route).length if len(route) > 1 else 0
+            pathfinder.create()
+            pathfinder.angle = 0
+            for k in range(queries):
+                start, goal = points[2*(plan*queries+k)], points[2*(plan*queries+k)+1]
+                way = pathfinder.find_way(start, goal)
+                stats['length'] += LineString([start]+way).length if len(way) > 0 else 0
+    finally:
+        del pathfinder.find_way
+    total_time = time.perf_counter() - start_time
+    G = current_map.astar_graph
+    nodes = str(nodes_before)+'->'+str(G.number_of_nodes())
+    edges = str(edges_before)+'->'+str(G.number_of_edges())
+    results.append(dict(queries=stats['queries'], astar=stats['time'], nodes=nodes, edges=edges, total=total_time, length=stats['length']))
+    print('{:>8} {:>10.3f} {:>12} {:>14} {:>10.3f} {:>10.1f}'.format(stats['queries'], stats['time'], nodes, edges, total_time, stats['length']))
+    return results
+
+def graph_memory(function, *args) -> tuple:
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        memory = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, memory
+
+def benchmark_astar(sizes: list, exclusions: int, queries: int) -> list:
+    #networkx graph + nx.astar_path vs CSR graph + array A* on the same edges and node pairs (equal paths: tests/test_astar.py)
+    results = []
+    print('{:>9} {:>8} {:>12} {:>12} {:>10} {:>10} {:>8}'.format('vertices', 'edges', 'nx[kB]', 'csr[kB]', 'nx[ms]', 'csr[ms]', 'speedup'))
+    for size in sizes:
+        polygon = synthetic_map(size, exclusions)
+        search_wire = synthetic_search_wire(polygon)
+        edges = visibilitygraph.create_edges(polygon, search_wire)
+        G_nx, memory_nx = graph_memory(visibilitygraph.create_graph, edges)
+        G_csr, memory_csr = graph_memory(astar.CSRGraph.from_edges, edges)
+        import random
+        rnd = random.Random(0)
+        nodes = list(G_nx.nodes)
+        pairs = [(rnd.choice(nodes), rnd.choice(nodes)) for i in range(queries)]
+        def run_nx():
+            return [nx.astar_path(G_nx, start, goal, heuristic=None, weight='weight') for start, goal in pairs]
+        def run_csr():
+            return [astar.astar_path(G_csr, start, goal) for start, goal in pairs]
+        paths_nx, time_nx = timed(run_nx)
+        paths_csr, time_csr = timed(run_csr)
+        results.append(dict(vertices=size, edges=G_csr.number_of_edges(), memory_nx=memory_nx, memory_csr=memory_csr, networkx=time_nx, csr=time_csr))
+        print('{:>9} {:>8} {:>12.1f} {:>12.1f} {:>10.3f} {:>10.3f} {:>8.1f}'.format(size, G_csr.number_of_edges(), memory_nx/1024, memory_csr/1024, 1000*time_nx/queries, 1000*time_csr/queries, time_nx/time_csr))
+    return results
+
+def benchmark_cells(size: int, exclusions: list, widths: list) -> list:
+    #Pattern lines (greedy line hopping) vs cells (boustrophedon cells) on the same map and parameters
+    from ..data.mapdata import current_map
+    from ..data.roverdata import robot
+    from ..data.cfgdata import PathPlannerCfg
+    from . import path
+    from .angleoptimizer import angle_optimizer
+    results = []
+    print('{:>6} {:>6} {:>8} {:>8} {:>10} {:>10} {:>10} {:>6}'.format('excl', 'width', 'pattern', 'time[s]', 'length', 'transit', 'points', 'turns'))
+    for exclusions_count in exclusions:
+        polygon = synthetic_map(size, exclusions_count)
+        current_map.perimeter = synthetic_perimeter_df(polygon)
+        current_map.create('benchmark')
+        robot.position_x, robot.position_y, robot.job = 0.0, -0.8*30, 0
+        for width in widths:
+            for pattern in ['lines', 'cells']:
+                parameters = PathPlannerCfg(pattern=pattern, width=width, angle=0)
+                route, duration = timed(path.calc_simple, current_map.perimeter_polygon, parameters)
+                score = angle_optimizer.score(route, parameters, 0)
+                results.append(dict(exclusions=exclusions_count, width=width, pattern=pattern, time=duration, length=score['length'], transit=score['transit'], points=len(route), turns=score['turns']))
+                print('{:>6} {:>6} {:>8} {:>8.3f} {:>10.1f} {:>10.1f} {:>10} {:>6}'.format(exclusions_count, width, pattern, duration, score['length'], score['transit'], len(route), score['turns']))
+    return results
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description='CaSSAndRA path planner benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    graph_parser = subparsers.add_parser('graph', help='visibility graph builder, legacy vs vectorized')
+    graph_parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200, 400, 600])
+    graph_parser.add_argument('--exclusions', type=int, default=12)
+    graph_parser.add_argument('--legacy-limit', type=int, default=600, help='skip legacy builder above this vertex count')
+    pathfinder_parser = subparsers.add_parser('pathfinder', help='pathfinder queries during lines runs')
+    pathfinder_parser.add_argument('--size', type=int, default=120)
+    pathfinder_parser.add_argument('--exclusions', type=int, default=16)
+    pathfinder_parser.add_argument('--width', type=float, default=0.3)
+    pathfinder_parser.add_argument('--plans', type=int, default=5)
+    pathfinder_parser.add_argument('--queries', type=int, default=40, help='pathfinder queries after each plan')
+    astar_parser = subparsers.add_parser('astar', help='A* graph memory and query latency, networkx vs CSR arrays')
+    astar_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200, 400])
+    astar_parser.add_argument('--exclusions', type=int, default=12)
+    astar_parser.add_argument('--queries', type=int, default=200)
+    cells_parser = subparsers.add_parser('cells', help='route planning time and route length, pattern lines vs cells')
+    cells_parser.add_argument('--size', type=int, default=120)
+    cells_parser.add_argument('--exclusions', type=int, nargs='+', default=[0, 4, 9, 16])
+    cells_parser.add_argument('--widths', type=float, nargs='+', default=[0.3, 0.18])
+    args = parser.parse_args(argv)
+    if args.benchmark == 'graph':
+        benchmark_graph(args.sizes, args.exclusions, args.legacy_limit)
+    elif args.benchmark == 'pathfinder':
+        benchmark_pathfinder(args.size, args.exclusions, args.width, args.plans, args.queries)
+    elif args.benchmark == 'astar':
+        benchmark_astar(args.sizes, args.exclusions, args.queries)
+    elif args.benchmark == 'cells':
+        benchmark_cells(args.size, args.exclusions, args.widths)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import time
+import numpy as np
+import shapely
+from shapely.geometry import *
+
+from ..data.mapdata import current_map
+from .pathfinder import pathfinder
+from .directway import directway
+from .tour import connect
+from .segmentorder import segment_order
+
+#Boustrophedon cell decomposition planner (pattern cells). Works in the turned frame like lines,
+#mow lines are horizontal. Line fragments of consecutive levels are merged into a cell as long as
+#the fragments overlap one to one and both side connections are direct ways, so every cell can be
+#mowed with one continuous zig-zag. Cells (and exclusion edges) are ordered as a tour over their entry and exit
+#points: nearest neighbor seed, then 2-opt and Or-opt moves of segment order and a pass choosing the zig-zag of every
+#cell (start left or right in the first row) until nothing improves or the time budget is used up.
+
+def line_fragments(line_mask) -> list:
+    #Returns rows of fragments [[(y, x_min, x_max), ...], ...] sorted by y and x
+    fragments = []
+    for part in shapely.get_parts(line_mask):
+        coords = shapely.get_coordinates(part)
+        if len(coords) == 0:
+            continue
+        fragments.append((round(float(coords[0, 1]), 6), float(coords[:, 0].min()), float(coords[:, 0].max())))
+    fragments.sort()
+    rows = []
+    for fragment in fragments:
+        if rows == [] or rows[-1][0][0] != fragment[0]:
+            rows.append([fragment])
+        else:
+            rows[-1].append(fragment)
+    return rows
+
+def overlaps(previous: list, current: list) -> list:
+    #Overlapping fragment pairs of two sorted rows (two pointer sweep)
+    pairs = []
+    i = j = 0
+    while i < len(previous) and j < len(current):
+        if previous[i][1] <= current[j][2] and current[j][1] <= previous[i][2]:
+            pairs.append((i, j))
+        if previous[i][2] < current[j][2]:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+def decompose(border: Polygon, rows: list) -> list:
+    cells = []
+    open_cells = []
+    for row in rows:
+        current_map.check_calc_cancelled()
+        pairs = overlaps([cells[cell_nr][-1] for cell_nr in open_cells], row)
+        previous_degree = np.bincount([i for i, j in pairs], minlength=len(open_cells))
+        current_degree = np.bincount([j for i, j in pairs], minlength=len(row))
+        pairs = [(i, j) for i, j in pairs if previous_degree[i] == 1 and current_degree[j] == 1]
+        continued = dict()
+        if pairs != []:
+            previous = np.array([cells[open_cells[i]][-1] for i, j in pairs])
+            current = np.array([row[j] for i, j in pairs])
+            left = directway.check_many(border, previous[:, [1, 0]], current[:, [1, 0]])
+            right = directway.check_many(border, previous[:, [2, 0]], current[:, [2, 0]])
+            continued = {j: open_cells[i] for (i, j), valid in zip(pairs, left & right) if valid}
+        open_cells_new = []
+        for j, fragment in enumerate(row):
+            if j in continued:
+                cells[continued[j]].append(fragment)
+                open_cells_new.append(continued[j])
+            else:
+                cells.append([fragment])
+                open_cells_new.append(len(cells)-1)
+        open_cells = open_cells_new
+    return cells
+
+def cell_route(cell: list, reverse_rows: bool, start_right: bool) -> list:
+    route = []
+    right = start_right
+    for y, x_min, x_max in (cell[::-1] if reverse_rows else cell):
+        route.extend([(x_max, y), (x_min, y)] if right else [(x_min, y), (x_max, y)])
+        right = not right
+    return route
+
+def edge_route(edge: Polygon, position: tuple) -> list:
+    route = list(edge.exterior.coords)[:-1]
+    first_coords_nr = min(range(len(route)), key=lambda k: (route[k][0]-position[0])**2 + (route[k][1]-position[1])**2)
+    route = route[first_coords_nr:]+route[:first_coords_nr]
+    route.append(route[0])
+    return route
+
+def choose_shapes(order: np.ndarray, flip: np.ndarray, first: np.ndarray, last: np.ndarray, ways: list, alternatives: list, position: tuple) -> bool:
+    #Takes the other zig-zag of a cell, if it shortens the connections to the previous and the next way
+    improved = False
+    entries, exits = segment_order.tour_points(order, flip, first, last)
+    for i, way_nr in enumerate(order.tolist()):
+        if alternatives[way_nr] is None:
+            continue
+        previous = np.asarray(position, dtype=float) if i == 0 else exits[i-1]
+        alternative = np.array([alternatives[way_nr][0], alternatives[way_nr][-1]], dtype=float)
+        entry, exit = (alternative[1], alternative[0]) if flip[i] else (alternative[0], alternative[1])
+        old = np.hypot(*(previous-entries[i])) + (np.hypot(*(exits[i]-entries[i+1])) if i < len(order)-1 else 0)
+        new = np.hypot(*(previous-entry)) + (np.hypot(*(exit-entries[i+1])) if i < len(order)-1 else 0)
+        if new < old - 1e-6:
+            ways[way_nr], alternatives[way_nr] = alternatives[way_nr], ways[way_nr]
+            first[way_nr], last[way_nr] = alternative[0], alternative[1]
+            entries[i], exits[i] = entry, exit
+            improved = True
+    return improved
+
+def order_ways(ways: list, alternatives: list, rings: np.ndarray, position: tuple) -> tuple:
+    deadline = time.perf_counter() + segment_order.time_budget
+    order, flip, ways = segment_order.seed(ways, rings, position)
+    first, last = segment_order.endpoints(ways, rings)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        current_map.check_calc_cancelled()
+        improved = segment_order.two_opt(order, flip, first, last, position, deadline)
+        improved = segment_order.or_opt(order, flip, first, last, position, deadline) or improved
+        improved = choose_shapes(order, flip, first, last, ways, alternatives, position) or improved
+    return order, flip, ways
+
+def greedy_ways(cells: list, edges_pol: list, position: tuple) -> list:
+    #Nearest neighbor order, entry points of every cell: (first row, left), (first row, right), (last row, left), (last row, right)
+    variants = [(False, False), (False, True), (True, False), (True, True)]
+    entries = np.array([[(cell[-1 if reverse_rows else 0][2 if start_right else 1], cell[-1 if reverse_rows else 0][0]) for reverse_rows, start_right in variants] for cell in cells]).reshape(-1, 4, 2)
+    cells_to_go = np.ones(len(cells), dtype=bool)
+    edges_to_go = list(edges_pol)
+    edges_coords = [np.asarray(edge.exterior.coords) for edge in edges_to_go]
+    ways = []
+    while cells_to_go.any() or edges_to_go != []:
+        current_map.check_calc_cancelled()
+        distances = np.hypot(entries[..., 0]-position[0], entries[..., 1]-position[1])
+        distances[~cells_to_go] = np.inf
+        edge_distances = [np.hypot(coords[:, 0]-position[0], coords[:, 1]-position[1]).min() for coords in edges_coords]
+        if edge_distances != [] and (not cells_to_go.any() or min(edge_distances) < distances.min()):
+            edge_nr = int(np.argmin(edge_distances))
+            del edges_coords[edge_nr]
+            way = edge_route(edges_to_go.pop(edge_nr), position)
+        else:
+            cell_nr, variant = np.unravel_index(np.argmin(distances), distances.shape)
+            cells_to_go[cell_nr] = False
+            way = cell_route(cells[cell_nr], *variants[variant])
+        ways.append(way)
+        position = way[-1]
+    return ways
+
+def tour_ways(cells: list, edges_pol: list, position: tuple) -> list:
+    #Every cell is a way with two zig-zags (start left or right in the first row), reversed zig-zags are the
+    #variants starting in the last row. Exclusion edges are closed rings in cutedge direction
+    ways = [cell_route(cell, False, False) for cell in cells] + [list(edge.exterior.coords)[:-1] for edge in edges_pol]
+    alternatives = [cell_route(cell, False, True) for cell in cells] + [None]*len(edges_pol)
+    rings = np.array([False]*len(cells) + [True]*len(edges_pol), dtype=bool)
+    order, flip, ways = order_ways(ways, alternatives, rings, position)
+    tour = []
+    for way_nr, flipped in zip(order.tolist(), flip.tolist()):
+        if rings[way_nr]:
+            tour.append(ways[way_nr] + [ways[way_nr][0]])
+        else:
+            tour.append(ways[way_nr][::-1] if flipped else ways[way_nr])
+    return tour
+
+def connect_ways(border: Polygon, route: list, ways: list) -> tuple:
+    #Returns route and number of skipped ways (no connection found)
+    route = list(route)
+    skipped = 0
+    for way in ways:
+        current_map.check_calc_cancelled()
+        if not connect(border, route, way):
+            skipped += 1
+        current_map.calculated_progress += 1
+    return route, skipped
+
+def calcroute(border, line_mask, edges_pol, route, parameters, angle):
+    logger.info('Coverage path planner (cells): Start coverage path planner')
+    logger.debug(parameters)
+    pathfinder.create()
+    pathfinder.angle = angle
+    if parameters.distancetoborder == 0:
+        logger.debug('Distance to border selected to 0, increase boundary')
+        border = border.buffer(0.05, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
+    rows = line_fragments(line_mask)
+    cells = decompose(border, rows)
+    logger.info('Coverage path planner (cells): '+str(sum(len(row) for row in rows))+' line fragments decomposed into '+str(len(cells))+' cells')
+    #Route is just the start point, start directly at the first cell (like lines)
+    position = route[-1]
+    if len(route) == 1:
+        route = []
+    if cells == [] and edges_pol == []:
+        return LineString([position, position])
+    current_map.total_progress = 2*(len(cells) + len(edges_pol))
+    current_map.calculated_progress = 0
+    #Tour is optimized on straight distances, transits around exclusions can make it longer. Keep the nearest neighbor route then
+    route_greedy, skipped_greedy = connect_ways(border, route, greedy_ways(cells, edges_pol, position))
+    route_tour, skipped_tour = connect_ways(border, route, tour_ways(cells, edges_pol, position))
+    length_greedy, length_tour = LineString(route_greedy+route_greedy[-1:]).length, LineString(route_tour+route_tour[-1:]).length
+    logger.info('Coverage path planner (cells): route length nearest neighbor '+str(round(length_greedy, 1))+'m, tour '+str(round(length_tour, 1))+'m')
+    if (skipped_tour, length_tour) <= (skipped_greedy, length_greedy):
+        route, skipped = route_tour, skipped_tour
+    else:
+        route, skipped = route_greedy, skipped_greedy
+    if skipped > 0:
+        logger.warning('Coverage path planner (cells): No way to '+str(skipped)+' cell(s) found, cell(s) skipped')
+    if route == []:
+        route = [position]
+    logger.info('Coverage path planner (cells): Route calculation finished')
+    return LineString(route) if len(route) > 1 else LineString(route+route)
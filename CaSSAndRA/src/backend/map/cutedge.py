@@ -3,9 +3,11 @@ logger = logging.getLogger(__name__)
 
 from shapely.geometry import *
 
+from .directway import directway
+from .offsetchain import offset_chains
+
 def check_direct_way(border: Polygon, start: list, end: list) -> bool:
-    way = LineString([start, end])
-    direct_way_possible = way.within(border)
+    direct_way_possible = directway.check(border, start, end)
     return direct_way_possible
 
 def create_route(perimeter: Polygon, mowborder: str, mowexclusion: bool, 
@@ -68,7 +70,7 @@ def calcroute(area_to_mow, parameters, start):
         else:
             logger.error('Coverage path planner (planing route for cut to edge): Unknown figure, calculation incomplete. Shapely: '+area_to_mow_tmp.geom_type)
 
-    for i in range(rounds):
+    for i, area_to_mow_tmp in enumerate(offset_chains.chain(area_to_mow_tmp, mowoffs, 0.05, rounds)):
         if area_to_mow_tmp.is_empty:
             logger.info('Coverage path planner (planing route for cut to edge): Could not finished distancetoborderloop, please check your settings. Max value: '+str(i))
             break
@@ -94,9 +96,6 @@ def calcroute(area_to_mow, parameters, start):
         else:
             logger.error('Coverage path planner (planing route for cut to edge): Unknown figure, calculation incomplete. Shapely: '+area_to_mow_tmp.geom_type)
             break
-    
-        area_to_mow_tmp = area_to_mow_tmp.buffer(mowoffs, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
-        area_to_mow_tmp = area_to_mow_tmp.simplify(0.05, preserve_topology=False)
 
     if route == []:
         route.extend(start)
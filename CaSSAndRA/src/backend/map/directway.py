@@ -0,0 +1,119 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import hashlib
+import threading
+import numpy as np
+import shapely
+from shapely.geometry import *
+from dataclasses import dataclass, field
+
+#Shared "is the direct way A->B inside the border" predicate. Borders are prepared once
+#(keyed by object and wkb), single checks are cached by endpoints, arrays of segments
+#are checked in one vectorized call. Border and result caches are shared by the planner threads
+#(api, dash, schedule), they are only accessed with the lock held
+@dataclass
+class BorderPredicate:
+    border: Polygon = Polygon()
+    cache: dict = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+@dataclass
+class DirectWay:
+    max_borders: int = 16
+    max_cache_size: int = 200000
+    borders: dict = field(default_factory=dict)
+    aliases: dict = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def get(self, border: Polygon) -> BorderPredicate:
+        with self.lock:
+            alias = self.aliases.get(id(border))
+            if alias is not None and alias[0] is border:
+                return alias[1]
+            key = hashlib.sha1(border.wkb).hexdigest()
+            predicate = self.borders.pop(key, None)
+            if predicate is None:
+                shapely.prepare(border)
+                predicate = BorderPredicate(border=border)
+                logger.debug('Direct way: prepared new border '+key[:8])
+            #keep latest used border at the end of the dict
+            self.borders[key] = predicate
+            if len(self.borders) > self.max_borders:
+                self.borders.pop(next(iter(self.borders)))
+            #alias keeps a reference to the border object, so its id can not be reused
+            self.aliases[id(border)] = (border, predicate)
+            if len(self.aliases) > 4*self.max_borders:
+                self.aliases.pop(next(iter(self.aliases)))
+            return predicate
+
+    def check(self, border: Polygon, start: list, end: list) -> bool:
+        predicate = self.get(border)
+        key = (tuple(start), tuple(end))
+        with self.lock:
+            result = predicate.cache.get(key)
+            if result is not None:
+                predicate.hits += 1
+                return result
+            predicate.misses += 1
+        way = LineString([start, end])
+        if tuple(start) == tuple(end):
+            #prepared and not prepared predicates disagree for zero length lines, keep legacy within result
+            result = bool(way.within(predicate.border))
+        else:
+            result = bool(shapely.contains(predicate.border, way))
+        with self.lock:
+            if len(predicate.cache) >= self.max_cache_size:
+                predicate.cache.clear()
+            predicate.cache[key] = result
+        return result
+
+    def check_many(self, border: Polygon, starts, ends) -> np.ndarray:
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        if len(starts) == 0:
+            return np.zeros(0, dtype=bool)
+        predicate = self.get(border)
+        lines = shapely.linestrings(np.stack((starts, ends), axis=1))
+        result = shapely.contains(predicate.border, lines)
+        #prepared and not prepared predicates disagree for zero length lines, keep legacy within result
+        degenerate = (starts == ends).all(axis=1)
+        if degenerate.any():
+            result[degenerate] = shapely.within(lines[degenerate], predicate.border)
+        return result
+
+    def check_nearest_ways(self, border: Polygon, ways: list, degenerate_length: float = 0.01) -> tuple:
+        #Ways are (start, end) pairs. Ways shorter than degenerate length are checked as end point,
+        #because a linestring with (almost) no length is never within the border
+        coords = np.array([[self._xy(start), self._xy(end)] for start, end in ways], dtype=float).reshape(-1, 2, 2)
+        within = np.zeros(len(coords), dtype=bool)
+        touches = np.zeros(len(coords), dtype=bool)
+        if len(coords) == 0:
+            return within, touches, []
+        predicate = self.get(border)
+        lines = shapely.linestrings(coords)
+        lengths = shapely.length(lines)
+        degenerate = lengths <= degenerate_length
+        within[~degenerate] = shapely.contains(predicate.border, lines[~degenerate])
+        if degenerate.any():
+            points = shapely.points(coords[degenerate, 1])
+            within[degenerate] = shapely.contains(predicate.border, points)
+            touches[degenerate] = shapely.touches(points, predicate.border)
+        return within.tolist(), touches.tolist(), lengths.tolist()
+
+    def _xy(self, point) -> tuple:
+        if isinstance(point, Point):
+            return (point.x, point.y)
+        return point
+
+    def check_geometry(self, border: Polygon, geometry) -> bool:
+        predicate = self.get(border)
+        return bool(shapely.contains(predicate.border, geometry))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.borders = dict()
+            self.aliases = dict()
+
+directway = DirectWay()
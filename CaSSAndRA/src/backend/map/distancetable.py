@@ -0,0 +1,101 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import heapq
+from itertools import count
+import numpy as np
+import networkx as nx
+from dataclasses import dataclass, field
+
+from .astar import CSRGraph, astar_path
+
+#Precomputed shortest path trees of the A* graph for the perimeter and exclusion vertices.
+#Every row holds predecessors and path lengths (geometric length, not graph weight) from one source.
+#Trees are built with the same expansion order as astar(), so the reconstructed paths are
+#the same as the ones delivered by a search between two vertices
+@dataclass
+class DistanceTable:
+    sources: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    predecessors: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.int32))
+    lengths: np.ndarray = field(default_factory=lambda: np.empty((0, 0)))
+    rows: dict = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.rows = {source: row for row, source in enumerate(self.sources.tolist())}
+
+    @classmethod
+    def create(cls, graph: CSRGraph, sources: list) -> 'DistanceTable':
+        source_ids = []
+        for source in sources:
+            source_id = graph.node_ids.get(tuple(source))
+            if source_id is not None and source_id not in source_ids:
+                source_ids.append(source_id)
+        nodes_count = graph.number_of_nodes()
+        predecessors = np.full((len(source_ids), nodes_count), -1, dtype=np.int32)
+        lengths = np.full((len(source_ids), nodes_count), np.inf)
+        adjacency = (graph.indptr.tolist(), graph.indices.tolist(), graph.weights.tolist())
+        coords = graph.coords.tolist()
+        for row, source_id in enumerate(source_ids):
+            predecessors[row], lengths[row] = shortest_path_tree(adjacency, coords, source_id, nodes_count)
+        logger.debug('A* distance table created. Sources: '+str(len(source_ids))+' Nodes: '+str(nodes_count))
+        return cls(sources=np.asarray(source_ids, dtype=np.int32), predecessors=predecessors, lengths=lengths)
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self.rows
+
+    def length(self, source_id: int, target_id: int) -> float:
+        return float(self.lengths[self.rows[source_id], target_id])
+
+    def path(self, source_id: int, target_id: int) -> list:
+        #Node ids from source to target, None if target is not reachable
+        predecessors = self.predecessors[self.rows[source_id]]
+        if source_id != target_id and predecessors[target_id] < 0:
+            return None
+        path = [target_id]
+        while path[-1] != source_id:
+            path.append(int(predecessors[path[-1]]))
+        path.reverse()
+        return path
+
+def shortest_path_tree(adjacency: tuple, coords: list, source: int, nodes_count: int) -> tuple:
+    #Same queue handling as astar() without heuristic, but the search does not stop at a target
+    indptr, indices, weights = adjacency
+    predecessors = np.full(nodes_count, -1, dtype=np.int32)
+    lengths = np.full(nodes_count, np.inf)
+    lengths[source] = 0
+    c = count()
+    queue = [(0, next(c), source, None)]
+    enqueued = {}
+    explored = {}
+    while queue:
+        dist, __, curnode, parent = heapq.heappop(queue)
+        if curnode in explored:
+            if explored[curnode] is None:
+                continue
+            qcost = enqueued[curnode]
+            if qcost < dist:
+                continue
+        explored[curnode] = parent
+        if parent is not None:
+            predecessors[curnode] = parent
+            lengths[curnode] = lengths[parent] + ((coords[curnode][0]-coords[parent][0])**2 + (coords[curnode][1]-coords[parent][1])**2)**0.5
+        for k in range(indptr[curnode], indptr[curnode+1]):
+            neighbor = indices[k]
+            ncost = dist + weights[k]
+            if neighbor in enqueued and enqueued[neighbor] <= ncost:
+                continue
+            enqueued[neighbor] = ncost
+            heapq.heappush(queue, (ncost, next(c), neighbor, curnode))
+    return predecessors, lengths
+
+def shortest_path(graph: CSRGraph, table: DistanceTable, source: tuple, target: tuple) -> tuple:
+    #Returns (path coords, path length). Sources outside of the table are searched by A*
+    source_id = graph.node_ids.get(source)
+    target_id = graph.node_ids.get(target)
+    if source_id is None or target_id is None or source_id not in table:
+        path = astar_path(graph, source, target)
+        return path, float(np.hypot(*np.diff(np.asarray(path, dtype=float).reshape(-1, 2), axis=0).T).sum())
+    path = table.path(source_id, target_id)
+    if path is None:
+        raise nx.NetworkXNoPath('Node '+str(target)+' not reachable from '+str(source))
+    return [tuple(graph.coords[node].tolist()) for node in path], table.length(source_id, target_id)
@@ -4,11 +4,14 @@ logger = logging.getLogger(__name__)
 from shapely.geometry import *
 from shapely.ops import *
 from shapely import affinity
-import pandas as pd
 import networkx as nx
 
 from ..data.mapdata import current_map
 from . pathfinder import pathfinder
+from . waysqueue import WaysQueue
+from . directway import directway
+from . import distancetable
+from .segmentorder import segment_order
 
 def turn_coords(coords: list, angle: int) -> list:
     if len(coords) < 2:
@@ -40,100 +43,63 @@ def check_astar_distance(border: Polygon, possible_start: list, angle: int, rout
     coords_tmp2 = affinity.rotate(coords_tmp2, angle, origin=(0, 0))
     astar_end_tmp2 = nearest_points(perimeter_points, coords_tmp2)
     astar_end2 = list(astar_end_tmp2[0].coords)
+    #Rank both candidates by table distance plus connection legs, check geometry only of the chosen one
+    candidates = []
     try:
-        astar_path1 = nx.astar_path(current_map.astar_graph, astar_start[0], astar_end1[0], heuristic=None, weight='weight')
-        astar_path1 = turn_coords(astar_path1, -angle)
-        way1 = [route[-1]]
-        way1.extend(astar_path1)
-        way1.extend([possible_start[0]])
-        way1 = LineString((way1))
-        way1_length = way1.length
-        if not way1.within(border):
-            way1 = None
-
-        astar_path2 = nx.astar_path(current_map.astar_graph, astar_start[0], astar_end2[0], heuristic=None, weight='weight')
-        astar_path2 = turn_coords(astar_path2, -angle)
-        way2 = [route[-1]]
-        way2.extend(astar_path2)
-        way2.extend([possible_start[1]])
-        way2 = LineString((way2))
-        way2_length = way2.length
-        if not way2.within(border):
-            way2 = None
+        for end, astar_end, astar_end_tmp in [(possible_start[0], astar_end1, astar_end_tmp1), (possible_start[1], astar_end2, astar_end_tmp2)]:
+            astar_path, astar_length = distancetable.shortest_path(current_map.astar_graph, current_map.astar_table, astar_start[0], astar_end[0])
+            astar_length += astar_start_tmp[0].distance(astar_start_tmp[1]) + astar_end_tmp[0].distance(astar_end_tmp[1])
+            candidates.append((astar_path, astar_length, end))
     except Exception as e:
         logger.warning('A* pathfinder delivered unexpexted result')
         logger.debug(str(e))
         return None, None, None
-    if (way1 != None and way2 != None and way1_length <= way2_length) or (way1 != None and way2 == None):
-        current_shortest_way_length = way1_length
-        route_tmp = astar_path1
-        reverse_line = False
-    elif (way1 != None and way2 != None and way1_length > way2_length) or (way2 != None and way1 == None):
-        current_shortest_way_length = way2_length
-        route_tmp = astar_path2
-        reverse_line = True
-    else:
-        return None, None, None
-    return route_tmp, current_shortest_way_length, reverse_line
+    order = [0, 1] if candidates[0][1] <= candidates[1][1] else [1, 0]
+    for nr in order:
+        astar_path, astar_length, end = candidates[nr]
+        astar_path = turn_coords(astar_path, -angle)
+        way = [route[-1]]
+        way.extend(astar_path)
+        way.extend([end])
+        way = LineString((way))
+        if directway.check_geometry(border, way):
+            route_tmp = astar_path
+            current_shortest_way_length = way.length
+            reverse_line = nr == 1
+            return route_tmp, current_shortest_way_length, reverse_line
+    return None, None, None
 
-def check_prio_lines(ways_to_go: pd.DataFrame, border: Polygon, current_level: int, route: list, angle: int) -> list:
-    possible_start = []
-    gone_way = None
+def check_prio_lines(ways_to_go: WaysQueue, border: Polygon, current_level: int, route: list, angle: int) -> list:
     #Standard call, look for lines: same level, level under, level over
+    ways_area = None
     if current_level != None:
-        #Check for prio lines 
-        ways_area = ways_to_go[(ways_to_go['type'] == 'area') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True) & (ways_to_go['level_min'] <= current_level+1) & (ways_to_go['level_min']>=current_level-1)]
-        if not ways_area.empty:
-            #possible_start = list(ways_area['coords'])
-            possible_start1 = min(ways_area['coords'], key=lambda coord: (coord[0][0]-route[-1][0])**2 + (coord[0][1]-route[-1][1])**2)
-            possible_start2 = min(ways_area['coords'], key=lambda coord: (coord[1][0]-route[-1][0])**2 + (coord[1][1]-route[-1][1])**2)
-            possible_start = [possible_start1, possible_start2]
-            route_line_way, gone_way, length_to_line = shortest_path(border, possible_start, route, angle)
-            return route_line_way, gone_way, length_to_line, possible_start
-        else:
-            #Check for all lines and pick the nearest two 
-            ways_area = ways_to_go[(ways_to_go['type'] == 'area') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True)]
-            if not ways_area.empty:
-                possible_start1 = min(ways_area['coords'], key=lambda coord: (coord[0][0]-route[-1][0])**2 + (coord[0][1]-route[-1][1])**2)
-                possible_start2 = min(ways_area['coords'], key=lambda coord: (coord[1][0]-route[-1][0])**2 + (coord[1][1]-route[-1][1])**2)
-                possible_start = [possible_start1, possible_start2]
-                route_line_way, gone_way, length_to_line = shortest_path(border, possible_start, route, angle)
-                return route_line_way, gone_way, length_to_line, possible_start
-            else:
-                return None, None, None, None
-    #If current_level == None, then it is first call or no prio lines accessable
-    if current_level == None or gone_way == None:
-        ways_area = ways_to_go[(ways_to_go['type'] == 'area') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True)]
-        if not ways_area.empty:
-            possible_start1 = min(ways_area['coords'], key=lambda coord: (coord[0][0]-route[-1][0])**2 + (coord[0][1]-route[-1][1])**2)
-            possible_start2 = min(ways_area['coords'], key=lambda coord: (coord[1][0]-route[-1][0])**2 + (coord[1][1]-route[-1][1])**2)
-            possible_start = [possible_start1, possible_start2]
-            route_line_way, gone_way, length_to_line = shortest_path(border, possible_start, route, angle)
-            return route_line_way, gone_way, length_to_line, possible_start
-        else:
-            return None, None, None, None
-    
+        #Check for prio lines
+        ways_area = ways_to_go.ids(type='area', level_min_range=(current_level-1, current_level+1))
+        if len(ways_area) == 0:
+            #Check for all lines and pick the nearest two
+            ways_area = None
+    #If ways_area == None, then it is first call or no prio lines accessable
+    if ways_area is None and ways_to_go.count(type='area') == 0:
+        return None, None, None, None
+    possible_ids = [ways_to_go.nearest(route[-1], type='area', ids=ways_area), ways_to_go.nearest(route[-1], type='area', ids=ways_area, use_end=True)]
+    possible_start = [ways_to_go.coords[way_id] for way_id in possible_ids]
+    route_line_way, gone_way, length_to_line = shortest_path(border, possible_start, route, angle)
+    return route_line_way, gone_way, length_to_line, possible_ids
 
 def shortest_path_to_exclusion(border: Polygon, edges_to_check: list, route: list) -> list:
     end_of_route = route[-1]
     way_nr = None
     route_tmp = None
-    current_shortest_way_coord = nearest_points(Point((end_of_route)), MultiPoint(edges_to_check[0].exterior.coords))
-    current_shortest_way = LineString((current_shortest_way_coord))
-    current_shortest_way_length = current_shortest_way.length
-    #Handle shapely problem in case if linestring has length. Within perimeter delivers False
-    if current_shortest_way_length <= 0.01:
-            current_shortest_way = 0
-            current_shortest_way = Point((current_shortest_way_coord[1]))
+    shortest_ways_coord = [nearest_points(Point((end_of_route)), MultiPoint(edge.exterior.coords)) for edge in edges_to_check]
+    shortest_ways_within, shortest_ways_touches, shortest_ways_length = directway.check_nearest_ways(border, shortest_ways_coord)
+    current_shortest_way_length = shortest_ways_length[0]
     for i, edge in enumerate(edges_to_check):
-        shortest_way_coord = nearest_points(Point((end_of_route)), MultiPoint(edge.exterior.coords))
-        shortest_way = LineString((shortest_way_coord))
-        shortest_way_length = shortest_way.length
+        shortest_way_coord = shortest_ways_coord[i]
+        shortest_way_length = shortest_ways_length[i]
         #Handle shapely problem in case if linestring has length. Within perimeter delivers False
         if shortest_way_length <= 0.01:
             shortest_way_length = 0
-            shortest_way = Point((shortest_way_coord[1]))
-        if (shortest_way_length <= current_shortest_way_length and shortest_way.within(border)) or (shortest_way_length == 0 and shortest_way.touches(border)):
+        if (shortest_way_length <= current_shortest_way_length and shortest_ways_within[i]) or (shortest_way_length == 0 and shortest_ways_touches[i]):
             current_shortest_way_length = shortest_way_length
             route_tmp = list(edge.exterior.coords)
             route_tmp.pop(-1)
@@ -166,28 +132,18 @@ def shortest_path(border: Polygon, ways_to_check: list, route: list, angle: int)
         way_rev = way.copy()
         way_rev.reverse()
         line_coord_rev = way_rev
-        way_to_line = LineString((end_of_route, line_coord[0]))
-        length_of_way = way_to_line.length
-        #Handle shapely problem in case if linestring has length. Within perimeter delivers False
-        if length_of_way == 0:
-            way_to_line = Point((end_of_route))
-            length_of_way = 0
-        way_to_line_rev = LineString((end_of_route, line_coord_rev[0]))
-        length_of_rev_way = way_to_line_rev.length
-        if length_of_rev_way == 0:
-            way_to_line_rev = Point((end_of_route))
-            length_of_rev_way = 0
+        (way_to_line_within, way_to_line_rev_within), (way_to_line_touches, way_to_line_rev_touches), (length_of_way, length_of_rev_way) = directway.check_nearest_ways(border, [(end_of_route, line_coord[0]), (end_of_route, line_coord_rev[0])], 0)
         #Now check the shortest path, direct or reverse line
-        if (length_of_way <= current_shortest_way and way_to_line.within(border)) or (length_of_way == 0 and way_to_line.touches(border)):
+        if (length_of_way <= current_shortest_way and way_to_line_within) or (length_of_way == 0 and way_to_line_touches):
             current_shortest_way = length_of_way
             possible_line = line_coord
             way_nr = i
-        if (length_of_rev_way < current_shortest_way and way_to_line_rev.within(border)) or (length_of_rev_way == 0 and way_to_line_rev.touches(border)):
+        if (length_of_rev_way < current_shortest_way and way_to_line_rev_within) or (length_of_rev_way == 0 and way_to_line_rev_touches):
             current_shortest_way = length_of_rev_way
             possible_line = line_coord_rev
             way_nr = i
         #No direct way for standar or reverse line, check A* distance
-        if (not way_to_line.within(border) or not way_to_line_rev.within(border)):
+        if (not way_to_line_within or not way_to_line_rev_within):
             way_coord, length_of_astar_way, reverse_line = check_astar_distance(border, way, angle, route, current_map.perimeter_points)
             if (length_of_astar_way != None and length_of_astar_way < current_shortest_way) or (length_of_astar_way != None and way_nr == None):
                 current_shortest_way = length_of_astar_way
@@ -218,8 +174,7 @@ def calcroute(border, line_mask, edges_pol, route, parameters, angle):
     #         route = [min(route_tmp, key=lambda coord: (coord[0]-route[-1][0])**2 + (coord[1]-route[-1][1])**2)]
     #         logger.info('Coverage path planner (lines): New start point: '+str(route))
 
-    ways_to_go = pd.DataFrame()
-    perimeter_points = current_map.perimeter_points
+    ways_to_go = WaysQueue()
 
     tosimplify = False
     if parameters.distancetoborder == 0:
@@ -278,12 +233,10 @@ def calcroute(border, line_mask, edges_pol, route, parameters, angle):
         level_min = round((bounds[1] - border_bounds[1])/parameters.width)
         level_max = round((bounds[3]-border_bounds[1])/parameters.width)
         logger.debug('Add levels to excl/border to cut. Min: '+str(level_min)+' Max: '+str(level_max))
-        edge = pd.DataFrame({'name': 'edge'+str(i),'shapely': pol, 'level_min': level_min, 'level_max': level_max, 'coords': [list(pol.exterior.coords)], 'type': 'edge', 'gone': False, 'take into account': True})
-        ways_to_go = pd.concat([ways_to_go, edge], ignore_index=True)
+        ways_to_go.add(pol, list(pol.exterior.coords), 'edge', level_min, level_max)
     
     #Add additionl informations to the lines about y-position on the map
     logger.debug('Sort lines to cut')
-    lines_to_go = []
     line_level = 0
     current_level = None
     if not result_lines.is_empty:
@@ -293,46 +246,40 @@ def calcroute(border, line_mask, edges_pol, route, parameters, angle):
             coord = list(result_lines.geoms[i].coords)
             if coord[0][1] > coord_y_old:
                 line_level += 1
-            line = pd.DataFrame({'name': 'area'+str(i),'shapely': result_lines.geoms[i], 'level_min': line_level, 'level_max': line_level, 'coords': [coord], 'type': 'area', 'gone': False, 'take into account': True})
-            ways_to_go = pd.concat([ways_to_go, line], ignore_index=True)
+            ways_to_go.add(result_lines.geoms[i], coord, 'area', line_level, line_level)
             coord_y_old = coord[0][1]
     else:
         logger.debug('No lines to sort found')
-        line = pd.DataFrame({'name': 'area1','shapely': LineString(), 'level_min': None, 'level_max': None, 'coords': [None], 'type': 'area', 'gone': True, 'take into account': True})
-        ways_to_go = pd.concat([ways_to_go, line], ignore_index= True)
+    ways_to_go.build()
 
     #Starting coverage path planner
     logger.info('Coverage path planner (calc lines): Starting loop')
-    astar_path = []
-    astar_last_way = []
+    current_map.total_progress = len(ways_to_go)
+    route_start = list(route)
     while True:
+        current_map.check_calc_cancelled()
         gone_way = None
         gone_way_edge = None
-        ways_to_go_filtered = ways_to_go[ways_to_go['gone'] == False]
-        if ways_to_go_filtered.empty:
+        if ways_to_go.empty:
             logger.info('Coverage path planner (calc lines): No more way to calculate, ending loop')
             break
 
         #First loop call and route just a start point (avoiding A* calculating) 
         if gone_way == None and gone_way_edge == None and len(route) == 1:
-            first_coord = [min(ways_to_go_filtered['coords'], key=lambda coord: (coord[0][0]-route[-1][0])**2 + (coord[0][1]-route[-1][1])**2)]
-            route = [first_coord[0][0]]
+            first_id = ways_to_go.nearest(route[-1])
+            route = [ways_to_go.coords[first_id][0]]
         #Check for ways to lines
         logger.debug('Check for prio lines')
-        route_line_way, gone_way, length_to_line, possible_start = check_prio_lines(ways_to_go, border, current_level, route, angle)
+        route_line_way, gone_way, length_to_line, possible_ids = check_prio_lines(ways_to_go, border, current_level, route, angle)
         if gone_way != None:
             logger.debug('Found way to line, distance: '+str(length_to_line))
 
         #Check for possible ways to edges
         logger.debug('Check for edges to cut in range')
         #First call or after pathfinder, current_level = None
-        if current_level == None:
-            ways_edge = ways_to_go[(ways_to_go['type'] == 'edge') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True)]
-        else:
-            ways_edge = ways_to_go[(ways_to_go['type'] == 'edge') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True) & (ways_to_go['level_min'] <= current_level) & (ways_to_go['level_max'] >= current_level)]
-        if not ways_edge.empty:
-            possible_edges = ways_edge.reset_index(drop=True)
-            route_edge_way, gone_way_edge, length_to_edge = shortest_path_to_exclusion(border, possible_edges['shapely'].to_list(), route)
+        possible_edges = ways_to_go.ids(type='edge', level=current_level)
+        if len(possible_edges) > 0:
+            route_edge_way, gone_way_edge, length_to_edge = shortest_path_to_exclusion(border, [ways_to_go.shapely[way_id] for way_id in possible_edges], route)
             if gone_way_edge != None:
                 logger.debug('Found edge(s) to cut in range, distance: '+str(length_to_edge))
             else:
@@ -341,61 +288,38 @@ def calcroute(border, line_mask, edges_pol, route, parameters, angle):
             logger.debug('No edges in range found')
         
         #Decide for a shortest way
-        if gone_way != None and gone_way_edge != None:
-            if length_to_line < 0.5*length_to_edge:
-                index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==possible_start[gone_way])].index.array[0]
-                ways_to_go.at[index, 'gone'] = True
-                current_level = ways_to_go.at[index, 'level_min']
-                logger.debug('Take way to a line, current level: '+str(ways_to_go.at[index, 'level_min'])+' Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-                astar_last_way = []
-                route.extend(route_line_way)   
-                # Progress-bar data
-                current_map.total_progress = len(ways_to_go)
-                current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
-            else:
-                index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==list(possible_edges.loc[gone_way_edge, 'shapely'].exterior.coords))].index.array[0] 
-                ways_to_go.at[index, 'gone'] = True
-                logger.debug('Take way to a edge, current level: '+str(ways_to_go.at[index, 'level_min'])+' Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-                astar_last_way = []
-                route.extend(route_edge_way)
-                # Progress-bar data
-                current_map.total_progress = len(ways_to_go)
-                current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
-        elif gone_way != None:
-            index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==possible_start[gone_way])].index.array[0]
-            ways_to_go.at[index, 'gone'] = True
-            current_level = ways_to_go.at[index, 'level_min']
-            logger.debug('Take way to a line, current level: '+str(ways_to_go.at[index, 'level_min'])+' Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-            astar_last_way = []
-            route.extend(route_line_way) 
+        if gone_way != None and (gone_way_edge == None or length_to_line < 0.5*length_to_edge):
+            way_id = possible_ids[gone_way]
+            ways_to_go.remove(way_id)
+            current_level = int(ways_to_go.level_min[way_id])
+            logger.debug('Take way to a line, current level: '+str(current_level)+' Finished: '+str(ways_to_go.finished)+'/'+str(len(ways_to_go)))  
+            route.extend(route_line_way)   
             # Progress-bar data
-            current_map.total_progress = len(ways_to_go)
-            current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
+            current_map.calculated_progress = ways_to_go.finished
         elif gone_way_edge != None:
-            index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==list(possible_edges.loc[gone_way_edge, 'shapely'].exterior.coords))].index.array[0] 
-            ways_to_go.at[index, 'gone'] = True
-            logger.debug('Take way to a edge, current level: '+str(ways_to_go.at[index, 'level_min'])+' Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-            astar_last_way = []
+            way_id = possible_edges[gone_way_edge]
+            ways_to_go.remove(way_id)
+            logger.debug('Take way to a edge, current level: '+str(int(ways_to_go.level_min[way_id]))+' Finished: '+str(ways_to_go.finished)+'/'+str(len(ways_to_go)))  
             route.extend(route_edge_way)
             # Progress-bar data
-            current_map.total_progress = len(ways_to_go)
-            current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
+            current_map.calculated_progress = ways_to_go.finished
         else:
             logger.debug('No point for start over direct way found. Starting A* pathfinder')
-            possible_goals = ways_to_go[ways_to_go['gone'] == False]
-            for i in range(len(possible_goals)):
-                coords = possible_goals.iloc[i]['coords']
-                goal = nearest_points(Point(route[-1]), MultiPoint(coords))
+            route_astar = []
+            for way_id in ways_to_go.ids():
+                goal = nearest_points(Point(route[-1]), MultiPoint(ways_to_go.coords[way_id]))
                 goal = list(goal[1].coords)
                 route_astar = pathfinder.find_way(route[-1], goal)
                 if route_astar != []:
-                    index = possible_goals.index.values[i]
                     route.extend(route_astar)
                     current_level = None
                     break
             if route_astar == []:
                 logger.warning('Coverage patha planner (lines): Could not finish calculation')
                 break
+
+    if segment_order.enabled and ways_to_go.empty:
+        route = segment_order.optimize(border, line_mask_coords, edges_pol, route_start, route)
         
     route_shapely = LineString(route)
     return route_shapely
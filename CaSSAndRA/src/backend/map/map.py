@@ -7,6 +7,8 @@ from shapely import affinity
 from shapely.ops import *
 import networkx as nx
 
+from .offsetchain import offset_chains
+
 def selection(perimeter: Polygon, selection: dict) -> Polygon:
     try: 
         logger.info('Check for selection and create a new perimter if there')
@@ -149,7 +151,7 @@ def areatomow(perimeter: Polygon, distancetoborder: int, mowoffset: float) -> Po
     if distancetoborder == 0:
         area_to_mow = perimeter
     else: 
-        area_to_mow = perimeter.buffer(distancetoborder*mowoffset, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
+        area_to_mow = offset_chains.offset(perimeter, distancetoborder*mowoffset)
     return area_to_mow
 
 def route(points: list) -> LineString:
@@ -0,0 +1,173 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import time
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import *
+from shapely.ops import nearest_points, unary_union
+from shapely import STRtree
+from dataclasses import dataclass, field
+
+from ..data.mapdata import current_map
+from ..data.roverdata import robot
+from . import visibilitygraph
+from .astar import CSRGraph
+from .pathfinder import PathFinder
+from .planningjobs import planning_jobs
+
+#Incremental replanning of the remaining mow path around obstacles reported by the rover.
+#Only the parts of segments after the current mow point index inside a (buffered) obstacle are rerouted, from the
+#point where the route enters the obstacle to the point where it leaves it. Detours are searched in a local visibility
+#graph (perimeter clipped to a box around the obstacles minus obstacles), if there is no way, the whole perimeter minus
+#obstacles is used. The rest of the route is kept as it is. Replanning runs as planning job (kind replan).
+@dataclass
+class ObstacleReplanner:
+    clearance: float = 0.2
+    margin: float = 3.0
+    result: dict = field(default_factory=dict)
+
+    def obstacle_polygons(self, obstacles: pd.DataFrame) -> list:
+        polygons = []
+        if obstacles.empty:
+            return polygons
+        for crc in obstacles['CRC'].unique():
+            coords = obstacles[(obstacles['CRC'] == crc) & (obstacles['type'] == 'points')][['X', 'Y']].to_numpy(dtype=float)
+            if len(coords) < 3:
+                continue
+            polygon = Polygon(coords).buffer(self.clearance, resolution=4, join_style=2, mitre_limit=1)
+            if polygon.is_valid and not polygon.is_empty:
+                polygons.append(polygon)
+        return polygons
+
+    def blocked_segments(self, coords: np.ndarray, blocked: Polygon) -> np.ndarray:
+        #Returns a mask of the segments intersecting the obstacles
+        segments = shapely.linestrings(np.stack((coords[:-1], coords[1:]), axis=1))
+        tree = STRtree(segments)
+        mask = np.zeros(len(segments), dtype=bool)
+        mask[tree.query(shapely.get_parts(blocked), predicate='intersects')[1]] = True
+        return mask
+
+    def free_pieces(self, start: tuple, end: tuple, blocked: Polygon) -> list:
+        #Parts (start, end) of a segment outside of the obstacles in direction of the segment
+        segment = LineString([start, end])
+        pieces = []
+        for part in shapely.get_parts(segment.difference(blocked)):
+            if part.is_empty or part.length < 1e-6:
+                continue
+            part_coords = shapely.get_coordinates(part)
+            positions = shapely.line_locate_point(segment, shapely.points(part_coords))
+            pieces.append((float(positions.min()), tuple(part_coords[np.argmin(positions)].tolist()), tuple(part_coords[np.argmax(positions)].tolist())))
+        return [(piece_start, piece_end) for position, piece_start, piece_end in sorted(pieces)]
+
+    def free_area(self, blocked: Polygon, bounds: tuple = None) -> Polygon:
+        area = current_map.perimeter_polygon
+        if bounds is not None:
+            area = area.intersection(box(*bounds).buffer(self.margin, join_style=2))
+        return area.difference(blocked)
+
+    def find_detour(self, area, start: tuple, end: tuple) -> list:
+        if area.is_empty:
+            return []
+        #part of the free area with start and goal
+        for part in shapely.get_parts(area):
+            if part.geom_type != 'Polygon' or part.distance(Point(start)) > 0.01 or part.distance(Point(end)) > 0.01:
+                continue
+            points = list(part.exterior.coords)
+            for interior in part.interiors:
+                points.extend(interior.coords)
+            finder = PathFinder(perimeter=part.buffer(0.01, resolution=16, join_style=2, mitre_limit=1, single_sided=True), perimeter_points=MultiPoint(points),
+                                G=CSRGraph.from_edges(visibilitygraph.create_edges(part, LineString())))
+            return finder.find_way(start, end)
+        return []
+
+    def detour(self, blocked: Polygon, start: tuple, end: tuple, passed: list) -> list:
+        #Way around the obstacles from start (entry) to end (exit), local area first, then the whole perimeter
+        obstacles = shapely.get_parts(blocked)
+        passed_obstacles = obstacles[shapely.intersects(obstacles, LineString([start]+passed+[end]))]
+        bounds = MultiPoint([start, end]).union(MultiPolygon(passed_obstacles.tolist())).bounds
+        way = self.find_detour(self.free_area(blocked, bounds), start, end)
+        if way == []:
+            logger.debug('Obstacle replanning: no local detour found, use whole perimeter')
+            way = self.find_detour(self.free_area(blocked), start, end)
+        return way
+
+    def replan(self, coords: np.ndarray, obstacles: pd.DataFrame) -> tuple:
+        #Returns the rerouted coords (list of tuples) and replanning stats. Every segment crossing an obstacle is cut
+        #at the obstacle, only the blocked part is replaced by a detour, free parts of the mow lines stay in the route
+        start_time = time.perf_counter()
+        result = dict(spans=0, rerouted=0, failed=0, before=len(coords), after=len(coords))
+        polygons = self.obstacle_polygons(obstacles)
+        if polygons == [] or len(coords) < 2:
+            return [tuple(point) for point in coords.tolist()], result
+        blocked = unary_union(polygons)
+        blocked_mask = self.blocked_segments(coords, blocked)
+        points = [tuple(point) for point in coords.tolist()]
+        route = [points[0]]
+        #entry point into the obstacles and original points passed inside, None if outside
+        entry, passed = None, []
+        #start inside of an obstacle (rover stopped in front of it): leave it by the nearest way
+        if blocked.intersects(Point(points[0])):
+            entry = nearest_points(blocked.boundary, Point(points[0]))[0].coords[0]
+            route.append(entry)
+        for segment_nr in range(len(points)-1):
+            start, end = points[segment_nr], points[segment_nr+1]
+            if not blocked_mask[segment_nr]:
+                route.append(end)
+                continue
+            #cursor: last point of the segment reached outside of the obstacles
+            cursor = start
+            for piece_start, piece_end in self.free_pieces(start, end, blocked):
+                if entry is None and not same_point(cursor, piece_start):
+                    entry = cursor
+                if entry is not None:
+                    result['spans'] += 1
+                    way = self.detour(blocked, entry, piece_start, passed)
+                    if way != []:
+                        route.extend(way[1:])
+                        result['rerouted'] += 1
+                    else:
+                        #keep original way, rover handles the obstacle itself
+                        route.extend(passed+[piece_start])
+                        result['failed'] += 1
+                    entry, passed = None, []
+                if not same_point(route[-1], piece_start):
+                    route.append(piece_start)
+                route.append(piece_end)
+                cursor = piece_end
+            if not same_point(cursor, end):
+                if entry is None:
+                    entry = cursor
+                passed.append(end)
+        #end inside of an obstacle is only possible for the last point of the route, original way is kept then
+        if entry is not None:
+            route.extend(passed)
+        result['after'] = len(route)
+        result['duration'] = round(time.perf_counter()-start_time, 2)
+        logger.info('Obstacle replanning: '+str(result))
+        return route, result
+
+    def replan_mowpath(self, on_replanned: callable = None, source: str = None) -> str:
+        #Submits replanning of the remaining mow path from the current mow point index, on_replanned is called
+        #if a new tail has to be uploaded. Returns the job id (None if there is nothing to replan)
+        if current_map.mowpath.empty or current_map.obstacles.empty:
+            logger.info('Obstacle replanning: No mow path or obstacles')
+            return None
+        mow_point_index = min(max(robot.position_mow_point_index, 0), len(current_map.mowpath)-1)
+        tail = np.vstack(([[robot.position_x, robot.position_y]], current_map.mowpath.coords[mow_point_index:]))
+        def apply_replanned(job) -> None:
+            self.result = dict(job.replan, mow_point_index=int(mow_point_index))
+            if job.state != 'done' or self.result.get('rerouted', 0) == 0:
+                logger.info('Obstacle replanning: Route not changed ('+job.state+')')
+                return
+            current_map.calc_route_preview(job.route)
+            current_map.calc_route_mowpath()
+            if on_replanned is not None:
+                on_replanned()
+        return planning_jobs.submit('replan', tail, current_map.obstacles.copy(), on_done=apply_replanned, source=source)
+
+def same_point(point1: tuple, point2: tuple) -> bool:
+    return abs(point1[0]-point2[0]) <= 1e-6 and abs(point1[1]-point2[1]) <= 1e-6
+
+obstacle_replanner = ObstacleReplanner()
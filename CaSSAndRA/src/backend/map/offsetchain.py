@@ -0,0 +1,75 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import hashlib
+from collections import OrderedDict
+from shapely.geometry import *
+from dataclasses import dataclass, field
+
+#Chains of offsets (buffer + simplify) of a polygon, used by cutedge, rings and area to mow.
+#Chains are cached by geometry, offset and simplify tolerance and are extended lazily up to the requested depth,
+#so repeated plans of the same map and width do not buffer again. Least recently used chains are dropped,
+#if more than max_offsets offsets are stored.
+@dataclass
+class OffsetChains:
+    max_offsets: int = 2000
+    chains: OrderedDict = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+
+    def chain(self, polygon: Polygon, offset: float, tolerance: float = None, depth: int = None) -> list:
+        #Returns [polygon, offset 1, offset 2, ...] up to depth elements or up to the first empty offset
+        key = self.key(polygon, offset, tolerance)
+        chain = self.chains.get(key)
+        if chain is None:
+            chain = [polygon]
+            self.chains[key] = chain
+        else:
+            self.chains.move_to_end(key)
+        known = len(chain)
+        while (depth is None or len(chain) < depth) and not chain[-1].is_empty:
+            chain.append(offset_polygon(chain[-1], offset, tolerance))
+        requested = len(chain) if depth is None else min(depth, len(chain))
+        self.hits += max(min(known, requested)-1, 0)
+        self.misses += max(requested-known, 0)
+        self.evict()
+        return list(chain) if depth is None else chain[:depth]
+
+    def offset(self, polygon: Polygon, offset: float, tolerance: float = None, depth: int = 1) -> Polygon:
+        #Single offset of the chain (depth 1 is the first offset)
+        chain = self.chain(polygon, offset, tolerance, depth+1)
+        if len(chain) <= depth:
+            return Polygon()
+        return chain[depth]
+
+    def evict(self) -> None:
+        offsets = sum(len(chain)-1 for chain in self.chains.values())
+        while offsets > self.max_offsets and len(self.chains) > 1:
+            offsets -= len(self.chains.popitem(last=False)[1])-1
+
+    def key(self, polygon: Polygon, offset: float, tolerance: float) -> tuple:
+        return (hashlib.sha1(polygon.wkb).hexdigest(), float(offset), None if tolerance is None else float(tolerance))
+
+    @property
+    def hit_ratio(self) -> float:
+        if self.hits + self.misses == 0:
+            return 0.0
+        return self.hits/(self.hits+self.misses)
+
+    def stats(self) -> dict:
+        return {'chains': len(self.chains), 'offsets': sum(len(chain)-1 for chain in self.chains.values()),
+                'hits': self.hits, 'misses': self.misses, 'hit ratio': round(self.hit_ratio, 3)}
+
+    def clear(self) -> None:
+        logger.debug('Offset chains: '+str(self.stats()))
+        self.chains = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+def offset_polygon(polygon: Polygon, offset: float, tolerance: float = None) -> Polygon:
+    offset_polygon = polygon.buffer(offset, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
+    if tolerance is None:
+        return offset_polygon
+    return offset_polygon.simplify(tolerance, preserve_topology=False)
+
+offset_chains = OffsetChains()
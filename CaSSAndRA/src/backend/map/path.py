@@ -4,12 +4,70 @@ logger = logging.getLogger(__name__)
 import pandas as pd
 from shapely.geometry import *
 import random, math
+from shapely.ops import nearest_points
 
-from . import map, cutedge, lines, rings
+from . import map, cutedge, lines, rings, cells
 from . pathfinder import pathfinder
 from ..data.mapdata import current_map
-from ..data.cfgdata import PathPlannerCfg, pathplannercfgtasktmp
+from ..data.cfgdata import PathPlannerCfg
 from ..data.roverdata import robot
+from ..data.routecache import route_cache
+from .angleoptimizer import angle_optimizer
+from .segmentorder import segment_order
+from .offsetchain import offset_chains
+
+def subtask_selection(subtask_df: pd.DataFrame, subtask_nr: int) -> Polygon:
+    if 'lassoPoints' in subtask_df['type'].unique():
+        logger.debug('Task'+str(subtask_nr)+' lasso selection detected')
+        x = subtask_df[subtask_df['type'] == 'lassoPoints']['X'].values.tolist()
+        y = subtask_df[subtask_df['type'] == 'lassoPoints']['Y'].values.tolist()
+        selection = {'x': x, 'y': y}
+        selection = {'lassoPoints': selection}
+        selected_perimeter = map.selection(current_map.perimeter_polygon, selection)
+        
+    elif 'range' in subtask_df['type'].unique():
+        logger.debug('Task'+str(subtask_nr)+' range selection detected')
+        x = subtask_df[subtask_df['type'] == 'range']['X'].values.tolist()
+        y = subtask_df[subtask_df['type'] == 'range']['Y'].values.tolist()
+        selection = {'x': x, 'y': y}
+        selection = {'range': selection}
+        selected_perimeter = map.selection(current_map.perimeter_polygon, selection)
+    else:
+        logger.debug('Task'+str(subtask_nr)+' no selection detected (Calc way for whole map)')
+        selected_perimeter = current_map.perimeter_polygon
+    return selected_perimeter
+
+def prepare_subtasks(substasks: pd.DataFrame, parameters: pd.DataFrame) -> list:
+    #Returns (subtask nr, selected perimeter, planner parameters) for every subtask
+    prepared = []
+    for subtask_nr in substasks['task nr'].unique():
+        subtask_df = substasks[substasks['task nr'] == subtask_nr]
+        subtask_df = subtask_df.reset_index(drop=True)
+        parameters_df = parameters[parameters['task nr'] == subtask_nr]
+        parameters_df = parameters_df.reset_index(drop=True)
+        subtask_parameters = PathPlannerCfg()
+        subtask_parameters.df_to_obj(parameters_df)
+        prepared.append((subtask_nr, subtask_selection(subtask_df, subtask_nr), subtask_parameters))
+    return prepared
+
+def connect_subtask(route: list, route_tmp: list) -> bool:
+    #Append route of next subtask, use pathfinder if there is no direct way
+    direct_way = current_map.check_direct_way(route[-1], route_tmp[0])
+    if direct_way:
+        logger.debug('Direct way possible. Connect tasks')
+        route.extend(route_tmp)
+    else:
+        logger.debug('Direct way not possible. Starting pathfinder to connect tasks')
+        pathfinder.create()
+        pathfinder.angle = 0
+        route_astar = pathfinder.find_way(route[-1], route_tmp[0])
+        if route_astar == []:
+            logger.error('Backend: Route calculation from task could not be finished')
+            return False
+        del route_astar[-1] #remove last point it is given by legacy route (second task start point)
+        route.extend(route_astar)
+        route.extend(route_tmp)
+    return True
 
 def calc_task(substasks: pd.DataFrame, parameters: pd.DataFrame) -> None:
     logger.info('Backend: Create route from task')
@@ -19,50 +77,15 @@ def calc_task(substasks: pd.DataFrame, parameters: pd.DataFrame) -> None:
 
     current_map.total_tasks = substasks['task nr'].nunique()
 
-    for subtask_nr in substasks['task nr'].unique():
+    for subtask_nr, selected_perimeter, subtask_parameters in prepare_subtasks(substasks, parameters):
+        current_map.check_calc_cancelled()
         current_map.task_progress = subtask_nr
-        subtask_df = substasks[substasks['task nr'] == subtask_nr]
-        subtask_df = subtask_df.reset_index(drop=True)
-        parameters_df = parameters[parameters['task nr'] == subtask_nr]
-        parameters_df = parameters_df.reset_index(drop=True)
-        if 'lassoPoints' in subtask_df['type'].unique():
-            logger.debug('Task'+str(subtask_nr)+' lasso selection detected')
-            x = subtask_df[subtask_df['type'] == 'lassoPoints']['X'].values.tolist()
-            y = subtask_df[subtask_df['type'] == 'lassoPoints']['Y'].values.tolist()
-            selection = {'x': x, 'y': y}
-            selection = {'lassoPoints': selection}
-            selected_perimeter = map.selection(current_map.perimeter_polygon, selection)
-            
-        elif 'range' in subtask_df['type'].unique():
-            logger.debug('Task'+str(subtask_nr)+' range selection detected')
-            x = subtask_df[subtask_df['type'] == 'range']['X'].values.tolist()
-            y = subtask_df[subtask_df['type'] == 'range']['Y'].values.tolist()
-            selection = {'x': x, 'y': y}
-            selection = {'range': selection}
-            selected_perimeter = map.selection(current_map.perimeter_polygon, selection)
-        else:
-            logger.debug('Task'+str(subtask_nr)+' no selection detected (Calc way for whole map)')
-            selected_perimeter = current_map.perimeter_polygon
-        pathplannercfgtasktmp.df_to_obj(parameters_df)
         if subtask_nr == 0:
-            route = calc_simple(selected_perimeter, pathplannercfgtasktmp)
+            route = calc_simple(selected_perimeter, subtask_parameters)
         else:
-            route_tmp = calc(selected_perimeter, pathplannercfgtasktmp, route[-1])
-            direct_way = current_map.check_direct_way(route[-1], route_tmp[0])
-            if direct_way:
-                logger.debug('Direct way possible. Connect tasks')
-                route.extend(route_tmp)
-            else:
-                logger.debug('Direct way not possible. Starting pathfinder to connect tasks')
-                pathfinder.create()
-                pathfinder.angle = 0
-                route_astar = pathfinder.find_way(route[-1], route_tmp[0])
-                if route_astar == []:
-                    logger.error('Backend: Route calculation from task could not be finished')
-                    return
-                del route_astar[-1] #remove last point it is given by legacy route (second task start point)
-                route.extend(route_astar)
-                route.extend(route_tmp)
+            route_tmp = calc(selected_perimeter, subtask_parameters, route[-1])
+            if not connect_subtask(route, route_tmp):
+                return
         start_pos = route[-1]
         #Extend areatomow value
         if areatomow == Polygon():
@@ -73,6 +96,41 @@ def calc_task(substasks: pd.DataFrame, parameters: pd.DataFrame) -> None:
     logger.info('Backend: Route calculation from task done')
     current_map.calc_route_preview(route)
 
+def estimate_entry_points(selected_perimeters: list, start_pos: list) -> list:
+    #First subtask starts at rover position, every other one at the point nearest to the previous selection
+    entry_points = [start_pos]
+    for previous, selected_perimeter in zip(selected_perimeters[:-1], selected_perimeters[1:]):
+        if previous.is_empty or selected_perimeter.is_empty:
+            entry_points.append(entry_points[-1])
+        else:
+            entry_points.append(list(nearest_points(previous, selected_perimeter)[1].coords)[0])
+    return entry_points
+
+def stitch_subtasks(subtasks: list, routes: list) -> None:
+    #Routes of subtasks planned in parallel (from their entry points) are connected in task order. Routes are not
+    #rotated: they already start near the previous selection (entry point) and a coverage route is open, rotating
+    #it would add a transit from its end back to its start and mow the border after the lines
+    logger.info('Backend: Stitch routes of subtasks')
+    route = []
+    areatomow = Polygon()
+    current_map.total_tasks = len(subtasks)
+    for (subtask_nr, selected_perimeter, subtask_parameters), route_tmp in zip(subtasks, routes):
+        current_map.check_calc_cancelled()
+        current_map.task_progress = subtask_nr
+        if route_tmp == []:
+            logger.info('Task'+str(subtask_nr)+' delivered no route')
+        elif route == []:
+            route = list(route_tmp)
+        elif not connect_subtask(route, list(route_tmp)):
+            return
+        if areatomow == Polygon():
+            areatomow = selected_perimeter
+        else:
+            areatomow = areatomow.union(selected_perimeter)
+    current_map.areatomow = round(areatomow.area)
+    logger.info('Backend: Route calculation from task done')
+    current_map.calc_route_preview(route)
+
 def calc_simple(selected_perimeter: Polygon, parameters: PathPlannerCfg) -> list:
     route = []
     use_cassandra_pathfinder = False
@@ -120,6 +178,16 @@ def calc_start_pos() -> list:
 def calc(selected_perimeter: Polygon, parameters: PathPlannerCfg, start_pos: list = None) -> list:
     if start_pos == None:
         start_pos = calc_start_pos()
+    if parameters.angleauto:
+        return angle_optimizer.optimize(selected_perimeter, parameters, start_pos)
+    cache_key = route_cache.key(current_map.perimeter, selected_perimeter, parameters, start_pos, (segment_order.enabled,))
+    route = route_cache.load(cache_key)
+    if route is None:
+        route = calc_route(selected_perimeter, parameters, start_pos)
+        route_cache.save(cache_key, route)
+    return route
+
+def calc_route(selected_perimeter: Polygon, parameters: PathPlannerCfg, start_pos: list) -> list:
     if selected_perimeter.is_empty or (not parameters.mowarea and parameters.mowborder==0 and not parameters.mowexclusion):
         logger.info('Coverage path planner parameters are not valid. Calculation aborted.')
         logger.debug(parameters)
@@ -135,11 +203,12 @@ def calc(selected_perimeter: Polygon, parameters: PathPlannerCfg, start_pos: lis
     else:
         angle = parameters.angle
 
-    if parameters.pattern == 'lines' or parameters.pattern == 'squares':
+    if parameters.pattern == 'lines' or parameters.pattern == 'squares' or parameters.pattern == 'cells':
         start_pos = map.turn(start_pos, angle)
         selected_area_turned = map.turn(selected_perimeter, angle)
         border = map.turn(current_map.perimeter_polygon, angle)
-        area_to_mow = map.areatomow(selected_area_turned, parameters.distancetoborder, parameters.width)
+        #Area to mow is calculated (and cached) unturned, so every angle and the second pass of squares share it
+        area_to_mow = map.turn(map.areatomow(selected_perimeter, parameters.distancetoborder, parameters.width), angle)
         route, edge_polygons = cutedge.calcroute(selected_area_turned, parameters, list(start_pos.coords))
         if parameters.mowarea:
             line_mask = map.linemask(area_to_mow, parameters.width)
@@ -148,20 +217,22 @@ def calc(selected_perimeter: Polygon, parameters: PathPlannerCfg, start_pos: lis
         if line_mask.is_empty and edge_polygons == [] and len(route) == 1:
             logger.info('No ways to calculate')
             return []
-        route = lines.calcroute(border, line_mask, edge_polygons, route, parameters, angle)
+        if parameters.pattern == 'cells':
+            route = cells.calcroute(border, line_mask, edge_polygons, route, parameters, angle)
+        else:
+            route = lines.calcroute(border, line_mask, edge_polygons, route, parameters, angle)
         route = map.turn(route, -angle)
         route = list(route.coords)
         # Clear progress bar
-        if parameters.pattern == 'lines' or (parameters.pattern == 'squares' and parameters.mowarea != True):
+        if parameters.pattern == 'lines' or parameters.pattern == 'cells' or (parameters.pattern == 'squares' and parameters.mowarea != True):
             current_map.total_progress = current_map.calculated_progress = 0
 
     if parameters.pattern == 'squares' and parameters.mowarea == True:
         last_coord = route[-1]
         last_coord = Point(last_coord)
         last_coord = map.turn(last_coord, angle+90)
-        selected_area_turned = map.turn(selected_perimeter, angle+90)
         border = map.turn(current_map.perimeter_polygon, angle+90)
-        area_to_mow = map.areatomow(selected_area_turned, parameters.distancetoborder, parameters.width)
+        area_to_mow = map.turn(map.areatomow(selected_perimeter, parameters.distancetoborder, parameters.width), angle+90)
         if parameters.mowarea:
             line_mask = map.linemask(area_to_mow, parameters.width)
         else:
@@ -185,4 +256,5 @@ def calc(selected_perimeter: Polygon, parameters: PathPlannerCfg, start_pos: lis
         # Clear progress bar
         current_map.total_progress = current_map.calculated_progress = 0
 
+    logger.debug('Offset chains: '+str(offset_chains.stats()))
     return route
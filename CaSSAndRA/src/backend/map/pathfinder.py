@@ -1,14 +1,18 @@
 import logging
 logger = logging.getLogger(__name__)
 
-import networkx as nx
 from shapely.geometry import *
 from shapely import affinity
 from shapely.ops import *
-from dataclasses import dataclass
+import numpy as np
+import shapely
+from dataclasses import dataclass, field
 
 #local imports
 from ..data.mapdata import current_map
+from .directway import directway
+from . import astar
+from .astar import CSRGraph
 
 @dataclass
 class PathFinder:
@@ -17,8 +21,10 @@ class PathFinder:
     perimeter_points: MultiPoint = MultiPoint()
     search_wire: LineString = LineString()
     search_wire_points: MultiPoint = MultiPoint()
-    G: nx.Graph = nx.Graph()
-    Gnew: nx.Graph = nx.Graph()
+    G: CSRGraph = field(default_factory=CSRGraph)
+    #base graph stays untouched, start/goal edges live only during one query
+    overlay_edges: dict = None
+    heuristic_factor: float = 1.0
 
     def create(self) -> None:
         self.perimeter = current_map.perimeter_polygon.buffer(0.01, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
@@ -26,51 +32,64 @@ class PathFinder:
         self.search_wire = current_map.search_wire
         self.search_wire_points = current_map.search_wire_points
         self.G = current_map.astar_graph
-        self.Gnew = current_map.astar_graph
+        #search wire edges are weighted with the half length, heuristic has to stay admissible
+        if self.search_wire.is_empty:
+            self.heuristic_factor = 1.0
+        else:
+            self.heuristic_factor = 0.5
+
+    def add_edge(self, start: tuple, end: tuple, weight: float) -> None:
+        self.overlay_edges.setdefault(start, dict())[end] = weight
+        self.overlay_edges.setdefault(end, dict())[start] = weight
 
     def check_direct_way(self, start, end) -> bool:
         way = LineString([start, end])
         if way.length <= 0.01:
             direct_way_possible = True
         else:
-            direct_way_possible = way.within(self.perimeter)
+            direct_way_possible = directway.check(self.perimeter, start, end)
         return direct_way_possible
 
+    def check_direct_ways(self, start, ends: np.ndarray) -> np.ndarray:
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        starts = np.repeat(np.asarray([start], dtype=float), len(ends), axis=0)
+        direct_ways_possible = directway.check_many(self.perimeter, starts, ends)
+        direct_ways_possible |= np.hypot(ends[:, 0]-start[0], ends[:, 1]-start[1]) <= 0.01
+        return direct_ways_possible
+
+    def add_edges_to_points(self, point: tuple, nearest_point: tuple, possible_points: np.ndarray) -> None:
+        if self.check_direct_way(point, nearest_point):
+            direct_way = LineString((point, nearest_point))
+            self.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], direct_way.length)
+        from_point = self.check_direct_ways(point, possible_points)
+        from_nearest_point = self.check_direct_ways(nearest_point, possible_points)
+        for k in np.flatnonzero(from_point | from_nearest_point):
+            possible_point = tuple(possible_points[k].tolist())
+            if from_point[k]:
+                direct_way = LineString((point, possible_point))
+                self.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], direct_way.length)
+            if from_nearest_point[k]:
+                direct_way = LineString((nearest_point, possible_point))
+                self.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], direct_way.length)
+
     def add_edges(self, point: Point) -> None:
-        nearest_point = nearest_points(point, self.perimeter)[1]
         #Check edges to perimeter and exclusions
-        if self.check_direct_way(list(point.coords)[0], list(nearest_point.coords)[0]):
-            direct_way = LineString((list(point.coords)[0], list(nearest_point.coords)[0]))
-            self.Gnew.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-        for possible_point in self.perimeter_points.geoms:
-            if self.check_direct_way(list(point.coords)[0], list(possible_point.coords)[0]):
-                direct_way = LineString((list(point.coords)[0], list(possible_point.coords)[0]))
-                self.Gnew.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-            if self.check_direct_way(list(nearest_point.coords)[0], list(possible_point.coords)[0]):
-                direct_way = LineString((list(nearest_point.coords)[0], list(possible_point.coords)[0]))
-                self.Gnew.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
+        nearest_point = nearest_points(point, self.perimeter)[1]
+        self.add_edges_to_points(list(point.coords)[0], list(nearest_point.coords)[0], shapely.get_coordinates(self.perimeter_points))
         #Check edges to search wire
         if not self.search_wire.is_empty:
             nearest_point = nearest_points(point, self.search_wire)[1]
-            if self.check_direct_way(list(point.coords)[0], list(nearest_point.coords)[0]):
-                direct_way = LineString((list(point.coords)[0], list(nearest_point.coords)[0]))
-                self.Gnew.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-            for possible_point in self.search_wire_points.geoms:
-                if self.check_direct_way(list(point.coords)[0], list(possible_point.coords)[0]):
-                    direct_way = LineString((list(point.coords)[0], list(possible_point.coords)[0]))
-                    self.Gnew.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
-                if self.check_direct_way(list(nearest_point.coords)[0], list(possible_point.coords)[0]):
-                    direct_way = LineString((list(nearest_point.coords)[0], list(possible_point.coords)[0]))
-                    self.Gnew.add_edge(list(direct_way.coords)[0], list(direct_way.coords)[1], weight=direct_way.length)
+            self.add_edges_to_points(list(point.coords)[0], list(nearest_point.coords)[0], shapely.get_coordinates(self.search_wire_points))
 
     def find_way(self, start: list, goal: list) -> list:
         start = affinity.rotate(Point(start), self.angle, origin=(0, 0))
         goal = affinity.rotate(Point(goal), self.angle, origin=(0, 0))
         logger.debug('Pathfinder start: '+str(list(start.coords)) +' goal: '+str(list(goal.coords)))
+        self.overlay_edges = dict()
         self.add_edges(start)
         self.add_edges(goal)
         try:
-            astar_path = nx.astar_path(self.Gnew, list(start.coords)[0], list(goal.coords)[0], heuristic=None, weight='weight') 
+            astar_path = astar.astar_path(self.G, list(start.coords)[0], list(goal.coords)[0], self.heuristic_factor, self.overlay_edges)
             logger.debug('Pathfinder found a way: '+str(astar_path))
             path = LineString(astar_path)
             path = affinity.rotate(path, -self.angle, origin=(0, 0))
@@ -80,6 +99,8 @@ class PathFinder:
             logger.warning('Pathfinder could not find a way. Action aborted')
             logger.debug(str(e))
             return list()
+        finally:
+            self.overlay_edges = None
 
 pathfinder = PathFinder()
 
@@ -0,0 +1,222 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import sys
+import json
+import time
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+import click
+import numpy as np
+import pandas as pd
+
+from ..data.mapdata import current_map
+from ..data.mapcache import map_cache
+from ..data.routecache import route_cache
+from ..data.route import Route
+from ..data.cfgdata import PathPlannerCfg
+from . import path
+from .planningjobs import init_worker, restore_snapshot
+from .routesimplify import route_simplifier
+
+#Headless planner for batch planning without dash app and rover connection (e.g. plan all maps overnight or benchmarks).
+#Maps are read from a saved perimeter file (perimeter.json of the data path, every map name is planned) or from
+#a map exported as geojson. Every map and parameter combination is planned in a worker process, routes are written
+#as geojson and/or npy together with stats.json (timing and size of every route). Map artifacts are created once per map
+#before the workers start and shared by the map cache (a temporary one, if no cache directory is given).
+#Usage: python -m src.backend.map.plan perimeter.json -p lines -p rings -w 0.18 -a 0 -a auto -o routes
+
+def load_perimeters(file: str) -> dict:
+    #Returns map name -> perimeter data frame (X, Y, type)
+    with open(file) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and data.get('type') == 'FeatureCollection':
+        name = os.path.splitext(os.path.basename(file))[0]
+        return {name: geojson_to_perimeter(data)}
+    saved = pd.DataFrame(data)
+    if not {'X', 'Y', 'type'}.issubset(saved.columns):
+        raise ValueError('Perimeter file has no X, Y, type columns: '+file)
+    if 'name' not in saved.columns:
+        saved['name'] = os.path.splitext(os.path.basename(file))[0]
+    perimeters = dict()
+    for name in saved['name'].unique():
+        perimeters[str(name)] = saved[saved['name'] == name][['X', 'Y', 'type']].reset_index(drop=True)
+    return perimeters
+
+def geojson_to_perimeter(geojson: dict) -> pd.DataFrame:
+    #Map exported by current_map.perimeter_to_geojson (coords relative to the rtk base)
+    perimeter = []
+    exclusion_nr = 0
+    for feature in geojson['features']:
+        name = feature.get('properties', dict()).get('name')
+        geometry = feature.get('geometry')
+        if geometry is None or geometry.get('coordinates') in (None, []):
+            continue
+        if name == 'perimeter' or name == 'exclusion':
+            coords = geometry['coordinates'][0]
+            if len(coords) > 1 and coords[0] == coords[-1]:
+                coords = coords[:-1]
+            if name == 'exclusion':
+                name = 'exclusion_'+str(exclusion_nr)
+                exclusion_nr += 1
+        elif name == 'dockpoints' or name == 'search wire':
+            coords = geometry['coordinates']
+        else:
+            continue
+        perimeter.extend((x, y, name) for x, y in coords)
+    return pd.DataFrame(perimeter, columns=['X', 'Y', 'type'])
+
+def create_jobs(perimeters: dict, patterns: list, widths: list, angles: list, start: tuple = None, options: dict = None, **parameters) -> list:
+    jobs = []
+    for name, pattern, width, angle in itertools.product(perimeters, patterns, widths, angles):
+        #without start position the rover starts docked (first dock point) like a scheduled task
+        snapshot = dict(map_id=map_cache.key(perimeters[name]), name=name, perimeter=perimeters[name],
+                        position_x=start[0] if start else 0.0, position_y=start[1] if start else 0.0, job=0 if start else 2,
+                        options=options or dict())
+        jobs.append(dict(name=name, snapshot=snapshot, parameters=PathPlannerCfg(pattern=pattern, width=width, angle=0 if angle == 'auto' else angle, 
+                                                                                 angleauto=angle == 'auto', **parameters)))
+    return jobs
+
+def plan_job(job: dict) -> dict:
+    #Runs in a worker process, returns route (list) and stats of one map and parameter set
+    stats = dict(name=job['name'], parameters=asdict(job['parameters']), state='done', error=None)
+    start_time = time.perf_counter()
+    try:
+        restore_snapshot(job['snapshot'])
+        stats['map_time'] = round(time.perf_counter()-start_time, 3)
+        route = path.calc_simple(current_map.perimeter_polygon, job['parameters'])
+        stats['plan_time'] = round(time.perf_counter()-start_time-stats['map_time'], 3)
+        route, stats['points'] = route_simplifier.simplify(current_map.perimeter_polygon, route)
+        stats['areatomow'] = round(current_map.perimeter_polygon.area)
+    except Exception as e:
+        logger.error('Headless planner: Planning of '+job['name']+' failed')
+        logger.debug(str(e))
+        route = []
+        stats['state'] = 'failed'
+        stats['error'] = str(e)
+    stats['duration'] = round(time.perf_counter()-start_time, 3)
+    stats['length'] = round(Route.from_list(route).length, 2)
+    return dict(route=route, stats=stats)
+
+def plan_batch(jobs: list, max_workers: int = None) -> list:
+    #Results in order of jobs, max_workers <= 1 plans in this process
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2)-1)
+    if max_workers <= 1 or len(jobs) <= 1:
+        return [plan_job(job) for job in jobs]
+    results = [None]*len(jobs)
+    with tempfile.TemporaryDirectory(prefix='cassandra-maps-') as cache_dir:
+        cache_path = map_cache.path
+        if map_cache.path is None:
+            map_cache.path = cache_dir
+        try:
+            prepare_maps(jobs)
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)), initializer=init_worker, initargs=(map_cache.path, route_cache.path)) as executor:
+                futures = {executor.submit(plan_job, job): nr for nr, job in enumerate(jobs)}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    logger.info('Headless planner: '+str(sum(result is not None for result in results))+'/'+str(len(jobs))+' routes planned')
+        finally:
+            map_cache.path = cache_path
+    return results
+
+def prepare_maps(jobs: list) -> None:
+    #Creates the map artifacts of every map once and stores them in the map cache, workers only load them
+    snapshots = {job['snapshot']['map_id']: job['snapshot'] for job in jobs}
+    map_cache.max_entries = max(map_cache.max_entries, len(snapshots))
+    for map_id, snapshot in snapshots.items():
+        if os.path.exists(map_cache.file(map_id)):
+            continue
+        start_time = time.perf_counter()
+        try:
+            restore_snapshot(snapshot)
+        except Exception as e:
+            #planning of this map fails in the worker and is reported in the stats
+            logger.error('Headless planner: Could not create map '+str(snapshot['name']))
+            logger.debug(str(e))
+            continue
+        logger.info('Headless planner: Map '+str(snapshot['name'])+' created in '+str(round(time.perf_counter()-start_time, 2))+'s')
+
+def file_name(stats: dict) -> str:
+    parameters = stats['parameters']
+    return '_'.join([stats['name'], parameters['pattern'], str(parameters['width']), 'auto' if parameters['angleauto'] else str(parameters['angle'])]).replace(os.sep, '-').replace(' ', '-')
+
+def write_results(results: list, output: str, formats: list) -> None:
+    os.makedirs(output, exist_ok=True)
+    for result in results:
+        route = Route.from_list(result['route'])
+        result['stats']['files'] = []
+        if 'geojson' in formats:
+            geojson = dict(type="FeatureCollection", features=[])
+            geojson['features'].append(dict(type='Feature', properties=dict(name=result['stats']['name'], parameters=result['stats']['parameters'])))
+            geojson['features'].append(route.to_geojson('preview'))
+            with open(os.path.join(output, file_name(result['stats'])+'.geojson'), 'w') as f:
+                json.dump(geojson, f)
+            result['stats']['files'].append(file_name(result['stats'])+'.geojson')
+        if 'npy' in formats:
+            np.save(os.path.join(output, file_name(result['stats'])+'.npy'), route.coords)
+            result['stats']['files'].append(file_name(result['stats'])+'.npy')
+    with open(os.path.join(output, 'stats.json'), 'w') as f:
+        json.dump([result['stats'] for result in results], f, indent=2)
+
+def parse_angle(ctx, param, values) -> list:
+    angles = []
+    for value in values:
+        try:
+            angles.append(value if value == 'auto' else int(value))
+        except ValueError:
+            raise click.BadParameter('angle has to be an integer or auto')
+    return angles
+
+@click.command()
+@click.argument('perimeter_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('-n', '--name', multiple=True, help='Map name(s) of the perimeter file to plan, default all')
+@click.option('-p', '--pattern', multiple=True, default=['lines'], show_default=True, type=click.Choice(['lines', 'squares', 'rings', 'cells']))
+@click.option('-w', '--width', multiple=True, default=[0.18], show_default=True, type=float)
+@click.option('-a', '--angle', multiple=True, default=['0'], show_default=True, callback=parse_angle, help='Angle in deg or auto')
+@click.option('--distancetoborder', default=1, show_default=True, type=int)
+@click.option('--mowborder', default=1, show_default=True, type=int)
+@click.option('--mowarea/--no-mowarea', default=True, show_default=True)
+@click.option('--mowexclusion/--no-mowexclusion', default=True, show_default=True)
+@click.option('--mowborderccw/--no-mowborderccw', default=True, show_default=True)
+@click.option('--segmentorder/--no-segmentorder', default=False, show_default=True, help='Optimize order of mow lines (slower)')
+@click.option('--simplify/--no-simplify', default=True, show_default=True, help='Remove points of the route closer than tolerance to a direct way')
+@click.option('--simplifytolerance', default=0.02, show_default=True, type=float)
+@click.option('--start', nargs=2, type=float, default=None, help='Start position X Y, default first dock point')
+@click.option('-o', '--output', default='routes', show_default=True, type=click.Path(file_okay=False))
+@click.option('-f', '--format', 'formats', multiple=True, default=['geojson'], show_default=True, type=click.Choice(['geojson', 'npy']))
+@click.option('-j', '--workers', default=None, type=int, help='Worker processes, default cpu count - 1')
+@click.option('--cache', default=None, type=click.Path(file_okay=False), help='Directory for map and route cache')
+@click.option('--log_level', default='WARN', show_default=True, type=click.Choice(['DEBUG', 'INFO', 'WARN', 'ERROR', 'CRITICAL']))
+def main(perimeter_file, name, pattern, width, angle, distancetoborder, mowborder, mowarea, mowexclusion, mowborderccw, segmentorder, simplify, simplifytolerance, start, output, formats, workers, cache, log_level) -> None:
+    """ Plan routes for saved maps without CaSSAndRA server """
+    logging.basicConfig(stream=sys.stdout, level=log_level, format="%(asctime)s %(levelname)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    if cache is not None:
+        os.makedirs(os.path.join(cache, 'maps'), exist_ok=True)
+        os.makedirs(os.path.join(cache, 'routes'), exist_ok=True)
+        map_cache.path = os.path.join(cache, 'maps')
+        route_cache.path = os.path.join(cache, 'routes')
+    perimeters = load_perimeters(perimeter_file)
+    if name:
+        missing = set(name) - set(perimeters)
+        if missing:
+            raise click.BadParameter('map(s) not found in perimeter file: '+', '.join(sorted(missing)))
+        perimeters = {map_name: perimeters[map_name] for map_name in name}
+    jobs = create_jobs(perimeters, list(pattern), list(width), angle, start, distancetoborder=distancetoborder,
+                       options=dict(segmentorder=segmentorder, simplify=simplify, simplifytolerance=simplifytolerance), mowarea=mowarea, mowborder=mowborder, mowexclusion=mowexclusion, mowborderccw=mowborderccw)
+    start_time = time.perf_counter()
+    results = plan_batch(jobs, workers)
+    write_results(results, output, formats)
+    for result in results:
+        stats = result['stats']
+        click.echo(file_name(stats)+': '+stats['state']+', '+str(stats['points']['after'] if 'points' in stats else 0)+' points, '
+                   +str(stats['length'])+'m, '+str(stats['duration'])+'s')
+    click.echo(str(len(results))+' route(s) planned in '+str(round(time.perf_counter()-start_time, 2))+'s, written to '+output)
+    if any(result['stats']['state'] != 'done' for result in results):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,499 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import threading
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from dataclasses import dataclass, field
+import pandas as pd
+from shapely.geometry import *
+
+from ..data.mapdata import current_map, PlanningCancelled
+from ..data.mapcache import map_cache
+from ..data.routecache import route_cache
+from ..data.route import Route
+from ..data.cfgdata import PathPlannerCfg, pathplannercfg
+from ..data.roverdata import robot
+from .segmentorder import segment_order
+from .routesimplify import route_simplifier
+from .angleoptimizer import angle_optimizer
+
+#Route planning jobs running in a process pool. A job gets a snapshot of map and rover position,
+#the worker restores the map (from map cache) and runs the planner. Progress of the worker is written
+#to a shared dict and mirrored to current_map (progress bar), cancel requests are checked by the
+#planners in their main loops (current_map.check_calc_cancelled). Workers are started with spawn, the server
+#runs several threads (comm, api, dash) and a forked child would inherit their locks.
+#Jobs are tagged with the source which submitted them (ui page, api, schedule), a source cancels only its own jobs.
+#Subtasks of a task order and the candidate angles of angleauto can run as child jobs in the same pool, the parent job
+#selects the best candidate of every subtask and stitches the routes in a last child job (one pool for all levels,
+#no nested process pools).
+
+PROGRESS_INTERVAL = 0.2
+
+@dataclass
+class PlanningJob:
+    job_id: str
+    kind: str
+    source: str = None
+    parent: str = None
+    children: list = field(default_factory=list)
+    subtasks: list = field(default_factory=list)
+    #(subtask index, planner parameters) of every child job
+    candidates: list = field(default_factory=list)
+    stitch_job_id: str = None
+    state: str = 'pending'
+    progress: dict = field(default_factory=dict)
+    route: list = field(default_factory=list)
+    areatomow: int = 0
+    angle_scores: list = field(default_factory=list)
+    points: dict = field(default_factory=dict)
+    replan: dict = field(default_factory=dict)
+    error: str = None
+    submitted: datetime = field(default_factory=datetime.now)
+    finished: datetime = None
+    future: object = None
+    on_done: callable = None
+    subscribers: list = field(default_factory=list)
+    done_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def active(self) -> bool:
+        return self.state in ['pending', 'running']
+
+    @property
+    def published_state(self) -> str:
+        #final state is published after on_done has applied the result (ui polls the state and draws the result)
+        if self.active or self.done_event.is_set():
+            return self.state
+        return 'running'
+
+    def to_dict(self) -> dict:
+        return dict(jobId=self.job_id, kind=self.kind, source=self.source, state=self.published_state, progress=self.progress, error=self.error, angleScores=self.angle_scores, points=self.points, replan=self.replan)
+
+@dataclass
+class PlanningJobs:
+    max_workers: int = max(1, (os.cpu_count() or 2)-1)
+    max_finished_jobs: int = 20
+    start_method: str = 'spawn'
+    #plan subtasks of a task order as parallel child jobs and stitch them afterwards. Only used with more than one
+    #worker (host with at least 3 cores), with one worker the subtasks are planned one after another in one job
+    parallel_subtasks: bool = True
+    jobs: dict = field(default_factory=dict)
+    executor: ProcessPoolExecutor = None
+    manager: object = None
+    shared_progress: dict = None
+    shared_cancel: dict = None
+    monitor_thread: threading.Thread = None
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    stop_event: threading.Event = field(default_factory=threading.Event)
+
+    def start(self) -> None:
+        with self.lock:
+            if self.executor is not None:
+                return
+            logger.info('Planning jobs: Starting process pool with '+str(self.max_workers)+' worker(s)')
+            self.manager = multiprocessing.get_context(self.start_method).Manager()
+            self.shared_progress = self.manager.dict()
+            self.shared_cancel = self.manager.dict()
+            self.executor = self.create_executor()
+            self.stop_event.clear()
+            self.monitor_thread = threading.Thread(target=self.monitor, name='planning jobs')
+            self.monitor_thread.daemon = True
+            self.monitor_thread.start()
+
+    def shutdown(self) -> None:
+        with self.lock:
+            if self.executor is None:
+                return
+            logger.info('Planning jobs: Shutting down process pool')
+            for job in list(self.jobs.values()):
+                if job.active:
+                    self.cancel(job.job_id)
+            self.stop_event.set()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.manager.shutdown()
+            self.executor = None
+            self.manager = None
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(self.start_method),
+                                   initializer=init_worker, initargs=(map_cache.path, route_cache.path))
+
+    def submit(self, kind: str, *args, on_done: callable = None, source: str = None, parent: str = None) -> str:
+        self.start()
+        job = PlanningJob(job_id=str(uuid.uuid4()), kind=kind, source=source, parent=parent, on_done=on_done)
+        snapshot = create_snapshot()
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self.shared_progress[job.job_id] = dict()
+            self.shared_cancel[job.job_id] = False
+            try:
+                job.future = self.executor.submit(run_job, job.job_id, kind, snapshot, args, self.shared_progress, self.shared_cancel)
+            except BrokenProcessPool as e:
+                logger.warning('Planning jobs: Process pool is broken, restarting')
+                logger.debug(str(e))
+                self.executor = self.create_executor()
+                job.future = self.executor.submit(run_job, job.job_id, kind, snapshot, args, self.shared_progress, self.shared_cancel)
+            self.remove_finished_jobs()
+        current_map.calculating = True
+        current_map.task_progress = 0
+        current_map.total_tasks = 1
+        current_map.calculated_progress = current_map.total_progress = 0
+        logger.info('Planning jobs: Job '+job.job_id+' ('+kind+', '+str(source)+') submitted')
+        return job.job_id
+
+    def submit_simple(self, selected_perimeter: Polygon, parameters: PathPlannerCfg, on_done: callable = None, source: str = None) -> str:
+        if self.max_workers > 1 and parameters.angleauto:
+            return self.submit_angles('simple', selected_perimeter, parameters, on_done=on_done, source=source)
+        return self.submit('simple', selected_perimeter, parameters, on_done=on_done, source=source)
+
+    def submit_calc(self, selected_perimeter: Polygon, parameters: PathPlannerCfg, on_done: callable = None, source: str = None) -> str:
+        if self.max_workers > 1 and parameters.angleauto:
+            return self.submit_angles('calc', selected_perimeter, parameters, on_done=on_done, source=source)
+        return self.submit('calc', selected_perimeter, parameters, on_done=on_done, source=source)
+
+    def submit_task(self, subtasks: pd.DataFrame, subtasks_parameters: pd.DataFrame, on_done: callable = None, source: str = None) -> str:
+        if self.parallel_subtasks and self.max_workers > 1:
+            from . import path
+            prepared = path.prepare_subtasks(subtasks, subtasks_parameters)
+            if len(prepared) > 1 or any(subtask_parameters.angleauto for subtask_nr, selected_perimeter, subtask_parameters in prepared):
+                return self.submit_subtasks(prepared, on_done=on_done, source=source)
+        return self.submit('task', subtasks, subtasks_parameters, on_done=on_done, source=source)
+
+    def submit_angles(self, kind: str, selected_perimeter: Polygon, parameters: PathPlannerCfg, on_done: callable = None, source: str = None) -> str:
+        #Selection as one subtask, the parent job plans every candidate angle as child job
+        from . import path
+        return self.submit_children(kind, [(0, selected_perimeter, parameters)], [path.calc_start_pos()], on_done=on_done, source=source)
+
+    def submit_subtasks(self, prepared: list, on_done: callable = None, source: str = None) -> str:
+        #Every subtask starts at the estimated entry point (nearest point to the previous selection)
+        from . import path
+        entry_points = path.estimate_entry_points([selected_perimeter for subtask_nr, selected_perimeter, subtask_parameters in prepared], path.calc_start_pos())
+        return self.submit_children('task', prepared, entry_points, on_done=on_done, source=source)
+
+    def submit_children(self, kind: str, prepared: list, start_positions: list, on_done: callable = None, source: str = None) -> str:
+        #One child job per subtask, subtasks with angleauto get one child job per candidate angle
+        job = PlanningJob(job_id=str(uuid.uuid4()), kind=kind, source=source, on_done=on_done, state='running', subtasks=prepared)
+        for index, (subtask_nr, selected_perimeter, subtask_parameters) in enumerate(prepared):
+            candidates = angle_optimizer.candidates(subtask_parameters) if subtask_parameters.angleauto else [subtask_parameters]
+            job.candidates.extend((index, candidate) for candidate in candidates)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        #children are set at once, the monitor thread handles the parent only with all children
+        job.children = [self.submit('subtask', prepared[index][1], candidate, start_positions[index], source=source, parent=job.job_id) 
+                        for index, candidate in job.candidates]
+        logger.info('Planning jobs: Job '+job.job_id+' ('+kind+', '+str(source)+') submitted as '+str(len(job.children))+' subtask jobs')
+        return job.job_id
+
+    def get(self, job_id: str) -> PlanningJob:
+        return self.jobs.get(job_id)
+
+    def status(self, job_id: str) -> dict:
+        job = self.get(job_id)
+        if job is None:
+            return dict(jobId=job_id, state='unknown')
+        return job.to_dict()
+
+    def subscribe(self, job_id: str, callback: callable) -> bool:
+        #callback(job) is called from monitor thread on every progress change and when job is finished
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.subscribers.append(callback)
+        return True
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        logger.info('Planning jobs: Cancel job '+job_id)
+        if job.children:
+            for child_id in job.children+[job.stitch_job_id]:
+                self.cancel(child_id)
+            self.finish(job, 'cancelled')
+        elif job.future is not None and job.future.cancel():
+            self.finish(job, 'cancelled')
+        else:
+            self.shared_cancel[job_id] = True
+        return True
+
+    def cancel_source(self, source: str) -> list:
+        #Cancels active jobs submitted by source, returns their job ids
+        job_ids = [job.job_id for job in list(self.jobs.values()) if job.active and job.source == source]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        return job_ids
+
+    def running_source(self, source: str) -> bool:
+        return any(job.active and job.source == source for job in list(self.jobs.values()))
+
+    def wait(self, job_id: str, timeout: float = None) -> PlanningJob:
+        job = self.get(job_id)
+        if job is not None:
+            job.done_event.wait(timeout)
+        return job
+
+    @property
+    def running(self) -> bool:
+        return any(job.active for job in self.jobs.values())
+
+    def latest(self) -> PlanningJob:
+        jobs = [job for job in list(self.jobs.values()) if job.parent is None]
+        if not jobs:
+            return None
+        return jobs[-1]
+
+    def monitor(self) -> None:
+        while not self.stop_event.wait(PROGRESS_INTERVAL):
+            try:
+                self.update()
+            except Exception as e:
+                logger.error('Planning jobs: Monitor update failed')
+                logger.debug(str(e))
+
+    def update(self) -> None:
+        active_jobs = [job for job in list(self.jobs.values()) if job.active]
+        for job in active_jobs:
+            if job.future is None:
+                continue
+            progress = self.shared_progress.get(job.job_id, dict())
+            if job.future.running() and job.state == 'pending':
+                job.state = 'running'
+            if progress != job.progress:
+                job.progress = progress
+                self.notify(job)
+            if job.future.done():
+                self.collect(job)
+        for job in active_jobs:
+            if job.children and job.active:
+                self.update_parent(job)
+        #mirror progress of latest active job for progress bar
+        active_jobs = [job for job in active_jobs if job.active and job.parent is None]
+        if active_jobs:
+            progress = active_jobs[-1].progress
+            current_map.calculating = True
+            current_map.task_progress = progress.get('task_progress', 0)
+            current_map.total_tasks = max(1, progress.get('total_tasks', 1))
+            current_map.calculated_progress = progress.get('calculated_progress', 0)
+            current_map.total_progress = progress.get('total_progress', 0)
+        elif current_map.calculating:
+            current_map.calculating = False
+            current_map.calculated_progress = current_map.total_progress = 0
+
+    def update_parent(self, job: PlanningJob) -> None:
+        #Parent job of subtask jobs: aggregate progress, select candidates and stitch routes if all subtasks are done
+        if job.stitch_job_id is not None:
+            stitch_job = self.jobs[job.stitch_job_id]
+            if stitch_job.active:
+                return
+            job.route = stitch_job.route
+            job.areatomow = stitch_job.areatomow
+            job.points = stitch_job.points
+            job.error = stitch_job.error
+            self.finish(job, stitch_job.state)
+            return
+        children = [self.jobs[child_id] for child_id in job.children]
+        stopped = [child for child in children if child.state in ['failed', 'cancelled']]
+        if stopped:
+            for child in children:
+                self.cancel(child.job_id)
+            job.error = stopped[0].error
+            self.finish(job, stopped[0].state)
+            return
+        done = [child for child in children if child.state == 'done']
+        running = [child for child in children if child.active]
+        progress = dict(task_progress=len(done), total_tasks=len(children),
+                        calculated_progress=running[0].progress.get('calculated_progress', 0) if running else 0,
+                        total_progress=running[0].progress.get('total_progress', 0) if running else 0)
+        if progress != job.progress:
+            job.progress = progress
+            self.notify(job)
+        if len(done) == len(children):
+            job.stitch_job_id = self.submit('stitch', job.subtasks, self.select_candidates(job, children), source=job.source, parent=job.job_id)
+
+    def select_candidates(self, job: PlanningJob, children: list) -> list:
+        #Returns route of every subtask, the candidate angle with the lowest score for subtasks with angleauto
+        routes = []
+        job.angle_scores = []
+        for index, (subtask_nr, selected_perimeter, subtask_parameters) in enumerate(job.subtasks):
+            candidates = [(candidate, child.route) for (candidate_index, candidate), child in zip(job.candidates, children) if candidate_index == index]
+            if len(candidates) == 1:
+                routes.append(candidates[0][1])
+                continue
+            route, scores = angle_optimizer.select([route for candidate, route in candidates], [candidate for candidate, route in candidates])
+            if scores:
+                job.angle_scores.append(scores)
+            routes.append(route)
+        return routes
+
+    def collect(self, job: PlanningJob) -> None:
+        try:
+            result = job.future.result()
+        except Exception as e:
+            logger.error('Planning jobs: Job '+job.job_id+' failed')
+            logger.debug(str(e))
+            job.error = str(e)
+            self.finish(job, 'failed')
+            return
+        if result['state'] == 'done':
+            job.route = result['route']
+            job.areatomow = result['areatomow']
+            job.angle_scores = result.get('angle_scores', [])
+            job.points = result.get('points', dict())
+            job.replan = result.get('replan', dict())
+        job.error = result.get('error')
+        self.finish(job, result['state'])
+
+    def finish(self, job: PlanningJob, state: str) -> None:
+        with self.lock:
+            if not job.active:
+                return
+            job.state = state
+            job.finished = datetime.now()
+        self.shared_progress.pop(job.job_id, None)
+        self.shared_cancel.pop(job.job_id, None)
+        logger.info('Planning jobs: Job '+job.job_id+' '+state)
+        if job.on_done is not None:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                logger.error('Planning jobs: Could not apply result of job '+job.job_id)
+                logger.debug(str(e))
+        self.notify(job)
+        #publishes the final state (status), result is applied now
+        job.done_event.set()
+
+    def notify(self, job: PlanningJob) -> None:
+        for callback in job.subscribers:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.warning('Planning jobs: Subscriber callback failed')
+                logger.debug(str(e))
+
+    def remove_finished_jobs(self) -> None:
+        #results of subtask jobs are kept until their parent job is finished
+        active_parents = [job.job_id for job in self.jobs.values() if job.active and job.children]
+        finished_jobs = [job_id for job_id, job in self.jobs.items() if not job.active and job.parent not in active_parents]
+        for job_id in finished_jobs[:max(0, len(finished_jobs)-self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+def apply_route_preview(job: PlanningJob) -> bool:
+    #Take over route of a finished job as current preview
+    if job.state != 'done':
+        return False
+    if job.route:
+        current_map.areatomow = job.areatomow
+        current_map.calc_route_preview(job.route)
+    return True
+
+def create_snapshot() -> dict:
+    return dict(map_id=current_map.map_id, name=current_map.name, perimeter=current_map.perimeter,
+                position_x=robot.position_x, position_y=robot.position_y, job=robot.job, options=planner_options())
+
+def planner_options() -> dict:
+    #Planner options of the settings, workers are spawned and do not read the config files
+    return dict(segmentorder=pathplannercfg.segmentorder, simplify=pathplannercfg.simplify, simplifytolerance=pathplannercfg.simplifytolerance)
+
+def apply_planner_options(options: dict) -> None:
+    segment_order.enabled = options.get('segmentorder', segment_order.enabled)
+    route_simplifier.enabled = options.get('simplify', route_simplifier.enabled)
+    route_simplifier.tolerance = float(options.get('simplifytolerance', route_simplifier.tolerance))
+
+def init_worker(map_cache_path: str, route_cache_path: str) -> None:
+    map_cache.path = map_cache_path
+    route_cache.path = route_cache_path
+
+def restore_snapshot(snapshot: dict) -> None:
+    if current_map.map_id != snapshot['map_id']:
+        logger.debug('Planning worker: Restore map '+str(snapshot['name']))
+        current_map.name = snapshot['name']
+        current_map.perimeter = snapshot['perimeter']
+        current_map.create_artifacts()
+        current_map.map_id = snapshot['map_id']
+    robot.position_x = snapshot['position_x']
+    robot.position_y = snapshot['position_y']
+    robot.job = snapshot['job']
+    apply_planner_options(snapshot.get('options', dict()))
+
+def report_progress(job_id: str, shared_progress: dict, shared_cancel: dict, finished: threading.Event) -> None:
+    while not finished.wait(PROGRESS_INTERVAL):
+        try:
+            shared_progress[job_id] = dict(task_progress=int(current_map.task_progress), total_tasks=int(current_map.total_tasks),
+                                           calculated_progress=int(current_map.calculated_progress), total_progress=int(current_map.total_progress))
+            if shared_cancel.get(job_id):
+                current_map.calc_cancel.set()
+        except Exception as e:
+            logger.debug('Planning worker: Could not report progress: '+str(e))
+            return
+
+def run_job(job_id: str, kind: str, snapshot: dict, args: tuple, shared_progress: dict, shared_cancel: dict) -> dict:
+    from . import path
+    from .angleoptimizer import angle_optimizer
+    from .obstaclereplan import obstacle_replanner
+    result = dict(state='done', route=[], areatomow=0)
+    finished = threading.Event()
+    current_map.calc_cancel.clear()
+    current_map.task_progress = current_map.calculated_progress = current_map.total_progress = 0
+    current_map.total_tasks = 1
+    angle_optimizer.results = []
+    reporter = threading.Thread(target=report_progress, args=(job_id, shared_progress, shared_cancel, finished), name='progress')
+    reporter.daemon = True
+    reporter.start()
+    start_time = time.perf_counter()
+    try:
+        restore_snapshot(snapshot)
+        if kind == 'simple':
+            selected_perimeter, parameters = args
+            result['route'] = path.calc_simple(selected_perimeter, parameters)
+            result['areatomow'] = round(selected_perimeter.area)
+        elif kind == 'calc':
+            selected_perimeter, parameters = args
+            result['route'] = path.calc(selected_perimeter, parameters)
+            result['areatomow'] = round(selected_perimeter.area)
+        elif kind == 'task':
+            subtasks, subtasks_parameters = args
+            current_map.preview = Route(type='preview route')
+            path.calc_task(subtasks, subtasks_parameters)
+            if not current_map.preview.empty:
+                result['route'] = current_map.preview.to_list()
+            result['areatomow'] = current_map.areatomow
+        elif kind == 'subtask':
+            selected_perimeter, parameters, start_pos = args
+            result['route'] = path.calc(selected_perimeter, parameters, start_pos)
+        elif kind == 'stitch':
+            subtasks, routes = args
+            current_map.preview = Route(type='preview route')
+            path.stitch_subtasks(subtasks, routes)
+            if not current_map.preview.empty:
+                result['route'] = current_map.preview.to_list()
+            result['areatomow'] = current_map.areatomow
+        elif kind == 'replan':
+            tail, obstacles = args
+            result['route'], result['replan'] = obstacle_replanner.replan(tail, obstacles)
+        else:
+            raise ValueError('Unknown planning job kind: '+str(kind))
+        #Waypoints for the rover, remove redundant points of the planners (subtask routes are simplified after stitching)
+        if kind != 'subtask':
+            result['route'], result['points'] = route_simplifier.simplify(current_map.perimeter_polygon, result['route'])
+        result['angle_scores'] = angle_optimizer.results
+    except PlanningCancelled:
+        logger.info('Planning worker: Job '+job_id+' cancelled')
+        result = dict(state='cancelled', route=[], areatomow=0)
+    except Exception as e:
+        logger.error('Planning worker: Job '+job_id+' failed')
+        logger.debug(str(e))
+        result = dict(state='failed', route=[], areatomow=0, error=str(e))
+    finally:
+        finished.set()
+        reporter.join()
+        current_map.calc_cancel.clear()
+    logger.info('Planning worker: Job '+job_id+' finished in '+str(round(time.perf_counter()-start_time, 2))+'s')
+    return result
+
+planning_jobs = PlanningJobs()
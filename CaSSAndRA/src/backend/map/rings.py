@@ -1,89 +1,135 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import numpy as np
+import shapely
 from shapely.geometry import *
-from shapely.ops import *
-import pandas as pd
-import networkx as nx
+from shapely import STRtree
+from dataclasses import dataclass, field
 
 from ..data.mapdata import current_map
 from .pathfinder import pathfinder
+from .directway import directway
+from .offsetchain import offset_chains
 
-def shortest_path_to_point(border: Polygon, points_to_check: list, route: list) -> list:
-    end_of_route = route[-1]
-    way_nr = None
-    route_tmp = None
-    current_shortest_way_coord = [end_of_route, list(points_to_check[0].coords)[0]]
-    current_shortest_way = LineString(current_shortest_way_coord)
-    current_shortest_way_length = current_shortest_way.length
-    #Handle shapely problem in case if linestring has length. Within perimeter delivers False
-    if current_shortest_way_length == 0:
-        current_shortest_way = Point((current_shortest_way_coord[0]))
-    for i, point in enumerate(points_to_check):
-        shortest_way_coord = [end_of_route, list(point.coords)[0]]
-        shortest_way = LineString((shortest_way_coord))
-        shortest_way_length = shortest_way.length
-        #Handle shapely problem in case if linestring has length. Within perimeter delivers False
-        if shortest_way_length == 0:
-            shortest_way = Point((shortest_way_coord[0]))
-        if (shortest_way_length <= current_shortest_way_length and shortest_way.within(border)) or (shortest_way_length == 0 and shortest_way.touches(border)):
-            current_shortest_way_length = shortest_way_length
-            route_tmp = list(point.coords)
-            way_nr = i
-    return route_tmp, way_nr, current_shortest_way_length
-
-def shortest_path_to_exclusion(border: Polygon, edges_to_check: list, route: list) -> list:
-    end_of_route = route[-1]
-    way_nr = None
-    route_tmp = None
-    current_shortest_way_coord = nearest_points(Point((end_of_route)), MultiPoint(edges_to_check[0].exterior.coords))
-    current_shortest_way = LineString((current_shortest_way_coord))
-    current_shortest_way_length = current_shortest_way.length
-    #Handle shapely problem in case if linestring has length. Within perimeter delivers False
-    if current_shortest_way_length <= 0.01:
-        current_shortest_way_length = 0
-        current_shortest_way = Point((current_shortest_way_coord[1]))
-    for i, edge in enumerate(edges_to_check):
-        shortest_way_coord = nearest_points(Point((end_of_route)), MultiPoint(edge.exterior.coords))
-        shortest_way = LineString((shortest_way_coord))
-        shortest_way_length = shortest_way.length
-        #Handle shapely problem in case if linestring has length. Within perimeter delivers False
-        if shortest_way_length <= 0.01:
-            shortest_way_length = 0
-            shortest_way = Point((shortest_way_coord[1]))
-        if (shortest_way_length <= current_shortest_way_length and shortest_way.within(border)) or (shortest_way_length == 0 and shortest_way.touches(border)):
-            current_shortest_way_length = shortest_way_length
-            route_tmp = list(edge.exterior.coords)
-            route_tmp.pop(-1)
-            first_coords_nr = route_tmp.index(list(shortest_way_coord[-1].coords)[0])
-            route_tmp = route_tmp[first_coords_nr:]+route_tmp[:first_coords_nr]
-            route_tmp.append(route_tmp[0])
-            #Check for cw or ccw, which way shorter
-            route_1 = [route[-1]]
-            route_1.extend(route_tmp)
-            route_2 = [route[-1]]
+#Pool of rings (and centroid points) to mow. Ring vertices are stored in one array and indexed
+#by a STRtree, nearest entry queries only look at vertices within the distance of the first remaining ring.
+#The selection rules are the same as the former DataFrame based implementation:
+#a way is taken, if its direct way is valid and not longer than the way to the first remaining way of the same type
+@dataclass
+class RingPool:
+    shapely: list = field(default_factory=list)
+    polygon: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    gone: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    vertices: np.ndarray = field(default_factory=lambda: np.empty((0, 2)))
+    owner: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+    offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=int))
+    #vertex ids of the tree (polygon vertices only)
+    tree_vertices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+    tree: STRtree = None
+
+    @classmethod
+    def create(cls, polygons: list) -> 'RingPool':
+        coords = [np.asarray(polygon.exterior.coords if polygon.geom_type == 'Polygon' else polygon.coords, dtype=float).reshape(-1, 2) for polygon in polygons]
+        is_polygon = np.array([polygon.geom_type == 'Polygon' for polygon in polygons], dtype=bool)
+        vertices = np.concatenate(coords)
+        owner = np.repeat(np.arange(len(coords)), [len(c) for c in coords])
+        offsets = np.concatenate(([0], np.cumsum([len(c) for c in coords]))).astype(int)
+        tree_vertices = np.flatnonzero(is_polygon[owner])
+        tree = STRtree(shapely.points(vertices[tree_vertices]))
+        return cls(shapely=polygons, polygon=is_polygon, gone=np.zeros(len(polygons), dtype=bool), vertices=vertices, owner=owner, offsets=offsets,
+                   tree_vertices=tree_vertices, tree=tree)
+
+    def __len__(self) -> int:
+        return len(self.shapely)
+
+    @property
+    def empty(self) -> bool:
+        return self.gone.all()
+
+    @property
+    def gone_count(self) -> int:
+        return int(self.gone.sum())
+
+    def nearest_vertex(self, position: tuple, way_nr: int) -> tuple:
+        #Nearest vertex of a way and its distance (first one in case of equal distances)
+        coords = self.vertices[self.offsets[way_nr]:self.offsets[way_nr+1]]
+        distances = np.sqrt((coords[:, 0]-position[0])**2 + (coords[:, 1]-position[1])**2)
+        nr = int(np.argmin(distances))
+        return tuple(coords[nr].tolist()), float(distances[nr])
+
+    def candidates(self, position: tuple, polygon: bool, max_length: float) -> np.ndarray:
+        #Ways of the given type with a vertex within max_length, sorted by pool order
+        if polygon:
+            vertex_ids = self.tree_vertices[self.tree.query(Point(position), predicate='dwithin', distance=max_length+0.01)]
+            ways = np.unique(self.owner[vertex_ids])
+        else:
+            ways = np.flatnonzero(~self.polygon)
+        return ways[~self.gone[ways]]
+
+    def shortest_way(self, border: Polygon, position: tuple, polygon: bool) -> tuple:
+        #Returns (way nr, entry point, length) of the shortest valid direct way, way nr is None if there is none
+        remaining = np.flatnonzero((self.polygon == polygon) & ~self.gone)
+        if len(remaining) == 0:
+            return None, None, None
+        degenerate_length = 0.01 if polygon else 0
+        entry, max_length = self.nearest_vertex(position, remaining[0])
+        if max_length <= degenerate_length:
+            max_length = 0
+        ways = self.candidates(position, polygon, max_length)
+        entries = [self.nearest_vertex(position, way_nr) for way_nr in ways]
+        lengths = np.array([length for entry, length in entries])
+        lengths[lengths <= degenerate_length] = 0
+        selectable = lengths <= max_length
+        ways, entries, lengths = ways[selectable], [entry for entry, ok in zip(entries, selectable) if ok], lengths[selectable]
+        if len(ways) == 0:
+            return None, None, max_length
+        within, touches, _ = directway.check_nearest_ways(border, [(position, entry[0]) for entry in entries], degenerate_length)
+        valid = np.array(within) | (np.array(touches) & (lengths == 0))
+        if not valid.any():
+            return None, None, max_length
+        #shortest valid way, the last one of equal lengths (like the former sequential search)
+        order = np.lexsort((-ways, lengths))
+        nr = order[valid[order]][0]
+        return int(ways[nr]), entries[nr][0], float(lengths[nr])
+
+    def ring_route(self, way_nr: int, entry: tuple, position: tuple) -> list:
+        route_tmp = list(self.shapely[way_nr].exterior.coords)
+        route_tmp.pop(-1)
+        first_coords_nr = route_tmp.index(entry)
+        route_tmp = route_tmp[first_coords_nr:]+route_tmp[:first_coords_nr]
+        route_tmp.append(route_tmp[0])
+        #Check for cw or ccw, which way shorter
+        route_1 = [position]
+        route_1.extend(route_tmp)
+        route_2 = [position]
+        route_tmp.reverse()
+        route_2.extend(route_tmp)
+        if LineString((route_1)).length < LineString((route_2)).length:
             route_tmp.reverse()
-            route_2.extend(route_tmp)
-            route1_length = LineString((route_1)).length
-            route2_length = LineString((route_2)).length
-            if route1_length < route2_length:
-                route_tmp.reverse()
-            way_nr = i
-    return route_tmp, way_nr, current_shortest_way_length
+        return route_tmp
+
+    def goal(self, way_nr: int, position: tuple) -> tuple:
+        if self.polygon[way_nr]:
+            return self.nearest_vertex(position, way_nr)[0]
+        return tuple(self.vertices[self.offsets[way_nr]].tolist())
+
+    def remove(self, way_nr: int) -> None:
+        self.gone[way_nr] = True
 
 def split_multipolygons(current_polygons: MultiPolygon, width: float) -> list:
     polygons = []
     for polygon in current_polygons.geoms:
-        polygons.extend(create_polygons(polygon, width))
+        polygons.extend(create_polygons(polygon, width, offset_chains.offset(polygon, width, 0.02)))
     return polygons
 
-def create_polygons(current_polygon: Polygon, width: float) -> list:
+def create_polygons(current_polygon: Polygon, width: float, last_polygon: Polygon = None) -> list:
     polygons = []
     perimeter_coords = list(current_polygon.exterior.coords)
     polygons.append(Polygon((perimeter_coords)))
-    #Check if perimeter is last polygon and add a centroid
-    last_polygon = current_polygon.buffer(width, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
-    last_polygon = last_polygon.simplify(0.02, preserve_topology=False)
+    #Check if perimeter is last polygon and add a centroid (offset is taken from the chain, if already known)
+    if last_polygon is None:
+        last_polygon = offset_chains.offset(current_polygon, width, 0.02)
     if last_polygon.is_empty:
         centroid = current_polygon.centroid
         polygons.append(centroid)
@@ -92,9 +138,24 @@ def create_polygons(current_polygon: Polygon, width: float) -> list:
         polygons.append(Polygon((exclusion_coords)))
     return polygons
 
+def create_rings(areatomow, width: float) -> list:
+    #Offsets of the area to mow until nothing is left, every offset is splitted into its rings
+    polygons = []
+    chain = offset_chains.chain(areatomow, -width, 0.02)
+    for i, areatomow_tmp in enumerate(chain):
+        if areatomow_tmp.is_empty:
+            break
+        if areatomow_tmp.geom_type == 'Polygon':
+            polygons.extend(create_polygons(areatomow_tmp, -width, chain[i+1]))
+        elif areatomow_tmp.geom_type == 'MultiPolygon':
+            polygons.extend(split_multipolygons(areatomow_tmp, -width))
+        else:
+            logger.warning('Unknown figure')
+            break
+    return polygons
+
 def calcroute(areatomow, border, edge_pol, route, parameters):
     logger.info('Coverage path planner (rings): Start coverage path planner')
-    mowccw = parameters.mowborderccw
     logger.debug(parameters)
     pathfinder.create()
     pathfinder.angle = 0
@@ -105,21 +166,7 @@ def calcroute(areatomow, border, edge_pol, route, parameters):
         start_pos = None
     
     logger.info('Coverage path planner (rings): Create polygons')
-    areatomow_tmp = areatomow
-    polygons = []
-    while True:
-        if areatomow_tmp.is_empty:
-            logger.info('Coverage path planner (rings): Calculation done')
-            break
-        if areatomow_tmp.geom_type == 'Polygon':
-            polygons.extend(create_polygons(areatomow_tmp, -parameters.width))
-        elif areatomow_tmp.geom_type == 'MultiPolygon':
-            polygons.extend(split_multipolygons(areatomow_tmp, -parameters.width))
-        else:
-            logger.warning('Unknown figure')
-            break
-        areatomow_tmp = areatomow_tmp.buffer(-parameters.width, resolution=16, join_style=2, mitre_limit=1, single_sided=True)
-        areatomow_tmp = areatomow_tmp.simplify(0.02, preserve_topology=False)
+    polygons = create_rings(areatomow, parameters.width)
     
     if len(edge_pol) > 0:
         polygons.extend(edge_pol)
@@ -131,91 +178,40 @@ def calcroute(areatomow, border, edge_pol, route, parameters):
         return route
     
     logger.info('Coverage path planner (rings): Polygons created. Polygons to calculate: '+str(len(polygons)))
-    logger.info('Coverage path planner (calc rings): Create ways')
-    ways_to_go = pd.DataFrame()
-    for i, polygon in enumerate(polygons):
-        if polygon.geom_type == 'Polygon':
-            pol_df = pd.DataFrame({'name': 'polygon'+str(i), 'shapely': polygon, 'coords': [list(polygon.exterior.coords)], 'type': 'polygon', 'gone': False, 'take into account': True})
-        else:
-            pol_df = pd.DataFrame({'name': 'polygon'+str(i), 'shapely': polygon, 'coords': [list(polygon.coords)], 'type': 'point', 'gone': False, 'take into account': True})
-        ways_to_go = pd.concat([ways_to_go, pol_df], ignore_index=True)
+    ways_to_go = RingPool.create(polygons)
+    current_map.total_progress = len(ways_to_go)
     
     logger.info('Coverage path planner (calc rings): Starting loop')
-    while True:
-        gone_way_pol = None
-        gone_way_pt = None
-        ways = ways_to_go[ways_to_go['gone'] == False]
-        if ways.empty:
-            logger.info('Coverage path planner (calc rings): Calculation done')
-            break
-        ways_polygons = ways_to_go[(ways_to_go['type'] == 'polygon') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True)]
-        ways_points = ways_to_go[(ways_to_go['type'] == 'point') & (ways_to_go['gone'] == False) & (ways_to_go['take into account'] == True)]
-        logger.debug('Check for polygons to cut in range')
-        if not ways_polygons.empty:
-            possible_pol = ways_polygons
-            possible_pol = possible_pol.reset_index(drop=True)
-            route_pol_way, gone_way_pol, length_to_pol = shortest_path_to_exclusion(border, possible_pol['shapely'].to_list(), route)  
-        else:
-            logger.debug('No direct way to a polygon found')
-        if not ways_points.empty:
-            possible_pt = ways_points
-            possible_pt = possible_pt.reset_index(drop=True)
-            route_pt_way, gone_way_pt, length_to_pt = shortest_path_to_point(border, possible_pt['shapely'].to_list(), route)
+    while not ways_to_go.empty:
+        current_map.check_calc_cancelled()
+        gone_way_pol, entry_pol, length_to_pol = ways_to_go.shortest_way(border, route[-1], True)
+        gone_way_pt, entry_pt, length_to_pt = ways_to_go.shortest_way(border, route[-1], False)
         #Decide for a shortest way
-        if gone_way_pol != None and gone_way_pt != None:
-            if length_to_pol < length_to_pt:
-                index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==list(possible_pol.loc[gone_way_pol, 'shapely'].exterior.coords))].index.array[0] 
-                ways_to_go.at[index, 'gone'] = True
-                logger.debug('Found way to a polygon: Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-                route.extend(route_pol_way)  
-                # Progress-bar data
-                current_map.total_progress = len(ways_to_go)
-                current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
-            else:
-                index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==list(possible_pt.loc[gone_way_pt, 'shapely'].coords))].index.array[0]
-                ways_to_go.at[index, 'gone'] = True
-                logger.debug('Found way to a point: Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-                route.extend(route_pt_way)
-                # Progress-bar data
-                current_map.total_progress = len(ways_to_go)
-                current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
-        elif gone_way_pol != None:
-            index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==list(possible_pol.loc[gone_way_pol, 'shapely'].exterior.coords))].index.array[0] 
-            ways_to_go.at[index, 'gone'] = True
-            logger.debug('Found way to a polygon: Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-            route.extend(route_pol_way)
-            # Progress-bar data
-            current_map.total_progress = len(ways_to_go)
-            current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
+        if gone_way_pol != None and (gone_way_pt == None or length_to_pol < length_to_pt):
+            route.extend(ways_to_go.ring_route(gone_way_pol, entry_pol, route[-1]))
+            ways_to_go.remove(gone_way_pol)
+            logger.debug('Found way to a polygon: Finished: '+str(ways_to_go.gone_count)+'/'+str(len(ways_to_go)))
         elif gone_way_pt != None:
-            index = ways_to_go[ways_to_go['coords'].apply(lambda x: x==list(possible_pt.loc[gone_way_pt, 'shapely'].coords))].index.array[0]
-            ways_to_go.at[index, 'gone'] = True
-            logger.debug('Found way to a point: Finished: '+str(len(ways_to_go[ways_to_go['gone']==True]))+'/'+str(len(ways_to_go)))  
-            route.extend(route_pt_way)
-            # Progress-bar data
-            current_map.total_progress = len(ways_to_go)
-            current_map.calculated_progress = len(ways_to_go[ways_to_go['gone']==True])
+            route.append(entry_pt)
+            ways_to_go.remove(gone_way_pt)
+            logger.debug('Found way to a point: Finished: '+str(ways_to_go.gone_count)+'/'+str(len(ways_to_go)))
         else:
             logger.debug('No point for start over direct way found. Starting A* pathfinder') 
-            possible_goals = ways_to_go[ways_to_go['gone'] == False]
-            for i in range(len(possible_goals)):
-                if not possible_goals.empty:
-                    if possible_goals.iloc[i]['type'] == 'polygon':
-                        goal = nearest_points(Point(route[-1]), MultiPoint((list(possible_goals.iloc[i]['shapely'].exterior.coords))))[1]
-                    else:
-                        goal = nearest_points(Point(route[-1]), Point((list(possible_goals.iloc[i]['shapely'].coords))))[1]
-                    goal = list(goal.coords)
-                route_astar = pathfinder.find_way(route[-1], goal)
+            route_astar = []
+            for way_nr in np.flatnonzero(~ways_to_go.gone):
+                route_astar = pathfinder.find_way(route[-1], ways_to_go.goal(way_nr, route[-1]))
                 if route_astar != []:
-                    index = possible_goals.index.values[0]
                     route.extend(route_astar)
                     break
             if route_astar == []:
                 logger.warning('Coverage patha planner (rings): Could not finish calculation')
                 break
+        # Progress-bar data
+        current_map.calculated_progress = ways_to_go.gone_count
+    logger.info('Coverage path planner (calc rings): Calculation done')
 
     # Remove first point from the route. Let handle route from function above
     if start_pos != None:
         route.pop(0)   
 
-    return route
\ No newline at end of file
+    return route
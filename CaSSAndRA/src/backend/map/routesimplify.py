@@ -0,0 +1,68 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import time
+import numpy as np
+from dataclasses import dataclass
+from shapely.geometry import *
+
+from .directway import directway
+
+#Post processing of a planned route before it is uploaded as waypoints. Duplicate and collinear points
+#are removed, then a Douglas-Peucker pass removes points closer than tolerance to the shortcut.
+#A shortcut is only taken, if it is a direct way within the border. Long routes are simplified in chunks
+#(chunk ends are kept), so the effort stays linear for big maps.
+@dataclass
+class RouteSimplifier:
+    enabled: bool = True
+    tolerance: float = 0.02
+    collinear_tolerance: float = 1e-6
+    max_chunk: int = 500
+
+    def simplify(self, border: Polygon, route: list) -> tuple:
+        #Returns simplified route and number of points before and after
+        points = dict(before=len(route), after=len(route))
+        if not self.enabled or len(route) < 3:
+            return route, points
+        start_time = time.perf_counter()
+        coords = np.asarray(route, dtype=float).reshape(-1, 2)
+        #duplicates
+        duplicate = np.zeros(len(coords), dtype=bool)
+        duplicate[1:] = (np.abs(np.diff(coords, axis=0)) <= self.collinear_tolerance).all(axis=1)
+        coords = coords[~duplicate]
+        #collinear points (shape of the route does not change, no border check needed)
+        coords = coords[self.douglas_peucker(border, coords, self.collinear_tolerance, False)]
+        if self.tolerance > self.collinear_tolerance:
+            coords = coords[self.douglas_peucker(border, coords, self.tolerance, True)]
+        points['after'] = len(coords)
+        logger.info('Route simplification: '+str(points['before'])+' -> '+str(points['after'])+' points (in '+str(round(time.perf_counter()-start_time, 2))+'s)')
+        return [tuple(point) for point in coords.tolist()], points
+
+    def douglas_peucker(self, border: Polygon, coords: np.ndarray, tolerance: float, check_border: bool) -> np.ndarray:
+        keep = np.zeros(len(coords), dtype=bool)
+        keep[::self.max_chunk] = True
+        keep[-1] = True
+        stack = [(int(start), int(end)) for start, end in zip(np.flatnonzero(keep)[:-1], np.flatnonzero(keep)[1:])]
+        while stack:
+            start, end = stack.pop()
+            if end - start < 2:
+                continue
+            distances = self.segment_distances(coords[start+1:end], coords[start], coords[end])
+            farthest = start + 1 + int(np.argmax(distances))
+            if distances.max() > tolerance or (check_border and not directway.check(border, tuple(coords[start]), tuple(coords[end]))):
+                keep[farthest] = True
+                stack.append((start, farthest))
+                stack.append((farthest, end))
+        return keep
+
+    def segment_distances(self, points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        #Distance to the segment (not the line), so turning points of a way back are kept
+        direction = end - start
+        length = direction.dot(direction)
+        if length == 0:
+            return np.hypot(*(points-start).T)
+        t = np.clip((points-start).dot(direction)/length, 0, 1)
+        projection = start + t[:, None]*direction
+        return np.hypot(*(points-projection).T)
+
+route_simplifier = RouteSimplifier()
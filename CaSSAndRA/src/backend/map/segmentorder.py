@@ -0,0 +1,150 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import time
+import numpy as np
+from dataclasses import dataclass
+from shapely.geometry import *
+
+from ..data.mapdata import current_map
+from .tour import connect
+
+#Post optimization of the lines planner: mow lines (both directions allowed) and exclusion edges
+#are ordered as an open tour from the start point. Nearest neighbor seed, then 2-opt and Or-opt moves
+#on Euclidean distances until no move improves or time budget is used up. The optimized route is only
+#taken, if it is shorter than the route of the planner (mow lines are the same, so only transit changes).
+#Exclusion edges are closed rings: they start and end at the same vertex and keep the direction of cutedge (mowborderccw).
+#Costs up to time_budget per plan, so it is off by default (pathplannercfg segmentorder, applied in the planning worker)
+@dataclass
+class SegmentOrder:
+    enabled: bool = False
+    time_budget: float = 1.0
+    max_chain: int = 3
+
+    def optimize(self, border: Polygon, lines: list, edges: list, start: list, route: list) -> list:
+        if len(lines) + len(edges) < 3:
+            return route
+        start_time = time.perf_counter()
+        deadline = start_time + self.time_budget
+        ways = [[tuple(coords) for coords in line] for line in lines] + [list(edge.exterior.coords)[:-1] for edge in edges]
+        rings = np.array([False]*len(lines) + [True]*len(edges))
+        order, flip, ways = self.seed(ways, rings, start[-1])
+        first, last = self.endpoints(ways, rings)
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            current_map.check_calc_cancelled()
+            improved = self.two_opt(order, flip, first, last, start[-1], deadline)
+            improved = self.or_opt(order, flip, first, last, start[-1], deadline) or improved
+        route_optimized = list(start) if len(start) > 1 else []
+        for way_nr, flipped in zip(order.tolist(), flip.tolist()):
+            way = ways[way_nr]
+            if rings[way_nr]:
+                way = way + [way[0]]
+            elif flipped:
+                way = way[::-1]
+            if not connect(border, route_optimized, way):
+                logger.info('Segment order: No connection found, keep route of planner')
+                return route
+        length, length_optimized = LineString(route).length, LineString(route_optimized).length
+        logger.info('Segment order: '+str(len(order))+' ways, route length '+str(round(length, 1))+'m -> '+str(round(length_optimized, 1))+'m (in '+str(round(time.perf_counter()-start_time, 2))+'s)')
+        if length_optimized < length:
+            return route_optimized
+        return route
+
+    def seed(self, ways: list, rings: np.ndarray, position: tuple) -> tuple:
+        #Nearest neighbor tour, edges are rotated to start at the vertex nearest to the previous way
+        first, last = self.endpoints(ways, rings)
+        ring_coords = {way_nr: np.asarray(ways[way_nr], dtype=float) for way_nr in np.flatnonzero(rings)}
+        to_go = np.ones(len(ways), dtype=bool)
+        order, flip = [], []
+        for i in range(len(ways)):
+            for way_nr, coords in ring_coords.items():
+                if to_go[way_nr]:
+                    first[way_nr] = last[way_nr] = coords[np.argmin(np.hypot(coords[:, 0]-position[0], coords[:, 1]-position[1]))]
+            distances = np.stack((np.hypot(first[:, 0]-position[0], first[:, 1]-position[1]), np.hypot(last[:, 0]-position[0], last[:, 1]-position[1])))
+            distances[:, ~to_go] = np.inf
+            flipped, way_nr = np.unravel_index(np.argmin(distances), distances.shape)
+            to_go[way_nr] = False
+            order.append(way_nr)
+            flip.append(bool(flipped))
+            position = first[way_nr] if flipped else last[way_nr]
+        for way_nr, coords in ring_coords.items():
+            nr = int(np.flatnonzero((coords == first[way_nr]).all(axis=1))[0])
+            ways[way_nr] = ways[way_nr][nr:]+ways[way_nr][:nr]
+        return np.array(order, dtype=int), np.array(flip, dtype=bool), ways
+
+    def endpoints(self, ways: list, rings: np.ndarray) -> tuple:
+        #A ring is closed in the route, it ends at its first vertex (flip does not change entry and exit)
+        first = np.array([way[0] for way in ways], dtype=float).reshape(-1, 2)
+        last = np.array([way[-1] for way in ways], dtype=float).reshape(-1, 2)
+        last[rings] = first[rings]
+        return first, last
+
+    def tour_points(self, order: np.ndarray, flip: np.ndarray, first: np.ndarray, last: np.ndarray) -> tuple:
+        entries = np.where(flip[:, None], last[order], first[order])
+        exits = np.where(flip[:, None], first[order], last[order])
+        return entries, exits
+
+    def two_opt(self, order: np.ndarray, flip: np.ndarray, first: np.ndarray, last: np.ndarray, position: tuple, deadline: float) -> bool:
+        #Reverse order[i:j+1] (and direction of these ways), only the two connections at the ends change
+        improved = False
+        n = len(order)
+        for i in range(n):
+            if time.perf_counter() > deadline:
+                break
+            entries, exits = self.tour_points(order, flip, first, last)
+            previous = np.asarray(position, dtype=float) if i == 0 else exits[i-1]
+            j = np.arange(i, n)
+            next_entries = np.vstack((entries[i+1:], entries[-1:]))
+            has_next = j < n-1
+            old = np.hypot(*(previous-entries[i])) + np.where(has_next, np.hypot(*(exits[j]-next_entries).T), 0)
+            new = np.hypot(*(previous-exits[j]).T) + np.where(has_next, np.hypot(*(entries[i]-next_entries).T), 0)
+            delta = new - old
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-6:
+                k = i + best
+                order[i:k+1] = order[i:k+1][::-1].copy()
+                flip[i:k+1] = ~flip[i:k+1][::-1]
+                improved = True
+        return improved
+
+    def or_opt(self, order: np.ndarray, flip: np.ndarray, first: np.ndarray, last: np.ndarray, position: tuple, deadline: float) -> bool:
+        #Move a chain of up to max_chain ways to another place (forward or reversed)
+        improved = False
+        for chain in range(1, self.max_chain+1):
+            s = 0
+            while s + chain <= len(order):
+                if time.perf_counter() > deadline:
+                    return improved
+                n = len(order)
+                e = s + chain - 1
+                entries, exits = self.tour_points(order, flip, first, last)
+                #exits of position -1 (start point) .. n-1 and entries of the following way (none after last way)
+                exits_all = np.vstack((np.asarray(position, dtype=float).reshape(1, 2), exits))
+                entries_next = np.vstack((entries, entries[-1:]))
+                has_next = np.arange(-1, n) < n-1
+                removal = np.hypot(*(exits_all[s]-entries[s])) + (np.hypot(*(exits[e]-entries[e+1])) - np.hypot(*(exits_all[s]-entries[e+1])) if e < n-1 else 0)
+                base = np.where(has_next, np.hypot(*(exits_all-entries_next).T), 0)
+                forward = np.hypot(*(exits_all-entries[s]).T) + np.where(has_next, np.hypot(*(exits[e]-entries_next).T), 0) - base
+                backward = np.hypot(*(exits_all-exits[e]).T) + np.where(has_next, np.hypot(*(entries[s]-entries_next).T), 0) - base
+                #insert after position k (-1 = start point), not inside or next to the chain itself
+                invalid = np.zeros(n+1, dtype=bool)
+                invalid[s:e+2] = True
+                forward[invalid] = backward[invalid] = np.inf
+                candidates = np.stack((forward, backward)) - removal
+                reversed_chain, k = np.unravel_index(np.argmin(candidates), candidates.shape)
+                if candidates[reversed_chain, k] < -1e-6:
+                    k = k - 1
+                    chain_order, chain_flip = order[s:e+1].copy(), flip[s:e+1].copy()
+                    if reversed_chain:
+                        chain_order, chain_flip = chain_order[::-1], ~chain_flip[::-1]
+                    rest_order, rest_flip = np.delete(order, np.s_[s:e+1]), np.delete(flip, np.s_[s:e+1])
+                    insert = k+1 if k < s else k+1-chain
+                    order[:] = np.concatenate((rest_order[:insert], chain_order, rest_order[insert:]))
+                    flip[:] = np.concatenate((rest_flip[:insert], chain_flip, rest_flip[insert:]))
+                    improved = True
+                else:
+                    s += 1
+        return improved
+
+segment_order = SegmentOrder()
@@ -0,0 +1,28 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from shapely.geometry import *
+
+from .pathfinder import pathfinder
+from .directway import directway
+
+#Helpers for planners, which mow a sequence of ways (cells, lines, exclusion edges) in a given order
+
+def connect(border: Polygon, route: list, way: list) -> bool:
+    #Appends way to route, use pathfinder if there is no direct way. Returns False if no connection is found
+    if route == []:
+        route.extend(way)
+        return True
+    #way starts at the end of the route (zero length ways are no direct ways)
+    if tuple(route[-1]) == tuple(way[0]):
+        route.extend(way[1:])
+        return True
+    if directway.check(border, route[-1], way[0]):
+        route.extend(way)
+        return True
+    route_astar = pathfinder.find_way(route[-1], way[0])
+    if route_astar == []:
+        return False
+    route.extend(route_astar[1:-1])
+    route.extend(way)
+    return True
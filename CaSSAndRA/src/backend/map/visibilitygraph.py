@@ -0,0 +1,186 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import networkx as nx
+import shapely
+from shapely import STRtree
+from shapely.geometry import *
+
+from .directway import directway
+
+#Vectorized builder for the A* visibility graph. All candidate pairs are created as numpy arrays,
+#pruned by bounding box and midpoint test, then classified against the border segments (STRtree).
+#Only pairs touching the border in a degenerated way are checked by shapely
+
+CHUNK_SIZE = 5000
+TOLERANCE = 1e-9
+
+def border_segments(polygon: Polygon) -> tuple:
+    #point in polygon tests use the prepared border
+    shapely.prepare(polygon)
+    starts = []
+    ends = []
+    for ring in [polygon.exterior, *polygon.interiors]:
+        coords = np.asarray(ring.coords, dtype=float).reshape(-1, 2)
+        starts.append(coords[:-1])
+        ends.append(coords[1:])
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    tree = STRtree(shapely.linestrings(np.stack((starts, ends), axis=1)))
+    return starts, ends, tree
+
+def orientation(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    return (b[:, 0]-a[:, 0])*(c[:, 1]-a[:, 1]) - (b[:, 1]-a[:, 1])*(c[:, 0]-a[:, 0])
+
+def robust_sign(values: np.ndarray, tolerance: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(values) <= tolerance, 0, np.sign(values))
+
+def classify(polygon: Polygon, segments: tuple, starts: np.ndarray, ends: np.ndarray) -> tuple:
+    #Returns (crossing, ambiguous) for every way
+    c_all, d_all, tree = segments
+    crossing = np.zeros(len(starts), dtype=bool)
+    ambiguous = (starts == ends).all(axis=1)
+    line_idx, segment_idx = tree.query(shapely.linestrings(np.stack((starts, ends), axis=1)))
+    if len(line_idx) == 0:
+        return crossing, ambiguous
+    a, b = starts[line_idx], ends[line_idx]
+    c, d = c_all[segment_idx], d_all[segment_idx]
+    scale = TOLERANCE*(1 + max(np.abs(polygon.bounds).max(), np.abs(starts).max(), np.abs(ends).max()))
+    tolerance_ab = scale*np.hypot(*(b-a).T)
+    tolerance_cd = scale*np.hypot(*(d-c).T)
+    s1 = robust_sign(orientation(a, b, c), tolerance_ab)
+    s2 = robust_sign(orientation(a, b, d), tolerance_ab)
+    s3 = robust_sign(orientation(c, d, a), tolerance_cd)
+    s4 = robust_sign(orientation(c, d, b), tolerance_cd)
+    disjoint = (s1*s2 > 0) | (s3*s4 > 0)
+    proper_crossing = (s1*s2 < 0) & (s3*s4 < 0)
+    #Border segments starting/ending in a way endpoint only touch the way there, if not collinear
+    c_shared = (c == a).all(axis=1) | (c == b).all(axis=1)
+    d_shared = (d == a).all(axis=1) | (d == b).all(axis=1)
+    incident = (c_shared & ~d_shared & (s2 != 0)) | (d_shared & ~c_shared & (s1 != 0))
+    crossing |= np.bincount(line_idx, weights=proper_crossing, minlength=len(starts)) > 0
+    ambiguous |= np.bincount(line_idx, weights=~(disjoint | proper_crossing | incident), minlength=len(starts)) > 0
+    return crossing, ambiguous
+
+def visible(polygon: Polygon, starts: np.ndarray, ends: np.ndarray, segments: tuple = None) -> np.ndarray:
+    result = np.zeros(len(starts), dtype=bool)
+    if len(starts) == 0:
+        return result
+    if segments is None:
+        segments = border_segments(polygon)
+    #Bounding box pass
+    minx, miny, maxx, maxy = polygon.bounds
+    candidates = (np.minimum(starts[:, 0], ends[:, 0]) >= minx) & (np.maximum(starts[:, 0], ends[:, 0]) <= maxx)
+    candidates &= (np.minimum(starts[:, 1], ends[:, 1]) >= miny) & (np.maximum(starts[:, 1], ends[:, 1]) <= maxy)
+    #Midpoint pass, a way within the polygon has its midpoint in the (closed) polygon
+    idx = np.flatnonzero(candidates)
+    midpoints = (starts[idx] + ends[idx])/2
+    idx = idx[shapely.intersects_xy(polygon, midpoints[:, 0], midpoints[:, 1])]
+    for chunk_start in range(0, len(idx), CHUNK_SIZE):
+        chunk = idx[chunk_start:chunk_start+CHUNK_SIZE]
+        crossing, ambiguous = classify(polygon, segments, starts[chunk], ends[chunk])
+        #Ways without any contact to the border are completely inside or outside
+        clear = ~crossing & ~ambiguous
+        midpoints = (starts[chunk[clear]] + ends[chunk[clear]])/2
+        result[chunk[clear]] = shapely.contains_xy(polygon, midpoints[:, 0], midpoints[:, 1])
+        #Exact check for ways touching the border
+        checked = chunk[ambiguous & ~crossing]
+        result[checked] = directway.check_many(polygon, starts[checked], ends[checked])
+    return result
+
+def visible_matrix(polygon: Polygon, starts: np.ndarray, ends: np.ndarray, segments: tuple = None) -> np.ndarray:
+    starts_idx, ends_idx = np.meshgrid(np.arange(len(starts)), np.arange(len(ends)), indexing='ij')
+    mask = visible(polygon, starts[starts_idx.ravel()], ends[ends_idx.ravel()], segments)
+    return mask.reshape(len(starts), len(ends))
+
+def visible_matrix_symmetric(polygon: Polygon, coords: np.ndarray, segments: tuple = None) -> np.ndarray:
+    upper_i, upper_k = np.triu_indices(len(coords), 1)
+    mask = np.zeros((len(coords), len(coords)), dtype=bool)
+    mask[upper_i, upper_k] = visible(polygon, coords[upper_i], coords[upper_k], segments)
+    mask |= mask.T
+    return mask
+
+def weighted_edges(starts: list, ends: list, factor: float = 1) -> list:
+    lengths = shapely.length(shapely.linestrings(np.stack((np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)), axis=1)))
+    return [(start, end, length*factor) for start, end, length in zip(starts, ends, lengths.tolist())]
+
+def add_edges(edges: list, starts: list, ends: list, factor: float = 1) -> None:
+    if starts:
+        edges.extend(weighted_edges(starts, ends, factor))
+
+def ring_edges(edges: list, coords: list) -> None:
+    add_edges(edges, coords[:-1], coords[1:])
+
+def create_edges(polygon: Polygon, search_wire: LineString) -> list:
+    #Returns the weighted edges (start, end, weight) in insertion order
+    edges = []
+    segments = border_segments(polygon)
+    #Create networkx edges for perimeter
+    logger.info('Create networkx edges for perimeter (A* pathfinder)')
+    perimeter_coords = list(polygon.exterior.coords)
+    perimeter_array = np.asarray(perimeter_coords[:-1], dtype=float).reshape(-1, 2)
+    perimeter_mask = visible_matrix_symmetric(polygon, perimeter_array, segments)
+    for i in range(len(perimeter_coords)-1):
+        starts = [perimeter_coords[i]]
+        ends = [perimeter_coords[i+1]]
+        for k in np.flatnonzero(perimeter_mask[i]):
+            starts.append(perimeter_coords[i])
+            ends.append(perimeter_coords[k])
+        add_edges(edges, starts, ends)
+    logger.debug('NetworkX perimeter edges (candidates): '+str(len(edges)))
+
+    #Create networkx edges for exclusions
+    logger.info('Create networkx edges for exclusions (A* pathfinder)')
+    exclusions_coords = [list(excl.coords) for excl in polygon.interiors]
+    for excl_coords in exclusions_coords:
+        ring_edges(edges, excl_coords)
+
+    #Create networkx edges betweed exclusions and perimeter
+    logger.info('Create networkx edges between exclusions and perimeter (A* pathfinder)')
+    for excl_coords in exclusions_coords:
+        excl_array = np.asarray(excl_coords[:-1], dtype=float).reshape(-1, 2)
+        mask = visible_matrix(polygon, excl_array, perimeter_array, segments)
+        idx_i, idx_k = np.nonzero(mask)
+        add_edges(edges, [excl_coords[i] for i in idx_i], [perimeter_coords[k] for k in idx_k])
+        if not mask.any():
+            logger.info('One exclusion could not be connected to perimeter')
+            logger.info('Trying to connect to other exclusions')
+            for l in range(len(excl_coords)-1):
+                for other_exclusion_coords in exclusions_coords:
+                    other_array = np.asarray(other_exclusion_coords, dtype=float).reshape(-1, 2)
+                    other_mask = visible(polygon, np.repeat(excl_array[l:l+1], len(other_array), axis=0), other_array, segments)
+                    add_edges(edges, [excl_coords[l]]*int(other_mask.sum()), [other_exclusion_coords[m] for m in np.flatnonzero(other_mask)])
+
+    #Create networkx edges from search wire
+    logger.info('Create networkx edges for search wire (A* pathfinder)')
+    if not search_wire.is_empty:
+        search_wire_coords = list(search_wire.coords)
+        search_wire_array = np.asarray(search_wire_coords, dtype=float).reshape(-1, 2)
+        perimeter_points_coords = list(perimeter_coords)
+        for excl_coords in exclusions_coords:
+            perimeter_points_coords.extend(excl_coords)
+        perimeter_points_array = np.asarray(perimeter_points_coords, dtype=float).reshape(-1, 2)
+        search_wire_mask = visible_matrix(polygon, search_wire_array[:-1], search_wire_array, segments)
+        search_wire_perimeter_mask = visible_matrix(polygon, search_wire_array[:-1], perimeter_points_array, segments)
+        for i in range(len(search_wire_coords)-1):
+            starts = [search_wire_coords[i]]
+            ends = [search_wire_coords[i+1]]
+            for k in np.flatnonzero(search_wire_mask[i]):
+                starts.append(search_wire_coords[i])
+                ends.append(search_wire_coords[k])
+            add_edges(edges, starts, ends, 0.5)
+            idx = np.flatnonzero(search_wire_perimeter_mask[i])
+            add_edges(edges, [search_wire_coords[i]]*len(idx), [perimeter_points_coords[k] for k in idx])
+    else:
+        logger.info('No search wire found.')
+    return edges
+
+def create_graph(edges: list) -> nx.Graph:
+    G = nx.Graph()
+    G.add_weighted_edges_from(edges, weight='weight')
+    logger.debug('NetworkX graph created. Nodes: '+str(len(G.nodes))+' Edges: '+str(len(G.edges)))
+    return G
+
+def create(polygon: Polygon, search_wire: LineString) -> nx.Graph:
+    return create_graph(create_edges(polygon, search_wire))
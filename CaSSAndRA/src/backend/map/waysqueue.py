@@ -0,0 +1,158 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+from dataclasses import dataclass, field
+from shapely import STRtree, points, box
+
+#Work queue for coverage path planners. Holds the ways (lines and edges) in numpy arrays,
+#endpoints are indexed by a STRtree. Removed ways are only masked, the index is rebuilt
+#if the amount of alive ways is less than the half of indexed ways. Alive masks per type and
+#alive ids per type and level are updated on remove, so a query does not scan the whole queue
+@dataclass
+class WaysQueue:
+    shapely: list = field(default_factory=list)
+    coords: list = field(default_factory=list)
+    types: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=object))
+    level_min: np.ndarray = field(default_factory=lambda: np.empty(0))
+    level_max: np.ndarray = field(default_factory=lambda: np.empty(0))
+    gone: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    start: np.ndarray = field(default_factory=lambda: np.empty((0, 2)))
+    end: np.ndarray = field(default_factory=lambda: np.empty((0, 2)))
+    finished: int = 0
+    alive: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    type_masks: dict = field(default_factory=dict)
+    type_ids: dict = field(default_factory=dict)
+    level_ids: dict = field(default_factory=dict)
+    _types: list = field(default_factory=list)
+    _level_min: list = field(default_factory=list)
+    _level_max: list = field(default_factory=list)
+    _indexed: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+    _start_tree: STRtree = None
+    _end_tree: STRtree = None
+
+    def add(self, shapely, coords: list, type: str, level_min: int = None, level_max: int = None) -> int:
+        self.shapely.append(shapely)
+        self.coords.append(coords)
+        self._types.append(type)
+        self._level_min.append(np.nan if level_min is None else level_min)
+        self._level_max.append(np.nan if level_max is None else level_max)
+        return len(self.coords) - 1
+
+    def build(self) -> None:
+        self.types = np.array(self._types, dtype=object)
+        self.level_min = np.array(self._level_min, dtype=float)
+        self.level_max = np.array(self._level_max, dtype=float)
+        self.gone = np.zeros(len(self.coords), dtype=bool)
+        self.start = np.array([coords[0] for coords in self.coords], dtype=float).reshape(-1, 2)
+        self.end = np.array([coords[-1] for coords in self.coords], dtype=float).reshape(-1, 2)
+        self.finished = 0
+        self.alive = np.ones(len(self.coords), dtype=bool)
+        self.type_masks = {type: self.types == type for type in set(self._types)}
+        self.type_ids = {type: set(np.flatnonzero(mask).tolist()) for type, mask in self.type_masks.items()}
+        self.level_ids = dict()
+        for way_id, (type, level_min) in enumerate(zip(self._types, self._level_min)):
+            if not np.isnan(level_min):
+                self.level_ids.setdefault((type, int(level_min)), set()).add(way_id)
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        self._indexed = np.flatnonzero(~self.gone)
+        if len(self._indexed) == 0:
+            self._start_tree = None
+            self._end_tree = None
+            return
+        self._start_tree = STRtree(points(self.start[self._indexed]))
+        self._end_tree = STRtree(points(self.end[self._indexed]))
+        logger.debug('Ways queue: index rebuilt with '+str(len(self._indexed))+' ways')
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    @property
+    def empty(self) -> bool:
+        return self.finished >= len(self.coords)
+
+    def remove(self, way_id: int) -> None:
+        if self.gone[way_id]:
+            return
+        self.gone[way_id] = True
+        self.alive[way_id] = False
+        type = self.types[way_id]
+        self.type_masks[type][way_id] = False
+        self.type_ids[type].discard(way_id)
+        if not np.isnan(self.level_min[way_id]):
+            self.level_ids[(type, int(self.level_min[way_id]))].discard(way_id)
+        self.finished += 1
+        if 2*(len(self.coords) - self.finished) < len(self._indexed):
+            self._rebuild_index()
+
+    def count(self, type: str = None) -> int:
+        #Number of alive ways (of type)
+        if type is None:
+            return len(self.coords) - self.finished
+        return len(self.type_ids.get(type, ()))
+
+    def mask(self, type: str = None) -> np.ndarray:
+        #Alive mask (of type), maintained by remove. Do not modify
+        if type is None:
+            return self.alive
+        if type not in self.type_masks:
+            return np.zeros(len(self.coords), dtype=bool)
+        return self.type_masks[type]
+
+    def ids(self, type: str = None, level_min_range: tuple = None, level: int = None) -> np.ndarray:
+        #Sorted ids of alive ways, level_min_range is looked up in the level buckets, level filters the ways of type
+        if level_min_range is not None:
+            ids = set()
+            for level_min in range(int(level_min_range[0]), int(level_min_range[1])+1):
+                ids.update(self.level_ids.get((type, level_min), ()))
+        elif type is not None:
+            ids = self.type_ids.get(type, set())
+        else:
+            return np.flatnonzero(self.alive)
+        ids = np.array(sorted(ids), dtype=int)
+        if level is not None and len(ids) > 0:
+            ids = ids[(self.level_min[ids] <= level) & (self.level_max[ids] >= level)]
+        return ids
+
+    def nearest(self, point: tuple, type: str = None, ids: np.ndarray = None, use_end: bool = False) -> int:
+        #Returns the id of the way with the nearest start (or end) point to the given point, ties to the lowest id.
+        #Candidates are the given ids (compared directly) or all alive ways of type (STRtree)
+        xy = self.end if use_end else self.start
+        if ids is not None:
+            if len(ids) == 0:
+                return None
+            return self._pick(np.asarray(ids), xy, point[0], point[1])
+        if self.count(type) == 0:
+            return None
+        mask = self.mask(type)
+        if self._start_tree is None:
+            return self._nearest_brute(point, mask, use_end)
+        tree = self._end_tree if use_end else self._start_tree
+        x, y = point[0], point[1]
+        #Try nearest alive indexed ways first
+        candidates = self._indexed[tree.query_nearest(points(x, y), all_matches=True)]
+        candidates = candidates[mask[candidates]]
+        if len(candidates) > 0:
+            return self._pick(candidates, xy, x, y)
+        #Expanding box search, every way outside the box is farther away than the half box size
+        radius = max(np.sqrt((xy[self._indexed[0], 0]-x)**2 + (xy[self._indexed[0], 1]-y)**2), 0.01)
+        max_radius = 2*(np.ptp(xy[:, 0]) + np.ptp(xy[:, 1]) + abs(x) + abs(y)) + 1
+        while radius <= max_radius:
+            radius *= 2
+            candidates = self._indexed[tree.query(box(x-radius, y-radius, x+radius, y+radius))]
+            candidates = candidates[mask[candidates]]
+            if len(candidates) > 0:
+                way_id = self._pick(candidates, xy, x, y)
+                if (xy[way_id, 0]-x)**2 + (xy[way_id, 1]-y)**2 <= radius**2:
+                    return way_id
+        return self._nearest_brute(point, mask, use_end)
+
+    def _nearest_brute(self, point: tuple, mask: np.ndarray, use_end: bool) -> int:
+        xy = self.end if use_end else self.start
+        return self._pick(np.flatnonzero(mask), xy, point[0], point[1])
+
+    def _pick(self, candidates: np.ndarray, xy: np.ndarray, x: float, y: float) -> int:
+        distances = (xy[candidates, 0]-x)**2 + (xy[candidates, 1]-y)**2
+        return int(candidates[distances == distances.min()].min())
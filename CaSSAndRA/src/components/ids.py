@@ -14,6 +14,7 @@ MAPPINGINTERVAL = 'mapping-interval'
 MOWPERCENTAGE = 'mow-percentage'
 PROGRESSBARINTERVAL = 'progress-bar-interval'
 CHARTSINTERVAL = 'charts-interval'
+TASKMAPINTERVAL = 'task-map-interval'
 URLUPDATE = 'url-update'
 JOYSTICK = 'joystick'
 LINEAR_SPEED = 'linear-speed'
@@ -46,6 +47,7 @@ BUTTONGOTO = 'button-goto'
 BUTTONHOME = 'button-home'
 BUTTONMOWALL = 'button-mow-all'
 BUTTONMOWSETTINGS = 'button-mow-settings'
+BUTTONREPLANOBSTACLES = 'button-replan-obstacles'
 BUTTONSTOP = 'button-stop'
 BUTTONSHORTCUTSELECT= 'button-shortcut-select'
 BUTTONGROUPAREAHTML = 'buttongroup-area-html'
@@ -61,6 +63,8 @@ MODALSTATS = 'modal-stats'
 INPUTPATTERNSTATE = 'input-pattern-state'
 INPUTMOWOFFSETSTATE = 'input-mowoffset-state'
 INPUTMOWOANGLESTATE = 'input-mowangle-state'
+INPUTMOWANGLEAUTOSTATE = 'input-mowangle-auto-state'
+ANGLESCORESSTATE = 'angle-scores-state'
 INPUTDISTANCETOBORDERSTATE = 'input-distance-to-border-state'
 INPUTMOWAREASTATE = 'input-mow-area-state'
 INPUTMOWCUTEDGEBORDERSTATE = 'input-mow-cut-edge-border-state'
@@ -98,6 +102,7 @@ DROPDOWNTASKSORDER = 'dropdown-tasks-order'
 INPUTPATTERNTASK = 'input-pattern-task'
 INPUTMOWOFFSETTASK = 'input-mowoffset-task'
 INPUTMOWOANGLETASK = 'input-mowangle-task'
+INPUTMOWANGLEAUTOTASK = 'input-mowangle-auto-task'
 INPUTDISTANCETOBORDERTASK = 'input-distancetoborder-task'
 INPUTMOWAREATASK = 'input-mow-area-task'
 INPUTMOWCUTEDGEBORDERTASK = 'input-mow-cut-edge-border-task'
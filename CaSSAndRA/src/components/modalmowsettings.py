@@ -3,12 +3,14 @@ import dash_bootstrap_components as dbc
 
 from . import ids
 from src.backend.data.cfgdata import pathplannercfgstate
+from src.backend.map.planningjobs import planning_jobs
 
 from . import mowsettingstemplate as mst
 
 template = mst.get_mow_settings_template(ids.INPUTPATTERNSTATE, pathplannercfgstate.pattern,
                                         ids.INPUTMOWOFFSETSTATE, pathplannercfgstate.width,
                                         ids.INPUTMOWOANGLESTATE, pathplannercfgstate.angle,
+                                        ids.INPUTMOWANGLEAUTOSTATE, pathplannercfgstate.angleauto,
                                         ids.INPUTDISTANCETOBORDERSTATE, pathplannercfgstate.distancetoborder,
                                         ids.INPUTMOWCUTEDGEBORDERSTATE, pathplannercfgstate.mowborder, 
                                         ids.INPUTMOWAREASTATE, pathplannercfgstate.mowarea,
@@ -20,6 +22,7 @@ mowsettings = dbc.Modal([
                 dbc.ModalHeader(dbc.ModalTitle('Mow settings')),
                 dbc.ModalBody([
                     template,                    
+                    html.Div(id=ids.ANGLESCORESSTATE),
                 ], style={"padding-top" : 0, "padding-bottom" : 0}),
                 dbc.ModalFooter(
                     dbc.Button('OK', id=ids.BUTTONOKINPUTMAPSETTINGS, className='ms-auto', n_clicks=0)
@@ -33,6 +36,7 @@ mowsettings = dbc.Modal([
            State(ids.INPUTPATTERNSTATE, 'value'),
            State(ids.INPUTMOWOFFSETSTATE, 'value'),
            State(ids.INPUTMOWOANGLESTATE, 'value'),
+           State(ids.INPUTMOWANGLEAUTOSTATE, 'value'),
            State(ids.INPUTDISTANCETOBORDERSTATE, 'value'),
            State(ids.INPUTMOWAREASTATE, 'value'),
            State(ids.INPUTMOWCUTEDGEBORDERSTATE, 'value'),
@@ -44,6 +48,7 @@ def toggle_modal(n_clicks_bms: int,
                  pattern: str,
                  mowoffset: float, 
                  mowangle: int,
+                 mowangleauto: bool,
                  distancetoborder: int, 
                  mowarea: bool,
                  mowborder: str, 
@@ -52,13 +57,14 @@ def toggle_modal(n_clicks_bms: int,
                  ) -> bool:
     context = ctx.triggered_id
     if context == ids.BUTTONOKINPUTMAPSETTINGS:
-        if pattern != 'lines' and pattern != 'squares' and pattern != 'rings':
+        if pattern != 'lines' and pattern != 'squares' and pattern != 'rings' and pattern != 'cells':
             pathplannercfgstate.pattern = 'lines'
         else:
             pathplannercfgstate.pattern = pattern
         if mowoffset != None:
             pathplannercfgstate.width = mowoffset
         pathplannercfgstate.angle = mowangle
+        pathplannercfgstate.angleauto = bool(mowangleauto)
         if distancetoborder != None:
             pathplannercfgstate.distancetoborder = distancetoborder
         pathplannercfgstate.mowarea = mowarea
@@ -72,6 +78,7 @@ def toggle_modal(n_clicks_bms: int,
 
 @callback(Output(ids.INPUTMOWOFFSETSTATE, 'value'),
           Output(ids.INPUTMOWOANGLESTATE, 'value'),
+          Output(ids.INPUTMOWANGLEAUTOSTATE, 'value'),
           Output(ids.INPUTMOWCUTEDGEBORDERSTATE, 'value'),
           Output(ids.INPUTDISTANCETOBORDERSTATE, 'value'),
           Output(ids.INPUTPATTERNSTATE, 'value'),
@@ -80,5 +87,25 @@ def toggle_modal(n_clicks_bms: int,
           Output(ids.INPUTMOWCUTEDGEBORDERCCWSTATE, 'value'),
           [Input(ids.URLUPDATE, 'pathname')])
 def update_pathplandersettings_on_reload(pathname: str) -> list:
-    return pathplannercfgstate.width, pathplannercfgstate.angle, pathplannercfgstate.mowborder, pathplannercfgstate.distancetoborder, pathplannercfgstate.pattern, pathplannercfgstate.mowarea, pathplannercfgstate.mowexclusion, pathplannercfgstate.mowborderccw
-    
\ No newline at end of file
+    return pathplannercfgstate.width, pathplannercfgstate.angle, pathplannercfgstate.angleauto, pathplannercfgstate.mowborder, pathplannercfgstate.distancetoborder, pathplannercfgstate.pattern, pathplannercfgstate.mowarea, pathplannercfgstate.mowexclusion, pathplannercfgstate.mowborderccw
+    
+
+@callback(Output(ids.INPUTMOWOANGLESTATE, 'disabled'),
+          [Input(ids.INPUTMOWANGLEAUTOSTATE, 'value')])
+def update_angle_input(mowangleauto: bool) -> bool:
+    return bool(mowangleauto)
+
+@callback(Output(ids.ANGLESCORESSTATE, 'children'),
+          [Input(ids.MODALMOWSETTINGS, 'is_open')])
+def update_angle_scores(modal_is_open: bool) -> list:
+    #Score table of the last auto angle planning
+    latest_job = planning_jobs.latest()
+    if not modal_is_open or latest_job is None or latest_job.angle_scores == []:
+        return []
+    tables = []
+    for scores in latest_job.angle_scores:
+        header = html.Thead(html.Tr([html.Th('Angle'), html.Th('Length'), html.Th('Transit'), html.Th('Turns'), html.Th('Score')]))
+        rows = [html.Tr([html.Td(str(row['angle'])+'°'), html.Td(str(row['length'])+'m'), html.Td(str(row['transit'])+'m'), html.Td(row['turns']), html.Td(row['score'])], 
+                        className='table-success' if row['selected'] else '') for row in scores]
+        tables.append(dbc.Table([header, html.Tbody(rows)], size='sm', className='mt-2 mb-0'))
+    return [html.P(['Last auto angle planning'], className='mb-0 mt-2')] + tables
\ No newline at end of file
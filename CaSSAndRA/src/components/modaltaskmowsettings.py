@@ -9,6 +9,7 @@ from . import mowsettingstemplate as mst
 template = mst.get_mow_settings_template(ids.INPUTPATTERNTASK, pathplannercfgtask.pattern,
                                         ids.INPUTMOWOFFSETTASK, pathplannercfgtask.width,
                                         ids.INPUTMOWOANGLETASK, pathplannercfgtask.angle,
+                                        ids.INPUTMOWANGLEAUTOTASK, pathplannercfgtask.angleauto,
                                         ids.INPUTDISTANCETOBORDERTASK, pathplannercfgtask.distancetoborder,
                                         ids.INPUTMOWCUTEDGEBORDERTASK, pathplannercfgtask.mowborder, 
                                         ids.INPUTMOWAREATASK, pathplannercfgtask.mowarea,
@@ -33,6 +34,7 @@ mowsettings = dbc.Modal([
            State(ids.INPUTPATTERNTASK, 'value'),
            State(ids.INPUTMOWOFFSETTASK, 'value'),
            State(ids.INPUTMOWOANGLETASK, 'value'),
+           State(ids.INPUTMOWANGLEAUTOTASK, 'value'),
            State(ids.INPUTDISTANCETOBORDERTASK, 'value'),
            State(ids.INPUTMOWAREATASK, 'value'),
            State(ids.INPUTMOWCUTEDGEBORDERTASK, 'value'),
@@ -44,6 +46,7 @@ def toggle_modal(n_clicks_bms: int,
                  pattern: str,
                  mowoffset: float, 
                  mowangle: int,
+                 mowangleauto: bool,
                  distancetoborder: int, 
                  mowarea: bool,
                  mowborder: str, 
@@ -52,13 +55,14 @@ def toggle_modal(n_clicks_bms: int,
                  ) -> bool:
     context = ctx.triggered_id
     if context == ids.BUTTONOKINPUTMOWTASKSETTINGS:
-        if pattern != 'lines' and pattern != 'squares' and pattern != 'rings':
+        if pattern != 'lines' and pattern != 'squares' and pattern != 'rings' and pattern != 'cells':
             pathplannercfgtask.pattern = 'lines'
         else:
             pathplannercfgtask.pattern = pattern
         if mowoffset != None:
             pathplannercfgtask.width = mowoffset
         pathplannercfgtask.angle = mowangle
+        pathplannercfgtask.angleauto = bool(mowangleauto)
         if distancetoborder != None:
             pathplannercfgtask.distancetoborder = distancetoborder
         pathplannercfgtask.mowarea = mowarea
@@ -72,6 +76,7 @@ def toggle_modal(n_clicks_bms: int,
 
 @callback(Output(ids.INPUTMOWOFFSETTASK, 'value'),
           Output(ids.INPUTMOWOANGLETASK, 'value'),
+          Output(ids.INPUTMOWANGLEAUTOTASK, 'value'),
           Output(ids.INPUTMOWCUTEDGEBORDERTASK, 'value'),
           Output(ids.INPUTDISTANCETOBORDERTASK, 'value'),
           Output(ids.INPUTPATTERNTASK, 'value'),
@@ -80,5 +85,11 @@ def toggle_modal(n_clicks_bms: int,
           Output(ids.INPUTMOWCUTEDGEBORDERCCWTASK, 'value'),
           [Input(ids.URLUPDATE, 'pathname')])
 def update_pathplandersettings_on_reload(pathname: str) -> list:
-    return pathplannercfgtask.width, pathplannercfgtask.angle, pathplannercfgtask.mowborder, pathplannercfgtask.distancetoborder, pathplannercfgtask.pattern, pathplannercfgtask.mowarea, pathplannercfgtask.mowexclusion, pathplannercfgtask.mowborderccw
+    return pathplannercfgtask.width, pathplannercfgtask.angle, pathplannercfgtask.angleauto, pathplannercfgtask.mowborder, pathplannercfgtask.distancetoborder, pathplannercfgtask.pattern, pathplannercfgtask.mowarea, pathplannercfgtask.mowexclusion, pathplannercfgtask.mowborderccw
     
+
+
+@callback(Output(ids.INPUTMOWOANGLETASK, 'disabled'),
+          [Input(ids.INPUTMOWANGLEAUTOTASK, 'value')])
+def update_angle_input(mowangleauto: bool) -> bool:
+    return bool(mowangleauto)
\ No newline at end of file
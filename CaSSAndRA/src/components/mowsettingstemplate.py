@@ -4,6 +4,7 @@ import dash_bootstrap_components as dbc
 def get_mow_settings_template(idInputPattern, cfgPattern,
                               idInputMowOffset, cfgWidth,
                               idMowAngle, cfgAngle,
+                              idMowAngleAuto, cfgAngleAuto,
                               idDistanceBorder, cfgDistanceBorder,
                               idMowBorder, cfgMowBorder,
                               idMowArea, cfgMowArea,
@@ -21,6 +22,7 @@ def get_mow_settings_template(idInputPattern, cfgPattern,
                                 {'label': 'lines', 'value': 'lines'},
                                 {'label': 'squares', 'value': 'squares'},
                                 {'label': 'rings', 'value': 'rings'},
+                                {'label': 'cells', 'value': 'cells'},
                             ],
                             value=cfgPattern, style={'padding-top' : '0.17rem', 'padding-bottom' : '0.17rem'}
                         ),
@@ -44,7 +46,14 @@ def get_mow_settings_template(idInputPattern, cfgPattern,
                                 min=0, 
                                 max=359, 
                                 step=1, 
-                                size='sm'
+                                size='sm',
+                                disabled=cfgAngleAuto
+                        ),
+                        dbc.Switch(
+                            id=idMowAngleAuto,
+                            label='auto',
+                            value=cfgAngleAuto,
+                            style={'margin-bottom' : '0rem'},
                         ),
                     ]),
                 ], style={'padding-bottom' : '0.75rem'}),
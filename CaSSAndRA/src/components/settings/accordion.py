@@ -70,6 +70,7 @@ accordion_settings = dbc.Accordion([
                                         {'label': 'lines', 'value': 'lines'},
                                         {'label': 'squares', 'value': 'squares'},
                                         {'label': 'rings', 'value': 'rings'},
+                                        {'label': 'cells', 'value': 'cells'},
                                     ],
                                     value=pathplannercfg.pattern
                                 ),
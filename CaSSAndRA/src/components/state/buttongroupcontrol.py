@@ -6,13 +6,15 @@ from src.backend.comm import cmdlist
 from src.backend.data import saveddata
 from src.backend.data.roverdata import robot
 from src.backend.data.mapdata import current_map, current_task, tasks
-from src.backend.map import path
+from src.backend.map.planningjobs import planning_jobs, apply_route_preview
+from src.backend.map.obstaclereplan import obstacle_replanner
 
 buttonhome = dbc.Button(id=ids.BUTTONHOME, size='lg',class_name='mx-1 mt-1 bi bi-house', disabled=False, title='go home(dock)')
 buttonmowall = dbc.Button(id=ids.BUTTONMOWALL, size='lg', class_name='me-1 mt-1 bi bi-map-fill', disabled=False, title='mow all or selected area')
 buttongoto = dbc.Button(id=ids.BUTTONGOTO, size='lg', class_name='me-1 mt-1 bi bi-geo-alt-fill', disabled=False, title='select go to')
 buttonshortcutselect= dbc.Button(id=ids.BUTTONSHORTCUTSELECT, size='lg', class_name='me-1 mt-1 bi bi-list-ol', disabled=False, title='select task')
 buttoncancel = dbc.Button(id=ids.BUTTONCANCEL, size='lg', class_name='me-1 mt-1 bi bi-x-square-fill', disabled=False, title='cancel')
+buttonreplanobstacles = dbc.Button(id=ids.BUTTONREPLANOBSTACLES, size='lg', class_name='me-1 mt-1 bi bi-signpost-split', disabled=True, title='replan remaining route around obstacles')
 buttonmowsettings = dbc.Button(id=ids.BUTTONMOWSETTINGS, size='lg', class_name='me-1 mt-1 bi bi-gear-fill', disabled=False, title='temporarly mow settings')
 buttongo = dbc.Button(id=ids.BUTTONGO, size='lg', class_name='bi bi-play-fill', color="success", disabled=False, title='start selected task', style={"width": "100%"})
 buttonstop = dbc.Button(id=ids.BUTTONSTOP, size='lg', class_name='bi bi-stop-fill', color='danger', disabled=False, title='stop', style={"width": "100%"})
@@ -112,14 +114,14 @@ def perfom_cmd(n_clicks_bgo: int,
             current_map.calc_route_mowpath()
             cmdlist.cmd_mow = True
         elif active_bss:
-            current_map.task_progress = 0
-            current_map.calculating = True
-            path.calc_task(current_task.subtasks, current_task.subtasks_parameters)
-            if len(current_task.subtasks['name'].unique()) == 1:
-                saveddata.update_task_preview(tasks.saved, current_map.preview)
-            current_map.calculating = False
-            current_map.calc_route_mowpath()
-            cmdlist.cmd_mow = True
+            single_task = len(current_task.subtasks['name'].unique()) == 1
+            def start_task(job) -> None:
+                if apply_route_preview(job):
+                    if single_task:
+                        saveddata.update_task_preview(tasks.saved, current_map.preview)
+                    current_map.calc_route_mowpath()
+                    cmdlist.cmd_mow = True
+            planning_jobs.submit_task(current_task.subtasks, current_task.subtasks_parameters, on_done=start_task, source='state')
         elif active_bgt:
             cmdlist.cmd_goto = True
         else:
@@ -148,6 +150,7 @@ def perfom_cmd(n_clicks_bgo: int,
           Output(ids.BUTTONSHORTCUTSELECT, 'disabled'),
           Output(ids.BUTTONGOTO, 'disabled'),
           Output(ids.BUTTONCANCEL, 'disabled'),
+          Output(ids.BUTTONREPLANOBSTACLES, 'disabled'),
           [Input(ids.INTERVAL, 'n_intervals'),
            Input(ids.BUTTONGO, 'n_clicks'),
            Input(ids.BUTTONSTOP, 'n_clicks'),
@@ -169,11 +172,21 @@ def update_button_disabled(n_intervals: int,
     context = ctx.triggered_id
 
     if current_map.perimeter.empty:
-        return True, True, True, True, True
+        return True, True, True, True, True, True
     elif (robot.job == 1 or robot.job == 4) and current_map.obstacles.empty:
-        return True, True, True, True, True
+        return True, True, True, True, True, True
     elif robot.job == 1 or robot.job == 4:
-        return True, True, True, True, False 
+        return True, True, True, True, False, current_map.mowpath.empty
     else:
-        return False, False, False, False, False 
+        return False, False, False, False, False, True
+
+#Replan remaining route around obstacles and upload it
+@callback(Output(ids.BUTTONREPLANOBSTACLES, 'active'),
+          [Input(ids.BUTTONREPLANOBSTACLES, 'n_clicks')])
+def replan_obstacles(n_clicks: int) -> bool:
+    if n_clicks:
+        def mow_replanned_route() -> None:
+            cmdlist.cmd_mow = True
+        obstacle_replanner.replan_mowpath(on_replanned=mow_replanned_route, source='state')
+    return False
 
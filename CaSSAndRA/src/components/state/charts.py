@@ -5,21 +5,26 @@ import pandas as pd
 from datetime import datetime
 
 from .. import ids
-from ... backend.data import roverdata
+from ... backend.data.telemetryquery import telemetry
+from ... backend.data.telemetryrollup import telemetry_rollup
 from ... backend.data.chartsdata import chartsdata
 
 daterange = dcc.DatePickerRange(id=ids.CHARTSDATERANGE,
                 end_date=datetime.now().date(),
                 display_format='YYYY-MM-DD',
                 start_date=datetime.now().date(),
-                max_date_allowed=roverdata.state.iloc[-1]['timestamp'],
-                min_date_allowed=roverdata.state.iloc[0]['timestamp'],
+                max_date_allowed=str(telemetry.bounds('state')[1]),
+                min_date_allowed=str(telemetry.bounds('state')[0]),
                 stay_open_on_select=False,
                 minimum_nights=0,
                 updatemode='bothdates',
                 style={"text-align":"center", "margin-bottom":"0.5rem"},
                 className="dbc"
 )
+#columns used by the charts
+STATE_COLUMNS = ['timestamp', 'battery_voltage', 'amps', 'job', 'position_solution', 'position_visible_satellites', 'position_visible_satellites_dgps', 'lateral_error']
+STATS_COLUMNS = ['timestamp', 'duration_mow_fix', 'duration_mow_float', 'duration_mow_invalid', 'duration_charge', 'duration_idle', 'duration_mow']
+
 timerange = dcc.RangeSlider(id=ids.CHARTSTIMERANGE, marks=None, className="chart-slider dbc")
 
 voltagecurrent = go.Figure()
@@ -231,17 +236,20 @@ def update_charts(n_intervals: int,
                   interval_disabled: bool,
                   ) -> list:
     context = ctx.triggered_id
-    max_date_allowed=roverdata.state.iloc[-1]['timestamp']
-    min_date_allowed=roverdata.state.iloc[0]['timestamp']
+    first_timestamp, last_timestamp = telemetry.bounds('state')
+    max_date_allowed=str(last_timestamp)
+    min_date_allowed=str(first_timestamp)
     if start_date_state == None or end_date_state == None:
         start_date_state = str(datetime.now().date())
         end_date_state = str(datetime.now().date())
     end_date_state = end_date_state + ' 23:59:59.0'
 
-    state_filtered = roverdata.state[(roverdata.state['timestamp'] > start_date_state)&(roverdata.state['timestamp'] <= end_date_state)]
-    state_filtered = state_filtered.reset_index(drop=True)
-    calced_from_stats_filtered = roverdata.calced_from_stats[(roverdata.calced_from_stats['timestamp'] > start_date_state)&(roverdata.calced_from_stats['timestamp'] <= end_date_state)]
-    calced_from_stats_filtered = calced_from_stats_filtered.reset_index(drop=True)
+    #long time ranges are shown with rollups (minute, hour or day buckets) instead of every sample
+    resolution = telemetry_rollup.resolution('state', start_date_state, end_date_state)
+    if resolution == None:
+        state_filtered = telemetry.range('state', start_date_state, end_date_state, columns=STATE_COLUMNS)
+    else:
+        state_filtered = telemetry_rollup.range('state', resolution, start_date_state, end_date_state)
     if timerange_state == None or context == ids.CHARTSDATERANGE:
         timerange_state = []
         timerange_state.append(state_filtered.index.min())
@@ -251,11 +259,18 @@ def update_charts(n_intervals: int,
         timerange_state[1] = state_filtered.index.max()
         timerange_state[0] = max(0, timerange_state[1]-timerange_delta)
     state_filtered = state_filtered.loc[timerange_state[0]:timerange_state[1]]
-    state_filtered_mow = state_filtered[state_filtered['job'] == 1]
     #calc stats time range from state time range
     if not state_filtered.empty:
-        calced_from_stats_filtered = calced_from_stats_filtered[(calced_from_stats_filtered['timestamp'] >= state_filtered.iloc[0]['timestamp'])&
-                                                                (calced_from_stats_filtered['timestamp'] <= state_filtered.iloc[-1]['timestamp'])]
+        first_timestamp, last_timestamp = state_filtered.iloc[0]['timestamp'], state_filtered.iloc[-1]['timestamp']
+    else:
+        first_timestamp, last_timestamp = start_date_state, end_date_state
+    if resolution == None:
+        state_filtered_mow = state_filtered[state_filtered['job'] == 1]
+        calced_from_stats_filtered = telemetry.range('calced_from_stats', first_timestamp, last_timestamp, columns=STATS_COLUMNS, closed='both')
+    else:
+        state_filtered_mow = telemetry_rollup.range('state_mow', resolution, first_timestamp, last_timestamp)
+        calced_from_stats_filtered = telemetry_rollup.range('calced_from_stats', resolution, first_timestamp, last_timestamp)
+        lateral_error_counts, lateral_error_bins = telemetry_rollup.histogram('state_mow', resolution, first_timestamp, last_timestamp)
 
     traces = []
     traces2 = []
@@ -284,16 +299,33 @@ def update_charts(n_intervals: int,
                 )
     )
     #Satellites plot
-    traces2.append(go.Histogram(x=state_filtered_mow['position_visible_satellites'],
-                             name='visible', 
-                             opacity=0.7
-                )
-    )
-    traces2.append(go.Histogram(x=state_filtered_mow['position_visible_satellites_dgps'],
-                             name='dgps', 
-                             opacity=0.7
-                )
-    )
+    if resolution == None:
+        traces2.append(go.Histogram(x=state_filtered_mow['position_visible_satellites'],
+                                 name='visible', 
+                                 opacity=0.7
+                    )
+        )
+        traces2.append(go.Histogram(x=state_filtered_mow['position_visible_satellites_dgps'],
+                                 name='dgps', 
+                                 opacity=0.7
+                    )
+        )
+    else:
+        #mean of every bucket weighted with the number of samples
+        traces2.append(go.Histogram(x=state_filtered_mow['position_visible_satellites'].round(),
+                                 y=state_filtered_mow['count'],
+                                 histfunc='sum',
+                                 name='visible', 
+                                 opacity=0.7
+                    )
+        )
+        traces2.append(go.Histogram(x=state_filtered_mow['position_visible_satellites_dgps'].round(),
+                                 y=state_filtered_mow['count'],
+                                 histfunc='sum',
+                                 name='dgps', 
+                                 opacity=0.7
+                    )
+        )
     #Pie chart fix, float, invalid duration
     duration_fix = calced_from_stats_filtered['duration_mow_fix'].sum()
     duration_float = calced_from_stats_filtered['duration_mow_float'].sum()
@@ -326,16 +358,25 @@ def update_charts(n_intervals: int,
                 )
             )
     #Histogramm lateral error
-    traces5.append(go.Histogram(
-                    x=state_filtered_mow[state_filtered_mow['position_solution']==2]['lateral_error'],
-                    xbins=dict(
-                        start=-0.5,
-                        end=0.5,
-                        size=0.01
-                    ),
-                    opacity=0.7
+    if resolution == None:
+        traces5.append(go.Histogram(
+                        x=state_filtered_mow[state_filtered_mow['position_solution']==2]['lateral_error'],
+                        xbins=dict(
+                            start=-0.5,
+                            end=0.5,
+                            size=0.01
+                        ),
+                        opacity=0.7
+                    )
+                )
+    else:
+        traces5.append(go.Bar(
+                        x=(lateral_error_bins[:-1]+lateral_error_bins[1:])/2,
+                        y=lateral_error_counts,
+                        width=lateral_error_bins[1]-lateral_error_bins[0],
+                        opacity=0.7
+                    )
                 )
-            )
     #activate interval update if zoomed in
     if len(state_filtered) <= 1000:
         interval_disabled = False
@@ -5,8 +5,10 @@ import pandas as pd
 from .. import ids
 from src.backend.data import mapdata, calceddata
 from src.backend.data.mapdata import current_map, current_task, tasks, progress_color_palette, tasks_color_palette
-from src.backend.map import map, path
+from src.backend.map import map
+from src.backend.map.planningjobs import planning_jobs, apply_route_preview
 from src.backend.data.roverdata import robot
+from src.backend.data.route import Route
 from src.backend.data.cfgdata import pathplannercfgstate, appcfg
 
 statemap = go.Figure()
@@ -84,35 +86,30 @@ def handle_buttons(
      if context == ids.BUTTONHOME and buttonhome:
           #What to do, if home button active
           current_map.gotopoint = pd.DataFrame() 
-          current_map.preview = pd.DataFrame()
+          current_map.preview = Route(type='preview route')
           current_task.subtasks = pd.DataFrame()
           current_task.subtasks_parameters = pd.DataFrame()
           #current_map.mowpath = pd.DataFrame()
           current_map.plotgotopoints = False
      elif context == ids.BUTTONMOWALL and buttonmowall:
           current_map.gotopoint = pd.DataFrame() 
-          current_map.preview = pd.DataFrame()
-          current_map.mowpath = pd.DataFrame()
+          current_map.preview = Route(type='preview route')
+          current_map.mowpath = Route()
           current_task.subtasks = pd.DataFrame()
           current_task.subtasks_parameters= pd.DataFrame()
           if 'selections' in fig_state['layout'] and fig_state['layout']['selections'] != []:
                current_map.selected_perimeter = map.selection(current_map.perimeter_polygon, selecteddata)
           else:
                current_map.selected_perimeter = current_map.perimeter_polygon
-          current_map.calculating = True
-          current_map.task_progress = 0
-          current_map.total_tasks = 1
-          route = path.calc_simple(current_map.selected_perimeter, pathplannercfgstate)
-          if route:
-               current_map.areatomow = round(current_map.selected_perimeter.area)
-               current_map.calc_route_preview(route) 
-          current_map.calculating = False
+          #a new preview replaces only the preview job of this page (jobs of api and schedule keep running)
+          planning_jobs.cancel_source('preview')
+          planning_jobs.submit_simple(current_map.selected_perimeter, pathplannercfgstate, on_done=apply_route_preview, source='preview')
           current_map.plotgotopoints = False
      elif context == ids.DROPDOWNSHORTCUTS and tasks_order != None:
           #Load tasks order if selected
           current_map.gotopoint = pd.DataFrame() 
-          current_map.preview = pd.DataFrame()
-          current_map.mowpath = pd.DataFrame()
+          current_map.preview = Route(type='preview route')
+          current_map.mowpath = Route()
           tasks_to_be_done = 0
           current_task.subtasks = pd.DataFrame()
           current_task.subtasks_parameters = pd.DataFrame()
@@ -130,18 +127,20 @@ def handle_buttons(
           current_map.plotgotopoints = False
      elif context == ids.BUTTONGOTO and buttongoto:
           current_map.gotopoint = pd.DataFrame()
-          current_map.preview = pd.DataFrame()
-          current_map.mowpath = pd.DataFrame()
+          current_map.preview = Route(type='preview route')
+          current_map.mowpath = Route()
           current_task.subtasks = pd.DataFrame()
           current_task.subtasks_parameters = pd.DataFrame()
           current_map.plotgotopoints = True
      elif context == ids.BUTTONCANCEL:
+          planning_jobs.cancel_source('preview')
+          planning_jobs.cancel_source('state')
           if not current_map.obstacles.empty:
                current_map.add_obstacles(pd.DataFrame())
           else:
                current_map.gotopoint = pd.DataFrame()
-               current_map.preview = pd.DataFrame()
-               current_map.mowpath = pd.DataFrame()
+               current_map.preview = Route(type='preview route')
+               current_map.mowpath = Route()
                current_task.subtasks = pd.DataFrame()
                current_task.subtasks_parameters = pd.DataFrame()
                current_map.plotgotopoints = False
@@ -209,24 +208,25 @@ def update(n_intervals: int,
      
      #Plot preview lines or mowpath, if there
      if not current_map.mowpath.empty:
-          filtered = current_map.mowpath[current_map.mowpath['type'] == 'way']
+          mowpath = current_map.mowpath.coords
           current_mow_idx = robot.position_mow_point_index - 1
           if current_mow_idx < 0:
                current_mow_idx = 0
-          path_finished = filtered[filtered.index < robot.position_mow_point_index]
-          path_to_go = filtered[filtered.index >= current_mow_idx]
-          current_target = filtered[(filtered.index == current_mow_idx)|(filtered.index == current_mow_idx + 1)]
+          path_finished = mowpath[:max(robot.position_mow_point_index, 0)]
+          path_to_go = mowpath[current_mow_idx:]
+          current_target = mowpath[current_mow_idx:current_mow_idx+2]
           #add mow progress
-          traces.append(go.Scatter(x=path_finished['X'], y=path_finished['Y'], mode='lines', name='mow finished', opacity=0.5, line=dict(color='rgba(127, 127, 127, 0.25)')))
-          traces.append(go.Scatter(x=path_to_go['X'], y=path_to_go['Y'], mode='lines', name='mow to go', opacity=0.7, line=dict(color='#7fb249')))
-          traces.append(go.Scatter(x=current_target['X'], y=current_target['Y'], mode='lines', name='current target', opacity=0.8, line=dict(color='black', dash='dash', width=2)))
+          traces.append(go.Scatter(x=path_finished[:, 0], y=path_finished[:, 1], mode='lines', name='mow finished', opacity=0.5, line=dict(color='rgba(127, 127, 127, 0.25)')))
+          traces.append(go.Scatter(x=path_to_go[:, 0], y=path_to_go[:, 1], mode='lines', name='mow to go', opacity=0.7, line=dict(color='#7fb249')))
+          traces.append(go.Scatter(x=current_target[:, 0], y=current_target[:, 1], mode='lines', name='current target', opacity=0.8, line=dict(color='black', dash='dash', width=2)))
           mowdata = [dict(text='Distance: '+str(current_map.finished_distance)+'m/'+str(current_map.distance)+'m ('+str(current_map.distance_perc)+'%)'+ '  ', showarrow=False, xref="paper", yref="paper",x=1,y=1),
                          dict(text='Index: '+str(current_map.finished_idx)+'/'+str(current_map.idx)+' ('+str(current_map.idx_perc)+'%)'+ '  ', showarrow=False, xref="paper", yref="paper",x=1,y=0.95), 
                          dict(text='Area to mow: '+str(current_map.areatomow)+'m²'+ '  ', showarrow=False, xref="paper", yref="paper",x=1,y=0.9)]
+          if current_map.remaining_time != None:
+               mowdata.append(dict(text='Remaining time: '+str(current_map.remaining_time//3600)+'h '+str(current_map.remaining_time%3600//60)+'min'+ '  ', showarrow=False, xref="paper", yref="paper",x=1,y=0.85))
           robot.mowprogress = round(current_map.idx_perc/100, 3)
      elif not current_map.preview.empty:
-          filtered = current_map.preview[current_map.preview['type'] == 'preview route']
-          traces.append(go.Scatter(x=filtered['X'], y=filtered['Y'], mode='lines', name='preview route', opacity=0.7, line=dict(color='#7fb249')))
+          traces.append(go.Scatter(x=current_map.preview.x, y=current_map.preview.y, mode='lines', name='preview route', opacity=0.7, line=dict(color='#7fb249')))
      elif not current_task.subtasks.empty:
           index = 0
           for task_name in current_task.subtasks['name'].unique():
@@ -4,7 +4,7 @@ import pandas as pd
 from datetime import datetime
 
 from .. import ids
-from ... backend.data import roverdata
+from ... backend.data.telemetryquery import telemetry
 from . charts import daterange, timerange
 
 from icecream import ic
@@ -191,26 +191,20 @@ def update_stats(#n_intervals: int,
         end_date_stats = str(datetime.now().date())
     end_date_stats = end_date_stats + ' 23:59:59.0'
 
-    stats = roverdata.stats
-    calced_stats = roverdata.calced_from_stats
-    state_filtered = roverdata.state[(roverdata.state['timestamp'] > start_date_stats)&(roverdata.state['timestamp'] <= end_date_stats)]
-    state_filtered = state_filtered.reset_index(drop=True)
+    state_filtered = telemetry.range('state', start_date_stats, end_date_stats, columns=['timestamp'])
     if timerange_state == None or context == ids.CHARTSDATERANGE:
         timerange_state = []
         timerange_state.append(state_filtered.index.min())
         timerange_state.append(state_filtered.index.max())
     state_filtered = state_filtered.loc[timerange_state[0]:timerange_state[1]]
-    stats_filtered = stats[(stats['timestamp'] > start_date_stats)&(stats['timestamp'] <= end_date_stats)]
-    stats_filtered = stats_filtered.reset_index(drop=True)
-    calced_stats_filtered = calced_stats[(calced_stats['timestamp'] > start_date_stats)&(calced_stats['timestamp'] <= end_date_stats)]
-    calced_stats_filtered = calced_stats_filtered.reset_index(drop=True)
 
     #calc stats time range from state time range
     if not state_filtered.empty:
-        calced_stats_filtered = calced_stats_filtered[(calced_stats_filtered['timestamp'] >= state_filtered.iloc[0]['timestamp'])&
-                                                                (calced_stats_filtered['timestamp'] <= state_filtered.iloc[-1]['timestamp'])]
-        stats_filtered = stats_filtered[(stats_filtered['timestamp'] >= state_filtered.iloc[0]['timestamp'])&
-                                                                (stats_filtered['timestamp'] <= state_filtered.iloc[-1]['timestamp'])]
+        calced_stats_filtered = telemetry.range('calced_from_stats', state_filtered.iloc[0]['timestamp'], state_filtered.iloc[-1]['timestamp'], closed='both')
+        stats_filtered = telemetry.range('stats', state_filtered.iloc[0]['timestamp'], state_filtered.iloc[-1]['timestamp'], closed='both')
+    else:
+        calced_stats_filtered = telemetry.range('calced_from_stats', start_date_stats, end_date_stats)
+        stats_filtered = telemetry.range('stats', start_date_stats, end_date_stats)
     
     counter_float_recoveries_range = int(calced_stats_filtered['counter_float_recoveries'].sum())
     mow_traveled_range = round(calced_stats_filtered['distance_mow_traveled'].sum()/1000, 2)
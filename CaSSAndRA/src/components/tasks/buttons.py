@@ -4,7 +4,7 @@ import dash_bootstrap_components as dbc
 from .. import ids
 from src.backend.data.mapdata import current_map, current_task, tasks
 from src.backend.data import saveddata
-from src.backend.map import path
+from src.backend.map.planningjobs import planning_jobs, apply_route_preview
 from src.backend.comm import cmdlist
 
 #modalbuttons
@@ -37,14 +37,14 @@ def update_saved_tasks_button_save_disabled(fig: dict, tasks_order: list):
 def start_selected_tasks_order(bsst_nclicks: int) -> bool:
     context = ctx.triggered_id
     if context == ids.BUTTONSTARTSELECTEDTASKSORDER:
-        current_map.task_progress = 0
-        current_map.calculating = True
-        path.calc_task(current_task.subtasks, current_task.subtasks_parameters)
-        if len(current_task.subtasks['name'].unique()) == 1:
-            saveddata.update_task_preview(tasks.saved, current_map.preview)
-        current_map.calculating = False
-        current_map.calc_route_mowpath()
-        cmdlist.cmd_mow = True
+        single_task = len(current_task.subtasks['name'].unique()) == 1
+        def start_task(job) -> None:
+            if apply_route_preview(job):
+                if single_task:
+                    saveddata.update_task_preview(tasks.saved, current_map.preview)
+                current_map.calc_route_mowpath()
+                cmdlist.cmd_mow = True
+        planning_jobs.submit_task(current_task.subtasks, current_task.subtasks_parameters, on_done=start_task, source='tasks')
     return False
 
 @callback(Output(ids.BUTTONLOADSELECTEDTASKSORDER, 'active'),
@@ -52,14 +52,14 @@ def start_selected_tasks_order(bsst_nclicks: int) -> bool:
 def load_selected_tasks_order(blsto_nclicks: int) -> bool:
     context = ctx.triggered_id
     if context == ids.BUTTONLOADSELECTEDTASKSORDER:
-        current_map.task_progress = 0
-        current_map.calculating = True
-        path.calc_task(current_task.subtasks, current_task.subtasks_parameters)
-        if len(current_task.subtasks['name'].unique()) == 1:
-            saveddata.update_task_preview(tasks.saved, current_map.preview)
-        current_map.calculating = False
-        current_map.calc_route_mowpath()
-        cmdlist.cmd_take_map = True
+        single_task = len(current_task.subtasks['name'].unique()) == 1
+        def load_task(job) -> None:
+            if apply_route_preview(job):
+                if single_task:
+                    saveddata.update_task_preview(tasks.saved, current_map.preview)
+                current_map.calc_route_mowpath()
+                cmdlist.cmd_take_map = True
+        planning_jobs.submit_task(current_task.subtasks, current_task.subtasks_parameters, on_done=load_task, source='tasks')
     return False
 
 @callback(Output(ids.BUTTONSTARTSELECTEDTASKSORDER, 'disabled'),
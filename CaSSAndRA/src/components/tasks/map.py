@@ -1,12 +1,14 @@
-from dash import html, Input, Output, State, callback, ctx, Patch
+from dash import html, Input, Output, State, callback, ctx, Patch, no_update
 import plotly.graph_objects as go
 import pandas as pd
 
 from .. import ids
 from src.backend.data.roverdata import robot
 from src.backend.data.mapdata import current_map, current_task, tasks, progress_color_palette, tasks_color_palette
+from src.backend.data.route import Route
 from src.backend.data.cfgdata import pathplannercfgtask
-from src.backend.map import map, path
+from src.backend.map import map
+from src.backend.map.planningjobs import planning_jobs
 
 tasksmap = go.Figure()
 tasksmap.update_layout(
@@ -41,12 +43,14 @@ tasksmap.update_layout(
      )
 
 @callback(Output(ids.TASKMAP, 'figure'),
+          Output(ids.TASKMAPINTERVAL, 'disabled'),
           [Input(ids.BUTTONPLANMOWALL, 'n_clicks'),
            Input(ids.BUTTONPLANCANCEL, 'n_clicks'),
            Input(ids.MODALSAVECURRENTTASK, 'is_open'),
            Input(ids.MODALREMOVETASK, 'is_open'), 
            Input(ids.DROPDOWNTASKSORDER, 'value'),
            Input(ids.BUTTONREMOVETASK, 'n_clicks'),
+           Input(ids.TASKMAPINTERVAL, 'n_intervals'),
            State(ids.TASKMAP, 'selectedData'),
            State(ids.TASKMAP, 'figure')
            ])
@@ -56,6 +60,7 @@ def update(bpma_nclicks: int,
            remove_is_open: bool, 
            tasks_order: list, 
            brt_nclicks: int, 
+           n_intervals: int,
            selecteddata: dict,
            fig_state: dict,
            ) -> list:
@@ -67,9 +72,13 @@ def update(bpma_nclicks: int,
     context = ctx.triggered_id
     context_triggered = ctx.triggered
 
+    #Planning job is still running, poll again
+    if context == ids.TASKMAPINTERVAL and planning_jobs.status(current_task.planning_job_id)['state'] in ['pending', 'running']:
+        return no_update, False
+
     #Create a task
     if context == ids.BUTTONPLANMOWALL:# and buttonmowall:
-        current_task.preview = pd.DataFrame()
+        current_task.preview = Route(type='preview route')
         if 'selections' in fig_state['layout'] and fig_state['layout']['selections'] != []:
             current_task.selected_perimeter = map.selection(current_map.perimeter_polygon, selecteddata)
             if 'lassoPoints' in selecteddata:
@@ -83,18 +92,17 @@ def update(bpma_nclicks: int,
             current_task.selection_type = 'perimeter'
             current_task.selection = {'X': [0], 'Y': [0]}
         #current_task.selected_perimeter = current_map.perimeter_polygon
-        current_map.task_progress = 0
-        current_map.total_tasks = 1
-        current_map.calculating = True
-        route = path.calc(current_task.selected_perimeter, pathplannercfgtask)
-        if route:
-            current_task.calc_route_preview(route) 
-        current_map.calculating = False
+        #Planning runs in a worker process, the result is plotted by the interval callback after the job is finished
+        planning_jobs.cancel(current_task.planning_job_id)
+        current_task.planning_job_id = planning_jobs.submit_calc(current_task.selected_perimeter, pathplannercfgtask, 
+                                                                 on_done=current_task.apply_planned_route, source='tasks')
         current_task.parameters = pathplannercfgtask
 
     #Remove preview if cancel button clicked
-    if context == ids.BUTTONPLANCANCEL and not current_task.preview.empty:
-        current_task.preview = pd.DataFrame()
+    if context == ids.BUTTONPLANCANCEL and planning_jobs.cancel(current_task.planning_job_id):
+        current_task.preview = Route(type='preview route')
+    elif context == ids.BUTTONPLANCANCEL and not current_task.preview.empty:
+        current_task.preview = Route(type='preview route')
         annotation = []
     elif context == ids.BUTTONPLANCANCEL:
         current_task.create()
@@ -136,8 +144,7 @@ def update(bpma_nclicks: int,
 
     #plot preview if there
     if not current_task.preview.empty:
-        filtered = current_task.preview[current_task.preview['type'] == 'preview route']
-        traces.append(go.Scatter(x=filtered['X'], y=filtered['Y'], mode='lines', name='preview', opacity=0.7, line=dict(color='#FF0000')))
+        traces.append(go.Scatter(x=current_task.preview.x, y=current_task.preview.y, mode='lines', name='preview', opacity=0.7, line=dict(color='#FF0000')))
         annotation = [dict(text='Not saved changes', showarrow=False, xref="paper", yref="paper",x=1,y=1)]
         
     #plot subtasks if there
@@ -158,5 +165,6 @@ def update(bpma_nclicks: int,
     fig = Patch()
     fig.data = traces
     fig.layout.annotations = annotation
+    interval_disabled = planning_jobs.status(current_task.planning_job_id)['state'] not in ['pending', 'running']
 
-    return fig
+    return fig, interval_disabled
@@ -23,6 +23,7 @@ def serve_layout() -> html.Div:
             dcc.Interval(id=ids.MAPPINGINTERVAL, interval=1*1000, n_intervals=0, disabled=True),
             dcc.Interval(id=ids.LOGINTERVAL, interval=3*1000, n_intervals=0, disabled=True),
             dcc.Interval(id=ids.CHARTSINTERVAL, interval=10*1000, n_intervals=0, disabled=True),
+            dcc.Interval(id=ids.TASKMAPINTERVAL, interval=1*1000, n_intervals=0, disabled=True),
             dcc.Location(id=ids.URLUPDATE, refresh=True),
             navbar.navbar,
             offcanvas.offcanvas,
@@ -76,6 +76,7 @@ def update_layout() -> html.Div:
                                     buttongroupcontrol.buttonshortcutselect,
                                     buttongroupcontrol.buttongoto,
                                     buttongroupcontrol.buttonmowsettings,
+                                    buttongroupcontrol.buttonreplanobstacles,
                                     buttongroupcontrol.buttoncancel,
                                 ],
                                 className="d-flex justify-content-center flex-wrap p-1",
@@ -0,0 +1,33 @@
+import os
+import sys
+import math
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+def create_perimeter(points: int = 40, exclusions: int = 3, radius: float = 20.0) -> pd.DataFrame:
+    #Wavy perimeter with hexagonal exclusions and a dock
+    rows = []
+    for i in range(points):
+        angle = 2*math.pi*i/points
+        r = radius*(1+0.25*math.sin(5*angle))
+        rows.append((r*math.cos(angle), r*math.sin(angle), 'perimeter'))
+    for exclusion in range(exclusions):
+        center_x, center_y = -8+8*exclusion, 3*((-1)**exclusion)
+        for i in range(6):
+            angle = 2*math.pi*i/6
+            rows.append((center_x+1.5*math.cos(angle), center_y+1.5*math.sin(angle), 'exclusion_'+str(exclusion)))
+    rows.append((radius*1.1, 0, 'dockpoints'))
+    rows.append((radius*1.2, 0, 'dockpoints'))
+    return pd.DataFrame(rows, columns=['X', 'Y', 'type'])
+
+@pytest.fixture
+def test_map(tmp_path):
+    from src.backend.data.mapdata import current_map
+    from src.backend.data.roverdata import robot
+    current_map.current_perimeter_file = str(tmp_path/'perimeter.json')
+    current_map.perimeter = create_perimeter()
+    current_map.create('test')
+    robot.position_x, robot.position_y, robot.job = 0.0, -10.0, 0
+    return current_map
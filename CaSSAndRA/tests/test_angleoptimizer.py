@@ -0,0 +1,36 @@
+import pandas as pd
+
+from src.backend.data.cfgdata import PathPlannerCfg
+from src.backend.map import path
+from src.backend.map.angleoptimizer import AngleOptimizer, angle_optimizer
+
+def test_auto_angle_takes_best_candidate(test_map, monkeypatch):
+    monkeypatch.setattr(angle_optimizer, 'angles', [0, 45, 90])
+    angle_optimizer.results = []
+    parameters = PathPlannerCfg(pattern='lines', width=0.5, angle=30, angleauto=True)
+    route = path.calc_simple(test_map.perimeter_polygon, parameters)
+    scores = angle_optimizer.results[-1]
+    assert [row['angle'] for row in scores] == [0, 45, 90]
+    best = [row for row in scores if row['selected']][0]
+    assert best['score'] == min(row['score'] for row in scores)
+    assert route == path.calc_simple(test_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=0.5, angle=best['angle']))
+    #the manual angle is kept for planning without optimizer
+    assert parameters.angle == 30
+
+def test_score_counts_transit_and_turns():
+    route = [(0, 0), (10, 0), (10, 1), (0, 1)]
+    score = AngleOptimizer().score(route, PathPlannerCfg(pattern='lines'), 0)
+    assert score['length'] == 21
+    assert score['transit'] == 1
+    assert score['turns'] == 2
+
+def test_angleauto_from_saved_task_parameters():
+    parameters = PathPlannerCfg()
+    saved = pd.DataFrame([dict(vars(PathPlannerCfg(angle=15)), angleauto=True)])
+    parameters.df_to_obj(saved)
+    assert parameters.angleauto and parameters.angle == 15
+    #tasks saved without the column
+    parameters.df_to_obj(saved.drop(columns=['angleauto']))
+    assert not parameters.angleauto
+    parameters.df_to_obj(saved.assign(angleauto=float('nan')))
+    assert not parameters.angleauto
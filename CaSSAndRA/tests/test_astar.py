@@ -0,0 +1,82 @@
+import math
+import random
+import networkx as nx
+import pytest
+
+from src.backend.map.astar import CSRGraph, astar_path
+from src.backend.map.distancetable import DistanceTable, shortest_path
+
+def random_edges(seed: int, nodes: int = 30, edges: int = 35, integer_weights: bool = False) -> list:
+    #Sparse random graph with coordinate nodes (several components), integer weights give many equal length paths
+    rnd = random.Random(seed)
+    coords = [(float(rnd.randint(0, 20)), float(rnd.randint(0, 20))) for i in range(nodes)]
+    coords = list(dict.fromkeys(coords))
+    G = nx.gnm_random_graph(len(coords), edges, seed=seed)
+    result = []
+    for u, v in G.edges:
+        weight = float(rnd.randint(1, 3)) if integer_weights else math.dist(coords[u], coords[v])
+        result.append((coords[u], coords[v], weight))
+    return result
+
+def graphs(edges: list) -> tuple:
+    G = nx.Graph()
+    G.add_weighted_edges_from(edges, weight='weight')
+    return G, CSRGraph.from_edges(edges)
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('integer_weights', [False, True])
+def test_astar_path_same_as_networkx(seed, integer_weights):
+    G, graph = graphs(random_edges(seed, integer_weights=integer_weights))
+    assert graph.number_of_nodes() == G.number_of_nodes()
+    assert graph.number_of_edges() == G.number_of_edges()
+    nodes = list(G.nodes)
+    for source in nodes[:10]:
+        for target in nodes:
+            try:
+                expected = nx.astar_path(G, source, target, heuristic=None, weight='weight')
+            except nx.NetworkXNoPath:
+                with pytest.raises(nx.NetworkXNoPath):
+                    astar_path(graph, source, target)
+                continue
+            assert astar_path(graph, source, target) == expected
+
+def test_ties_on_grid():
+    #all monotone ways through the grid have the same length
+    G = nx.grid_2d_graph(5, 5)
+    edges = [((float(u[0]), float(u[1])), (float(v[0]), float(v[1])), 1.0) for u, v in G.edges]
+    G, graph = graphs(edges)
+    for target in G.nodes:
+        assert astar_path(graph, (0.0, 0.0), target) == nx.astar_path(G, (0.0, 0.0), target, heuristic=None, weight='weight')
+
+def test_unknown_and_unreachable_nodes():
+    G, graph = graphs([((0.0, 0.0), (1.0, 0.0), 1.0), ((5.0, 5.0), (6.0, 5.0), 1.0)])
+    with pytest.raises(nx.NetworkXNoPath):
+        astar_path(graph, (0.0, 0.0), (6.0, 5.0))
+    with pytest.raises(nx.NodeNotFound):
+        astar_path(graph, (0.0, 0.0), (9.0, 9.0))
+
+@pytest.mark.parametrize('seed', range(8))
+def test_distance_table_same_as_networkx(seed):
+    G, graph = graphs(random_edges(seed))
+    nodes = list(G.nodes)
+    sources = nodes[:8]
+    table = DistanceTable.create(graph, sources)
+    for source in sources:
+        lengths = nx.shortest_path_length(G, source, weight='weight')
+        source_id = graph.node_ids[source]
+        for target in nodes:
+            target_id = graph.node_ids[target]
+            if target not in lengths:
+                assert table.path(source_id, target_id) is None
+                assert math.isinf(table.length(source_id, target_id))
+                with pytest.raises(nx.NetworkXNoPath):
+                    shortest_path(graph, table, source, target)
+                continue
+            assert table.length(source_id, target_id) == pytest.approx(lengths[target])
+            path, length = shortest_path(graph, table, source, target)
+            assert path == nx.astar_path(G, source, target, heuristic=None, weight='weight')
+            assert length == pytest.approx(lengths[target])
+        #ranking of the targets (e.g. nearest reachable vertex)
+        reachable = [target for target in nodes if target in lengths]
+        ranking = sorted(reachable, key=lambda target: (round(table.length(source_id, graph.node_ids[target]), 9), nodes.index(target)))
+        assert ranking == sorted(reachable, key=lambda target: (round(lengths[target], 9), nodes.index(target)))
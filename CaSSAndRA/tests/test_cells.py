@@ -0,0 +1,55 @@
+import numpy as np
+from shapely.geometry import *
+from shapely.geometry.polygon import orient
+
+from src.backend.data.cfgdata import PathPlannerCfg
+from src.backend.map import cells
+
+def create_cells(test_map, width=0.5):
+    border = test_map.perimeter_polygon
+    lines = MultiLineString([[(-30, y), (30, y)] for y in np.arange(-25, 25, width)]).intersection(border.buffer(-0.3))
+    edges = [orient(Polygon(interior).buffer(0.3, join_style=2), sign=1.0) for interior in border.interiors]
+    return border, lines, cells.decompose(border, cells.line_fragments(lines)), edges
+
+def test_tour_ways(test_map):
+    border, lines, cells_of_map, edges = create_cells(test_map)
+    ways = cells.tour_ways(cells_of_map, edges, (0.0, -10.0))
+    assert len(ways) == len(cells_of_map) + len(edges)
+    #every cell once (zig-zag of one of its variants), rings closed in cutedge direction
+    for cell in cells_of_map:
+        rows = {(round(y, 6), x_min, x_max) for y, x_min, x_max in cell}
+        matches = [way for way in ways if len(way) == 2*len(cell) and {(round(way[k][1], 6), min(way[k][0], way[k+1][0]), max(way[k][0], way[k+1][0])) for k in range(0, len(way), 2)} == rows]
+        assert len(matches) >= 1
+    rings = [way for way in ways if way[0] == way[-1] and len(way) > 2]
+    assert len(rings) == len(edges)
+    assert all(LinearRing(ring).is_ccw for ring in rings)
+
+def test_tour_not_longer_than_nearest_neighbor(test_map):
+    border, lines, cells_of_map, edges = create_cells(test_map)
+    route = cells.calcroute(border, lines, edges, [(0.0, -10.0)], PathPlannerCfg(pattern='cells'), 0)
+    route_greedy, skipped = cells.connect_ways(border, [], cells.greedy_ways(cells_of_map, edges, (0.0, -10.0)))
+    assert skipped == 0
+    assert route.length <= LineString(route_greedy).length + 1e-6
+
+def test_connect_way_at_route_end(test_map):
+    from src.backend.map.tour import connect
+    route = [(0.0, -10.0), (1.0, -10.0)]
+    assert connect(test_map.perimeter_polygon, route, [(1.0, -10.0), (1.0, -9.5), (2.0, -9.5)])
+    assert route == [(0.0, -10.0), (1.0, -10.0), (1.0, -9.5), (2.0, -9.5)]
+
+def test_no_cell_skipped(tmp_path, caplog):
+    #rectangle with one exclusion, one cell of a single row starts at the end of the previous cell
+    import pandas as pd
+    from src.backend.data.mapdata import current_map
+    from src.backend.data.roverdata import robot
+    from src.backend.map import path
+    rows = [(0, 0, 'perimeter'), (20, 0, 'perimeter'), (20, 15, 'perimeter'), (0, 15, 'perimeter'),
+            (8, 6, 'exclusion_0'), (11, 6, 'exclusion_0'), (11, 9, 'exclusion_0'), (8, 9, 'exclusion_0'), (21, 1, 'dockpoints'), (22, 1, 'dockpoints')]
+    current_map.current_perimeter_file = str(tmp_path/'perimeter.json')
+    current_map.perimeter = pd.DataFrame(rows, columns=['X', 'Y', 'type'])
+    current_map.create('rectangle')
+    robot.position_x, robot.position_y, robot.job = 1.0, 1.0, 0
+    route = path.calc_simple(current_map.perimeter_polygon, PathPlannerCfg(pattern='cells', width=0.5, angle=0))
+    assert len(route) > 2
+    assert 'skipped' not in caplog.text
+    assert 'could not find a way' not in caplog.text
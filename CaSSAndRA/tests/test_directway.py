@@ -0,0 +1,41 @@
+import threading
+import numpy as np
+from shapely.geometry import Polygon, LineString
+
+from src.backend.map.directway import DirectWay
+
+def test_check_many_matches_check():
+    directway = DirectWay()
+    border = Polygon([(0, 0), (10, 0), (10, 10), (5, 5), (0, 10)])
+    rng = np.random.default_rng(3)
+    starts, ends = rng.uniform(-1, 11, (200, 2)), rng.uniform(-1, 11, (200, 2))
+    expected = [directway.check(border, list(start), list(end)) for start, end in zip(starts, ends)]
+    assert directway.check_many(border, starts, ends).tolist() == expected
+    assert not directway.check(border, [1, 9], [9, 9])
+    assert directway.check(border, [1, 1], [9, 1])
+
+def test_threads_share_caches():
+    directway = DirectWay(max_borders=2, max_cache_size=50)
+    borders = [Polygon([(0, 0), (10+i, 0), (10+i, 10), (0, 10)]) for i in range(4)]
+    rng = np.random.default_rng(4)
+    ways = rng.uniform(-1, 14, (300, 2, 2))
+    expected = [[border.contains(LineString(way)) for way in ways] for border in borders]
+    errors = []
+
+    def worker(seed: int) -> None:
+        try:
+            for i in np.random.default_rng(seed).integers(0, len(borders), 200):
+                border = Polygon(borders[i].exterior.coords)
+                results = [directway.check(border, list(way[0]), list(way[1])) for way in ways[:50]]
+                if results != expected[i][:50]:
+                    errors.append(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(directway.borders) <= 2
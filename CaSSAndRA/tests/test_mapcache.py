@@ -0,0 +1,84 @@
+import os
+import time
+import numpy as np
+
+from conftest import create_perimeter
+from src.backend.data.mapcache import MapCache, map_cache
+from src.backend.data.mapdata import current_map
+
+def artifacts(current_map) -> dict:
+    return dict(perimeter_polygon=current_map.perimeter_polygon, search_wire=current_map.search_wire,
+                gotopoints=current_map.gotopoints[['X', 'Y']].to_numpy(dtype=float),
+                graph=current_map.astar_graph, table=current_map.astar_table)
+
+def test_key_stable_and_changes_with_map():
+    cache = MapCache()
+    perimeter = create_perimeter()
+    assert cache.key(perimeter) == cache.key(create_perimeter())
+    edited = perimeter.copy()
+    edited.loc[3, 'X'] += 0.01
+    assert cache.key(edited) != cache.key(perimeter)
+    retyped = perimeter.copy()
+    retyped.loc[len(retyped)-1, 'type'] = 'perimeter'
+    assert cache.key(retyped) != cache.key(perimeter)
+    assert MapCache(version='other').key(perimeter) != cache.key(perimeter)
+    assert cache.key(perimeter.iloc[0:0]) is None
+
+def test_round_trip_equals_fresh_artifacts(test_map, tmp_path, monkeypatch):
+    monkeypatch.setattr(map_cache, 'path', None)
+    test_map.create_artifacts()
+    fresh = artifacts(test_map)
+    monkeypatch.setattr(map_cache, 'path', str(tmp_path/'maps'))
+    test_map.create_artifacts()
+    assert os.path.exists(map_cache.file(map_cache.key(test_map.perimeter)))
+    hits = map_cache.hits
+    test_map.create_artifacts()
+    assert map_cache.hits == hits+1
+    loaded = artifacts(test_map)
+    assert loaded['perimeter_polygon'].equals(fresh['perimeter_polygon'])
+    assert loaded['search_wire'].equals(fresh['search_wire'])
+    assert np.array_equal(loaded['gotopoints'], fresh['gotopoints'])
+    for name in ['coords', 'indptr', 'indices', 'weights']:
+        assert np.array_equal(getattr(loaded['graph'], name), getattr(fresh['graph'], name))
+    assert loaded['graph'].node_ids == fresh['graph'].node_ids
+    for name in ['sources', 'predecessors', 'lengths']:
+        assert np.array_equal(getattr(loaded['table'], name), getattr(fresh['table'], name))
+
+def test_invalidate_removes_entry(test_map, tmp_path, monkeypatch):
+    monkeypatch.setattr(map_cache, 'path', str(tmp_path/'maps'))
+    test_map.create_artifacts()
+    key = map_cache.key(test_map.perimeter)
+    assert os.path.exists(map_cache.file(key))
+    map_cache.invalidate(key)
+    assert not os.path.exists(map_cache.file(key))
+    assert map_cache.load(key) is None
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = MapCache(path=str(tmp_path), max_entries=3)
+    for nr in range(3):
+        with open(cache.file('entry'+str(nr)), 'wb') as f:
+            f.write(b'')
+        os.utime(cache.file('entry'+str(nr)), (time.time()-100+nr, time.time()-100+nr))
+    #entry0 is used (load touches the file), entry1 is the oldest then
+    os.utime(cache.file('entry0'))
+    with open(cache.file('entry3'), 'wb') as f:
+        f.write(b'')
+    cache.evict()
+    assert sorted(file for file in os.listdir(tmp_path)) == ['entry0.npz', 'entry2.npz', 'entry3.npz']
+
+def test_corrupt_file_is_rebuilt(test_map, tmp_path, monkeypatch):
+    monkeypatch.setattr(map_cache, 'path', str(tmp_path/'maps'))
+    test_map.create_artifacts()
+    fresh = artifacts(test_map)
+    key = map_cache.key(test_map.perimeter)
+    with open(map_cache.file(key), 'wb') as f:
+        f.write(b'no npz file')
+    assert map_cache.load(key) is None
+    assert not os.path.exists(map_cache.file(key))
+    with open(map_cache.file(key), 'wb') as f:
+        f.write(b'no npz file')
+    test_map.create_artifacts()
+    assert test_map.perimeter_polygon.equals(fresh['perimeter_polygon'])
+    assert np.array_equal(test_map.astar_table.lengths, fresh['table'].lengths)
+    #rebuilt artifacts are saved again
+    assert map_cache.load(key) is not None
@@ -0,0 +1,41 @@
+import random
+import pytest
+from shapely.geometry import *
+
+from src.backend.data.mapdata import current_map
+from src.backend.data.roverdata import robot
+
+def legacy_progress(route: list, finished_idx: int, seconds_per_idx: float) -> dict:
+    #Progress computed with LineStrings of the finished and the whole mow path
+    finished_idx = max(finished_idx, 0)
+    try:
+        finished_distance = round(LineString(route[:finished_idx]).length)
+    except Exception:
+        finished_distance = 0
+    distance = round(LineString(route).length)
+    return dict(finished_distance=finished_distance, distance=distance, distance_perc=round(finished_distance/distance*100),
+                finished_idx=finished_idx, idx=len(route), idx_perc=round(finished_idx/len(route)*100),
+                remaining_time=round(max(len(route)-finished_idx, 0)*seconds_per_idx))
+
+@pytest.fixture
+def mowpath(monkeypatch):
+    rnd = random.Random(0)
+    route = [(rnd.uniform(-20, 20), rnd.uniform(-20, 20)) for i in range(200)]
+    current_map.calc_route_preview(route)
+    current_map.calc_route_mowpath()
+    monkeypatch.setattr(robot, 'seconds_per_idx', 1.5)
+    return route
+
+@pytest.mark.parametrize('mow_point_index', [0, 1, 2, 3, 57, 199, 200, 201, 250])
+def test_progress_same_as_linestrings(mowpath, mow_point_index, monkeypatch):
+    #finished index is mow point index - 1, 199 is the last point of the mow path and larger ones are past its end
+    monkeypatch.setattr(robot, 'position_mow_point_index', mow_point_index)
+    current_map.calc_mow_progress()
+    progress = {name: getattr(current_map, name) for name in ['finished_distance', 'distance', 'distance_perc', 'finished_idx', 'idx', 'idx_perc', 'remaining_time']}
+    assert progress == legacy_progress(mowpath, mow_point_index-1, robot.seconds_per_idx)
+
+def test_no_remaining_time_without_speed(mowpath, monkeypatch):
+    monkeypatch.setattr(robot, 'position_mow_point_index', 10)
+    monkeypatch.setattr(robot, 'seconds_per_idx', None)
+    current_map.calc_mow_progress()
+    assert current_map.remaining_time is None
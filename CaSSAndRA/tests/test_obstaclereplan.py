@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from shapely.geometry import *
+from shapely.ops import unary_union
+
+from src.backend.map.obstaclereplan import ObstacleReplanner
+
+def create_obstacle(center_x: float, center_y: float, size: float, crc: int) -> pd.DataFrame:
+    coords = [(center_x-size, center_y-size), (center_x+size, center_y-size), (center_x+size, center_y+size), (center_x-size, center_y+size)]
+    return pd.DataFrame([(x, y, 'points', crc) for x, y in coords], columns=['X', 'Y', 'type', 'CRC'])
+
+def zig_zag() -> np.ndarray:
+    #Mow lines in the free area below the exclusions
+    route = []
+    for nr, y in enumerate(np.arange(-12, -8, 0.5)):
+        line = [(-10, y), (10, y)]
+        route.extend(line[::-1] if nr % 2 else line)
+    return np.array(route)
+
+def test_detour_keeps_free_mow_lines(test_map):
+    replanner = ObstacleReplanner()
+    coords = zig_zag()
+    #one obstacle crossing two lines, one crossing a single line
+    obstacles = pd.concat([create_obstacle(0, -11.25, 0.4, 1), create_obstacle(5, -9, 0.2, 2)], ignore_index=True)
+    route, result = replanner.replan(coords, obstacles)
+    blocked = unary_union(replanner.obstacle_polygons(obstacles))
+    assert result['rerouted'] == result['spans'] == 3
+    assert result['failed'] == 0
+    assert route[0] == tuple(coords[0]) and route[-1] == tuple(coords[-1])
+    #no way through the obstacles, every free part of the mow lines is still mowed
+    route_line = LineString(route)
+    assert route_line.intersection(blocked.buffer(-1e-6)).length < 1e-6
+    free = LineString(coords).difference(blocked)
+    assert free.difference(route_line.buffer(1e-6)).length < 1e-6
+
+def test_no_obstacles_on_route(test_map):
+    coords = zig_zag()
+    route, result = ObstacleReplanner().replan(coords, create_obstacle(0, 5, 0.5, 1))
+    assert route == [tuple(point) for point in coords.tolist()]
+    assert result['spans'] == 0
+
+def test_start_inside_obstacle(test_map):
+    coords = np.array([(0, -11), (10, -11)])
+    replanner = ObstacleReplanner()
+    route, result = replanner.replan(coords, create_obstacle(0.5, -11, 1, 1))
+    assert route[0] == (0.0, -11.0) and route[-1] == (10.0, -11.0)
+    assert result['rerouted'] == 1
+    blocked = unary_union(replanner.obstacle_polygons(create_obstacle(0.5, -11, 1, 1)))
+    assert LineString(route[1:]).intersection(blocked.buffer(-1e-6)).length < 1e-6
@@ -0,0 +1,49 @@
+from shapely.geometry import *
+
+from src.backend.map.offsetchain import OffsetChains, offset_polygon
+
+def test_chain_same_as_offsets():
+    polygon = Point(0, 0).buffer(5)
+    offset_chains = OffsetChains()
+    chain = offset_chains.chain(polygon, -0.5, 0.02)
+    assert chain[0] is polygon
+    assert chain[-1].is_empty
+    expected = polygon
+    for offset in chain[1:]:
+        expected = offset_polygon(expected, -0.5, 0.02)
+        assert offset.equals(expected)
+    assert offset_chains.offset(polygon, -0.5, 0.02, 2).equals(chain[2])
+    assert offset_chains.offset(polygon, -0.5, 0.02, len(chain)).is_empty
+
+def test_lazy_extension_and_hits():
+    polygon = Point(0, 0).buffer(5)
+    offset_chains = OffsetChains()
+    offset_chains.chain(polygon, -0.5, depth=3)
+    assert (offset_chains.hits, offset_chains.misses) == (0, 2)
+    offset_chains.chain(polygon, -0.5, depth=5)
+    assert (offset_chains.hits, offset_chains.misses) == (2, 4)
+    offset_chains.chain(polygon, -0.5, depth=2)
+    assert (offset_chains.hits, offset_chains.misses) == (3, 4)
+    assert offset_chains.hit_ratio == 3/7
+    #other tolerance is another chain
+    offset_chains.chain(polygon, -0.5, 0.02, depth=2)
+    assert offset_chains.stats()['chains'] == 2
+
+def test_least_recently_used_evicted():
+    offset_chains = OffsetChains(max_offsets=6)
+    polygons = [Point(x*20, 0).buffer(5) for x in range(3)]
+    for polygon in polygons:
+        offset_chains.chain(polygon, -0.5, depth=3)
+    assert len(offset_chains.chains) == 3
+    #use first chain again, adding a fourth chain drops the second one
+    offset_chains.chain(polygons[0], -0.5, depth=3)
+    offset_chains.chain(Point(60, 0).buffer(5), -0.5, depth=3)
+    keys = list(offset_chains.chains)
+    assert offset_chains.key(polygons[1], -0.5, None) not in keys
+    assert offset_chains.key(polygons[0], -0.5, None) in keys
+    assert offset_chains.stats()['offsets'] <= 6
+    #a single chain longer than max_offsets is kept
+    offset_chains.chain(polygons[2], -0.5)
+    assert len(offset_chains.chains) >= 1
+    offset_chains.clear()
+    assert offset_chains.stats() == {'chains': 0, 'offsets': 0, 'hits': 0, 'misses': 0, 'hit ratio': 0.0}
@@ -0,0 +1,17 @@
+from shapely.geometry import LineString
+
+from src.backend.map.pathfinder import pathfinder
+
+def test_find_way_around_exclusion(test_map):
+    pathfinder.create()
+    pathfinder.angle = 0
+    nodes, edges = test_map.astar_graph.number_of_nodes(), test_map.astar_graph.number_of_edges()
+    start, goal = (-12.0, 3.0), (12.0, 3.0)
+    way = pathfinder.find_way(start, goal)
+    assert len(way) > 2
+    assert way[-1] == goal
+    assert test_map.perimeter_polygon.buffer(0.02).contains(LineString([start]+way))
+    #start and goal edges are only added for the query
+    assert test_map.astar_graph.number_of_nodes() == nodes
+    assert test_map.astar_graph.number_of_edges() == edges
+    assert pathfinder.overlay_edges is None
@@ -0,0 +1,13 @@
+from src.backend.data.mapcache import map_cache
+from src.backend.map import plan
+from conftest import create_perimeter
+
+def test_plan_batch_creates_maps_once():
+    jobs = plan.create_jobs(dict(test=create_perimeter()), ['lines'], [0.5], [0, 90], start=(0.0, -10.0))
+    results = plan.plan_batch(jobs, max_workers=2)
+    assert [result['stats']['state'] for result in results] == ['done', 'done']
+    assert [result['stats']['parameters']['angle'] for result in results] == [0, 90]
+    #workers load the map from the temporary map cache of the batch
+    assert all(result['stats']['map_time'] < 2 for result in results)
+    assert all(len(result['route']) > 2 for result in results)
+    assert map_cache.path is None
@@ -0,0 +1,143 @@
+import time
+import pytest
+
+from src.backend.data.cfgdata import PathPlannerCfg
+from src.backend.map.planningjobs import PlanningJobs
+
+@pytest.fixture
+def jobs():
+    planning_jobs = PlanningJobs(max_workers=1)
+    yield planning_jobs
+    planning_jobs.shutdown()
+
+def wait_for_state(jobs: PlanningJobs, job_id: str, states: list, timeout: float = 60) -> str:
+    end = time.time()+timeout
+    while time.time() < end:
+        state = jobs.status(job_id)['state']
+        if state in states:
+            return state
+        time.sleep(0.05)
+    return jobs.status(job_id)['state']
+
+def test_submit_done(jobs, test_map):
+    done = []
+    job_id = jobs.submit_simple(test_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=0.5, angle=0), on_done=done.append, source='tasks')
+    job = jobs.wait(job_id, timeout=120)
+    assert job.state == 'done'
+    assert job.source == 'tasks'
+    assert len(job.route) > 2
+    assert job.areatomow == round(test_map.perimeter_polygon.area)
+    assert done == [job]
+    assert not jobs.running_source('tasks')
+
+def test_progress(jobs, test_map):
+    updates = []
+    job_id = jobs.submit_simple(test_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=0.04, angle=0))
+    jobs.subscribe(job_id, lambda job: updates.append(dict(job.progress)))
+    job = jobs.wait(job_id, timeout=120)
+    assert job.state == 'done'
+    assert any(update.get('total_progress', 0) > 0 for update in updates)
+
+def test_cancel_running(jobs, test_map):
+    job_id = jobs.submit_simple(test_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=0.02, angle=0))
+    assert wait_for_state(jobs, job_id, ['running']) == 'running'
+    assert jobs.cancel(job_id)
+    job = jobs.wait(job_id, timeout=60)
+    assert job.state == 'cancelled'
+    assert job.route == []
+    assert not jobs.cancel(job_id)
+
+def test_cancel_source(jobs, test_map):
+    parameters = PathPlannerCfg(pattern='lines', width=0.02, angle=0)
+    api_job_id = jobs.submit_simple(test_map.perimeter_polygon, parameters, source='api')
+    tasks_job_id = jobs.submit_simple(test_map.perimeter_polygon, parameters, source='tasks')
+    assert jobs.cancel_source('tasks') == [tasks_job_id]
+    assert jobs.running_source('api')
+    assert jobs.wait(tasks_job_id, timeout=60).state == 'cancelled'
+    assert not jobs.running_source('tasks')
+    assert jobs.cancel_source('api') == [api_job_id]
+    assert jobs.wait(api_job_id, timeout=60).state == 'cancelled'
+
+def create_task(test_map) -> tuple:
+    #Two range selections (left and right half of the map) as saved by the tasks page
+    from src.backend.data.cfgdata import PathPlannerCfg
+    import pandas as pd
+    subtasks = pd.DataFrame([[0, 'range', -25, -25], [0, 'range', 0, 25], [1, 'range', 0, -25], [1, 'range', 25, 25]], columns=['task nr', 'type', 'X', 'Y'])
+    parameters = PathPlannerCfg(pattern='lines', width=0.5, angle=0)
+    subtasks_parameters = pd.DataFrame([dict(vars(parameters), **{'task nr': nr}) for nr in [0, 1]])
+    return subtasks, subtasks_parameters
+
+@pytest.fixture
+def parallel_jobs():
+    #parallel subtasks are on by default, they are used with more than one worker
+    planning_jobs = PlanningJobs(max_workers=2)
+    yield planning_jobs
+    planning_jobs.shutdown()
+
+def test_subtasks_serial_with_one_worker(jobs, test_map):
+    subtasks, subtasks_parameters = create_task(test_map)
+    job = jobs.wait(jobs.submit_task(subtasks, subtasks_parameters, source='tasks'), timeout=120)
+    assert job.state == 'done'
+    assert job.children == []
+    assert len(job.route) > 2
+
+def test_subtasks_in_job_pool(parallel_jobs, test_map):
+    subtasks, subtasks_parameters = create_task(test_map)
+    job_id = parallel_jobs.submit_task(subtasks, subtasks_parameters, source='tasks')
+    job = parallel_jobs.wait(job_id, timeout=120)
+    assert job.state == 'done'
+    assert [parallel_jobs.get(child_id).kind for child_id in job.children] == ['subtask', 'subtask']
+    assert parallel_jobs.get(job.stitch_job_id).state == 'done'
+    assert len(job.route) > 2
+    assert job.areatomow > 0
+    assert parallel_jobs.latest() is job
+
+def test_angle_candidates_in_job_pool(parallel_jobs, jobs, test_map, monkeypatch):
+    from src.backend.map.angleoptimizer import angle_optimizer
+    monkeypatch.setattr(angle_optimizer, 'angles', [0, 45, 90])
+    parameters = PathPlannerCfg(pattern='lines', width=0.5, angle=30, angleauto=True)
+    job = parallel_jobs.wait(parallel_jobs.submit_simple(test_map.perimeter_polygon, parameters, source='preview'), timeout=120)
+    assert job.state == 'done'
+    #every candidate angle is a child job, the parent selects the route
+    children = [parallel_jobs.get(child_id) for child_id in job.children]
+    assert [child.kind for child in children] == ['subtask']*3
+    assert [candidate.angle for index, candidate in job.candidates] == [0, 45, 90]
+    assert all(child.state == 'done' and len(child.route) > 1 for child in children)
+    scores = job.angle_scores[0]
+    best = [row for row in scores if row['selected']][0]
+    assert best['score'] == min(row['score'] for row in scores)
+    serial = jobs.wait(jobs.submit_simple(test_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=0.5, angle=best['angle']), source='preview'), timeout=120)
+    assert job.route == serial.route
+    assert job.areatomow == serial.areatomow
+
+def test_cancel_subtasks(parallel_jobs, test_map):
+    subtasks, subtasks_parameters = create_task(test_map)
+    subtasks_parameters['width'] = 0.02
+    job_id = parallel_jobs.submit_task(subtasks, subtasks_parameters, source='tasks')
+    assert parallel_jobs.cancel(job_id)
+    job = parallel_jobs.wait(job_id, timeout=10)
+    assert job.state == 'cancelled'
+    for child_id in job.children:
+        assert parallel_jobs.wait(child_id, timeout=60).state == 'cancelled'
+    assert job.stitch_job_id is None
+
+def test_replan_job(jobs, test_map):
+    import numpy as np
+    import pandas as pd
+    tail = np.array([(-10, -11), (10, -11), (10, -10), (-10, -10)], dtype=float)
+    obstacles = pd.DataFrame([(x, y, 'points', 1) for x, y in [(-0.5, -11.5), (0.5, -11.5), (0.5, -10.5), (-0.5, -10.5)]], columns=['X', 'Y', 'type', 'CRC'])
+    job = jobs.wait(jobs.submit('replan', tail, obstacles, source='state'), timeout=120)
+    assert job.state == 'done'
+    assert job.replan['rerouted'] == 1
+    assert job.points['after'] == len(job.route)
+    assert job.route[0] == (-10.0, -11.0) and job.route[-1] == (-10.0, -10.0)
+
+def test_state_published_after_on_done(jobs, test_map):
+    states = []
+    def on_done(job) -> None:
+        time.sleep(0.5)
+        states.append((job.state, jobs.status(job.job_id)['state']))
+    job_id = jobs.submit_simple(test_map.perimeter_polygon, PathPlannerCfg(pattern='lines', width=0.5, angle=0), on_done=on_done, source='tasks')
+    #ui polls the status, a final state means the result is applied
+    assert wait_for_state(jobs, job_id, ['done', 'failed', 'cancelled'], timeout=120) == 'done'
+    assert states == [('done', 'running')]
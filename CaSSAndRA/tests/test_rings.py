@@ -0,0 +1,14 @@
+import numpy as np
+from shapely.geometry import *
+
+from src.backend.map.rings import RingPool
+
+def test_candidates():
+    polygons = [Point(0, 0).buffer(1), Point(10, 0), Point(5, 0).buffer(1), Point(20, 0).buffer(1)]
+    pool = RingPool.create(polygons)
+    assert np.array_equal(pool.tree_vertices, np.flatnonzero(pool.polygon[pool.owner]))
+    assert pool.candidates((2, 0), True, 2.5).tolist() == [0, 2]
+    assert pool.candidates((2, 0), False, 2.5).tolist() == [1]
+    pool.remove(2)
+    assert pool.candidates((2, 0), True, 2.5).tolist() == [0]
+    assert pool.candidates((21.2, 0), True, 0.5).tolist() == [3]
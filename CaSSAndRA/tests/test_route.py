@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.data.route import Route
+
+def test_from_list_and_back():
+    route = Route.from_list([(0, 0), (3, 4), (3, 0)], type='preview')
+    assert route.coords.dtype == np.float64
+    assert route.coords.shape == (3, 2)
+    assert route.to_list() == [(0.0, 0.0), (3.0, 4.0), (3.0, 0.0)]
+    assert route.type == 'preview'
+    with pytest.raises(ValueError):
+        route.coords[0, 0] = 1
+
+def test_empty():
+    route = Route()
+    assert route.empty and len(route) == 0
+    assert route.length == 0.0
+    assert route.bounds == ()
+    assert route.crc == 0.0
+    assert route.to_geojson('preview')['geometry']['coordinates'] == []
+    assert Route.from_dataframe(pd.DataFrame(columns=['X', 'Y', 'type']), 'way').empty
+
+def test_derived_values():
+    route = Route.from_list([(0, 0), (3, 4), (3, 0)])
+    assert route.cumulative_length.tolist() == [0.0, 5.0, 9.0]
+    assert route.length == 9.0
+    assert route.bounds == (0.0, 0.0, 3.0, 4.0)
+    assert route.crc == pytest.approx(1000.0)
+    assert Route.from_list([(1.234, 2.5), (-3.0, 0.0)]).upload_coords == [',1.23,2.5', ',-3.0,0.0']
+
+def test_dataframe_round_trip():
+    data = pd.DataFrame({'X': [0.0, 1.0, 2.0, 5.0], 'Y': [0.0, 1.0, 2.0, 5.0], 'type': ['way', 'way', 'way', 'dockpoints']})
+    route = Route.from_dataframe(data, 'way')
+    assert len(route) == 3 and route.type == 'way'
+    assert Route.from_dataframe(data.iloc[3:]).type == 'dockpoints'
+    frame = route.with_type('mow').to_dataframe()
+    assert frame.columns.tolist() == ['X', 'Y', 'type']
+    assert frame['type'].unique().tolist() == ['mow']
+    #data frame is a copy, the route stays read only
+    frame.loc[0, 'X'] = 10
+    assert route.coords[0, 0] == 0.0
@@ -0,0 +1,73 @@
+import os
+from dataclasses import replace
+from shapely.geometry import *
+
+from conftest import create_perimeter
+from src.backend.data.cfgdata import PathPlannerCfg
+from src.backend.data.routecache import RouteCache, route_cache
+from src.backend.map import path
+
+def create_key(cache: RouteCache, **changes) -> str:
+    arguments = dict(perimeter=create_perimeter(), selected_perimeter=box(-10, -10, 10, 10),
+                     parameters=PathPlannerCfg(pattern='lines', width=0.5, angle=0), start_pos=[0.1, 0.1], options=(False,))
+    arguments.update(changes)
+    return cache.key(**arguments)
+
+def test_key_changes_with_inputs():
+    cache = RouteCache()
+    key = create_key(cache)
+    assert key == create_key(cache)
+    assert create_key(cache, selected_perimeter=box(-10, -10, 10, 11)) != key
+    parameters = PathPlannerCfg(pattern='lines', width=0.5, angle=0)
+    for change in [dict(pattern='squares'), dict(width=0.4), dict(angle=15), dict(distancetoborder=2), dict(mowarea=False),
+                   dict(mowborder=2), dict(mowexclusion=False), dict(mowborderccw=False)]:
+        assert create_key(cache, parameters=replace(parameters, **change)) != key, change
+    #start positions in the same bucket share the route
+    assert create_key(cache, start_pos=[0.2, 0.2]) == key
+    assert create_key(cache, start_pos=[0.3, 0.1]) != key
+    assert create_key(cache, options=(True,)) != key
+    edited = create_perimeter()
+    edited.loc[0, 'X'] += 0.1
+    assert create_key(cache, perimeter=edited) != key
+
+def test_random_angle_not_cached():
+    cache = RouteCache()
+    assert create_key(cache, parameters=PathPlannerCfg(pattern='lines', width=0.5, angle=None)) is None
+    assert create_key(cache, parameters=PathPlannerCfg(pattern='lines', width=0.5, angle=float('nan'))) is None
+
+def test_round_trip(tmp_path):
+    cache = RouteCache(path=str(tmp_path))
+    key = create_key(cache)
+    assert cache.load(key) is None
+    route = [(0.0, 0.0), (1.5, 0.25), (2.0, -3.0)]
+    cache.save(key, route)
+    assert cache.load(key) == route
+    #empty routes and routes without key are not saved
+    cache.save(create_key(cache, start_pos=[5, 5]), [])
+    cache.save(None, route)
+    assert os.listdir(tmp_path) == [key+'.npz']
+
+def test_invalidate_routes_of_map(tmp_path):
+    cache = RouteCache(path=str(tmp_path))
+    other = create_perimeter(points=30)
+    cache.save(create_key(cache), [(0, 0), (1, 1)])
+    cache.save(create_key(cache, start_pos=[5, 5]), [(0, 0), (1, 1)])
+    cache.save(create_key(cache, perimeter=other), [(0, 0), (1, 1)])
+    cache.invalidate_map(create_perimeter())
+    assert os.listdir(tmp_path) == [create_key(cache, perimeter=other)+'.npz']
+
+def test_edited_map_plans_new_route(test_map, tmp_path, monkeypatch):
+    monkeypatch.setattr(route_cache, 'path', str(tmp_path/'routes'))
+    parameters = PathPlannerCfg(pattern='lines', width=0.5, angle=0)
+    selection = box(-10, -10, 10, 10)
+    route = path.calc(selection, parameters, [0, -10])
+    hits = route_cache.hits
+    assert path.calc(selection, parameters, [0, -10]) == route
+    assert route_cache.hits == hits+1
+    #exclusion moved, cached routes of the old map are not used
+    test_map.perimeter.loc[test_map.perimeter['type'] == 'exclusion_1', 'Y'] -= 6
+    test_map.create_artifacts()
+    misses = route_cache.misses
+    route = path.calc(selection, parameters, [0, -10])
+    assert route_cache.misses == misses+1
+    assert route == path.calc_route(selection, parameters, [0, -10])
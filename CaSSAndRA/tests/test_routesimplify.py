@@ -0,0 +1,55 @@
+import numpy as np
+from shapely.geometry import *
+
+from src.backend.map.routesimplify import RouteSimplifier
+
+BORDER = Polygon([(0, 0), (20, 0), (20, 20), (0, 20)], [[(9, 5), (11, 5), (11, 7), (9, 7)]])
+
+def noisy_route(points: int = 2000, noise: float = 0.005) -> list:
+    #Zig-zag lines with many points and some noise, lines pass the exclusion below and above
+    rng = np.random.default_rng(1)
+    route = []
+    for nr, y in enumerate([y for y in np.arange(1, 19, 0.5) if not 4.8 < y < 7.2]):
+        x = np.linspace(1, 19, points//36)
+        line = np.column_stack((x, y+rng.uniform(-noise, noise, len(x))))
+        route.extend(line[::-1] if nr % 2 else line)
+    return [tuple(point) for point in np.asarray(route).tolist()]
+
+def test_disabled():
+    route = noisy_route()
+    simplified, points = RouteSimplifier(enabled=False).simplify(BORDER, route)
+    assert simplified is route
+    assert points == dict(before=len(route), after=len(route))
+
+def test_duplicates_and_collinear_points():
+    route = [(1, 1), (1, 1), (2, 1), (3, 1), (4, 1), (4, 2)]
+    simplified, points = RouteSimplifier(tolerance=0).simplify(BORDER, route)
+    assert simplified == [(1.0, 1.0), (4.0, 1.0), (4.0, 2.0)]
+    assert points == dict(before=6, after=3)
+
+def test_tolerance():
+    route = noisy_route()
+    for tolerance in (0.01, 0.05):
+        simplified, points = RouteSimplifier(tolerance=tolerance, max_chunk=100).simplify(BORDER, route)
+        assert points['after'] < points['before']
+        assert simplified[0] == route[0] and simplified[-1] == route[-1]
+        #every point of the route is within tolerance of the simplified route
+        simplified_line = LineString(simplified)
+        assert max(simplified_line.distance(Point(point)) for point in route) <= tolerance + 1e-9
+
+def test_border():
+    #with a big tolerance the route would cut the exclusion, shortcuts have to stay direct ways
+    route = [(1, 6), (8.9, 6), (8.9, 4.9), (11.1, 4.9), (11.1, 6), (19, 6)]
+    simplified, points = RouteSimplifier(tolerance=5).simplify(BORDER, route)
+    assert all(BORDER.contains(LineString(simplified[nr:nr+2])) for nr in range(len(simplified)-1))
+    assert LineString(simplified).within(BORDER)
+    simplified, points = RouteSimplifier(tolerance=5).simplify(BORDER, noisy_route())
+    assert all(BORDER.contains(LineString(simplified[nr:nr+2])) for nr in range(len(simplified)-1))
+
+def test_options_applied_in_worker():
+    from src.backend.map.planningjobs import apply_planner_options
+    from src.backend.map.routesimplify import route_simplifier
+    enabled, tolerance = route_simplifier.enabled, route_simplifier.tolerance
+    apply_planner_options(dict(simplify=False, simplifytolerance=0.05))
+    assert (route_simplifier.enabled, route_simplifier.tolerance) == (False, 0.05)
+    apply_planner_options(dict(simplify=enabled, simplifytolerance=tolerance))
@@ -0,0 +1,61 @@
+import numpy as np
+from shapely.geometry import *
+from shapely.geometry.polygon import orient
+
+from src.backend.map.segmentorder import SegmentOrder
+
+def create_ways(test_map):
+    #Horizontal mow lines in the free area and a ccw edge around every exclusion
+    border = test_map.perimeter_polygon
+    lines = []
+    for y in np.arange(-12, 12, 1.5):
+        line = border.intersection(LineString([(-25, y), (25, y)]))
+        for part in getattr(line, 'geoms', [line]):
+            if isinstance(part, LineString) and part.length > 1:
+                lines.append(list(part.coords))
+    edges = [orient(Polygon(interior).buffer(0.3, join_style=2), sign=1.0) for interior in border.interiors]
+    return border, lines, edges
+
+def find_ring(route: list, edge: Polygon) -> list:
+    #Part of the route running along the edge
+    coords = set(edge.exterior.coords)
+    start = next(nr for nr, point in enumerate(route) if tuple(point) in coords)
+    end = start
+    while end+1 < len(route) and tuple(route[end+1]) in coords:
+        end += 1
+    return route[start:end+1]
+
+def test_ring_endpoints():
+    ways = [[(0, 0), (1, 0)], [(0, 0), (1, 0), (1, 1)]]
+    first, last = SegmentOrder().endpoints(ways, np.array([False, True]))
+    assert (last[0] == (1, 0)).all()
+    assert (last[1] == first[1]).all()
+
+def test_rings_closed_and_ccw(test_map):
+    from src.backend.map.pathfinder import pathfinder
+    border, lines, edges = create_ways(test_map)
+    pathfinder.create()
+    segment_order = SegmentOrder(enabled=True, time_budget=5)
+    #planner route: lines in given order (zig zag), edges at the end, only transits change in the optimized route
+    route = [(0.0, -10.0)]
+    for nr, line in enumerate(lines):
+        route.extend(line if nr % 2 == 0 else line[::-1])
+    route_optimized = segment_order.optimize(border, lines, edges, [(0.0, -10.0)], route)
+    assert route_optimized is not route
+    assert LineString(route_optimized).length < LineString(route).length
+    for edge in edges:
+        ring = find_ring(route_optimized, edge)
+        assert tuple(ring[0]) == tuple(ring[-1])
+        assert len(ring) == len(edge.exterior.coords)
+        assert LinearRing(ring).is_ccw
+
+def test_options_applied_in_worker():
+    from src.backend.map.planningjobs import apply_planner_options
+    from src.backend.map.segmentorder import segment_order
+    assert not segment_order.enabled
+    apply_planner_options(dict(segmentorder=True))
+    assert segment_order.enabled
+    apply_planner_options(dict())
+    assert segment_order.enabled
+    apply_planner_options(dict(segmentorder=False))
+    assert not segment_order.enabled
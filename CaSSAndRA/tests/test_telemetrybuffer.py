@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.data.telemetrybuffer import TelemetryBuffer
+
+SCHEMA = {'battery_voltage': 'float32', 'job': 'int8', 'solution': 'category', 'timestamp': 'datetime64[ns]'}
+
+def create_rows(count: int, start: str = '2024-05-01 10:00:00') -> pd.DataFrame:
+    return pd.DataFrame({'battery_voltage': np.linspace(25, 28, count), 'job': np.arange(count) % 3,
+                         'solution': ['fix']*count, 'timestamp': pd.date_range(start, periods=count, freq='s')})
+
+def test_append_and_grow():
+    buffer = TelemetryBuffer(schema=SCHEMA, chunk_size=4)
+    for nr in range(10):
+        buffer.append(dict(battery_voltage=25.0+nr, job=1, solution='fix' if nr % 2 else 'float', timestamp=np.datetime64('2024-05-01T10:00:00')+np.timedelta64(nr, 's')))
+    assert len(buffer) == 10
+    assert buffer.capacity == 16
+    assert buffer.data['battery_voltage'].dtype == np.float32
+    assert buffer.data['solution'].dtype == np.int16
+    assert buffer.frame['solution'].tolist() == ['float', 'fix']*5
+    assert buffer.last()['battery_voltage'] == 34.0
+    assert buffer.generation == 0
+
+def test_frame_is_read_only_view():
+    buffer = TelemetryBuffer(schema=SCHEMA)
+    buffer.extend(create_rows(5))
+    frame = buffer.frame
+    assert frame is buffer.frame
+    assert np.shares_memory(frame['battery_voltage'].to_numpy(), buffer.data['battery_voltage'])
+    with pytest.raises(ValueError):
+        frame['battery_voltage'].to_numpy()[0] = 0
+    #snapshot stays valid after further appends
+    buffer.extend(create_rows(3))
+    assert len(frame) == 5 and len(buffer.frame) == 8
+
+def test_new_columns_and_promotion():
+    buffer = TelemetryBuffer(schema=SCHEMA)
+    buffer.append(dict(battery_voltage=25.0, counter=1))
+    buffer.append(dict(battery_voltage=26.0, counter=1.5))
+    buffer.append(dict(battery_voltage=27.0, counter='x'))
+    assert buffer.data['counter'].dtype == object
+    assert buffer.frame['counter'].tolist() == [1, 1.5, 'x']
+    #missing values get defaults
+    assert np.isnat(buffer.data['timestamp'][0])
+    assert buffer.last()['solution'] is None
+
+def test_replace_and_drop_head():
+    buffer = TelemetryBuffer(schema=SCHEMA)
+    buffer.extend(create_rows(6))
+    frame = buffer.frame
+    buffer.drop_head(2)
+    assert len(buffer) == 4 and buffer.generation == 1
+    assert buffer.frame['battery_voltage'].iloc[0] == frame['battery_voltage'].iloc[2]
+    assert len(frame) == 6
+    buffer.replace(create_rows(3))
+    assert len(buffer) == 3 and buffer.generation == 2
+    assert buffer.tail(2)['job'].tolist() == [1, 2]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.data import telemetryquery
+from src.backend.data.telemetrybuffer import TelemetryBuffer
+from src.backend.data.telemetrystore import TelemetryStore
+from src.backend.data.telemetryquery import TelemetryQuery
+
+SCHEMA = {'battery_voltage': 'float32', 'job': 'int8', 'timestamp': 'datetime64[ns]'}
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = TelemetryStore(path=str(tmp_path))
+    store.register('state', TelemetryBuffer(schema=SCHEMA))
+    monkeypatch.setattr(telemetryquery, 'telemetry_store', store)
+    return store
+
+def create_rows(start: str, count: int, freq: str = 'h') -> pd.DataFrame:
+    return pd.DataFrame({'battery_voltage': np.arange(count, dtype=float), 'job': np.ones(count, dtype=int), 'timestamp': pd.date_range(start, periods=count, freq=freq)})
+
+def test_range(store):
+    store.tables['state'].extend(create_rows('2024-05-01', 48))
+    query = TelemetryQuery()
+    data = query.range('state', '2024-05-01 10:00', '2024-05-01 12:00')
+    assert data['battery_voltage'].tolist() == [11, 12]
+    data = query.range('state', '2024-05-01 10:00', '2024-05-01 12:00', closed='both', columns=['timestamp'])
+    assert data.columns.tolist() == ['timestamp'] and len(data) == 3
+    assert len(query.range('state')) == 48
+    assert len(query.range('state', end='2024-05-01 00:00')) == 1
+    assert query.range('state', '2024-06-01').empty
+    assert query.bounds('state') == (pd.Timestamp('2024-05-01 00:00'), pd.Timestamp('2024-05-02 23:00'))
+
+def test_finished_days_cached(store):
+    buffer = store.tables['state']
+    buffer.extend(create_rows('2024-05-01', 24))
+    query = TelemetryQuery()
+    data = query.range('state', '2024-05-01', '2024-05-01 23:00')
+    assert query.range('state', '2024-05-01', '2024-05-01 23:00') is data
+    #replaced rows are a new generation, cache is not used
+    buffer.replace(create_rows('2024-05-01', 12))
+    assert len(query.range('state', '2024-05-01', '2024-05-01 23:00')) == 11
+
+def test_unordered_timestamps(store):
+    rows = create_rows('2024-05-01', 10)
+    rows.loc[5, 'timestamp'] = pd.Timestamp('1970-01-01')
+    store.tables['state'].extend(rows)
+    query = TelemetryQuery()
+    data = query.range('state', '2024-05-01 02:00', '2024-05-01 07:00')
+    assert data['battery_voltage'].tolist() == [3, 4, 6, 7]
+    assert len(query.range('state', '2024-05-01 02:00', '2024-05-01 04:00')) == 2
+    assert not query.ordered['state'][2]
+
+def test_older_rows_from_store(store):
+    buffer = store.tables['state']
+    buffer.extend(create_rows('2024-05-01', 48))
+    store.flush()
+    #only the last day is loaded into the buffer
+    store.load(pd.Timestamp('2024-05-02'))
+    assert len(buffer) == 24
+    data = TelemetryQuery().range('state', '2024-05-01 20:00', '2024-05-02 02:00')
+    assert data['battery_voltage'].tolist() == [21, 22, 23, 24, 25, 26]
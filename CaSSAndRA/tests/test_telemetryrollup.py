@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.data import telemetryquery, telemetryrollup
+from src.backend.data.telemetrybuffer import TelemetryBuffer
+from src.backend.data.telemetrystore import TelemetryStore
+from src.backend.data.telemetryquery import TelemetryQuery
+from src.backend.data.telemetryrollup import TelemetryRollup
+from src.backend.data.telemetryschema import STATE_SCHEMA, CALCED_FROM_STATS_SCHEMA
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TelemetryStore()
+    store.register('state', TelemetryBuffer(schema=STATE_SCHEMA))
+    store.register('calced_from_stats', TelemetryBuffer(schema=CALCED_FROM_STATS_SCHEMA))
+    monkeypatch.setattr(telemetryquery, 'telemetry_store', store)
+    monkeypatch.setattr(telemetryrollup, 'telemetry_store', store)
+    monkeypatch.setattr(telemetryrollup, 'telemetry', TelemetryQuery())
+    return store
+
+def create_state(start: str, count: int, freq: str = '10s') -> pd.DataFrame:
+    #voltage 0..count-1, every second row mowing (job 1) with fix solution and lateral error 0.1
+    return pd.DataFrame({'battery_voltage': np.arange(count, dtype=float), 'amps': np.ones(count), 'job': np.arange(count) % 2,
+                         'position_solution': np.full(count, 2), 'lateral_error': np.full(count, 0.1),
+                         'timestamp': pd.date_range(start, periods=count, freq=freq)})
+
+def test_minute_and_hour_buckets(store):
+    store.tables['state'].extend(create_state('2024-05-01 10:00', 12))
+    rollup = TelemetryRollup()
+    minutes = rollup.range('state', 'minute')
+    assert minutes['count'].tolist() == [6, 6]
+    assert minutes['battery_voltage'].tolist() == [2.5, 8.5]
+    assert minutes['battery_voltage_min'].tolist() == [0, 6] and minutes['battery_voltage_max'].tolist() == [5, 11]
+    hours = rollup.range('state', 'hour')
+    assert hours['count'].tolist() == [12] and hours['battery_voltage'].tolist() == [5.5]
+    #mow rollup: rows of job 1 only, lateral error histogram of fix solutions
+    assert rollup.range('state_mow', 'hour')['count'].tolist() == [6]
+    histogram, bins = rollup.histogram('state_mow', 'day')
+    assert histogram.sum() == 6
+    assert bins[np.argmax(histogram)] == pytest.approx(0.1)
+
+def test_incremental_update_and_rebuild(store):
+    buffer = store.tables['state']
+    buffer.extend(create_state('2024-05-01 10:00', 6))
+    rollup = TelemetryRollup()
+    assert rollup.range('state', 'minute')['count'].tolist() == [6]
+    buffer.extend(create_state('2024-05-01 10:01', 6))
+    assert rollup.range('state', 'minute')['count'].tolist() == [6, 6]
+    #rows older than the last bucket (clock jump back): rollups are rebuilt in time order
+    buffer.extend(create_state('2024-05-01 09:00', 3))
+    assert rollup.range('state', 'minute')['count'].tolist() == [3, 6, 6]
+    #replaced rows (new generation)
+    buffer.replace(create_state('2024-05-01 12:00', 2))
+    minutes = rollup.range('state', 'minute')
+    assert minutes['count'].tolist() == [2]
+    assert minutes['timestamp'].tolist() == [pd.Timestamp('2024-05-01 12:00')]
+
+def test_sums_and_range(store):
+    stats = pd.DataFrame({'duration_mow': [60, 120, 30], 'duration_mow_fix': [50, 100, 30],
+                          'timestamp': pd.to_datetime(['2024-05-01 10:00', '2024-05-01 18:00', '2024-05-02 08:00'])})
+    store.tables['calced_from_stats'].extend(stats)
+    rollup = TelemetryRollup()
+    days = rollup.range('calced_from_stats', 'day')
+    assert days['duration_mow'].tolist() == [180, 30]
+    assert days['duration_mow_fix'].tolist() == [150, 30]
+    assert rollup.range('calced_from_stats', 'hour', '2024-05-01 12:00', '2024-05-02 12:00')['duration_mow'].tolist() == [120, 30]
+
+def test_resolution(store):
+    store.tables['state'].extend(create_state('2024-05-01 00:00', 3*24*360))
+    rollup = TelemetryRollup(max_points=200)
+    #raw rows, finest resolution with not more than max_points buckets
+    assert rollup.resolution('state', '2024-05-01 10:00', '2024-05-01 10:10') is None
+    assert rollup.resolution('state', '2024-05-01 10:00', '2024-05-01 11:00') == 'minute'
+    assert rollup.resolution('state') == 'hour'
+    rollup.max_points = 2
+    assert rollup.resolution('state') == 'day'
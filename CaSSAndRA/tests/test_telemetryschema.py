@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from src.backend.data.telemetryschema import apply_schema, migrate, STATE_SCHEMA, CALCED_FROM_STATE_SCHEMA
+
+def test_migrate_old_state_data():
+    #data of older versions: string timestamps, int64/float64 and object columns
+    data = pd.DataFrame({'battery_voltage': [27.1, 27.0], 'position_solution': [2, 1], 'job': [1, 1], 'map_crc': [123456789012, 1],
+                         'timestamp': ['2024-05-01 10:00:00', '2024-05-01T10:00:01.5'], 'unknown': ['a', 'b']})
+    migrated = migrate('state', data, STATE_SCHEMA)
+    assert migrated is not data
+    assert migrated['battery_voltage'].dtype == np.float32
+    assert migrated['position_solution'].dtype == np.int8
+    assert migrated['map_crc'].dtype == np.int64 and migrated['map_crc'].iloc[0] == 123456789012
+    assert migrated['timestamp'].dtype == 'datetime64[ns]'
+    assert migrated['timestamp'].iloc[1] == pd.Timestamp('2024-05-01 10:00:01.5')
+    assert migrated['unknown'].tolist() == ['a', 'b']
+    assert data['timestamp'].dtype == object
+
+def test_invalid_values():
+    data = pd.DataFrame({'job': ['1', None, 'x'], 'amps': ['0.5', '', None], 'timestamp': ['2024-05-01 10:00:00', 'invalid', None]})
+    migrated = apply_schema(data, STATE_SCHEMA)
+    assert migrated['job'].tolist() == [1, 0, 0]
+    assert migrated['amps'].iloc[0] == np.float32(0.5) and migrated['amps'].isna().sum() == 2
+    assert migrated['timestamp'].isna().tolist() == [False, True, True]
+
+def test_categories_and_unchanged_data():
+    data = pd.DataFrame({'solution': ['fix', 'float', 'fix'], 'soc': [0.5, 0.6, 0.7]})
+    migrated = apply_schema(data, CALCED_FROM_STATE_SCHEMA)
+    assert migrated['solution'].dtype == 'category'
+    assert migrated['solution'].cat.categories.tolist() == ['fix', 'float']
+    #typed data is not copied again
+    assert apply_schema(migrated, CALCED_FROM_STATE_SCHEMA) is migrated
@@ -0,0 +1,79 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from src.backend.data.telemetrybuffer import TelemetryBuffer
+from src.backend.data.telemetrystore import TelemetryStore
+
+SCHEMA = {'battery_voltage': 'float32', 'solution': 'category', 'timestamp': 'datetime64[ns]'}
+
+def create_store(path) -> tuple:
+    store = TelemetryStore(path=str(path))
+    buffer = TelemetryBuffer(schema=SCHEMA)
+    store.register('state', buffer)
+    return store, buffer
+
+def create_rows(timestamps: list, voltage: float = 25.0) -> pd.DataFrame:
+    return pd.DataFrame({'battery_voltage': voltage+np.arange(len(timestamps)), 'solution': ['fix', 'float']*(len(timestamps)//2)+['fix']*(len(timestamps) % 2),
+                         'timestamp': pd.to_datetime(timestamps)})
+
+def test_flush_and_load(tmp_path):
+    store, buffer = create_store(tmp_path)
+    buffer.extend(create_rows(['2024-05-01 23:59:59', '2024-05-02 00:00:00', '2024-05-02 10:00:00']))
+    assert store.flush() == 3
+    assert store.flush() == 0
+    assert store.segments('state') == ['2024-05-01', '2024-05-02']
+    buffer.extend(create_rows(['2024-05-02 11:00:00'], 30))
+    assert store.flush() == 1
+    store_loaded, buffer_loaded = create_store(tmp_path)
+    store_loaded.load()
+    assert len(buffer_loaded) == 4
+    assert buffer_loaded.frame['battery_voltage'].tolist() == [25, 26, 27, 30]
+    assert buffer_loaded.frame['solution'].tolist() == ['fix', 'float', 'fix', 'fix']
+    #segment granularity
+    assert len(store_loaded.read('state', '2024-05-02 12:00', '2024-05-03')) == 3
+
+def test_incomplete_flush(tmp_path):
+    store, buffer = create_store(tmp_path)
+    buffer.extend(create_rows(['2024-05-01 10:00:00', '2024-05-01 10:00:01']))
+    store.flush()
+    #crash after writing column data, before segment.json
+    with open(os.path.join(store.segment_path('state', '2024-05-01'), 'battery_voltage.bin'), 'ab') as f:
+        np.array([99], dtype=np.float32).tofile(f)
+    assert len(store.read('state')) == 2
+    buffer.extend(create_rows(['2024-05-01 10:00:02'], 40))
+    store.flush()
+    assert store.read('state')['battery_voltage'].tolist() == [25, 26, 40]
+
+def test_segments_with_clock_jumps(tmp_path):
+    store, buffer = create_store(tmp_path)
+    #host without RTC: 1970 until time is synchronized, later a jump back by one day
+    buffer.extend(create_rows(['1970-01-01 00:00:10', '1970-01-01 00:00:11']))
+    store.flush()
+    assert store.segments('state') == ['2020-01-01']
+    buffer.extend(create_rows(['2024-05-02 10:00:00', '2024-05-01 10:00:00', '2024-05-02 10:00:01']))
+    store.flush()
+    assert store.segments('state') == ['2020-01-01', '2024-05-02']
+    assert store.read_segment_meta('state', '2024-05-02')['rows'] == 3
+    #timestamps stay as they are, last segment is known after a restart
+    store_restarted, buffer_restarted = create_store(tmp_path)
+    store_restarted.load()
+    buffer_restarted.extend(create_rows(['2024-04-30 10:00:00']))
+    store_restarted.flush()
+    assert store_restarted.segments('state') == ['2020-01-01', '2024-05-02']
+    assert store_restarted.read('state')['timestamp'].iloc[-1] == pd.Timestamp('2024-04-30 10:00:00')
+
+def test_drop_before_unordered(tmp_path):
+    store, buffer = create_store(tmp_path)
+    buffer.extend(create_rows(['2024-05-01 10:00:00', '2024-05-03 10:00:00', '1970-01-01 00:00:01', '2024-05-03 10:00:01']))
+    store.flush()
+    buffer.extend(create_rows(['2024-05-01 11:00:00', '2024-05-03 11:00:00'], 30))
+    store.drop_before(pd.Timestamp('2024-05-02 12:00'))
+    assert buffer.frame['timestamp'].tolist() == pd.to_datetime(['2024-05-03 10:00:00', '2024-05-03 10:00:01', '2024-05-03 11:00:00']).tolist()
+    #rows of the buffer not written yet are still flushed once
+    assert store.flushed['state'] == 2
+    assert store.flush() == 1
+    assert store.segments('state') == ['2024-05-03']
+    #retention on disk removes whole segments, the 1970 row was written to the segment of 2024-05-03
+    assert store.read('state')['battery_voltage'].tolist() == [26, 27, 28, 31]
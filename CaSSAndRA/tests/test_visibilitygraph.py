@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from shapely.geometry import *
+
+from src.backend.map import visibilitygraph
+from src.backend.map.benchmark import legacy_graph, same_graph
+from src.backend.map.directway import directway
+
+def brute_force_visible(polygon: Polygon, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    return np.array([LineString([start, end]).within(polygon) for start, end in zip(starts.tolist(), ends.tolist())], dtype=bool)
+
+def record_check_many(monkeypatch) -> list:
+    calls = []
+    check_many = directway.check_many
+    def recorded(border, starts, ends):
+        result = check_many(border, starts, ends)
+        calls.append((len(starts), int(result.sum())))
+        return result
+    monkeypatch.setattr(directway, 'check_many', recorded)
+    return calls
+
+def test_visible_same_as_within(test_map, monkeypatch):
+    #every pair of border vertices, including ways along and through the border
+    polygon = test_map.perimeter_polygon
+    coords = np.concatenate([np.asarray(ring.coords, dtype=float)[:-1] for ring in [polygon.exterior, *polygon.interiors]])
+    starts_idx, ends_idx = np.triu_indices(len(coords), 1)
+    starts, ends = coords[starts_idx], coords[ends_idx]
+    calls = record_check_many(monkeypatch)
+    assert np.array_equal(visibilitygraph.visible(polygon, starts, ends), brute_force_visible(polygon, starts, ends))
+    #pairs touching the border are checked exactly
+    assert sum(pairs for pairs, visible in calls) > 0
+    #ways crossing the border are found by the orientation test
+    crossing, ambiguous = visibilitygraph.classify(polygon, visibilitygraph.border_segments(polygon), starts, ends)
+    assert crossing.any() and ambiguous.any()
+    assert not brute_force_visible(polygon, starts[crossing], ends[crossing]).any()
+
+def test_edges_same_as_brute_force(test_map, monkeypatch):
+    calls = record_check_many(monkeypatch)
+    G = visibilitygraph.create(test_map.perimeter_polygon, test_map.search_wire)
+    assert sum(pairs for pairs, visible in calls) > 0
+    assert same_graph(legacy_graph(test_map.perimeter_polygon, test_map.search_wire), G)
+
+def test_edges_with_search_wire_same_as_brute_force(test_map):
+    search_wire = pd.DataFrame([(-15, -2, 'search wire'), (-4, -6, 'search wire'), (0, 0, 'search wire'), (12, 0, 'search wire')], columns=['X', 'Y', 'type'])
+    test_map.perimeter = pd.concat([test_map.perimeter, search_wire], ignore_index=True)
+    test_map.create_artifacts()
+    assert not test_map.search_wire.is_empty
+    G = visibilitygraph.create(test_map.perimeter_polygon, test_map.search_wire)
+    assert same_graph(legacy_graph(test_map.perimeter_polygon, test_map.search_wire), G)
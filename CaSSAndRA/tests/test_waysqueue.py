@@ -0,0 +1,51 @@
+import numpy as np
+from shapely.geometry import LineString
+
+from src.backend.map.waysqueue import WaysQueue
+
+def create_queue(lines: int = 200) -> WaysQueue:
+    queue = WaysQueue()
+    rng = np.random.default_rng(1)
+    for level in range(lines):
+        x = rng.uniform(-10, 10)
+        coords = [(x, level*0.2), (x+rng.uniform(1, 5), level*0.2)]
+        queue.add(LineString(coords), coords, 'area', level, level)
+    coords = [(0, 5), (1, 5), (1, 6), (0, 6), (0, 5)]
+    queue.add(LineString(coords), coords, 'edge', 25, 30)
+    queue.build()
+    return queue
+
+def test_incremental_index_matches_scan():
+    queue = create_queue()
+    rng = np.random.default_rng(2)
+    for way_id in rng.permutation(len(queue))[:150]:
+        queue.remove(int(way_id))
+        alive = ~queue.gone
+        assert np.array_equal(queue.mask(), alive)
+        assert np.array_equal(queue.mask(type='area'), alive & (queue.types == 'area'))
+        assert np.array_equal(queue.ids(type='area', level_min_range=(40, 60)),
+                              np.flatnonzero(alive & (queue.types == 'area') & (queue.level_min >= 40) & (queue.level_min <= 60)))
+        assert queue.count() == alive.sum()
+    assert queue.finished == 150
+
+def test_nearest():
+    queue = create_queue()
+    for way_id in range(0, len(queue), 3):
+        queue.remove(way_id)
+    point = (2.0, 13.0)
+    alive = np.flatnonzero((~queue.gone) & (queue.types == 'area'))
+    distances = (queue.start[alive, 0]-point[0])**2 + (queue.start[alive, 1]-point[1])**2
+    assert queue.nearest(point, type='area') == alive[np.argmin(distances)]
+    ids = queue.ids(type='area', level_min_range=(0, 10))
+    distances = (queue.end[ids, 0]-point[0])**2 + (queue.end[ids, 1]-point[1])**2
+    assert queue.nearest(point, type='area', ids=ids, use_end=True) == ids[np.argmin(distances)]
+    assert queue.nearest(point, ids=np.empty(0, dtype=int)) is None
+
+def test_edge_levels():
+    queue = create_queue()
+    edge_id = len(queue)-1
+    assert list(queue.ids(type='edge', level=27)) == [edge_id]
+    assert len(queue.ids(type='edge', level=31)) == 0
+    assert list(queue.ids(type='edge')) == [edge_id]
+    queue.remove(edge_id)
+    assert len(queue.ids(type='edge', level=27)) == 0